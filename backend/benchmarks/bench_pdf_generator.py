@@ -0,0 +1,99 @@
+"""
+Benchmark for utils/pdf_generator.generate_meeting_summary_pdf.
+
+Renders a synthetic meeting with N agenda items (each with a patient and a
+multi-paragraph treatment plan), N patients, N/2 decisions and 30
+participants, in standard and in large-document mode, and reports wall time,
+peak RSS and output size. Each case runs in a fresh process so the RSS peak
+belongs to that case alone. Large mode writes to a file sink, as the export
+workers do.
+
+USAGE
+-----
+    cd backend
+    python benchmarks/bench_pdf_generator.py                # 10 / 100 / 500 items
+    python benchmarks/bench_pdf_generator.py --sizes 150 --repeat 3
+"""
+import argparse
+import multiprocessing
+import os
+import resource
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+PLAN = (
+    "Continue current regimen and reassess renal function in two weeks.\n"
+    "Refer to oncology for staging CT; discuss surgical options at next board.\n"
+    "Physiotherapy twice weekly. Review analgesia and adjust if pain persists."
+)
+
+
+def build(items: int):
+    meeting = {"title": "Annual Case Review", "meeting_date": "2026-12-01", "start_time": "09:00",
+               "end_time": "17:00", "meeting_type": "video", "status": "completed",
+               "organizer_name": "Dr. Organizer", "description": "Year-end multidisciplinary review"}
+    participants = [{"name": f"Dr. Participant {i}", "role": "doctor", "specialty": "Cardiology",
+                     "response_status": "accepted"} for i in range(30)]
+    patients = [{"first_name": f"Patient{i}", "last_name": "Example", "patient_id_number": f"MRN{i:06d}",
+                 "age": 40 + i % 40, "department_name": "Cardiology",
+                 "primary_diagnosis": "Heart failure with reduced ejection fraction"} for i in range(items)]
+    agenda = [{"title": f"Case {i}: follow-up review", "description": "Progress since last board",
+               "patient_name": f"Patient{i} Example", "patient_mrn": f"MRN{i:06d}", "presenter": "Dr. Presenter",
+               "duration": 10, "treatment_plan": PLAN} for i in range(items)]
+    decisions = [{"title": f"Decision for case {i}", "description": "Proceed with plan as discussed.\nRe-review in 3 months.",
+                  "decision_maker": "Dr. Organizer", "created_at": "December 01, 2026 at 10:00 AM"}
+                 for i in range(items // 2)]
+    return meeting, participants, patients, agenda, decisions
+
+
+def _case(items: int, large: bool, queue) -> None:
+    from utils.pdf_generator import generate_meeting_summary_pdf
+
+    data = build(items)
+    baseline = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    start = time.perf_counter()
+    if large:
+        with tempfile.TemporaryFile() as sink:
+            generate_meeting_summary_pdf(*data, output=sink, large=True)
+            size = sink.tell()
+    else:
+        size = len(generate_meeting_summary_pdf(*data, large=False))
+    elapsed = time.perf_counter() - start
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss  # KiB on Linux
+    queue.put((elapsed, peak / 1024, (peak - baseline) / 1024, size))
+
+
+def run(items: int, large: bool):
+    ctx = multiprocessing.get_context("spawn")
+    queue = ctx.Queue()
+    proc = ctx.Process(target=_case, args=(items, large, queue))
+    proc.start()
+    result = queue.get()
+    proc.join()
+    return result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 100, 500])
+    parser.add_argument("--repeat", type=int, default=1)
+    args = parser.parse_args()
+
+    print(f"{'items':>6} {'mode':>9} {'time s':>8} {'peak RSS MiB':>13} {'growth MiB':>11} {'PDF KiB':>8}")
+    for items in args.sizes:
+        for large in (False, True):
+            runs = [run(items, large) for _ in range(args.repeat)]
+            elapsed = statistics.median(r[0] for r in runs)
+            peak = max(r[1] for r in runs)
+            growth = max(r[2] for r in runs)
+            size = runs[0][3]
+            mode = "large" if large else "standard"
+            print(f"{items:>6} {mode:>9} {elapsed:>8.2f} {peak:>13.1f} {growth:>11.1f} {size / 1024:>8.0f}")
+
+
+if __name__ == "__main__":
+    main()
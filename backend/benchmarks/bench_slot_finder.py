@@ -0,0 +1,104 @@
+"""
+Benchmark for services/slot_finder.find_common_slots.
+
+Builds a synthetic multi-site MDT: N participants spread over several
+timezones and holiday calendars, each with a few bookings per working day,
+then times the slot search over the whole horizon. No database is needed —
+the busy rows are generated in the shape `busy_intervals` returns.
+
+USAGE
+-----
+    cd backend
+    python benchmarks/bench_slot_finder.py                 # 200 users, 90 days
+    python benchmarks/bench_slot_finder.py --users 50 --days 30 --per-day 6
+
+Two cases are timed: the normal one (each user booked on `--busy-share` of
+the days; the search stops at the first `limit` slots) and a saturated
+calendar where no slot exists, so every candidate in the horizon is checked.
+Working hours are 08:00-18:00 local in every participant's own timezone.
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+from datetime import date, datetime, timedelta, timezone
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from services.busy_index import epoch_minutes  # noqa: E402
+from services.slot_finder import find_common_slots  # noqa: E402
+
+TIMEZONES = ["Europe/London", "Europe/Berlin", "Europe/Paris", "America/New_York", "America/Chicago", "UTC"]
+COUNTRIES = ["United Kingdom", "Germany", "France", "United States", "United States", "United States"]
+
+
+def build(users: int, days: int, per_day: int, busy_share: float, seed: int = 7):
+    rng = random.Random(seed)
+    start = date.today() + timedelta(days=1)
+    participants, rows = [], []
+    for i in range(users):
+        k = i % len(TIMEZONES)
+        participants.append({
+            "id": f"user-{i}",
+            "timezone": TIMEZONES[k],
+            "country": COUNTRIES[k],
+            "enabled_default_holidays": ["Christmas Day", "New Year's Day"],
+            "custom_holidays": [{"date": (start + timedelta(days=rng.randrange(days))).isoformat(), "name": "Leave"}],
+        })
+        for d in range(days):
+            if rng.random() >= busy_share:
+                continue
+            base = datetime(start.year, start.month, start.day, tzinfo=timezone.utc) + timedelta(days=d)
+            for _ in range(per_day):
+                begin = base + timedelta(minutes=rng.randrange(6 * 60, 20 * 60, 15))
+                rows.append({
+                    "start_min": epoch_minutes(begin),
+                    "end_min": epoch_minutes(begin + timedelta(minutes=rng.choice((30, 45, 60, 90)))),
+                })
+    return participants, rows, start, start + timedelta(days=days - 1)
+
+
+def timed(fn, repeat: int):
+    samples = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        result = fn()
+        samples.append((time.perf_counter() - t0) * 1000)
+    return result, statistics.median(samples), max(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--days", type=int, default=90)
+    parser.add_argument("--per-day", type=int, default=3, help="bookings per user per booked day")
+    parser.add_argument("--busy-share", type=float, default=0.02, help="share of days each user has bookings")
+    parser.add_argument("--duration", type=int, default=60)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    participants, rows, start, end = build(args.users, args.days, args.per_day, args.busy_share)
+    print(f"{args.users} participants, {args.days} days, {len(rows)} busy rows")
+
+    slots, median, worst = timed(lambda: find_common_slots(
+        participants, rows, start, end, args.duration, 8 * 60, 18 * 60,
+        organizer_timezone="Europe/London",
+    ), args.repeat)
+    print(f"  typical:   median {median:7.1f} ms  max {worst:7.1f} ms  -> {len(slots)} slot(s)")
+
+    # One participant booked all day, every day: no common slot exists.
+    day0 = epoch_minutes(datetime(start.year, start.month, start.day, tzinfo=timezone.utc))
+    saturated = rows + [
+        {"start_min": day0 + (d - 1) * 1440, "end_min": day0 + d * 1440} for d in range(args.days + 2)
+    ]
+    slots, median, worst = timed(lambda: find_common_slots(
+        participants, saturated, start, end, args.duration, 8 * 60, 18 * 60,
+        organizer_timezone="Europe/London",
+    ), args.repeat)
+    print(f"  saturated: median {median:7.1f} ms  max {worst:7.1f} ms  -> {len(slots)} slot(s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -3,7 +3,7 @@ from .config import (
     MONGO_URL, DB_NAME,
     UPLOAD_DIR, FRONTEND_URL, CORS_ORIGINS
 )
-from .database import db, client, serialize_doc
+from .database import db, client, serialize_doc, transactions_supported
 from .auth import (
     hash_password,
     verify_password,
@@ -17,7 +17,7 @@ __all__ = [
     'JWT_SECRET', 'JWT_ALGORITHM', 'JWT_EXPIRATION_HOURS',
     'MONGO_URL', 'DB_NAME',
     'UPLOAD_DIR', 'FRONTEND_URL', 'CORS_ORIGINS',
-    'db', 'client', 'serialize_doc',
+    'db', 'client', 'serialize_doc', 'transactions_supported',
     'hash_password', 'verify_password', 'create_jwt_token',
     'get_current_user', 'generate_secure_password', 'security'
 ]
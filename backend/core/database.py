@@ -1,14 +1,35 @@
 """
 MongoDB Database Connection and Utilities
 """
+import logging
 from motor.motor_asyncio import AsyncIOMotorClient
 from datetime import datetime
+from typing import Optional
 from .config import MONGO_URL, DB_NAME
 
+logger = logging.getLogger(__name__)
+
 # MongoDB Client
 client = AsyncIOMotorClient(MONGO_URL)
 db = client[DB_NAME]
 
+# Multi-document transactions need a replica set (or a sharded cluster);
+# a standalone mongod rejects them. Probed once per process.
+_transactions_supported: Optional[bool] = None
+
+
+async def transactions_supported(database=None) -> bool:
+    """True when the MongoDB deployment behind `database` can run transactions."""
+    global _transactions_supported
+    if _transactions_supported is None:
+        try:
+            hello = await (database if database is not None else db).command("hello")
+            _transactions_supported = bool(hello.get("setName")) or hello.get("msg") == "isdbgrid"
+        except Exception as e:
+            logger.info(f"Transaction support probe failed, writing without transactions: {e}")
+            _transactions_supported = False
+    return _transactions_supported
+
 
 def serialize_doc(doc: dict) -> dict:
     """Remove MongoDB _id and convert dates to strings"""
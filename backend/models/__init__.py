@@ -1,17 +1,17 @@
 from .schemas import (
     UserBase, UserCreate, UserResponse, UserLogin, TokenResponse,
     PatientBase, PatientCreate,
-    MeetingBase, MeetingCreate,
-    ParticipantInvite, ParticipantResponse,
-    MeetingPatientCreate, AgendaItemCreate, DecisionLogCreate,
+    MeetingBase, MeetingCreate, SlotSuggestRequest,
+    ParticipantInvite, BulkParticipantInvite, ParticipantResponse,
+    MeetingPatientCreate, BulkApprovalRequest, SummaryExportRequest, UploadInitRequest, UploadCommitRequest, AgendaItemCreate, AgendaReorderRequest, DecisionLogCreate,
     FeedbackRequest
 )
 
 __all__ = [
     'UserBase', 'UserCreate', 'UserResponse', 'UserLogin', 'TokenResponse',
     'PatientBase', 'PatientCreate',
-    'MeetingBase', 'MeetingCreate',
-    'ParticipantInvite', 'ParticipantResponse',
-    'MeetingPatientCreate', 'AgendaItemCreate', 'DecisionLogCreate',
+    'MeetingBase', 'MeetingCreate', 'SlotSuggestRequest',
+    'ParticipantInvite', 'BulkParticipantInvite', 'ParticipantResponse',
+    'MeetingPatientCreate', 'BulkApprovalRequest', 'SummaryExportRequest', 'UploadInitRequest', 'UploadCommitRequest', 'AgendaItemCreate', 'AgendaReorderRequest', 'DecisionLogCreate',
     'FeedbackRequest'
 ]
@@ -1,7 +1,7 @@
 """
 Pydantic Models and Schemas
 """
-from pydantic import BaseModel, EmailStr
+from pydantic import BaseModel, EmailStr, Field
 from typing import List, Optional
 
 
@@ -98,11 +98,28 @@ class MeetingCreate(MeetingBase):
     agenda_items: Optional[List[dict]] = []
 
 
+class SlotSuggestRequest(BaseModel):
+    participant_ids: List[str]
+    start_date: str  # YYYY-MM-DD, organizer's local date
+    end_date: str    # YYYY-MM-DD, inclusive
+    duration_minutes: int = 60
+    working_hours_start: str = "09:00"  # in each participant's own timezone
+    working_hours_end: str = "17:00"
+    include_weekends: bool = False
+    include_organizer: bool = True
+    step_minutes: int = 15
+    limit: int = 5
+
+
 class ParticipantInvite(BaseModel):
     user_id: str
     role: Optional[str] = "attendee"
 
 
+class BulkParticipantInvite(BaseModel):
+    participants: List[ParticipantInvite]
+
+
 class ParticipantResponse(BaseModel):
     response_status: str
 
@@ -114,6 +131,31 @@ class MeetingPatientCreate(BaseModel):
     status: Optional[str] = "new_case"
 
 
+class BulkApprovalRequest(BaseModel):
+    ids: List[str]  # meeting_patients ids
+
+
+class SummaryExportRequest(BaseModel):
+    date_from: str  # YYYY-MM-DD, inclusive
+    date_to: str    # YYYY-MM-DD, inclusive
+    department: Optional[str] = None  # patients' department_name
+
+
+class UploadInitRequest(BaseModel):
+    file_name: str
+    total_size: int = Field(..., ge=0)  # bytes
+    mime_type: Optional[str] = None
+    patient_id: Optional[str] = None
+    meeting_patient_id: Optional[str] = None
+    file_type: Optional[str] = "other"
+    department_document_type: Optional[str] = None
+    sha256: Optional[str] = None  # hex; lets object storage take the bytes directly
+
+
+class UploadCommitRequest(BaseModel):
+    sha256: Optional[str] = None  # hex digest; verified against the received bytes
+
+
 class AgendaItemCreate(BaseModel):
     patient_id: str
     mrn: str
@@ -125,6 +167,10 @@ class AgendaItemCreate(BaseModel):
     treatment_plan: Optional[str] = None
 
 
+class AgendaReorderRequest(BaseModel):
+    item_ids: List[str]  # every agenda item of the meeting, in the new order
+
+
 class DecisionLogCreate(BaseModel):
     meeting_patient_id: Optional[str] = None
     agenda_item_id: Optional[str] = None
@@ -16,21 +16,43 @@ Configuration (env vars — set in backend/.env):
     REMINDER_POLL_SECONDS           int seconds     default: 300  (5 minutes)
     AUTO_COMPLETE_GRACE_MINUTES     int minutes     default: 120  (2 hours)
 
+Recurring meetings are driven off the `meeting_occurrences` collection
+(see services/meeting_occurrences.py): each session is reminded and
+auto-completed on its own, and the series itself is only completed once its
+last occurrence is. Every poll also tops up the rolling occurrence window.
+
+    OCCURRENCE_WINDOW_DAYS          int days        default: 90
+
+Each poll also emails responsible doctors a digest of decision follow-ups
+that went overdue (see services/follow_ups.py).
+
+    FOLLOW_UP_ALERTS_ENABLED        "true"/"false"  default: "true"
+
 Deduplication:
-    - A meeting is flagged with `reminder_1h_sent: True` after its 1h
-      reminders dispatch, so we never re-send.
-    - Auto-complete only targets `scheduled` / `in_progress` meetings,
-      so each meeting is flipped to `completed` at most once.
+    - A meeting (or occurrence) is flagged with `reminder_1h_sent: True`
+      after its 1h reminders dispatch, so we never re-send.
+    - Overdue follow-ups are flagged with `overdue_alert_sent: True` once
+      alerted; moving the follow-up date re-arms the alert.
+    - Auto-complete only targets `scheduled` / `in_progress` meetings and
+      occurrences, so each is flipped to `completed` at most once.
 """
 
 import asyncio
 import logging
 import os
 from datetime import datetime, timedelta, timezone
-from typing import Optional
+from typing import Dict, Optional
 from zoneinfo import ZoneInfo
 
 from utils.email import send_meeting_reminder
+from utils.env import env_int
+from services.user_meetings import sync_meeting_fields
+from services.meeting_occurrences import (
+    extend_occurrence_windows,
+    series_has_open_occurrences,
+)
+from utils.recurrence import ONE_TIME_TYPES
+from services.follow_ups import send_overdue_alerts
 from services.imap_rsvp_poller import (
     poll_rsvp_replies,
     rsvp_poll_enabled,
@@ -52,6 +74,8 @@ WINDOW_UPPER_MIN = 70
 
 DEFAULT_POLL_SECONDS = 300
 DEFAULT_AUTO_COMPLETE_GRACE_MIN = 120
+# Meetings / occurrences read per round trip by the auto-complete pass.
+AUTO_COMPLETE_PAGE_SIZE = 500
 
 
 # ---------------------------------------------------------------------------
@@ -62,13 +86,6 @@ def _env_bool(name: str, default: bool = True) -> bool:
     return os.environ.get(name, "true" if default else "false").lower() == "true"
 
 
-def _env_int(name: str, default: int) -> int:
-    try:
-        return int(os.environ.get(name, str(default)))
-    except ValueError:
-        return default
-
-
 def _reminders_enabled() -> bool:
     return _env_bool("EMAIL_REMINDERS_ENABLED", default=True)
 
@@ -77,12 +94,16 @@ def _auto_complete_enabled() -> bool:
     return _env_bool("AUTO_COMPLETE_ENABLED", default=True)
 
 
+def _follow_up_alerts_enabled() -> bool:
+    return _env_bool("FOLLOW_UP_ALERTS_ENABLED", default=True)
+
+
 def _poll_interval() -> int:
-    return _env_int("REMINDER_POLL_SECONDS", DEFAULT_POLL_SECONDS)
+    return env_int("REMINDER_POLL_SECONDS", DEFAULT_POLL_SECONDS)
 
 
 def _auto_complete_grace_minutes() -> int:
-    return _env_int("AUTO_COMPLETE_GRACE_MINUTES", DEFAULT_AUTO_COMPLETE_GRACE_MIN)
+    return env_int("AUTO_COMPLETE_GRACE_MINUTES", DEFAULT_AUTO_COMPLETE_GRACE_MIN)
 
 
 def _frontend_url() -> str:
@@ -151,6 +172,17 @@ async def _mark_meeting_reminded(db, meeting_id: str, sent_count: int) -> None:
     """Persist reminder dispatch so we never re-send for this meeting."""
     await db.meetings.update_one(
         {"id": meeting_id},
+        {"$set": {
+            "reminder_1h_sent": True,
+            "reminder_1h_sent_at": datetime.now().isoformat(),
+            "reminder_1h_sent_count": sent_count,
+        }, "$inc": {"version": 1}},
+    )
+
+
+async def _mark_occurrence_reminded(db, occurrence_id: str, sent_count: int) -> None:
+    await db.meeting_occurrences.update_one(
+        {"id": occurrence_id},
         {"$set": {
             "reminder_1h_sent": True,
             "reminder_1h_sent_at": datetime.now().isoformat(),
@@ -159,6 +191,47 @@ async def _mark_meeting_reminded(db, meeting_id: str, sent_count: int) -> None:
     )
 
 
+async def _send_occurrence_reminders(db, today: str, lower: datetime, upper: datetime) -> None:
+    """1h reminders for today's sessions of recurring meetings."""
+    occurrences = await db.meeting_occurrences.find(
+        {
+            "occurrence_date": today,
+            "status": "scheduled",
+            "reminder_1h_sent": {"$ne": True},
+        },
+        {"_id": 0},
+    ).to_list(1000)
+    due = []
+    for occ in occurrences:
+        start = _parse_meeting_start(occ, today)
+        if start is not None and lower <= start <= upper:
+            due.append((occ, start))
+    if not due:
+        return
+
+    series = {
+        m["id"]: m
+        for m in await db.meetings.find(
+            {"id": {"$in": list({occ["meeting_id"] for occ, _ in due})}, "status": "scheduled"},
+            {"_id": 0},
+        ).to_list(None)
+    }
+    for occ, start in due:
+        meeting = series.get(occ["meeting_id"])
+        if meeting is None:
+            continue
+        logger.info(
+            "Dispatching 1h reminder for occurrence %s starting at %s",
+            occ["id"], start.isoformat(),
+        )
+        sent_count = await _send_reminder_to_participants(db, {
+            **meeting,
+            "meeting_date": occ["occurrence_date"],
+            "start_time": occ.get("start_time"),
+        })
+        await _mark_occurrence_reminded(db, occ["id"], sent_count)
+
+
 async def _send_one_hour_reminders(db) -> None:
     """Find scheduled meetings starting in ~1 hour and email accepted participants."""
     now = datetime.now()
@@ -166,11 +239,13 @@ async def _send_one_hour_reminders(db) -> None:
     lower = now + timedelta(minutes=WINDOW_LOWER_MIN)
     upper = now + timedelta(minutes=WINDOW_UPPER_MIN)
 
+    # One-time meetings; recurring series are reminded per occurrence below.
     cursor = db.meetings.find(
         {
             "meeting_date": today,
             "status": "scheduled",
             "reminder_1h_sent": {"$ne": True},
+            "recurrence_type": {"$in": list(ONE_TIME_TYPES)},
         },
         {"_id": 0},
     )
@@ -192,26 +267,40 @@ async def _send_one_hour_reminders(db) -> None:
             meeting_id, sent_count,
         )
 
+    await _send_occurrence_reminders(db, today, lower, upper)
+
 
 # ---------------------------------------------------------------------------
 # Auto-complete past meetings
 # ---------------------------------------------------------------------------
 
-async def _organizer_timezone(db, organizer_id: Optional[str]) -> ZoneInfo:
-    """Resolve organizer's timezone with a UTC fallback."""
-    tz_name = "UTC"
-    if organizer_id:
-        organizer = await db.users.find_one(
-            {"id": organizer_id}, {"_id": 0, "timezone": 1}
-        )
-        if organizer and organizer.get("timezone"):
-            tz_name = organizer["timezone"]
+def _zone(tz_name: Optional[str]) -> ZoneInfo:
     try:
-        return ZoneInfo(tz_name)
+        return ZoneInfo(tz_name or "UTC")
     except Exception:
         return ZoneInfo("UTC")
 
 
+async def _organizer_timezones(db, organizer_ids) -> Dict[str, ZoneInfo]:
+    """Timezone of each organizer in one query; missing or unknown zones
+    fall back to UTC (see `_zone`)."""
+    ids = list({i for i in organizer_ids if i})
+    if not ids:
+        return {}
+    users = await db.users.find({"id": {"$in": ids}}, {"_id": 0, "id": 1, "timezone": 1}).to_list(None)
+    return {u["id"]: _zone(u.get("timezone")) for u in users}
+
+
+async def _pages(cursor):
+    """Yield the cursor's documents a page at a time, so no result set is
+    loaded (or truncated) whole."""
+    while True:
+        page = await cursor.to_list(AUTO_COMPLETE_PAGE_SIZE)
+        if not page:
+            return
+        yield page
+
+
 def _meeting_end_utc(
     meeting: dict, tz: ZoneInfo
 ) -> Optional[datetime]:
@@ -242,8 +331,9 @@ async def _flip_meeting_complete(db, meeting_id: str, now_utc: datetime, grace_m
             "completed_at": now_utc.isoformat(),
             "auto_completed": True,
             "auto_completed_reason": f"Scheduled end + {grace_min} min grace elapsed",
-        }},
+        }, "$inc": {"version": 1}},
     )
+    await sync_meeting_fields(db, meeting_id, {"status": "completed"})
 
 
 async def _auto_complete_ended_meetings(db) -> None:
@@ -259,24 +349,85 @@ async def _auto_complete_ended_meetings(db) -> None:
     now_utc = datetime.now(timezone.utc)
 
     cursor = db.meetings.find(
-        {"status": {"$in": ["scheduled", "in_progress"]}},
+        {
+            "status": {"$in": ["scheduled", "in_progress"]},
+            "recurrence_type": {"$in": list(ONE_TIME_TYPES)},
+        },
         {"_id": 0},
     )
 
-    for meeting in await cursor.to_list(1000):
-        tz = await _organizer_timezone(db, meeting.get("organizer_id"))
-        end_dt_utc = _meeting_end_utc(meeting, tz)
-        if end_dt_utc is None:
-            continue
-        if now_utc < end_dt_utc + timedelta(minutes=grace_min):
-            continue  # still inside the grace window
+    async for page in _pages(cursor):
+        zones = await _organizer_timezones(db, (m.get("organizer_id") for m in page))
+        for meeting in page:
+            tz = zones.get(meeting.get("organizer_id"), _zone(None))
+            end_dt_utc = _meeting_end_utc(meeting, tz)
+            if end_dt_utc is None:
+                continue
+            if now_utc < end_dt_utc + timedelta(minutes=grace_min):
+                continue  # still inside the grace window
+
+            meeting_id = meeting["id"]
+            await _flip_meeting_complete(db, meeting_id, now_utc, grace_min)
+            logger.info(
+                "Auto-completed meeting %s (end=%s UTC, grace=%dmin)",
+                meeting_id, end_dt_utc.isoformat(), grace_min,
+            )
 
-        meeting_id = meeting["id"]
-        await _flip_meeting_complete(db, meeting_id, now_utc, grace_min)
-        logger.info(
-            "Auto-completed meeting %s (end=%s UTC, grace=%dmin)",
-            meeting_id, end_dt_utc.isoformat(), grace_min,
-        )
+    await _auto_complete_ended_occurrences(db, now_utc, grace_min)
+
+
+async def _auto_complete_ended_occurrences(db, now_utc: datetime, grace_min: int) -> None:
+    """
+    Complete each ended session of a recurring meeting. The series itself is
+    completed only once it has an end date, is fully materialised and has no
+    open occurrence left.
+    """
+    # Organizer-local dates can run up to a day ahead of UTC.
+    latest = (now_utc + timedelta(days=1)).strftime("%Y-%m-%d")
+    cursor = db.meeting_occurrences.find(
+        {
+            "status": {"$in": ["scheduled", "in_progress"]},
+            "occurrence_date": {"$lte": latest},
+        },
+        {"_id": 0},
+    )
+
+    touched = set()
+    async for page in _pages(cursor):
+        zones = await _organizer_timezones(db, (o.get("organizer_id") for o in page))
+        for occ in page:
+            tz = zones.get(occ.get("organizer_id"), _zone(None))
+            end_dt_utc = _meeting_end_utc(
+                {**occ, "meeting_date": occ["occurrence_date"]}, tz
+            )
+            if end_dt_utc is None or now_utc < end_dt_utc + timedelta(minutes=grace_min):
+                continue
+            await db.meeting_occurrences.update_one(
+                {"id": occ["id"], "status": {"$in": ["scheduled", "in_progress"]}},
+                {"$set": {
+                    "status": "completed",
+                    "completed_at": now_utc.isoformat(),
+                    "auto_completed": True,
+                }},
+            )
+            touched.add(occ["meeting_id"])
+            logger.info("Auto-completed occurrence %s", occ["id"])
+
+    if not touched:
+        return
+    series = await db.meetings.find(
+        {"id": {"$in": list(touched)}, "status": {"$in": ["scheduled", "in_progress"]}},
+        {"_id": 0, "id": 1, "recurrence_end_date": 1, "occurrences_materialized_through": 1},
+    ).to_list(None)
+    for meeting in series:
+        end_date = meeting.get("recurrence_end_date")
+        through = meeting.get("occurrences_materialized_through")
+        if not end_date or not through or through < end_date:
+            continue
+        if await series_has_open_occurrences(db, meeting["id"]):
+            continue
+        await _flip_meeting_complete(db, meeting["id"], now_utc, grace_min)
+        logger.info("Auto-completed series %s after its last occurrence", meeting["id"])
 
 
 # ---------------------------------------------------------------------------
@@ -288,10 +439,11 @@ async def reminder_loop(db) -> None:
     reminders_on = _reminders_enabled()
     auto_complete_on = _auto_complete_enabled()
     rsvp_on = rsvp_poll_enabled()
+    follow_ups_on = _follow_up_alerts_enabled()
 
-    if not reminders_on and not auto_complete_on and not rsvp_on:
+    if not reminders_on and not auto_complete_on and not rsvp_on and not follow_ups_on:
         logger.info(
-            "Scheduler disabled (no reminders/auto-complete/RSVP polling enabled)"
+            "Scheduler disabled (no reminders/auto-complete/RSVP polling/follow-up alerts enabled)"
         )
         return
 
@@ -300,8 +452,8 @@ async def reminder_loop(db) -> None:
     rsvp_interval = rsvp_poll_seconds()
     logger.info(
         "Scheduler started — reminders=%s, auto_complete=%s, rsvp_poll=%s, "
-        "poll=%ss, grace=%dmin, rsvp_poll=%ss",
-        reminders_on, auto_complete_on, rsvp_on, interval, grace, rsvp_interval,
+        "follow_up_alerts=%s, poll=%ss, grace=%dmin, rsvp_poll=%ss",
+        reminders_on, auto_complete_on, rsvp_on, follow_ups_on, interval, grace, rsvp_interval,
     )
 
     # Track when we last ran RSVP polling — it has its own cadence so we don't
@@ -310,10 +462,14 @@ async def reminder_loop(db) -> None:
 
     while True:
         try:
+            # Cheap no-op once every active series is covered for the day.
+            await extend_occurrence_windows(db)
             if reminders_on:
                 await _send_one_hour_reminders(db)
             if auto_complete_on:
                 await _auto_complete_ended_meetings(db)
+            if follow_ups_on:
+                await send_overdue_alerts(db, _frontend_url())
             if rsvp_on:
                 now = datetime.now(timezone.utc)
                 if (
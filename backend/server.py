@@ -1,5 +1,6 @@
-from fastapi import FastAPI, APIRouter, HTTPException, Depends, UploadFile, File, Form, Request, Response, Body
+from fastapi import FastAPI, APIRouter, HTTPException, Depends, Request, Response, Body, Query, BackgroundTasks
 from starlette.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, RedirectResponse, StreamingResponse
 import logging
 from typing import Optional, Dict
 from pathlib import Path
@@ -7,7 +8,7 @@ import uuid
 from datetime import datetime, timezone, timedelta
 from zoneinfo import ZoneInfo
 import secrets
-import aiofiles
+import hashlib
 import httpx
 import os
 import asyncio
@@ -22,9 +23,9 @@ from core import (
 # Model imports (refactored schemas)
 from models import (
     UserCreate, UserLogin, UserResponse, TokenResponse,
-    PatientCreate, MeetingCreate, ParticipantInvite, ParticipantResponse,
-    MeetingPatientCreate, AgendaItemCreate, DecisionLogCreate,
-    FeedbackRequest
+    PatientCreate, MeetingCreate, ParticipantInvite, BulkParticipantInvite, ParticipantResponse,
+    MeetingPatientCreate, BulkApprovalRequest, SummaryExportRequest, UploadInitRequest, UploadCommitRequest, AgendaItemCreate, AgendaReorderRequest, DecisionLogCreate,
+    FeedbackRequest, SlotSuggestRequest
 )
 from pydantic import BaseModel
 
@@ -36,7 +37,17 @@ from utils.email import (
     send_password_reset_email,
     send_simple_account_setup_email
 )
-from utils.pdf_generator import generate_meeting_summary_pdf
+from utils.http_cache import (
+    REVALIDATE_CACHE_CONTROL,
+    make_etag,
+    etag_matches,
+    not_modified,
+    canonical_list,
+    conditional_response,
+    file_response,
+    content_disposition,
+)
+from utils.admission import endpoint_limiter, rate_limiter, admission_metrics
 from utils.holiday_checker import (
     get_holiday_checker,
     validate_meeting_date,
@@ -46,11 +57,9 @@ from services.teams_service import get_teams_service
 from services.meeting_helpers import (
     validate_meeting_date_or_raise,
     build_meeting_doc,
-    attach_teams_meeting,
-    insert_organizer_participant,
-    insert_participants_and_invite,
-    insert_meeting_patients,
-    insert_agenda_items,
+    create_teams_meeting,
+    insert_meeting_with_rows,
+    send_meeting_invites,
     assert_can_update,
     build_update_data,
     datetime_changed,
@@ -62,6 +71,133 @@ from services.meeting_helpers import (
     attach_agenda,
     attach_files,
     attach_decisions,
+    enrich_meeting_list,
+    bump_meeting_version,
+    bump_patient_meeting_versions,
+    bump_user_meeting_versions,
+    MEETING_USER_FIELDS,
+    allocate_agenda_positions,
+    apply_agenda_order,
+)
+from services.user_meetings import (
+    ensure_user_meeting_indexes,
+    backfill_user_meetings,
+    index_meeting_members,
+    add_member,
+    add_members,
+    remove_member,
+    set_member_response,
+    sync_meeting_fields,
+    needs_backfill,
+    MEMBERSHIP_PROJECTION,
+)
+from services import dashboard_stats
+from services.meeting_calendar import calendar_occurrences, MAX_CALENDAR_DAYS
+from services.meeting_occurrences import (
+    ensure_occurrence_indexes,
+    rematerialize_series,
+    cancel_upcoming_occurrences,
+    set_upcoming_teams_link,
+    schedule_changed,
+)
+from services.busy_index import (
+    ensure_busy_indexes,
+    backfill_busy_intervals,
+    rebuild_meeting_busy,
+    meeting_conflicts,
+)
+from services.approvals import (
+    ensure_approval_indexes,
+    backfill_approval_organizers,
+    pending_approvals,
+    approve_rows,
+    notify_adders,
+    MAX_BULK_APPROVALS,
+)
+from services.meeting_summary import build_summary_pdf, summary_cache, shutdown_render_pool
+from services.summary_exports import (
+    ensure_export_indexes,
+    export_meeting_ids,
+    export_view,
+    active_export,
+    create_export,
+    fail_interrupted_exports,
+    purge_expired_exports,
+    cancel_running_exports,
+    MAX_EXPORT_DAYS,
+    MAX_EXPORT_MEETINGS,
+)
+from services.attachments import (
+    ensure_upload_indexes,
+    StreamedForm,
+    MULTIPART_OVERHEAD_BYTES,
+    write_stream,
+    store_attachment,
+    delete_attachment_file,
+    ensure_blob_indexes,
+    migrate_legacy_attachments,
+    storage_stats,
+    max_upload_bytes,
+    accel_redirect_location,
+    attachment_source,
+    partial_path,
+    session_view,
+    create_upload_session,
+    append_chunk,
+    commit_upload,
+    discard_upload,
+    purge_expired_uploads,
+    UploadTooLarge,
+    UploadOffsetMismatch,
+)
+from services.blob_storage import storage_backend, presigned_urls_enabled, presigned_url_ttl, PRESIGNED_LINK_MEDIA_TYPE
+from services.attachment_archive import archive_entries, stream_archive
+from services.attachment_previews import (
+    PREVIEW_MEDIA_TYPE,
+    request_preview,
+    preview_source,
+    start_preview_pipeline,
+    stop_preview_pipeline,
+    backfill_previews,
+    preview_stats,
+)
+from services.attachment_text import (
+    MAX_SEARCH_RESULTS,
+    ensure_text_indexes,
+    request_text_index,
+    remove_from_text_index,
+    search_attachments,
+    start_text_pipeline,
+    stop_text_pipeline,
+    backfill_text_index,
+    text_index_stats,
+)
+from services.follow_ups import (
+    backfill_overdue_alert_flags,
+    ensure_follow_up_indexes,
+    follow_up_page,
+    follow_up_date_reset,
+    PRIORITIES as FOLLOW_UP_PRIORITIES,
+    MAX_PAGE_SIZE as MAX_FOLLOW_UP_PAGE,
+)
+from services.slot_finder import (
+    suggest_slots,
+    parse_hhmm,
+    PARTICIPANT_FIELDS,
+    MAX_SUGGEST_DAYS,
+    MAX_SUGGEST_PARTICIPANTS,
+    MAX_SUGGESTIONS,
+)
+from utils.recurrence import is_recurring, ongoing_series_filter
+from services.field_selection import (
+    MEETING_EXPANSIONS,
+    MEETING_LIST_EXPANSIONS,
+    PATIENT_EXPANSIONS,
+    USER_SECRET_FIELDS,
+    parse_csv_param,
+    parse_expand,
+    build_projection,
+    strip_unrequested,
 )
 
 app = FastAPI(title="Hospital Meeting Scheduler API")
@@ -71,6 +207,20 @@ api_router = APIRouter(prefix="/api")
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
+# Admission control (utils/admission.py): each expensive endpoint class gets
+# a few slots and a short queue; login attempts are rate-limited per email.
+PDF_ADMISSION = endpoint_limiter("pdf", max_concurrent=2, max_queue=8)
+TEAMS_ADMISSION = endpoint_limiter("teams", max_concurrent=4, max_queue=16)
+BULK_ADMISSION = endpoint_limiter("bulk", max_concurrent=2, max_queue=8)
+LOGIN_RATE_LIMIT = rate_limiter("login", per_minute=10, burst=5)
+
+
+async def bulk_admission(current_user: dict = Depends(get_current_user)):
+    """Route dependency holding a bulk slot for the whole handler
+    (authenticated first, so anonymous requests never queue)."""
+    async with BULK_ADMISSION.slot():
+        yield
+
 
 # ============== Demo Meeting Auto-Attach ==============
 # When a new user signs up, attach them as a participant to every seeded demo
@@ -79,7 +229,7 @@ logger = logging.getLogger(__name__)
 
 async def _attach_user_to_demo_meetings(user_id: str) -> None:
     try:
-        cursor = db.meetings.find({"_seed": "demo_v1"}, {"_id": 0, "id": 1})
+        cursor = db.meetings.find({"_seed": "demo_v1"}, MEMBERSHIP_PROJECTION)
         async for meeting in cursor:
             mid = meeting["id"]
             already = await db.meeting_participants.find_one(
@@ -96,6 +246,8 @@ async def _attach_user_to_demo_meetings(user_id: str) -> None:
                 "created_at": datetime.now(timezone.utc).isoformat(),
                 "_seed": "demo_v1_auto",
             })
+            await add_member(db, meeting, user_id, "attendee", "pending")
+            await bump_meeting_version(mid)
     except Exception as e:
         logger.error(f"Failed to attach user {user_id} to demo meetings: {e}")
 
@@ -173,6 +325,7 @@ async def register(user: UserCreate):
 
 @api_router.post("/auth/login", response_model=TokenResponse)
 async def login(credentials: UserLogin):
+    LOGIN_RATE_LIMIT.check(credentials.email.lower())
     user = await db.users.find_one({"email": credentials.email}, {"_id": 0})
     if not user or not user.get('password_hash'):
         raise HTTPException(status_code=401, detail="Invalid credentials")
@@ -310,6 +463,8 @@ async def process_session(request: Request, response: Response):
             {"id": user['id']},
             {"$set": {"picture": auth_data.get('picture'), "name": auth_data['name']}}
         )
+        if user.get('name') != auth_data['name']:
+            await bump_user_meeting_versions(user['id'])
         user = await db.users.find_one({"id": user['id']}, {"_id": 0})
     
     # Create session
@@ -352,13 +507,14 @@ async def logout(request: Request, response: Response):
 # ============== Users Routes ==============
 
 @api_router.get("/users")
-async def list_users(current_user: dict = Depends(get_current_user)):
-    users = await db.users.find({"is_active": True}, {"_id": 0}).sort("name", 1).to_list(1000)
+async def list_users(fields: Optional[str] = None, current_user: dict = Depends(get_current_user)):
+    projection = build_projection(parse_csv_param(fields), excluded=USER_SECRET_FIELDS)
+    users = await db.users.find({"is_active": True}, projection).sort("name", 1).to_list(1000)
     return [serialize_doc(u) for u in users]
 
 @api_router.get("/users/{user_id}")
 async def get_user(user_id: str, current_user: dict = Depends(get_current_user)):
-    user = await db.users.find_one({"id": user_id}, {"_id": 0})
+    user = await db.users.find_one({"id": user_id}, build_projection(None, excluded=USER_SECRET_FIELDS))
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     return serialize_doc(user)
@@ -386,6 +542,8 @@ async def update_user_role(user_id: str, data: dict, current_user: dict = Depend
     
     if result.matched_count == 0:
         raise HTTPException(status_code=404, detail="User not found")
+    if result.modified_count:
+        await bump_user_meeting_versions(user_id)
     
     updated_user = await db.users.find_one({"id": user_id}, {"_id": 0})
     return serialize_doc(updated_user)
@@ -430,6 +588,8 @@ async def update_user(user_id: str, updates: dict, current_user: dict = Depends(
     
     if update_data:
         await db.users.update_one({"id": user_id}, {"$set": update_data})
+        if any(f in update_data for f in MEETING_USER_FIELDS):
+            await bump_user_meeting_versions(user_id)
     
     user = await db.users.find_one({"id": user_id}, {"_id": 0})
     return serialize_doc(user)
@@ -465,50 +625,68 @@ async def create_patient(patient: PatientCreate, current_user: dict = Depends(ge
         "created_at": datetime.now(timezone.utc).isoformat()
     }
     await db.patients.insert_one(patient_doc)
+    dashboard_stats.invalidate_patient_count()
     
     patient_data = await db.patients.find_one({"id": patient_id}, {"_id": 0})
     return serialize_doc(patient_data)
 
 @api_router.get("/patients/{patient_id}")
-async def get_patient(patient_id: str, current_user: dict = Depends(get_current_user)):
-    patient = await db.patients.find_one({"id": patient_id}, {"_id": 0})
+async def get_patient(
+    patient_id: str,
+    fields: Optional[str] = None,
+    expand: Optional[str] = None,
+    current_user: dict = Depends(get_current_user),
+):
+    field_list = parse_csv_param(fields)
+    expansions = parse_expand(expand, PATIENT_EXPANSIONS)
+
+    patient = await db.patients.find_one({"id": patient_id}, build_projection(field_list))
     if not patient:
         raise HTTPException(status_code=404, detail="Patient not found")
     
+    result = serialize_doc(patient)
+
     # Get patient's meetings
-    meeting_patients = await db.meeting_patients.find({"patient_id": patient_id}, {"_id": 0}).to_list(100)
-    meeting_ids = [mp['meeting_id'] for mp in meeting_patients]
-    meetings = await db.meetings.find({"id": {"$in": meeting_ids}}, {"_id": 0}).sort("meeting_date", -1).to_list(100)
+    if 'meetings' in expansions:
+        meeting_patients = await db.meeting_patients.find({"patient_id": patient_id}, {"_id": 0, "meeting_id": 1}).to_list(100)
+        meeting_ids = [mp['meeting_id'] for mp in meeting_patients]
+        meetings = await db.meetings.find({"id": {"$in": meeting_ids}}, {"_id": 0}).sort("meeting_date", -1).to_list(100)
+        result['meetings'] = [serialize_doc(m) for m in meetings]
     
     # Get patient's files
-    files = await db.file_attachments.find({"patient_id": patient_id}, {"_id": 0}).sort("created_at", -1).to_list(100)
+    if 'files' in expansions:
+        files = await db.file_attachments.find({"patient_id": patient_id}, {"_id": 0}).sort("created_at", -1).to_list(100)
+        result['files'] = [serialize_doc(f) for f in files]
     
     # Get patient's treatment plans from agenda items (sorted by meeting date DESC - latest first)
-    treatment_plans = []
-    agenda_items = await db.agenda_items.find({"patient_id": patient_id, "treatment_plan": {"$exists": True, "$ne": ""}}, {"_id": 0}).to_list(1000)
-    
-    for item in agenda_items:
-        # Get the meeting details for this agenda item
-        meeting = await db.meetings.find_one({"id": item['meeting_id']}, {"_id": 0, "title": 1, "meeting_date": 1, "id": 1})
-        if meeting:
-            treatment_plans.append({
-                "id": item.get('id'),
-                "treatment_plan": item.get('treatment_plan'),
-                "diagnosis": item.get('diagnosis'),
-                "requested_provider": item.get('requested_provider'),
-                "created_at": item.get('created_at'),
-                "meeting_id": meeting.get('id'),
-                "meeting_title": meeting.get('title'),
-                "meeting_date": meeting.get('meeting_date'),
-            })
-    
-    # Sort treatment plans by meeting date (descending - latest first)
-    treatment_plans.sort(key=lambda x: x.get('meeting_date', ''), reverse=True)
-    
-    result = serialize_doc(patient)
-    result['meetings'] = [serialize_doc(m) for m in meetings]
-    result['files'] = [serialize_doc(f) for f in files]
-    result['treatment_plans'] = treatment_plans
+    if 'treatment_plans' in expansions:
+        treatment_plans = []
+        agenda_items = await db.agenda_items.find({"patient_id": patient_id, "treatment_plan": {"$exists": True, "$ne": ""}}, {"_id": 0}).to_list(1000)
+
+        # One lookup for every meeting referenced by the agenda items.
+        plan_meeting_ids = list({item['meeting_id'] for item in agenda_items})
+        plan_meetings = await db.meetings.find(
+            {"id": {"$in": plan_meeting_ids}}, {"_id": 0, "title": 1, "meeting_date": 1, "id": 1}
+        ).to_list(len(plan_meeting_ids) or 1)
+        meetings_by_id = {m['id']: m for m in plan_meetings}
+
+        for item in agenda_items:
+            meeting = meetings_by_id.get(item['meeting_id'])
+            if meeting:
+                treatment_plans.append({
+                    "id": item.get('id'),
+                    "treatment_plan": item.get('treatment_plan'),
+                    "diagnosis": item.get('diagnosis'),
+                    "requested_provider": item.get('requested_provider'),
+                    "created_at": item.get('created_at'),
+                    "meeting_id": meeting.get('id'),
+                    "meeting_title": meeting.get('title'),
+                    "meeting_date": meeting.get('meeting_date'),
+                })
+
+        # Sort treatment plans by meeting date (descending - latest first)
+        treatment_plans.sort(key=lambda x: x.get('meeting_date', ''), reverse=True)
+        result['treatment_plans'] = treatment_plans
     
     return result
 
@@ -522,6 +700,8 @@ async def update_patient(patient_id: str, updates: dict, current_user: dict = De
     
     if update_data:
         await db.patients.update_one({"id": patient_id}, {"$set": update_data})
+        # Meeting views and summary PDFs show the patient: refresh them.
+        await bump_patient_meeting_versions(patient_id)
     
     patient = await db.patients.find_one({"id": patient_id}, {"_id": 0})
     return serialize_doc(patient)
@@ -529,100 +709,207 @@ async def update_patient(patient_id: str, updates: dict, current_user: dict = De
 @api_router.delete("/patients/{patient_id}")
 async def delete_patient(patient_id: str, current_user: dict = Depends(get_current_user)):
     await db.patients.update_one({"id": patient_id}, {"$set": {"is_active": False}})
+    dashboard_stats.invalidate_patient_count()
     return {"message": "Patient deleted"}
 
 # ============== Meetings Routes ==============
 
 @api_router.get("/meetings")
-async def list_meetings(filter_type: Optional[str] = None, status: Optional[str] = None, current_user: dict = Depends(get_current_user)):
+async def list_meetings(
+    filter_type: Optional[str] = None,
+    status: Optional[str] = None,
+    fields: Optional[str] = None,
+    expand: Optional[str] = None,
+    current_user: dict = Depends(get_current_user),
+):
+    field_list = parse_csv_param(fields)
+    expansions = parse_expand(expand, MEETING_LIST_EXPANSIONS)
+
     today = datetime.now(timezone.utc).strftime("%Y-%m-%d")
     
-    # Base query - meetings where user is organizer or participant
-    participant_meetings = await db.meeting_participants.find({"user_id": current_user['id']}, {"_id": 0}).to_list(1000)
-    participant_meeting_ids = [pm['meeting_id'] for pm in participant_meetings]
-    
-    query = {"$or": [
-        {"organizer_id": current_user['id']},
-        {"id": {"$in": participant_meeting_ids}}
-    ]}
+    # Membership rows (organizer or participant) for this user — a single
+    # range query on the (user_id, meeting_date, start_time) index.
+    query = {"user_id": current_user['id']}
     
+    # A recurring series stays upcoming (not past) until its end date.
     if filter_type == "upcoming":
-        query["meeting_date"] = {"$gte": today}
+        query["$or"] = [{"meeting_date": {"$gte": today}}, ongoing_series_filter(today)]
         query["status"] = {"$in": ["scheduled", "in_progress"]}
     elif filter_type == "past":
-        query["$or"] = [{"meeting_date": {"$lt": today}}, {"status": "completed"}]
+        query["$or"] = [
+            {"meeting_date": {"$lt": today}, "$nor": [ongoing_series_filter(today)]},
+            {"status": "completed"},
+        ]
     elif filter_type == "my_invites":
-        query = {"id": {"$in": participant_meeting_ids}}
+        # Only rows backed by a meeting_participants entry.
+        query["response_status"] = {"$ne": None}
     
     if status:
         query["status"] = status
     
-    meetings = await db.meetings.find(query, {"_id": 0}).sort([("meeting_date", -1), ("start_time", -1)]).to_list(1000)
+    memberships = await db.user_meetings.find(
+        query, {"_id": 0, "meeting_id": 1, "response_status": 1}
+    ).sort([("meeting_date", -1), ("start_time", -1)]).to_list(1000)
+    order = {m['meeting_id']: i for i, m in enumerate(memberships)}
     
-    # Enrich with organizer info and counts
-    for meeting in meetings:
-        organizer = await db.users.find_one({"id": meeting['organizer_id']}, {"_id": 0, "name": 1, "specialty": 1})
-        meeting['organizer_name'] = organizer['name'] if organizer else None
-        meeting['organizer_specialty'] = organizer.get('specialty') if organizer else None
-        
-        participant_count = await db.meeting_participants.count_documents({"meeting_id": meeting['id']})
-        patient_count = await db.meeting_patients.count_documents({"meeting_id": meeting['id']})
-        meeting['participant_count'] = participant_count
-        meeting['patient_count'] = patient_count
-        
-        # Add participants array with response_status for dashboard
-        participants = await db.meeting_participants.find({"meeting_id": meeting['id']}, {"_id": 0, "user_id": 1, "response_status": 1, "responded_at": 1}).to_list(100)
-        meeting['participants'] = participants
-        
-        # Get response status for my_invites
-        if filter_type == "my_invites":
-            participant = next((pm for pm in participant_meetings if pm['meeting_id'] == meeting['id']), None)
-            meeting['response_status'] = participant.get('response_status') if participant else None
+    required = ["id"]
+    if 'organizer' in expansions:
+        required.append("organizer_id")
+    projection = build_projection(field_list, required=required)
+    meetings = await db.meetings.find({"id": {"$in": list(order)}}, projection).to_list(len(order) or 1)
+    meetings.sort(key=lambda m: order[m['id']])
+    
+    # Enrich with organizer info, counts and the participants array the
+    # dashboard uses for response_status — one batched query per expansion.
+    await enrich_meeting_list(meetings, expansions)
+
+    # Get response status for my_invites
+    if filter_type == "my_invites":
+        status_by_meeting = {m['meeting_id']: m.get('response_status') for m in memberships}
+        for meeting in meetings:
+            meeting['response_status'] = status_by_meeting.get(meeting['id'])
     
-    return [serialize_doc(m) for m in meetings]
+    return [serialize_doc(strip_unrequested(m, field_list, required)) for m in meetings]
 
 @api_router.post("/meetings")
-async def create_meeting(meeting: MeetingCreate, current_user: dict = Depends(get_current_user)):
+async def create_meeting(
+    meeting: MeetingCreate,
+    background_tasks: BackgroundTasks,
+    current_user: dict = Depends(get_current_user),
+):
     # Holiday validation per organizer's preferences (raises 400 on conflict).
     validate_meeting_date_or_raise(meeting.meeting_date, current_user)
 
     meeting_id = str(uuid.uuid4())
-    await db.meetings.insert_one(build_meeting_doc(meeting, current_user, meeting_id))
-
+    meeting_doc = build_meeting_doc(meeting, current_user, meeting_id)
     # Best-effort Teams meeting creation. Failures don't block scheduling.
-    await attach_teams_meeting(meeting_id, meeting, current_user)
-
-    # Organizer is always an "accepted" participant.
-    await insert_organizer_participant(meeting_id, current_user['id'])
-
-    # Invitees + patients + agenda. Each call is independent and idempotent
-    # at the row level (we generate fresh UUIDs).
-    await insert_participants_and_invite(meeting_id, meeting, current_user)
-    await insert_meeting_patients(meeting_id, meeting.patient_ids or [], current_user)
-    await insert_agenda_items(meeting_id, meeting.agenda_items)
+    meeting_doc.update(await create_teams_meeting(meeting_id, meeting, current_user))
+
+    # Meeting + organizer/invitees + patients + agenda: one bulk insert per
+    # collection (transactional on a replica set).
+    invitee_ids = await insert_meeting_with_rows(meeting_doc, meeting, current_user)
+    await index_meeting_members(db, meeting_doc)
+    if is_recurring(meeting_doc):
+        await rematerialize_series(db, meeting_id)
+    # Invites go out after the response; SMTP latency is not the caller's.
+    background_tasks.add_task(send_meeting_invites, meeting_doc, invitee_ids, current_user)
+
+    result = await get_meeting_detail(meeting_id, current_user)
+    # Advisory: the meeting is created either way; the UI shows who is double-booked.
+    result['conflicts'] = await meeting_conflicts(db, meeting_id)
+    return result
 
-    return await get_meeting_detail(meeting_id, current_user)
+async def get_meeting_detail(
+    meeting_id: str,
+    current_user: dict,
+    fields: Optional[list] = None,
+    expansions: Optional[set] = None,
+):
+    if expansions is None:
+        expansions = set(MEETING_EXPANSIONS)
+    required = ["id", "organizer_id"] if 'organizer' in expansions else ["id"]
 
-async def get_meeting_detail(meeting_id: str, current_user: dict):
-    meeting = await db.meetings.find_one({"id": meeting_id}, {"_id": 0})
+    meeting = await db.meetings.find_one({"id": meeting_id}, build_projection(fields, required=required))
     if not meeting:
         raise HTTPException(status_code=404, detail="Meeting not found")
 
     # Each `attach_*` helper enriches `meeting` in place with related data
     # (organizer, participants with user info, patients, agenda items, files,
     # decisions). The order is independent — kept here only for readability.
-    await attach_organizer(meeting)
-    await attach_participants(meeting)
-    await attach_patients(meeting)
-    await attach_agenda(meeting)
-    await attach_files(meeting)
-    await attach_decisions(meeting)
-
-    return serialize_doc(meeting)
+    # Relations the caller did not expand are never queried.
+    if 'organizer' in expansions:
+        await attach_organizer(meeting)
+    if 'participants' in expansions:
+        await attach_participants(meeting)
+    if 'patients' in expansions:
+        await attach_patients(meeting)
+    if 'agenda' in expansions:
+        await attach_agenda(meeting)
+    if 'files' in expansions:
+        await attach_files(meeting)
+    if 'decisions' in expansions:
+        await attach_decisions(meeting)
+
+    return serialize_doc(strip_unrequested(meeting, fields, required))
+
+@api_router.get("/meetings/calendar")
+async def get_meeting_calendar(
+    from_date: str = Query(..., alias="from"),
+    to_date: str = Query(..., alias="to"),
+    current_user: dict = Depends(get_current_user),
+):
+    """Concrete occurrences of the user's meetings (recurring series expanded,
+    organizer holidays skipped) between `from` and `to`, both inclusive."""
+    try:
+        start = datetime.strptime(from_date, "%Y-%m-%d").date()
+        end = datetime.strptime(to_date, "%Y-%m-%d").date()
+    except ValueError:
+        raise HTTPException(status_code=400, detail="from/to must be YYYY-MM-DD dates")
+    if end < start:
+        raise HTTPException(status_code=400, detail="'to' must not be before 'from'")
+    if (end - start).days + 1 > MAX_CALENDAR_DAYS:
+        raise HTTPException(status_code=400, detail=f"Calendar range is limited to {MAX_CALENDAR_DAYS} days")
+    
+    occurrences = await calendar_occurrences(db, current_user['id'], start, end)
+    # Plain str/bool/None values only: skip jsonable_encoder, which dominates
+    # the cost of a year view with tens of thousands of occurrences.
+    return JSONResponse({"from": from_date, "to": to_date, "occurrences": occurrences})
 
 @api_router.get("/meetings/{meeting_id}")
-async def get_meeting(meeting_id: str, current_user: dict = Depends(get_current_user)):
-    return await get_meeting_detail(meeting_id, current_user)
+async def get_meeting(
+    meeting_id: str,
+    request: Request,
+    response: Response,
+    fields: Optional[str] = None,
+    expand: Optional[str] = None,
+    current_user: dict = Depends(get_current_user),
+):
+    field_list = parse_csv_param(fields)
+    expansions = parse_expand(expand, MEETING_EXPANSIONS)
+
+    # Cheap revalidation: one indexed read of the version counter decides
+    # whether the client's copy is current before any enrichment runs.
+    current = await db.meetings.find_one({"id": meeting_id}, {"_id": 0, "id": 1, "version": 1})
+    if not current:
+        raise HTTPException(status_code=404, detail="Meeting not found")
+    etag = make_etag(
+        "meeting", meeting_id, current.get('version', 0),
+        canonical_list(field_list), canonical_list(expansions),
+    )
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return not_modified(etag)
+
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = REVALIDATE_CACHE_CONTROL
+    return await get_meeting_detail(
+        meeting_id, current_user,
+        fields=field_list,
+        expansions=expansions,
+    )
+
+@api_router.get("/meetings/{meeting_id}/occurrences")
+async def list_meeting_occurrences(
+    meeting_id: str,
+    from_date: Optional[str] = Query(None, alias="from"),
+    to_date: Optional[str] = Query(None, alias="to"),
+    current_user: dict = Depends(get_current_user),
+):
+    """Materialised sessions of a recurring meeting, with per-occurrence
+    status, reminder state and Teams link. Defaults to today onwards."""
+    head = await db.meetings.find_one({"id": meeting_id}, {"_id": 0, "id": 1, "organizer_id": 1})
+    if not head:
+        raise HTTPException(status_code=404, detail="Meeting not found")
+    if head['organizer_id'] != current_user['id'] and not await db.meeting_participants.find_one(
+        {"meeting_id": meeting_id, "user_id": current_user['id']}, {"_id": 0, "id": 1}
+    ):
+        raise HTTPException(status_code=403, detail="You don't have access to this meeting")
+    
+    date_range = {"$gte": from_date or datetime.now(timezone.utc).strftime("%Y-%m-%d")}
+    if to_date:
+        date_range["$lte"] = to_date
+    return await db.meeting_occurrences.find(
+        {"meeting_id": meeting_id, "occurrence_date": date_range}, {"_id": 0}
+    ).sort("occurrence_date", 1).to_list(1000)
 
 @api_router.put("/meetings/{meeting_id}")
 async def update_meeting(meeting_id: str, updates: dict, current_user: dict = Depends(get_current_user)):
@@ -637,14 +924,24 @@ async def update_meeting(meeting_id: str, updates: dict, current_user: dict = De
     dt_changed = datetime_changed(meeting, update_data)
 
     if update_data:
-        await db.meetings.update_one({"id": meeting_id}, {"$set": update_data})
+        await db.meetings.update_one({"id": meeting_id}, {"$set": update_data, "$inc": {"version": 1}})
+        await sync_meeting_fields(db, meeting_id, update_data)
+        if update_data.get('status') == 'cancelled':
+            await cancel_upcoming_occurrences(db, meeting_id)
+        elif schedule_changed(update_data):
+            await rematerialize_series(db, meeting_id)
+        elif 'status' in update_data:
+            await rebuild_meeting_busy(db, meeting_id)
 
     if dt_changed:
         # Keep Teams calendar entry in sync, then email participants the new schedule.
         await sync_teams_meeting_datetime(meeting, update_data, current_user)
         await send_reschedule_notifications(meeting, update_data, current_user)
 
-    return await get_meeting_detail(meeting_id, current_user)
+    result = await get_meeting_detail(meeting_id, current_user)
+    if schedule_changed(update_data):
+        result['conflicts'] = await meeting_conflicts(db, meeting_id)
+    return result
 
 @api_router.delete("/meetings/{meeting_id}")
 async def delete_meeting(meeting_id: str, current_user: dict = Depends(get_current_user)):
@@ -655,12 +952,14 @@ async def delete_meeting(meeting_id: str, current_user: dict = Depends(get_curre
     if meeting['organizer_id'] != current_user['id']:
         raise HTTPException(status_code=403, detail="Only organizer can delete meeting")
     
-    await db.meetings.update_one({"id": meeting_id}, {"$set": {"status": "cancelled"}})
+    await db.meetings.update_one({"id": meeting_id}, {"$set": {"status": "cancelled"}, "$inc": {"version": 1}})
+    await sync_meeting_fields(db, meeting_id, {"status": "cancelled"})
+    await cancel_upcoming_occurrences(db, meeting_id)
     return {"message": "Meeting cancelled"}
 
 # Generate Meeting Summary PDF
 @api_router.get("/meetings/{meeting_id}/summary")
-async def generate_meeting_summary(meeting_id: str, current_user: dict = Depends(get_current_user)):
+async def generate_meeting_summary(meeting_id: str, request: Request, current_user: dict = Depends(get_current_user)):
     """
     Generate a comprehensive PDF summary for a meeting including:
     - Meeting details
@@ -669,102 +968,126 @@ async def generate_meeting_summary(meeting_id: str, current_user: dict = Depends
     - Agenda items with treatment plans
     - Decisions made
     """
-    # Get meeting details
-    meeting = await db.meetings.find_one({"id": meeting_id}, {"_id": 0})
-    if not meeting:
+    # Enough to authorise, revalidate, hit the PDF cache and name the file.
+    head = await db.meetings.find_one(
+        {"id": meeting_id},
+        {"_id": 0, "id": 1, "organizer_id": 1, "version": 1, "title": 1, "meeting_date": 1, "start_time": 1},
+    )
+    if not head:
         raise HTTPException(status_code=404, detail="Meeting not found")
     
     # Check if user has access to this meeting
-    is_organizer = meeting['organizer_id'] == current_user['id']
-    is_participant = await db.meeting_participants.find_one({
+    is_organizer = head['organizer_id'] == current_user['id']
+    is_participant = is_organizer or await db.meeting_participants.find_one({
         "meeting_id": meeting_id,
         "user_id": current_user['id']
-    })
+    }, {"_id": 0, "id": 1})
     
     if not is_organizer and not is_participant:
         raise HTTPException(status_code=403, detail="You don't have access to this meeting")
+
+    etag = make_etag("summary", meeting_id, head.get('version', 0))
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return not_modified(etag)
+
+    pdf_bytes = summary_cache.get(meeting_id, head.get('version', 0))
+    if pdf_bytes is None:
+        async with PDF_ADMISSION.slot():
+            try:
+                pdf_bytes = await build_summary_pdf(db, meeting_id, head.get('version', 0))
+            except Exception as e:
+                logger.error(f"Error generating PDF: {str(e)}")
+                raise HTTPException(status_code=500, detail=f"Failed to generate PDF: {str(e)}")
+        if pdf_bytes is None:
+            raise HTTPException(status_code=404, detail="Meeting not found")
+    
+    # Create filename: Summary_MeetingTitle_Date_Time.pdf
+    # Format: Summary_Weekly_Case_Review_2024-03-25_14-30.pdf
+    meeting_title = head.get('title', 'Meeting').replace(' ', '_')
+    meeting_date = head.get('meeting_date', datetime.now().strftime('%Y-%m-%d'))
+    meeting_time = head.get('start_time', '00:00')[:5].replace(':', '-')  # Convert HH:MM to HH-MM
+    
+    filename = f"Summary_{meeting_title}_{meeting_date}_{meeting_time}.pdf"
+    
+    return Response(
+        content=pdf_bytes,
+        media_type="application/pdf",
+        headers={
+            "Content-Disposition": f"attachment; filename={filename}",
+            "ETag": etag,
+            "Cache-Control": REVALIDATE_CACHE_CONTROL,
+        }
+    )
+
+# ============== Summary Exports ==============
+
+SUMMARY_EXPORT_DIR = UPLOAD_DIR / "exports"
+
+@api_router.post("/exports/summaries", status_code=202)
+async def start_summary_export(payload: SummaryExportRequest, current_user: dict = Depends(get_current_user)):
+    """Start a background job that bundles the summary PDF of every meeting
+    in a date range (optionally only those with a patient of `department`)
+    into one ZIP. Poll the returned job for progress."""
+    try:
+        start = datetime.strptime(payload.date_from, "%Y-%m-%d").date()
+        end = datetime.strptime(payload.date_to, "%Y-%m-%d").date()
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Dates must be YYYY-MM-DD")
+    if end < start:
+        raise HTTPException(status_code=400, detail="date_to must not be before date_from")
+    if (end - start).days + 1 > MAX_EXPORT_DAYS:
+        raise HTTPException(status_code=400, detail=f"Date range cannot exceed {MAX_EXPORT_DAYS} days")
+    
+    running = await active_export(db, current_user['id'])
+    if running:
+        raise HTTPException(status_code=409, detail=f"Export {running['id']} is still in progress")
+    
+    meeting_ids = await export_meeting_ids(db, current_user, payload.date_from, payload.date_to, payload.department)
+    if not meeting_ids:
+        raise HTTPException(status_code=404, detail="No meetings match the requested range")
+    if len(meeting_ids) > MAX_EXPORT_MEETINGS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"{len(meeting_ids)} meetings match; narrow the range to at most {MAX_EXPORT_MEETINGS}",
+        )
     
-    # Get organizer info
-    organizer = await db.users.find_one({"id": meeting['organizer_id']}, {"_id": 0, "name": 1})
-    meeting['organizer_name'] = organizer.get('name', 'Unknown') if organizer else 'Unknown'
-    
-    # Get participants
-    participants_cursor = db.meeting_participants.find({"meeting_id": meeting_id}, {"_id": 0})
-    participants_list = await participants_cursor.to_list(length=None)
-    
-    participants = []
-    for p in participants_list:
-        user = await db.users.find_one({"id": p['user_id']}, {"_id": 0, "name": 1, "role": 1, "specialty": 1})
-        if user:
-            participants.append({
-                "name": user.get('name', 'Unknown'),
-                "role": user.get('role', 'Unknown'),
-                "specialty": user.get('specialty', 'N/A'),
-                "response_status": p.get('response_status', 'pending')
-            })
-    
-    # Get patients
-    patients_cursor = db.meeting_patients.find({"meeting_id": meeting_id}, {"_id": 0})
-    meeting_patients = await patients_cursor.to_list(length=None)
-    
-    patients = []
-    for mp in meeting_patients:
-        patient = await db.patients.find_one({"id": mp['patient_id']}, {"_id": 0})
-        if patient:
-            # Calculate age
-            if patient.get('date_of_birth'):
-                dob = datetime.fromisoformat(patient['date_of_birth'].replace('Z', '+00:00'))
-                today = datetime.now(timezone.utc)
-                age = today.year - dob.year - ((today.month, today.day) < (dob.month, dob.day))
-                patient['age'] = age
-            patients.append(patient)
-    
-    # Get agenda items with treatment plans
-    agenda_cursor = db.agenda_items.find({"meeting_id": meeting_id}, {"_id": 0}).sort("order", 1)
-    agenda_items = await agenda_cursor.to_list(length=None)
-    
-    for item in agenda_items:
-        if item.get('patient_id'):
-            patient = await db.patients.find_one({"id": item['patient_id']}, {"_id": 0, "first_name": 1, "last_name": 1, "patient_id_number": 1})
-            if patient:
-                item['patient_name'] = f"{patient.get('first_name', '')} {patient.get('last_name', '')}"
-                item['patient_mrn'] = patient.get('patient_id_number', '')
-    
-    # Get decisions
-    decisions_cursor = db.meeting_decisions.find({"meeting_id": meeting_id}, {"_id": 0})
-    decisions = await decisions_cursor.to_list(length=None)
-    
-    for decision in decisions:
-        if decision.get('created_by'):
-            user = await db.users.find_one({"id": decision['created_by']}, {"_id": 0, "name": 1})
-            if user:
-                decision['decision_maker'] = user.get('name', 'Unknown')
-        
-        if decision.get('created_at'):
-            decision['created_at'] = decision['created_at'].strftime('%B %d, %Y at %I:%M %p')
-    
-    # Generate PDF
+    await purge_expired_exports(db)
     try:
-        pdf_bytes = generate_meeting_summary_pdf(meeting, participants, patients, agenda_items, decisions)
-        
-        # Create filename: Summary_MeetingTitle_Date_Time.pdf
-        # Format: Summary_Weekly_Case_Review_2024-03-25_14-30.pdf
-        meeting_title = meeting.get('title', 'Meeting').replace(' ', '_')
-        meeting_date = meeting.get('meeting_date', datetime.now().strftime('%Y-%m-%d'))
-        meeting_time = meeting.get('start_time', '00:00')[:5].replace(':', '-')  # Convert HH:MM to HH-MM
-        
-        filename = f"Summary_{meeting_title}_{meeting_date}_{meeting_time}.pdf"
-        
-        return Response(
-            content=pdf_bytes,
-            media_type="application/pdf",
-            headers={
-                "Content-Disposition": f"attachment; filename={filename}"
-            }
+        return await create_export(
+            db, current_user, meeting_ids, payload.date_from, payload.date_to, payload.department, SUMMARY_EXPORT_DIR
         )
-    except Exception as e:
-        logger.error(f"Error generating PDF: {str(e)}")
-        raise HTTPException(status_code=500, detail=f"Failed to generate PDF: {str(e)}")
+    except ValueError:
+        # Lost a race with a concurrent request from the same user.
+        running = await active_export(db, current_user['id'])
+        detail = f"Export {running['id']} is still in progress" if running else "An export is already in progress"
+        raise HTTPException(status_code=409, detail=detail)
+
+@api_router.get("/exports/summaries/{export_id}")
+async def get_summary_export(export_id: str, current_user: dict = Depends(get_current_user)):
+    """Progress of an export job: status, done / failed / total."""
+    job = await db.summary_exports.find_one({"id": export_id, "requested_by": current_user['id']}, {"_id": 0})
+    if not job:
+        raise HTTPException(status_code=404, detail="Export not found")
+    return export_view(job)
+
+@api_router.get("/exports/summaries/{export_id}/download")
+async def download_summary_export(export_id: str, current_user: dict = Depends(get_current_user)):
+    from fastapi.responses import FileResponse
+    
+    job = await db.summary_exports.find_one({"id": export_id, "requested_by": current_user['id']}, {"_id": 0})
+    if not job:
+        raise HTTPException(status_code=404, detail="Export not found")
+    if job['status'] != 'completed':
+        raise HTTPException(status_code=409, detail=f"Export is {job['status']}")
+    if not os.path.exists(job['file_path']):
+        raise HTTPException(status_code=410, detail="Export file is no longer available")
+    
+    # Streamed from disk in chunks; the archive is never loaded into memory.
+    return FileResponse(
+        job['file_path'],
+        media_type="application/zip",
+        filename=f"meeting_summaries_{job['date_from']}_{job['date_to']}.zip",
+    )
 
 # ============== Meeting Participants Routes ==============
 
@@ -800,6 +1123,8 @@ async def add_participant(meeting_id: str, invite: ParticipantInvite, current_us
         "created_at": datetime.now(timezone.utc).isoformat(),
         "added_by": current_user['id']  # Track who added this participant
     })
+    await add_member(db, meeting, invite.user_id, invite.role, "pending")
+    await bump_meeting_version(meeting_id)
     
     # Send email invite to newly added participant
     try:
@@ -835,7 +1160,87 @@ async def add_participant(meeting_id: str, invite: ParticipantInvite, current_us
     except Exception as e:
         logger.error(f"Failed to send meeting invite to newly added participant: {str(e)}")
     
-    return {"message": "Participant added successfully"}
+    return {
+        "message": "Participant added successfully",
+        "conflicts": await meeting_conflicts(db, meeting_id, [invite.user_id]),
+    }
+
+MAX_BULK_PARTICIPANTS = 500
+
+@api_router.post("/meetings/{meeting_id}/participants:bulk", dependencies=[Depends(bulk_admission)])
+async def add_participants_bulk(
+    meeting_id: str,
+    payload: BulkParticipantInvite,
+    background_tasks: BackgroundTasks,
+    current_user: dict = Depends(get_current_user),
+):
+    """Add many participants in one call. Permissions are checked once,
+    existing participants and unknown users are found with one query each,
+    new rows are inserted together and invites are sent after the response.
+    Returns one outcome per requested user: added, already_participant,
+    duplicate (repeated in the request) or user_not_found."""
+    if not payload.participants:
+        raise HTTPException(status_code=400, detail="No participants given")
+    if len(payload.participants) > MAX_BULK_PARTICIPANTS:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_BULK_PARTICIPANTS} participants per request")
+    
+    meeting = await db.meetings.find_one({"id": meeting_id}, {"_id": 0})
+    if not meeting:
+        raise HTTPException(status_code=404, detail="Meeting not found")
+    
+    # Same rule as the single add: organizer or an existing participant.
+    requested_ids = list(dict.fromkeys(p.user_id for p in payload.participants))
+    existing_ids = {
+        p['user_id'] for p in await db.meeting_participants.find(
+            {"meeting_id": meeting_id, "user_id": {"$in": requested_ids + [current_user['id']]}},
+            {"_id": 0, "user_id": 1},
+        ).to_list(None)
+    }
+    if meeting['organizer_id'] != current_user['id'] and current_user['id'] not in existing_ids:
+        raise HTTPException(status_code=403, detail="Only organizer or existing participants can add new participants")
+    known_ids = {
+        u['id'] for u in await db.users.find({"id": {"$in": requested_ids}}, {"_id": 0, "id": 1}).to_list(None)
+    }
+    
+    results, rows, seen = [], [], set()
+    now_iso = datetime.now(timezone.utc).isoformat()
+    for invite in payload.participants:
+        if invite.user_id in seen:
+            outcome = "duplicate"
+        elif invite.user_id not in known_ids:
+            outcome = "user_not_found"
+        elif invite.user_id in existing_ids:
+            outcome = "already_participant"
+        else:
+            outcome = "added"
+            rows.append({
+                "id": str(uuid.uuid4()),
+                "meeting_id": meeting_id,
+                "user_id": invite.user_id,
+                "role": invite.role,
+                "response_status": "pending",
+                "created_at": now_iso,
+                "added_by": current_user['id'],
+            })
+        seen.add(invite.user_id)
+        results.append({"user_id": invite.user_id, "role": invite.role, "status": outcome})
+    
+    added_ids = [r['user_id'] for r in rows]
+    conflicts = []
+    if rows:
+        await db.meeting_participants.insert_many(rows)
+        await add_members(db, meeting, rows)
+        await bump_meeting_version(meeting_id)
+        organizer = await db.users.find_one({"id": meeting['organizer_id']}, {"_id": 0, "password_hash": 0})
+        if organizer:
+            background_tasks.add_task(send_meeting_invites, meeting, added_ids, organizer)
+        conflicts = await meeting_conflicts(db, meeting_id, added_ids)
+    
+    return {
+        "added": len(added_ids),
+        "results": results,
+        "conflicts": conflicts,
+    }
 
 @api_router.put("/meetings/{meeting_id}/respond")
 async def respond_to_invite(meeting_id: str, response: ParticipantResponse, current_user: dict = Depends(get_current_user)):
@@ -846,6 +1251,8 @@ async def respond_to_invite(meeting_id: str, response: ParticipantResponse, curr
         {"meeting_id": meeting_id, "user_id": current_user['id']},
         {"$set": {"response_status": response.response_status, "response_date": datetime.now(timezone.utc).isoformat()}}
     )
+    await set_member_response(db, meeting_id, current_user['id'], response.response_status)
+    await bump_meeting_version(meeting_id)
     
     return {"message": f"Response recorded: {response.response_status}"}
 
@@ -856,6 +1263,8 @@ async def remove_participant(meeting_id: str, user_id: str, current_user: dict =
         raise HTTPException(status_code=403, detail="Only organizer can remove participants")
     
     await db.meeting_participants.delete_one({"meeting_id": meeting_id, "user_id": user_id})
+    await remove_member(db, meeting, user_id)
+    await bump_meeting_version(meeting_id)
     return {"message": "Participant removed"}
 
 @api_router.put("/meetings/{meeting_id}/participants/{user_id}/response")
@@ -875,6 +1284,8 @@ async def update_participant_response(meeting_id: str, user_id: str, data: dict,
     
     if result.modified_count == 0:
         raise HTTPException(status_code=404, detail="Participant not found")
+    await set_member_response(db, meeting_id, user_id, response_status)
+    await bump_meeting_version(meeting_id)
     
     # Send response alert to organizer
     try:
@@ -940,6 +1351,8 @@ async def add_patient_to_meeting(meeting_id: str, patient_data: MeetingPatientCr
         "added_by": current_user['id'],
         "added_by_name": current_user['name'],
         "approval_status": approval_status,
+        # Denormalised for the organizer's approval worklist (services/approvals.py).
+        "organizer_id": meeting['organizer_id'],
         "created_at": datetime.now(timezone.utc).isoformat()
     }
     
@@ -950,6 +1363,7 @@ async def add_patient_to_meeting(meeting_id: str, patient_data: MeetingPatientCr
         meeting_patient_doc["approved_at"] = datetime.now(timezone.utc).isoformat()
     
     await db.meeting_patients.insert_one(meeting_patient_doc)
+    await bump_meeting_version(meeting_id)
     
     # Send notification to organizer if added by participant
     if not is_organizer:
@@ -1012,6 +1426,7 @@ async def add_patient_to_meeting(meeting_id: str, patient_data: MeetingPatientCr
 @api_router.delete("/meetings/{meeting_id}/patients/{patient_id}")
 async def remove_patient_from_meeting(meeting_id: str, patient_id: str, current_user: dict = Depends(get_current_user)):
     await db.meeting_patients.delete_one({"meeting_id": meeting_id, "patient_id": patient_id})
+    await bump_meeting_version(meeting_id)
     return {"message": "Patient removed from meeting"}
 
 
@@ -1052,6 +1467,7 @@ async def approve_patient_addition(meeting_id: str, patient_id: str, current_use
             "approved_at": datetime.now(timezone.utc).isoformat()
         }}
     )
+    await bump_meeting_version(meeting_id)
     
     # Send notification to the person who added the patient
     try:
@@ -1105,6 +1521,42 @@ async def approve_patient_addition(meeting_id: str, patient_id: str, current_use
     }
 
 
+# ============== Approval Worklist ==============
+
+@api_router.get("/approvals/pending")
+async def list_pending_approvals(
+    limit: int = Query(100, ge=1, le=500),
+    current_user: dict = Depends(get_current_user),
+):
+    """Pending patient additions across every meeting the caller organises,
+    oldest first, with meeting and patient details for the worklist."""
+    items = await pending_approvals(db, current_user['id'], limit)
+    return {"count": len(items), "items": items}
+
+@api_router.post("/approvals:bulk", dependencies=[Depends(bulk_admission)])
+async def bulk_approve_patients(
+    payload: BulkApprovalRequest,
+    background_tasks: BackgroundTasks,
+    current_user: dict = Depends(get_current_user),
+):
+    """Approve many pending patient additions (meeting_patients ids) at once.
+    Only rows of meetings the caller organises are touched; the others are
+    reported as not_found. Adders get one summary email each, after the
+    response."""
+    if not payload.ids:
+        raise HTTPException(status_code=400, detail="No ids given")
+    if len(payload.ids) > MAX_BULK_APPROVALS:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_BULK_APPROVALS} ids per request")
+    
+    outcome = await approve_rows(db, current_user, payload.ids)
+    if outcome['approved']:
+        background_tasks.add_task(notify_adders, db, outcome['approved'], current_user, FRONTEND_URL)
+    return {
+        "approved": len(outcome['approved']),
+        "results": outcome['results'],
+    }
+
+
 # ============== Agenda Routes ==============
 
 @api_router.post("/meetings/{meeting_id}/agenda")
@@ -1136,9 +1588,9 @@ async def add_agenda_item(meeting_id: str, item: AgendaItemCreate, current_user:
     
     item_id = str(uuid.uuid4())
     
-    # Get current max order_index
-    max_order = await db.agenda_items.find({"meeting_id": meeting_id}).sort("order_index", -1).limit(1).to_list(1)
-    order_index = (max_order[0]['order_index'] + 1) if max_order else 0
+    # Atomic counter on the meeting: concurrent adds get distinct positions.
+    # (Also bumps the meeting version.)
+    order_index = await allocate_agenda_positions(meeting_id)
     
     await db.agenda_items.insert_one({
         "id": item_id,
@@ -1159,15 +1611,46 @@ async def add_agenda_item(meeting_id: str, item: AgendaItemCreate, current_user:
     
     return {"id": item_id, "message": "Agenda item added"}
 
+@api_router.put("/meetings/{meeting_id}/agenda:reorder")
+async def reorder_agenda(meeting_id: str, payload: AgendaReorderRequest, current_user: dict = Depends(get_current_user)):
+    """Set the whole agenda order in one request (drag-and-drop).
+    `item_ids` must list every agenda item of the meeting exactly once;
+    the positions are written with a single bulk write."""
+    meeting = await db.meetings.find_one({"id": meeting_id}, {"_id": 0, "id": 1, "organizer_id": 1})
+    if not meeting:
+        raise HTTPException(status_code=404, detail="Meeting not found")
+    if meeting['organizer_id'] != current_user['id'] and not await db.meeting_participants.find_one(
+        {"meeting_id": meeting_id, "user_id": current_user['id']}, {"_id": 0, "id": 1}
+    ):
+        raise HTTPException(status_code=403, detail="Only organizer or participants can reorder agenda items")
+    if len(set(payload.item_ids)) != len(payload.item_ids):
+        raise HTTPException(status_code=400, detail="item_ids contains duplicates")
+    
+    current = {
+        a['id']: a.get('order_index')
+        for a in await db.agenda_items.find(
+            {"meeting_id": meeting_id}, {"_id": 0, "id": 1, "order_index": 1}
+        ).to_list(None)
+    }
+    if set(payload.item_ids) != set(current):
+        # Someone added or removed an item since the client loaded the agenda.
+        raise HTTPException(status_code=409, detail="Agenda has changed; reload it and reorder again")
+    
+    moved = await apply_agenda_order(meeting_id, payload.item_ids, current)
+    return {"message": "Agenda reordered", "moved": moved}
+
 @api_router.put("/meetings/{meeting_id}/agenda/{item_id}")
 async def update_agenda_item(meeting_id: str, item_id: str, updates: dict, current_user: dict = Depends(get_current_user)):
+    # Positions only change through agenda:reorder, which keeps them a
+    # permutation below the meeting's agenda_order_seq.
     allowed_fields = ['mrn', 'requested_provider', 'diagnosis', 'reason_for_discussion',
-                      'pathology_required', 'radiology_required', 'treatment_plan', 'order_index']
+                      'pathology_required', 'radiology_required', 'treatment_plan']
     update_data = {k: v for k, v in updates.items() if k in allowed_fields}
     
     if update_data:
         update_data['updated_at'] = datetime.now(timezone.utc).isoformat()
         await db.agenda_items.update_one({"id": item_id}, {"$set": update_data})
+        await bump_meeting_version(meeting_id)
     
     item = await db.agenda_items.find_one({"id": item_id}, {"_id": 0})
     return serialize_doc(item)
@@ -1202,6 +1685,7 @@ async def update_treatment_plan(meeting_id: str, item_id: str, data: dict, curre
             "last_updated_by": current_user['id']
         }}
     )
+    await bump_meeting_version(meeting_id)
     
     item = await db.agenda_items.find_one({"id": item_id}, {"_id": 0})
     return serialize_doc(item)
@@ -1209,6 +1693,7 @@ async def update_treatment_plan(meeting_id: str, item_id: str, data: dict, curre
 @api_router.delete("/meetings/{meeting_id}/agenda/{item_id}")
 async def delete_agenda_item(meeting_id: str, item_id: str, current_user: dict = Depends(get_current_user)):
     await db.agenda_items.delete_one({"id": item_id, "meeting_id": meeting_id})
+    await bump_meeting_version(meeting_id)
     return {"message": "Agenda item deleted"}
 
 # ============== Decision Logs Routes ==============
@@ -1230,15 +1715,18 @@ async def create_decision(meeting_id: str, decision: DecisionLogCreate, current_
         "follow_up_date": decision.follow_up_date,
         "priority": decision.priority,
         "status": "pending",
+        "overdue_alert_sent": False,
         "created_by": current_user['id'],
         "created_at": datetime.now(timezone.utc).isoformat()
     })
+    await bump_meeting_version(meeting_id)
     
     return {"id": decision_id, "message": "Decision logged"}
 
 @api_router.delete("/meetings/{meeting_id}/decisions/{decision_id}")
 async def delete_decision(meeting_id: str, decision_id: str, current_user: dict = Depends(get_current_user)):
     await db.decision_logs.delete_one({"id": decision_id, "meeting_id": meeting_id})
+    await bump_meeting_version(meeting_id)
     return {"message": "Decision deleted"}
 
 @api_router.put("/meetings/{meeting_id}/decisions/{decision_id}")
@@ -1248,53 +1736,195 @@ async def update_decision(meeting_id: str, decision_id: str, updates: dict, curr
     update_data = {k: v for k, v in updates.items() if k in allowed_fields}
     
     if update_data:
-        await db.decision_logs.update_one({"id": decision_id}, {"$set": update_data})
+        await db.decision_logs.update_one(
+            {"id": decision_id}, {"$set": {**update_data, **follow_up_date_reset(update_data)}}
+        )
+        await bump_meeting_version(meeting_id)
     
     decision = await db.decision_logs.find_one({"id": decision_id}, {"_id": 0})
     return serialize_doc(decision)
 
+@api_router.get("/follow-ups")
+async def list_follow_ups(
+    responsible_doctor_id: Optional[str] = Query(None),
+    due_from: Optional[str] = Query(None),
+    due_to: Optional[str] = Query(None),
+    priority: Optional[str] = Query(None),
+    include_completed: bool = Query(False),
+    limit: int = Query(50, ge=1, le=MAX_FOLLOW_UP_PAGE),
+    cursor: Optional[str] = Query(None),
+    current_user: dict = Depends(get_current_user),
+):
+    """Decision follow-up worklist of one responsible doctor (default: the
+    caller), ordered by follow-up date. `priority` is a comma-separated list;
+    pass the returned `next_cursor` back to get the next page."""
+    doctor_id = responsible_doctor_id or current_user['id']
+    if doctor_id != current_user['id'] and current_user.get('role') not in ['organizer', 'admin']:
+        raise HTTPException(status_code=403, detail="Only organizers and admins can view another doctor's follow-ups")
+    for value in (due_from, due_to):
+        if value:
+            try:
+                datetime.strptime(value, "%Y-%m-%d")
+            except ValueError:
+                raise HTTPException(status_code=400, detail="Dates must be YYYY-MM-DD")
+    priorities = [p.strip() for p in priority.split(",") if p.strip()] if priority else None
+    if priorities and set(priorities) - set(FOLLOW_UP_PRIORITIES):
+        raise HTTPException(status_code=400, detail=f"priority must be among: {', '.join(FOLLOW_UP_PRIORITIES)}")
+    
+    try:
+        page = await follow_up_page(
+            db, doctor_id, limit=limit, cursor=cursor,
+            due_from=due_from, due_to=due_to, priorities=priorities, include_closed=include_completed,
+        )
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return {"count": len(page['items']), **page}
+
 # ============== File Upload Routes ==============
 
 @api_router.post("/meetings/{meeting_id}/files")
-async def upload_file(
-    meeting_id: str,
-    file: UploadFile = File(...),
-    patient_id: Optional[str] = Form(None),
-    meeting_patient_id: Optional[str] = Form(None),
-    file_type: Optional[str] = Form("other"),
-    department_document_type: Optional[str] = Form(None),
-    current_user: dict = Depends(get_current_user)
-):
-    # Generate unique filename
-    file_ext = Path(file.filename).suffix
-    file_name = f"{uuid.uuid4()}{file_ext}"
-    file_path = UPLOAD_DIR / meeting_id
-    file_path.mkdir(parents=True, exist_ok=True)
-    full_path = file_path / file_name
-    
-    # Save file
-    async with aiofiles.open(full_path, 'wb') as f:
-        content = await file.read()
-        await f.write(content)
-    
-    file_id = str(uuid.uuid4())
-    await db.file_attachments.insert_one({
-        "id": file_id,
-        "meeting_id": meeting_id,
-        "patient_id": patient_id,
-        "meeting_patient_id": meeting_patient_id,
-        "file_name": file_name,
-        "original_name": file.filename,
-        "file_path": str(full_path),
-        "file_type": file_type,
-        "mime_type": file.content_type,
-        "file_size": len(content),
-        "department_document_type": department_document_type,
-        "uploaded_by": current_user['id'],
-        "created_at": datetime.now(timezone.utc).isoformat()
-    })
-    
-    return {"id": file_id, "file_name": file_name, "message": "File uploaded"}
+async def upload_file(meeting_id: str, request: Request, current_user: dict = Depends(get_current_user)):
+    """Multipart form: `file`, plus optional `patient_id`, `meeting_patient_id`,
+    `file_type` and `department_document_type`. The body is parsed as it
+    arrives (StreamedForm), so the size limit applies while the file is
+    still being sent rather than after it has been spooled."""
+    limit = max_upload_bytes()
+    too_large = HTTPException(status_code=413, detail=f"File exceeds the {limit // (1024 * 1024)} MB upload limit")
+    declared = request.headers.get("content-length")
+    if declared and declared.isdigit() and int(declared) > limit + MULTIPART_OVERHEAD_BYTES:
+        raise too_large
+    try:
+        form = StreamedForm(request.headers.get("content-type"))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    # Copy in fixed-size chunks, hashing as we go; the file is only moved
+    # into the blob store once it is complete.
+    tmp_path = partial_path(UPLOAD_DIR, str(uuid.uuid4()))
+    tmp_path.parent.mkdir(parents=True, exist_ok=True)
+    hasher = hashlib.sha256()
+    try:
+        size = await write_stream(form.file_chunks(request.stream()), tmp_path, limit, hasher)
+        fields = form.fields
+        record = await store_attachment(
+            db, tmp_path, UPLOAD_DIR, meeting_id, form.filename, form.content_type, size, hasher.hexdigest(),
+            {"patient_id": fields.get("patient_id") or None,
+             "meeting_patient_id": fields.get("meeting_patient_id") or None,
+             "file_type": fields.get("file_type") or "other",
+             "department_document_type": fields.get("department_document_type") or None},
+            current_user['id'],
+        )
+    except UploadTooLarge:
+        raise too_large
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"Malformed upload: {e}")
+    finally:
+        tmp_path.unlink(missing_ok=True)
+    await bump_meeting_version(meeting_id)
+    request_preview(record['sha256'])
+    request_text_index(record['sha256'])
+    
+    return {"id": record['id'], "file_name": record['file_name'], "message": "File uploaded"}
+
+async def _require_meeting_access(meeting_id: Optional[str], current_user: dict,
+                                  fields: Optional[dict] = None) -> dict:
+    """The meeting, if the user is its organizer, a participant or an admin.
+    Attachments are only reachable through this check."""
+    meeting = await db.meetings.find_one(
+        {"id": meeting_id}, {"_id": 0, "organizer_id": 1, **(fields or {})}
+    ) if meeting_id else None
+    if not meeting:
+        raise HTTPException(status_code=404, detail="Meeting not found")
+    if current_user['role'] != 'admin' and meeting['organizer_id'] != current_user['id']:
+        if not await db.meeting_participants.find_one(
+            {"meeting_id": meeting_id, "user_id": current_user['id']}, {"_id": 0, "id": 1}
+        ):
+            raise HTTPException(status_code=403, detail="You don't have access to this meeting")
+    return meeting
+
+@api_router.get("/meetings/{meeting_id}/files.zip")
+async def download_meeting_files(meeting_id: str, current_user: dict = Depends(get_current_user)):
+    """Every attachment of the meeting in one ZIP, one folder per patient.
+    The archive is built while it is sent (services/attachment_archive.py)."""
+    meeting = await _require_meeting_access(meeting_id, current_user, {"title": 1, "meeting_date": 1})
+    
+    entries = await archive_entries(db, meeting_id)
+    if not entries:
+        raise HTTPException(status_code=404, detail="This meeting has no files")
+    
+    meeting_title = meeting.get('title', 'Meeting').replace(' ', '_')
+    filename = f"Files_{meeting_title}_{meeting.get('meeting_date', '')}.zip"
+    return StreamingResponse(
+        stream_archive(db, UPLOAD_DIR, entries),
+        media_type="application/zip",
+        headers={"Content-Disposition": content_disposition(filename), "Cache-Control": "private, no-store"},
+    )
+
+# Resumable uploads for large files: init -> PUT chunks at ?offset= -> commit.
+
+async def _get_upload_session(upload_id: str, current_user: dict) -> dict:
+    session = await db.upload_sessions.find_one({"id": upload_id}, {"_id": 0})
+    if not session or session['expires_at'] < datetime.now(timezone.utc).isoformat():
+        raise HTTPException(status_code=404, detail="Upload not found or expired")
+    if session['owner_id'] != current_user['id']:
+        raise HTTPException(status_code=403, detail="Not your upload")
+    return session
+
+@api_router.post("/meetings/{meeting_id}/uploads", status_code=201)
+async def init_upload(meeting_id: str, payload: UploadInitRequest, current_user: dict = Depends(get_current_user)):
+    if not await db.meetings.find_one({"id": meeting_id}, {"_id": 0, "id": 1}):
+        raise HTTPException(status_code=404, detail="Meeting not found")
+    await purge_expired_uploads(db, UPLOAD_DIR)
+    try:
+        session = await create_upload_session(
+            db, UPLOAD_DIR, meeting_id, current_user['id'], payload.file_name, payload.mime_type,
+            payload.total_size, payload.model_dump(), sha256=payload.sha256,
+        )
+    except UploadTooLarge as e:
+        raise HTTPException(status_code=413, detail=f"File exceeds the {e.limit // (1024 * 1024)} MB upload limit")
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return await session_view(db, UPLOAD_DIR, session)
+
+@api_router.get("/uploads/{upload_id}")
+async def get_upload(upload_id: str, current_user: dict = Depends(get_current_user)):
+    return await session_view(db, UPLOAD_DIR, await _get_upload_session(upload_id, current_user))
+
+@api_router.put("/uploads/{upload_id}")
+async def append_upload(upload_id: str, request: Request, offset: int = Query(..., ge=0),
+                        current_user: dict = Depends(get_current_user)):
+    """Append the raw request body at `offset`. After a dropped connection,
+    GET the upload and resume from its `received` offset."""
+    session = await _get_upload_session(upload_id, current_user)
+    try:
+        received = await append_chunk(db, UPLOAD_DIR, session, offset, request.stream())
+    except UploadOffsetMismatch as e:
+        raise HTTPException(status_code=409, detail=f"Expected offset {e.received}")
+    except ValueError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except UploadTooLarge:
+        raise HTTPException(status_code=413, detail=f"Chunk runs past the declared size of {session['total_size']} bytes")
+    return {**await session_view(db, UPLOAD_DIR, session), "received": received}
+
+@api_router.post("/uploads/{upload_id}:commit", status_code=201)
+async def commit_upload_session(upload_id: str, payload: Optional[UploadCommitRequest] = None,
+                                current_user: dict = Depends(get_current_user)):
+    session = await _get_upload_session(upload_id, current_user)
+    try:
+        record = await commit_upload(db, UPLOAD_DIR, session, current_user['id'],
+                                     expected_sha256=payload.sha256 if payload else None)
+    except ValueError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    await bump_meeting_version(record['meeting_id'])
+    request_preview(record['sha256'])
+    request_text_index(record['sha256'])
+    return {"id": record['id'], "file_name": record['file_name'], "sha256": record['sha256'], "message": "File uploaded"}
+
+@api_router.delete("/uploads/{upload_id}")
+async def abort_upload(upload_id: str, current_user: dict = Depends(get_current_user)):
+    await _get_upload_session(upload_id, current_user)
+    await discard_upload(db, UPLOAD_DIR, upload_id)
+    return {"message": "Upload cancelled"}
 
 @api_router.post("/meetings/{meeting_id}/generate-teams-link")
 async def generate_teams_link(meeting_id: str, current_user: dict = Depends(get_current_user)):
@@ -1345,11 +1975,12 @@ async def generate_teams_link(meeting_id: str, current_user: dict = Depends(get_
         ).replace(tzinfo=tz)
 
         # Create Teams meeting
-        teams_meeting = await teams_service.create_online_meeting(
-            subject=f"{meeting['title']} - Hospital Meeting",
-            start_datetime=meeting_datetime,
-            end_datetime=end_datetime
-        )
+        async with TEAMS_ADMISSION.slot():
+            teams_meeting = await teams_service.create_online_meeting(
+                subject=f"{meeting['title']} - Hospital Meeting",
+                start_datetime=meeting_datetime,
+                end_datetime=end_datetime
+            )
 
         # Update meeting with Teams info
         await db.meetings.update_one(
@@ -1358,8 +1989,9 @@ async def generate_teams_link(meeting_id: str, current_user: dict = Depends(get_
                 "teams_meeting_id": teams_meeting['id'],
                 "teams_join_url": teams_meeting['joinWebUrl'],
                 "teams_generated_at": datetime.now(timezone.utc).isoformat()
-            }}
+            }, "$inc": {"version": 1}}
         )
+        await set_upcoming_teams_link(db, meeting_id, teams_meeting['joinWebUrl'])
 
         logger.info(f"Teams link generated for meeting {meeting_id} by user {current_user['id']}")
 
@@ -1427,11 +2059,12 @@ async def generate_standalone_teams_link(
                 detail="Invalid date/time format. Expected meeting_date YYYY-MM-DD, start_time/end_time HH:MM.",
             )
 
-        teams_meeting = await teams_service.create_online_meeting(
-            subject=f"{payload.title} - Hospital Meeting",
-            start_datetime=meeting_dt,
-            end_datetime=end_dt,
-        )
+        async with TEAMS_ADMISSION.slot():
+            teams_meeting = await teams_service.create_online_meeting(
+                subject=f"{payload.title} - Hospital Meeting",
+                start_datetime=meeting_dt,
+                end_datetime=end_dt,
+            )
 
         logger.info(
             f"Standalone Teams link generated by user {current_user['id']}: "
@@ -1454,73 +2087,195 @@ async def generate_standalone_teams_link(
         )
 
 
+@api_router.get("/files/search")
+async def search_files(
+    q: str = Query(..., min_length=2, max_length=200),
+    meeting_id: Optional[str] = None,
+    patient_id: Optional[str] = None,
+    limit: int = Query(20, ge=1, le=MAX_SEARCH_RESULTS),
+    current_user: dict = Depends(get_current_user),
+):
+    """Full-text search over attachment names and contents (PDF text layer,
+    plain text), best match first, within the meetings the user belongs to
+    (admins: all). Narrow with `meeting_id` and/or `patient_id`."""
+    meeting_ids = None
+    if current_user['role'] != 'admin':
+        meeting_ids = await db.user_meetings.distinct("meeting_id", {"user_id": current_user['id']})
+        if meeting_id and meeting_id not in meeting_ids:
+            raise HTTPException(status_code=403, detail="You don't have access to this meeting")
+    items = await search_attachments(db, q, meeting_ids=meeting_ids, meeting_id=meeting_id,
+                                     patient_id=patient_id, limit=limit)
+    return {"count": len(items), "items": items}
+
 @api_router.get("/files/{file_id}")
-async def get_file(file_id: str, current_user: dict = Depends(get_current_user)):
-    from fastapi.responses import FileResponse
-    
+async def get_file(file_id: str, request: Request, current_user: dict = Depends(get_current_user)):
     file_record = await db.file_attachments.find_one({"id": file_id}, {"_id": 0})
     if not file_record:
         raise HTTPException(status_code=404, detail="File not found")
+    await _require_meeting_access(file_record.get('meeting_id'), current_user)
     
-    return FileResponse(
-        file_record['file_path'],
-        filename=file_record['original_name'],
-        media_type=file_record['mime_type']
+    # Attachments never change under their id, so the content hash is a
+    # strong validator and the copy can be cached for good.
+    if file_record.get('sha256'):
+        etag = f'"{file_record["sha256"]}"'
+    else:
+        etag = make_etag("file", file_id, file_record.get('file_size'), file_record.get('created_at'))
+    last_modified = datetime.fromisoformat(file_record['created_at'])
+    source = await attachment_source(db, UPLOAD_DIR, file_record)
+    if source is None:
+        raise HTTPException(status_code=404, detail="File content missing")
+    return await _send_stored(request, source, etag, last_modified, file_record['original_name'], file_record['mime_type'])
+
+async def _send_stored(request: Request, source, etag: str, last_modified: datetime,
+                       filename: str, media_type: Optional[str]):
+    """Serve stored bytes from wherever their backend keeps them."""
+    if source.path is not None:
+        return file_response(
+            request, str(source.path), source.size, etag, last_modified,
+            filename=filename,
+            media_type=media_type,
+            accel_location=accel_redirect_location(UPLOAD_DIR, str(source.path)),
+        )
+    if source.backend.supports_presigned_urls and presigned_urls_enabled():
+        # Object storage: send the client straight to the object.
+        cached = conditional_response(request, etag, last_modified)
+        if cached is not None:
+            return cached
+        url = await source.backend.presigned_download_url(source.key, filename, media_type)
+        if request.query_params.get("redirect", "").lower() in ("0", "false", "no"):
+            # For the SPA: it navigates to the link itself, without its token.
+            return JSONResponse({"url": url, "expires_in": presigned_url_ttl()},
+                                media_type=PRESIGNED_LINK_MEDIA_TYPE,
+                                headers={"Cache-Control": "private, no-store"})
+        return RedirectResponse(url, status_code=307, headers={"Cache-Control": "private, no-store"})
+    return file_response(
+        request, None, source.size, etag, last_modified,
+        filename=filename,
+        media_type=media_type,
+        stream=lambda start, end: source.backend.read_range(source.key, start, end),
     )
 
+@api_router.get("/files/{file_id}/preview")
+async def get_file_preview(file_id: str, request: Request, current_user: dict = Depends(get_current_user)):
+    """JPEG preview of a PDF (first page) or image attachment, rendered in
+    the background after upload (services/attachment_previews.py). 202 while
+    it is still being made, 404 when the file has none."""
+    file_record = await db.file_attachments.find_one(
+        {"id": file_id}, {"_id": 0, "meeting_id": 1, "blob_id": 1, "original_name": 1}
+    )
+    if not file_record:
+        raise HTTPException(status_code=404, detail="File not found")
+    await _require_meeting_access(file_record.get('meeting_id'), current_user)
+    blob = None
+    if file_record.get('blob_id'):
+        blob = await db.file_blobs.find_one(
+            {"sha256": file_record['blob_id']}, {"_id": 0, "sha256": 1, "storage": 1, "preview": 1}
+        )
+    if not blob:
+        raise HTTPException(status_code=404, detail="No preview for this file")
+    
+    preview = blob.get('preview')
+    if preview is None:
+        # Not processed yet (or dropped from a full backlog): queue it again.
+        request_preview(blob['sha256'])
+        return JSONResponse({"status": "pending"}, status_code=202,
+                            headers={"Retry-After": "2", "Cache-Control": "no-store"})
+    if preview['status'] != 'ready':
+        raise HTTPException(status_code=404, detail="No preview for this file")
+    
+    # Keyed by content like the blob, so it never changes either.
+    etag = f'"{blob["sha256"]}.preview"'
+    filename = f"{Path(file_record.get('original_name') or 'file').stem}-preview.jpg"
+    return await _send_stored(request, preview_source(db, UPLOAD_DIR, blob), etag,
+                              datetime.fromisoformat(preview['created_at']), filename, PREVIEW_MEDIA_TYPE)
+
 @api_router.delete("/files/{file_id}")
 async def delete_file(file_id: str, current_user: dict = Depends(get_current_user)):
     file_record = await db.file_attachments.find_one({"id": file_id}, {"_id": 0})
     if not file_record:
         raise HTTPException(status_code=404, detail="File not found")
+    await _require_meeting_access(file_record.get('meeting_id'), current_user)
     
-    # Delete physical file
-    try:
-        os.remove(file_record['file_path'])
-    except (FileNotFoundError, OSError):
-        pass
-    
+    # Row first, then the storage: the blob is only unlinked when no other
+    # attachment still points at it.
     await db.file_attachments.delete_one({"id": file_id})
+    await delete_attachment_file(db, UPLOAD_DIR, file_record)
+    await remove_from_text_index(db, file_id)
+    await bump_meeting_version(file_record.get('meeting_id'))
     return {"message": "File deleted"}
 
 # ============== Dashboard Stats ==============
 
 @api_router.get("/dashboard/stats")
 async def get_dashboard_stats(current_user: dict = Depends(get_current_user)):
-    today = datetime.now(timezone.utc).strftime("%Y-%m-%d")
-    week_end = (datetime.now(timezone.utc) + timedelta(days=7)).strftime("%Y-%m-%d")
-    
-    # Get meeting IDs where user is participant
-    participant_meetings = await db.meeting_participants.find({"user_id": current_user['id']}, {"_id": 0, "meeting_id": 1}).to_list(1000)
-    participant_meeting_ids = [pm['meeting_id'] for pm in participant_meetings]
-    
-    # Upcoming meetings count
-    upcoming = await db.meetings.count_documents({
-        "$or": [{"organizer_id": current_user['id']}, {"id": {"$in": participant_meeting_ids}}],
-        "meeting_date": {"$gte": today},
-        "status": {"$in": ["scheduled", "in_progress"]}
-    })
-    
-    # Pending invites
-    pending = await db.meeting_participants.count_documents({
-        "user_id": current_user['id'],
-        "response_status": "pending"
-    })
-    
-    # Total patients
-    patients = await db.patients.count_documents({"is_active": True})
-    
-    # Meetings this week
-    this_week = await db.meetings.count_documents({
-        "$or": [{"organizer_id": current_user['id']}, {"id": {"$in": participant_meeting_ids}}],
-        "meeting_date": {"$gte": today, "$lte": week_end}
-    })
+    # Both served from the in-process cache; "today" is the user's local date.
+    counts = await dashboard_stats.get_user_dashboard_counts(db, current_user)
+    patients = await dashboard_stats.get_active_patient_count(db)
     
     return {
-        "upcoming_meetings": upcoming,
-        "pending_invites": pending,
+        "upcoming_meetings": counts["upcoming_meetings"],
+        "pending_invites": counts["pending_invites"],
         "total_patients": patients,
-        "meetings_this_week": this_week
+        "meetings_this_week": counts["meetings_this_week"]
+    }
+
+# ============== Scheduling Assistant ==============
+
+@api_router.post("/scheduling/suggest")
+async def suggest_meeting_slots(
+    payload: SlotSuggestRequest,
+    current_user: dict = Depends(get_current_user),
+):
+    """Earliest slots in which every participant is within their working
+    hours (in their own timezone), not on a holiday and not already booked.
+    Dates and the returned meeting_date/start_time are in the organizer's
+    timezone, ready to be used for POST /meetings."""
+    try:
+        start = datetime.strptime(payload.start_date, "%Y-%m-%d").date()
+        end = datetime.strptime(payload.end_date, "%Y-%m-%d").date()
+    except ValueError:
+        raise HTTPException(status_code=400, detail="start_date/end_date must be YYYY-MM-DD dates")
+    if end < start:
+        raise HTTPException(status_code=400, detail="end_date must not be before start_date")
+    if (end - start).days + 1 > MAX_SUGGEST_DAYS:
+        raise HTTPException(status_code=400, detail=f"Suggestion range is limited to {MAX_SUGGEST_DAYS} days")
+    try:
+        work_start = parse_hhmm(payload.working_hours_start)
+        work_end = parse_hhmm(payload.working_hours_end)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Working hours must be HH:MM")
+    if work_end <= work_start:
+        raise HTTPException(status_code=400, detail="working_hours_end must be after working_hours_start")
+    if not 0 < payload.duration_minutes <= work_end - work_start:
+        raise HTTPException(status_code=400, detail="duration_minutes must fit within the working hours")
+    if payload.step_minutes not in (5, 10, 15, 30, 60):
+        raise HTTPException(status_code=400, detail="step_minutes must be one of 5, 10, 15, 30, 60")
+    
+    participant_ids = list(dict.fromkeys(payload.participant_ids))
+    if payload.include_organizer and current_user['id'] not in participant_ids:
+        participant_ids.append(current_user['id'])
+    if not participant_ids:
+        raise HTTPException(status_code=400, detail="At least one participant is required")
+    if len(participant_ids) > MAX_SUGGEST_PARTICIPANTS:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_SUGGEST_PARTICIPANTS} participants are supported")
+    
+    participants = await db.users.find({"id": {"$in": participant_ids}}, PARTICIPANT_FIELDS).to_list(None)
+    missing = set(participant_ids) - {p['id'] for p in participants}
+    if missing:
+        raise HTTPException(status_code=404, detail=f"Participant(s) not found: {', '.join(sorted(missing))}")
+    
+    slots = await suggest_slots(
+        db, participants, start, end, payload.duration_minutes, work_start, work_end,
+        organizer_timezone=current_user.get('timezone'),
+        include_weekends=payload.include_weekends,
+        step_minutes=payload.step_minutes,
+        limit=max(1, min(payload.limit, MAX_SUGGESTIONS)),
+        not_before=datetime.now(timezone.utc),
+    )
+    return {
+        "timezone": current_user.get('timezone') or "UTC",
+        "participant_count": len(participants),
+        "slots": slots,
     }
 
 # ============== Feedback Routes ==============
@@ -1935,6 +2690,32 @@ async def set_active_country(
     except Exception as e:
         logger.error(f"Error setting active country: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Error setting active country: {str(e)}")
+# ============== Admin: Admission control metrics ==============
+
+@api_router.get("/admin/admission")
+async def get_admission_metrics(current_user: dict = Depends(get_current_user)):
+    """Live slot usage, queue depth and rejection counts of every limited
+    endpoint class, plus the login rate limiter, the summary PDF cache and
+    the attachment preview and text-index queues. Organizer/admin only."""
+    if current_user['role'] not in ['organizer', 'admin']:
+        raise HTTPException(
+            status_code=403,
+            detail="Only organizers and admins can view admission metrics",
+        )
+    return {**admission_metrics(), "summary_pdf_cache": summary_cache.stats(),
+            "preview_queue": preview_stats(), "text_index_queue": text_index_stats()}
+
+@api_router.get("/admin/storage")
+async def get_storage_stats(current_user: dict = Depends(get_current_user)):
+    """Attachment storage: bytes referenced by attachments vs bytes actually
+    stored in the deduplicated blob store. Organizer/admin only."""
+    if current_user['role'] not in ['organizer', 'admin']:
+        raise HTTPException(
+            status_code=403,
+            detail="Only organizers and admins can view storage statistics",
+        )
+    return await storage_stats(db)
+
 # ============== Admin: Inbound RSVP audit log ==============
 
 @api_router.get("/admin/rsvp-log")
@@ -2041,8 +2822,14 @@ app.add_middleware(
     allow_origins=CORS_ORIGINS,
     allow_methods=["*"],
     allow_headers=["*"],
+    # Let in-browser viewers read range, validator and filename headers on file downloads.
+    expose_headers=["Accept-Ranges", "Content-Range", "ETag", "Content-Disposition"],
 )
 
+async def _attachment_backfill():
+    await migrate_legacy_attachments(db, UPLOAD_DIR)
+    await asyncio.gather(backfill_previews(db), backfill_text_index(db))
+
 @app.on_event("startup")
 async def startup():
     logger.info("Starting Hospital Meeting Scheduler API")
@@ -2051,9 +2838,43 @@ async def startup():
     await db.users.create_index("id", unique=True)
     await db.patients.create_index("id", unique=True)
     await db.meetings.create_index("id", unique=True)
+    # Covers the `{id} -> {version}` read used for ETag revalidation.
+    await db.meetings.create_index([("id", 1), ("version", 1)])
     await db.meeting_participants.create_index([("meeting_id", 1), ("user_id", 1)])
     await db.meeting_patients.create_index([("meeting_id", 1), ("patient_id", 1)])
+    await ensure_user_meeting_indexes(db)
+    await ensure_occurrence_indexes(db)
+    await ensure_busy_indexes(db)
+    await ensure_approval_indexes(db)
+    await ensure_follow_up_indexes(db)
+    # Jobs left active by the previous process would clash with the
+    # one-active-export-per-user index.
+    await fail_interrupted_exports(db)
+    await ensure_export_indexes(db)
+    await ensure_upload_indexes(db)
+    await ensure_blob_indexes(db)
+    await ensure_text_indexes(db)
     logger.info("Database indexes created")
+    # Fails fast on a misconfigured backend (bad STORAGE_BACKEND, S3 without boto3/bucket).
+    logger.info(f"Attachment storage backend: {storage_backend(db, UPLOAD_DIR).name}")
+
+    # First boot after the membership index was introduced (or its row
+    # shape changed): rebuild it once.
+    if await needs_backfill(db):
+        await backfill_user_meetings(db)
+        await backfill_busy_intervals(db)
+    elif await db.busy_intervals.estimated_document_count() == 0:
+        await backfill_busy_intervals(db)
+    await backfill_approval_organizers(db)
+    await backfill_overdue_alert_flags(db)
+    await purge_expired_exports(db)
+    await purge_expired_uploads(db, UPLOAD_DIR)
+    # Attachments saved before the blob store are moved over in the
+    # background; then every blob still without a preview, and every
+    # attachment not yet in the text index, is queued.
+    start_preview_pipeline(db, UPLOAD_DIR)
+    start_text_pipeline(db, UPLOAD_DIR)
+    app.state.blob_migration_task = asyncio.create_task(_attachment_backfill())
 
     # Start background email reminder scheduler (1h before meeting)
     from scheduler import reminder_loop
@@ -2070,5 +2891,12 @@ async def shutdown():
             await task
         except (asyncio.CancelledError, Exception):
             pass
+    migration = getattr(app.state, "blob_migration_task", None)
+    if migration is not None:
+        migration.cancel()
+    await cancel_running_exports()
+    shutdown_render_pool()
+    await stop_preview_pipeline()
+    await stop_text_pipeline()
     client.close()
     logger.info("Database connection closed")
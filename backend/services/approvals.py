@@ -0,0 +1,221 @@
+"""
+Organizer approval worklist for patient additions (`meeting_patients`).
+
+Rows added by a participant start as `approval_status: "pending"` and wait
+for the meeting organizer. Each row carries a denormalised `organizer_id`
+(meetings never change organizer), so an organizer's whole worklist is one
+indexed query on (organizer_id, approval_status) instead of a walk over
+every meeting they run. Rows written before the field existed are filled in
+by `backfill_approval_organizers` at startup.
+
+`approve_rows` approves any number of rows with a single `update_many`;
+`notify_adders` then sends one summary email per person who added patients,
+and is meant to run as a background task.
+
+Every helper takes `db` explicitly, like the other services.
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+from collections import defaultdict
+from datetime import datetime, timezone
+from typing import Dict, List, Sequence
+
+from pymongo import UpdateMany
+
+from utils.email import send_email
+
+logger = logging.getLogger(__name__)
+
+MAX_BULK_APPROVALS = 500
+
+# Meetings in these states no longer need approvals.
+CLOSED_MEETING_STATUSES = ("cancelled",)
+
+
+async def ensure_approval_indexes(db) -> None:
+    await db.meeting_patients.create_index([("organizer_id", 1), ("approval_status", 1), ("created_at", 1)])
+    await db.meeting_patients.create_index("id")
+    await db.meetings.create_index([("organizer_id", 1), ("status", 1)])
+
+
+async def backfill_approval_organizers(db) -> int:
+    """Copy `organizer_id` onto rows that predate it. Returns rows updated."""
+    if not await db.meeting_patients.find_one({"organizer_id": {"$exists": False}}, {"_id": 1}):
+        return 0
+    meeting_ids = await db.meeting_patients.distinct("meeting_id", {"organizer_id": {"$exists": False}})
+    meetings = await db.meetings.find(
+        {"id": {"$in": meeting_ids}}, {"_id": 0, "id": 1, "organizer_id": 1}
+    ).to_list(None)
+    ops = [
+        UpdateMany(
+            {"meeting_id": m["id"], "organizer_id": {"$exists": False}},
+            {"$set": {"organizer_id": m.get("organizer_id")}},
+        )
+        for m in meetings
+    ]
+    if not ops:
+        return 0
+    result = await db.meeting_patients.bulk_write(ops, ordered=False)
+    logger.info("meeting_patients backfill: set organizer_id on %d row(s)", result.modified_count)
+    return result.modified_count
+
+
+def _patient_name(patient: dict) -> str:
+    return f"{patient.get('first_name', '')} {patient.get('last_name', '')}".strip()
+
+
+async def pending_approvals(db, organizer_id: str, limit: int = 100) -> List[Dict]:
+    """Oldest-first pending rows of every meeting `organizer_id` runs, each
+    with the meeting and patient fields the worklist shows. Rows of closed
+    meetings are excluded in the query, so they never use up the `limit`."""
+    closed = await db.meetings.distinct(
+        "id", {"organizer_id": organizer_id, "status": {"$in": list(CLOSED_MEETING_STATUSES)}}
+    )
+    rows = await db.meeting_patients.find(
+        {"organizer_id": organizer_id, "approval_status": "pending", "meeting_id": {"$nin": closed}},
+        {"_id": 0},
+    ).sort("created_at", 1).limit(limit).to_list(limit)
+    if not rows:
+        return []
+    meetings = {
+        m["id"]: m
+        for m in await db.meetings.find(
+            {"id": {"$in": list({r["meeting_id"] for r in rows})}},
+            {"_id": 0, "id": 1, "title": 1, "meeting_date": 1, "start_time": 1, "status": 1},
+        ).to_list(None)
+    }
+    patients = {
+        p["id"]: p
+        for p in await db.patients.find(
+            {"id": {"$in": list({r["patient_id"] for r in rows})}},
+            {"_id": 0, "id": 1, "first_name": 1, "last_name": 1, "patient_id_number": 1},
+        ).to_list(None)
+    }
+    items = []
+    for row in rows:
+        meeting = meetings.get(row["meeting_id"])
+        if not meeting or meeting.get("status") in CLOSED_MEETING_STATUSES:
+            continue
+        patient = patients.get(row["patient_id"]) or {}
+        items.append({
+            **row,
+            "meeting_title": meeting.get("title"),
+            "meeting_date": meeting.get("meeting_date"),
+            "meeting_start_time": meeting.get("start_time"),
+            "patient_name": _patient_name(patient) or None,
+            "patient_id_number": patient.get("patient_id_number"),
+        })
+    return items
+
+
+async def approve_rows(db, organizer: dict, row_ids: Sequence[str]) -> Dict:
+    """Approve the organizer's pending rows among `row_ids` in one write.
+
+    Rows of meetings someone else organises are reported as not_found.
+    Returns {"results": [...], "approved": [rows]} where `approved` holds the
+    rows that changed (for `notify_adders`).
+    """
+    row_ids = list(dict.fromkeys(row_ids))
+    rows = await db.meeting_patients.find(
+        {"id": {"$in": row_ids}, "organizer_id": organizer["id"]},
+        {"_id": 0, "id": 1, "meeting_id": 1, "patient_id": 1, "approval_status": 1, "added_by": 1},
+    ).to_list(None)
+    by_id = {r["id"]: r for r in rows}
+    pending = [r for r in rows if r.get("approval_status") == "pending"]
+
+    approved: List[dict] = []
+    if pending:
+        now_iso = datetime.now(timezone.utc).isoformat()
+        await db.meeting_patients.update_many(
+            # approval_status in the filter keeps a concurrent approve idempotent.
+            {"id": {"$in": [r["id"] for r in pending]}, "approval_status": "pending"},
+            {"$set": {
+                "approval_status": "approved",
+                "approved_by": organizer["id"],
+                "approved_by_name": organizer.get("name"),
+                "approved_at": now_iso,
+            }},
+        )
+        await db.meetings.update_many(
+            {"id": {"$in": list({r["meeting_id"] for r in pending})}}, {"$inc": {"version": 1}}
+        )
+        approved = pending
+
+    results = []
+    for row_id in row_ids:
+        row = by_id.get(row_id)
+        if row is None:
+            status = "not_found"
+        elif row.get("approval_status") == "pending":
+            status = "approved"
+        else:
+            status = "already_approved"
+        results.append({"id": row_id, "status": status})
+    return {"results": results, "approved": approved}
+
+
+async def notify_adders(db, approved: Sequence[dict], approver: dict, frontend_url: str) -> None:
+    """One email per adder listing every patient of theirs that was approved.
+
+    Users, patients and meetings are each fetched with a single query; SMTP
+    is blocking, so the sends run in a worker thread.
+    """
+    by_adder: Dict[str, List[dict]] = defaultdict(list)
+    for row in approved:
+        if row.get("added_by") and row["added_by"] != approver["id"]:
+            by_adder[row["added_by"]].append(row)
+    if not by_adder:
+        return
+
+    users = await db.users.find(
+        {"id": {"$in": list(by_adder)}}, {"_id": 0, "id": 1, "name": 1, "email": 1}
+    ).to_list(None)
+    rows = [r for group in by_adder.values() for r in group]
+    patients = {
+        p["id"]: p
+        for p in await db.patients.find(
+            {"id": {"$in": list({r["patient_id"] for r in rows})}},
+            {"_id": 0, "id": 1, "first_name": 1, "last_name": 1, "patient_id_number": 1},
+        ).to_list(None)
+    }
+    meetings = {
+        m["id"]: m
+        for m in await db.meetings.find(
+            {"id": {"$in": list({r["meeting_id"] for r in rows})}},
+            {"_id": 0, "id": 1, "title": 1, "meeting_date": 1, "start_time": 1},
+        ).to_list(None)
+    }
+
+    for user in users:
+        if not user.get("email"):
+            continue
+        lines = []
+        for row in by_adder[user["id"]]:
+            patient = patients.get(row["patient_id"]) or {}
+            meeting = meetings.get(row["meeting_id"]) or {}
+            lines.append(
+                f"<li><strong>{_patient_name(patient) or 'Patient'}</strong> "
+                f"({patient.get('patient_id_number', 'N/A')}) — "
+                f"<a href=\"{frontend_url}/meetings/{row['meeting_id']}\">{meeting.get('title', 'Meeting')}</a>, "
+                f"{meeting.get('meeting_date', '')} {meeting.get('start_time', '')}</li>"
+            )
+        html = f"""
+        <h2>Patient Additions Approved</h2>
+        <p>Hello {user.get('name', '')},</p>
+        <p><strong>{approver.get('name', '')}</strong> (Organizer) has approved the following patient(s) you added:</p>
+        <ul>{''.join(lines)}</ul>
+        <p>They can now be fully discussed in the meeting.</p>
+        <p>Best regards,<br>Hospital Meeting Scheduler</p>
+        """
+        count = len(lines)
+        try:
+            await asyncio.to_thread(
+                send_email,
+                to_email=user["email"],
+                subject=f"{count} patient addition{'s' if count != 1 else ''} approved",
+                html_content=html,
+            )
+        except Exception as e:
+            logger.error("Failed to send approval summary to %s: %s", user["email"], e)
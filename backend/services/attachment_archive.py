@@ -0,0 +1,175 @@
+"""
+Meeting "prep pack": every attachment of a meeting in one ZIP, streamed.
+
+`archive_entries` lists the meeting's attachments with their place in the
+archive, one folder per patient and a sub-folder per department document
+type:
+
+    Doe_Jane_MRN12345/Radiology/ct-chest.dcm
+    Doe_Jane_MRN12345/Pathology/biopsy-report.pdf
+    Meeting/agenda.docx                      (files with no patient)
+
+`stream_archive` then writes the ZIP while it reads the files and yields it
+piece by piece, so nothing is staged on disk and memory stays at about one
+`UPLOAD_CHUNK_BYTES` chunk whatever the size of the pack. The archive goes
+to a write-only sink. `zipfile` then puts sizes and CRCs in data
+descriptors after each entry, and switches to ZIP64 by itself for large
+files. Formats that are already compressed (images, video, PDF, Office,
+archives) are stored as they are. Everything else is deflated, in a worker
+thread so the event loop keeps serving. Files whose content is missing are
+skipped and listed in `MISSING_FILES.txt` at the end, since the response
+status has long been sent by then.
+
+Every helper takes `db` explicitly, like the other services.
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+import re
+import zipfile
+from datetime import datetime
+from pathlib import Path
+from typing import AsyncIterator, Dict, List, Set, Tuple
+
+import aiofiles
+
+from services.attachments import UPLOAD_CHUNK_BYTES, AttachmentSource, attachment_source
+
+logger = logging.getLogger(__name__)
+
+NO_PATIENT_FOLDER = "Meeting"
+MISSING_FILES_ENTRY = "MISSING_FILES.txt"
+
+# Deflating these gains next to nothing and costs CPU.
+STORED_EXTENSIONS = frozenset({
+    ".jpg", ".jpeg", ".png", ".gif", ".webp", ".heic", ".jp2", ".mp4", ".mov", ".avi", ".mkv",
+    ".webm", ".mp3", ".m4a", ".pdf", ".docx", ".xlsx", ".pptx", ".odt", ".ods", ".zip", ".gz",
+    ".tgz", ".bz2", ".xz", ".7z", ".rar",
+})
+STORED_MIME_PREFIXES = ("image/jpeg", "image/png", "image/gif", "image/webp", "video/", "audio/",
+                        "application/pdf", "application/zip", "application/gzip",
+                        "application/vnd.openxmlformats-officedocument.")
+
+_UNSAFE = re.compile(r'[\x00-\x1f/\\:*?"<>|]+')
+_FILE_FIELDS = {"_id": 0, "id": 1, "patient_id": 1, "department_document_type": 1, "original_name": 1,
+                "mime_type": 1, "file_path": 1, "blob_id": 1, "file_size": 1, "created_at": 1}
+
+
+def is_compressed(name: str, mime_type: str | None) -> bool:
+    """Whether a file is already compressed, so the archive should store it."""
+    if Path(name).suffix.lower() in STORED_EXTENSIONS:
+        return True
+    return (mime_type or "").lower().startswith(STORED_MIME_PREFIXES)
+
+
+def _component(value: str, fallback: str) -> str:
+    """One safe path component: no separators, no leading dots."""
+    return _UNSAFE.sub("_", value or "").strip(" .")[:100] or fallback
+
+
+def _unique(path: str, used: Set[str]) -> str:
+    candidate, n = path, 1
+    stem, dot, ext = path.rpartition(".") if "." in Path(path).name else (path, "", "")
+    while candidate.lower() in used:
+        n += 1
+        candidate = f"{stem} ({n}){dot}{ext}"
+    used.add(candidate.lower())
+    return candidate
+
+
+async def archive_entries(db, meeting_id: str) -> List[Tuple[str, dict]]:
+    """(path in the archive, attachment row) for each file of the meeting,
+    grouped by patient, then document type, oldest first."""
+    files = await db.file_attachments.find({"meeting_id": meeting_id}, _FILE_FIELDS).sort("created_at", 1).to_list(None)
+    patient_ids = list({f['patient_id'] for f in files if f.get('patient_id')})
+    patients = await db.patients.find(
+        {"id": {"$in": patient_ids}}, {"_id": 0, "id": 1, "first_name": 1, "last_name": 1, "patient_id_number": 1}
+    ).to_list(len(patient_ids) or 1)
+    folders: Dict[str, str] = {}
+    for p in patients:
+        label = "_".join(filter(None, [p.get('last_name'), p.get('first_name'), p.get('patient_id_number')]))
+        folders[p['id']] = _component(label, p['id'])
+
+    used: Set[str] = set()
+    entries = []
+    for f in files:
+        patient = folders.get(f.get('patient_id'), _component(f.get('patient_id'), NO_PATIENT_FOLDER))
+        doc_type = _component(f.get('department_document_type'), "")
+        name = _component(f.get('original_name'), f['id'])
+        path = "/".join(filter(None, [patient, doc_type, name]))
+        entries.append((path, f))
+    entries.sort(key=lambda e: e[0].rsplit("/", 1)[0].lower())  # stable: upload order within a folder
+    return [(_unique(path, used), f) for path, f in entries]
+
+
+class _Sink:
+    """Write-only file object the ZIP is written to; `drain` hands over
+    (and forgets) whatever has been written since the last call."""
+
+    def __init__(self):
+        self._parts: List[bytes] = []
+
+    def write(self, data) -> int:
+        self._parts.append(bytes(data))
+        return len(data)
+
+    def flush(self) -> None:
+        pass
+
+    def drain(self) -> bytes:
+        data = b"".join(self._parts)
+        self._parts.clear()
+        return data
+
+
+async def _source_chunks(source: AttachmentSource) -> AsyncIterator[bytes]:
+    if source.path is not None:
+        async with aiofiles.open(source.path, "rb") as f:
+            while chunk := await f.read(UPLOAD_CHUNK_BYTES):
+                yield chunk
+    elif source.size:
+        async for chunk in source.backend.read_range(source.key, 0, source.size - 1):
+            yield chunk
+
+
+def _zip_info(path: str, record: dict, size: int) -> zipfile.ZipInfo:
+    try:
+        created = datetime.fromisoformat(record['created_at'])
+        date_time = created.timetuple()[:6] if created.year >= 1980 else (1980, 1, 1, 0, 0, 0)
+    except (KeyError, TypeError, ValueError):
+        date_time = (1980, 1, 1, 0, 0, 0)
+    info = zipfile.ZipInfo(path, date_time=date_time)
+    info.compress_type = (zipfile.ZIP_STORED if is_compressed(path, record.get('mime_type'))
+                          else zipfile.ZIP_DEFLATED)
+    info.file_size = size  # lets zipfile pick ZIP64 headers up front for big files
+    return info
+
+
+async def stream_archive(db, upload_dir: Path, entries: List[Tuple[str, dict]]) -> AsyncIterator[bytes]:
+    """Yield a ZIP of `entries` as it is written."""
+    sink = _Sink()
+    missing = []
+    with zipfile.ZipFile(sink, "w", allowZip64=True) as archive:
+        for path, record in entries:
+            source = await attachment_source(db, upload_dir, record)
+            if source is None:
+                missing.append(path)
+                continue
+            info = _zip_info(path, record, source.size)
+            deflate = info.compress_type == zipfile.ZIP_DEFLATED
+            with archive.open(info, "w") as dest:
+                async for chunk in _source_chunks(source):
+                    if deflate:
+                        await asyncio.to_thread(dest.write, chunk)
+                    else:
+                        dest.write(chunk)
+                    if data := sink.drain():
+                        yield data
+            if data := sink.drain():
+                yield data
+        if missing:
+            logger.warning("Archive skipped %d attachment(s) with missing content", len(missing))
+            archive.writestr(MISSING_FILES_ENTRY, "These files could not be found in storage:\n"
+                             + "".join(f"{p}\n" for p in missing))
+    yield sink.drain()
@@ -0,0 +1,235 @@
+"""
+Attachment previews: first-page PDF renders and downscaled image thumbnails.
+
+Previews are made in the background, never while a request waits. Each
+upload asks for one (`request_preview`, after the attachment is stored). A
+`WorkQueue` (utils/work_queue.py) with a bounded backlog hands blob hashes
+to `generate_preview`, which renders in a spawned process pool
+(`PREVIEW_WORKERS`, default 1; backlog `PREVIEW_BACKLOG`, default 500):
+
+    PDF    first page, via pypdfium2
+    image  EXIF-rotated, downscaled with Pillow
+
+The result is a JPEG whose longest side is at most `PREVIEW_MAX_PX`
+(default 512). Like the blob, a preview is keyed by content: it is stored
+in the blob's own backend under `preview_key` (next to the blob) and
+described by the blob's `file_blobs.preview` field. Identical files
+therefore share one preview, and the preview goes when the blob goes.
+
+    preview: {status: "ready", width, height, size, created_at}
+             {status: "unsupported"}   not a PDF or image, or too large
+             {status: "unsupported", reason: "no PDF renderer"}
+                                       pypdfium2 is not installed
+             {status: "failed", error}
+
+A blob without a `preview` field has not been processed yet. When an upload
+burst overflows the backlog, the remaining blobs are picked up by
+`backfill_previews` at startup, or when someone asks for their preview.
+PDFs skipped for want of pypdfium2 are retried by the first startup that
+has it.
+Moving a blob to another storage backend drops its preview, which is then
+rendered again from the new copy.
+
+Every helper takes `db` explicitly, like the other services.
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+import uuid
+from datetime import datetime, timezone
+from importlib.util import find_spec
+from pathlib import Path
+from typing import Optional, Tuple
+
+from services.attachments import AttachmentSource, partial_path
+from services.blob_storage import blob_key, preview_key, storage_backend
+from utils.env import env_int
+from utils.work_queue import ProcessPool, WorkQueue
+
+logger = logging.getLogger(__name__)
+
+PREVIEW_MEDIA_TYPE = "image/jpeg"
+DEFAULT_PREVIEW_MAX_PX = 512
+DEFAULT_PREVIEW_WORKERS = 1
+DEFAULT_PREVIEW_BACKLOG = 500
+DEFAULT_PREVIEW_MAX_SOURCE_MB = 200
+_JPEG_QUALITY = 80
+_NO_PDF_RENDERER = "no PDF renderer"
+
+_PDF_EXTENSIONS = {".pdf"}
+_IMAGE_EXTENSIONS = {".jpg", ".jpeg", ".png", ".gif", ".webp", ".bmp", ".tif", ".tiff"}
+
+_pool = ProcessPool("preview", env_int("PREVIEW_WORKERS", DEFAULT_PREVIEW_WORKERS))
+_queue: Optional[WorkQueue] = None
+_warned_no_pdf = False
+
+
+def preview_kind(name: Optional[str], mime_type: Optional[str]) -> Optional[str]:
+    """"pdf", "image", or None when no preview can be made."""
+    mime_type = (mime_type or "").lower()
+    suffix = Path(name or "").suffix.lower()
+    if mime_type == "application/pdf" or suffix in _PDF_EXTENSIONS:
+        return "pdf"
+    if (mime_type.startswith("image/") and mime_type != "image/svg+xml") or suffix in _IMAGE_EXTENSIONS:
+        return "image"
+    return None
+
+
+def _pdf_renderer_installed() -> bool:
+    return find_spec("pypdfium2") is not None
+
+
+def _pdf_supported() -> bool:
+    global _warned_no_pdf
+    if _pdf_renderer_installed():
+        return True
+    if not _warned_no_pdf:
+        logger.warning("pypdfium2 is not installed; PDF previews are skipped")
+        _warned_no_pdf = True
+    return False
+
+
+def render_preview(src: str, dest: str, kind: str, max_px: int) -> Tuple[int, int]:
+    """Write a JPEG preview of `src` to `dest`; returns its (width, height).
+    Runs in a worker process."""
+    from PIL import Image, ImageOps
+
+    if kind == "pdf":
+        import pypdfium2 as pdfium
+
+        pdf = pdfium.PdfDocument(src)
+        try:
+            page = pdf[0]
+            width, height = page.get_size()
+            image = page.render(scale=max_px / max(width, height, 1)).to_pil()
+            page.close()
+        finally:
+            pdf.close()
+    else:
+        image = Image.open(src)
+        image.draft("RGB", (max_px, max_px))  # JPEG: decode at reduced size
+        image = ImageOps.exif_transpose(image)
+    image.thumbnail((max_px, max_px))
+    if image.mode != "RGB":
+        image = image.convert("RGB")
+    image.save(dest, "JPEG", quality=_JPEG_QUALITY, optimize=True)
+    return image.size
+
+
+async def _record(db, blob: dict, preview: dict) -> bool:
+    """Attach `preview` to the blob unless it was released (or is being
+    deleted), moved or given a preview meanwhile."""
+    result = await db.file_blobs.update_one(
+        {"sha256": blob["sha256"], "storage": blob.get("storage"), "preview": {"$exists": False},
+         "state": {"$ne": "deleting"}},
+        {"$set": {"preview": preview}},
+    )
+    return bool(result.matched_count)
+
+
+async def generate_preview(db, upload_dir: Path, sha256: str) -> Optional[str]:
+    """Render and store the preview of blob `sha256` if it has none yet.
+    Returns the resulting status, or None when nothing was done."""
+    blob = await db.file_blobs.find_one({"sha256": sha256}, {"_id": 0, "sha256": 1, "storage": 1, "size": 1, "preview": 1})
+    if not blob or blob.get("preview"):
+        return None
+    row = await db.file_attachments.find_one({"blob_id": sha256}, {"_id": 0, "original_name": 1, "mime_type": 1})
+    kind = preview_kind(row.get("original_name"), row.get("mime_type")) if row else None
+    max_source = env_int("PREVIEW_MAX_SOURCE_MB", DEFAULT_PREVIEW_MAX_SOURCE_MB) * 1024 * 1024
+    if kind is None or (blob.get("size") or 0) > max_source:
+        await _record(db, blob, {"status": "unsupported"})
+        return "unsupported"
+    if kind == "pdf" and not _pdf_supported():
+        # Terminal for now, so the endpoint answers 404 instead of 202.
+        await _record(db, blob, {"status": "unsupported", "reason": _NO_PDF_RENDERER})
+        return "unsupported"
+
+    backend = storage_backend(db, upload_dir, blob.get("storage") or "local")
+    key = blob_key(sha256)
+    src = backend.local_path(key)
+    fetched = out = None
+    try:
+        if src is None:
+            fetched = src = partial_path(upload_dir, str(uuid.uuid4()))
+            src.parent.mkdir(parents=True, exist_ok=True)
+            await backend.fetch_to(key, src)
+        out = partial_path(upload_dir, f"{uuid.uuid4()}.jpg")
+        out.parent.mkdir(parents=True, exist_ok=True)
+        width, height = await _pool.run(
+            render_preview, str(src), str(out), kind, env_int("PREVIEW_MAX_PX", DEFAULT_PREVIEW_MAX_PX),
+        )
+        size = out.stat().st_size
+        await backend.put_file(preview_key(sha256), out)
+    except Exception as e:
+        logger.warning("Could not render a preview of blob %s: %s", sha256, e)
+        await _record(db, blob, {"status": "failed", "error": str(e)[:200]})
+        return "failed"
+    finally:
+        for path in (fetched, out):
+            if path is not None:
+                path.unlink(missing_ok=True)
+
+    preview = {"status": "ready", "width": width, "height": height, "size": size,
+               "created_at": datetime.now(timezone.utc).isoformat()}
+    if not await _record(db, blob, preview):
+        await backend.delete(preview_key(sha256))
+        return None
+    return "ready"
+
+
+def preview_source(db, upload_dir: Path, blob: dict) -> AttachmentSource:
+    """Where the ready preview of `blob` is stored."""
+    backend = storage_backend(db, upload_dir, blob.get("storage") or "local")
+    key = preview_key(blob["sha256"])
+    return AttachmentSource(backend, key, backend.local_path(key), blob["preview"]["size"])
+
+
+# ---------------------------------------------------------------------------
+# Pipeline
+# ---------------------------------------------------------------------------
+
+def start_preview_pipeline(db, upload_dir: Path) -> None:
+    global _queue
+    if _queue is None:
+        _queue = WorkQueue(
+            "preview", lambda sha256: generate_preview(db, upload_dir, sha256),
+            workers=_pool.workers, max_backlog=env_int("PREVIEW_BACKLOG", DEFAULT_PREVIEW_BACKLOG),
+        )
+    _queue.start()
+
+
+async def stop_preview_pipeline() -> None:
+    if _queue is not None:
+        await _queue.stop()
+    _pool.shutdown()
+
+
+def request_preview(sha256: Optional[str]) -> bool:
+    """Queue blob `sha256` for a preview. False when the backlog is full
+    (the blob is picked up later) or the pipeline is not running."""
+    if not sha256 or _queue is None:
+        return False
+    return _queue.submit(sha256)
+
+
+async def backfill_previews(db) -> int:
+    """Queue every blob that has not been through the pipeline, waiting for
+    room in the backlog as it drains. Returns the number queued."""
+    if _pdf_renderer_installed():
+        await db.file_blobs.update_many({"preview.reason": _NO_PDF_RENDERER}, {"$unset": {"preview": ""}})
+    queued = 0
+    cursor = db.file_blobs.find({"preview": {"$exists": False}}, {"_id": 0, "sha256": 1})
+    async for blob in cursor:
+        while _queue is not None and _queue.running and not _queue.has_room():
+            await asyncio.sleep(1)
+        if not request_preview(blob["sha256"]):
+            break
+        queued += 1
+    if queued:
+        logger.info("Queued %d attachment(s) for previews", queued)
+    return queued
+
+
+def preview_stats() -> dict:
+    return _queue.stats() if _queue is not None else {}
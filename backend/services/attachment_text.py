@@ -0,0 +1,317 @@
+"""
+Full-text search inside attachments (`attachment_texts` collection).
+
+Text is pulled out of PDFs (pypdfium2, text layer only; no OCR) and plain
+text uploads (.txt, .csv, .md, ... / text/*). It runs in a spawned process
+pool (`TEXT_EXTRACT_WORKERS`, default 1), fed by a `WorkQueue` (see
+utils/work_queue.py) with a bounded backlog (`TEXT_EXTRACT_BACKLOG`,
+default 500). Uploads ask for it with `request_text_index`, after the
+attachment is stored. Like previews, work is keyed by blob: identical
+files are read once, whatever the number of meetings they are attached to.
+
+Every attachment gets one index row, including files with no text, so the
+file name stays searchable. The row carries the search scope:
+
+    {file_id, blob_id, meeting_id, patient_id, file_name,
+     text, status: "indexed" | "empty" | "unsupported" | "failed",
+     chars, indexed_at}
+
+`text` is normalised before it is stored: NFKC, control characters
+dropped, words hyphenated across lines re-joined, whitespace collapsed. It
+is capped at `TEXT_INDEX_MAX_CHARS` (default 200,000). A MongoDB text index
+over `file_name` and `text` (English stemming, file name weighted higher)
+serves `search_attachments`.
+
+Indexing is incremental. A blob whose text is already in the index is not
+read again when it is attached elsewhere; the text is copied to the new
+row. `backfill_text_index` queues, at startup, every attachment that has
+no row yet, e.g. because an upload burst overflowed the backlog.
+`remove_from_text_index` drops the row of a deleted attachment.
+
+Every helper takes `db` explicitly, like the other services.
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+import re
+import unicodedata
+import uuid
+from datetime import datetime, timezone
+from importlib.util import find_spec
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+from services.attachments import partial_path
+from services.blob_storage import blob_key, storage_backend
+from utils.env import env_int
+from utils.work_queue import ProcessPool, WorkQueue
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TEXT_WORKERS = 1
+DEFAULT_TEXT_BACKLOG = 500
+DEFAULT_TEXT_MAX_CHARS = 200_000
+DEFAULT_TEXT_MAX_SOURCE_MB = 100
+MAX_SEARCH_RESULTS = 50
+_SNIPPET_CHARS = 80
+
+_TEXT_EXTENSIONS = {".txt", ".text", ".csv", ".tsv", ".md", ".log", ".json", ".xml"}
+
+_pool = ProcessPool("text", env_int("TEXT_EXTRACT_WORKERS", DEFAULT_TEXT_WORKERS))
+_queue: Optional[WorkQueue] = None
+_warned_no_pdf = False
+
+# pdfium marks a hyphen it removed at a line break with U+FFFE.
+_SOFT_HYPHENS = re.compile("[\u00ad\ufffe]")
+_HYPHENATED = re.compile(r"(\w)-[ \t]*\r?\n\s*(\w)")
+_CONTROL = re.compile(r"[\x00-\x08\x0b\x0c\x0e-\x1f\x7f]")
+_SPACE = re.compile(r"\s+")
+
+
+async def ensure_text_indexes(db) -> None:
+    await db.attachment_texts.create_index("file_id", unique=True)
+    await db.attachment_texts.create_index("blob_id")
+    await db.attachment_texts.create_index("meeting_id")
+    await db.attachment_texts.create_index("patient_id")
+    await db.attachment_texts.create_index(
+        [("file_name", "text"), ("text", "text")],
+        name="attachment_text_search", weights={"file_name": 5, "text": 1},
+        default_language="english", language_override="_text_language",
+    )
+
+
+def text_kind(name: Optional[str], mime_type: Optional[str]) -> Optional[str]:
+    """"pdf", "plain", or None when no text can be extracted."""
+    mime_type = (mime_type or "").lower()
+    suffix = Path(name or "").suffix.lower()
+    if mime_type == "application/pdf" or suffix == ".pdf":
+        return "pdf"
+    if mime_type.startswith("text/") or suffix in _TEXT_EXTENSIONS:
+        return "plain"
+    return None
+
+
+def normalise_text(text: str, max_chars: int) -> str:
+    text = unicodedata.normalize("NFKC", _SOFT_HYPHENS.sub("", text))
+    text = _HYPHENATED.sub(r"\1\2", text)
+    text = _CONTROL.sub(" ", text)
+    return _SPACE.sub(" ", text).strip()[:max_chars]
+
+
+def _decode(data: bytes) -> str:
+    if data.startswith((b"\xff\xfe", b"\xfe\xff")):
+        return data.decode("utf-16", errors="replace")
+    try:
+        return data.decode("utf-8-sig")
+    except UnicodeDecodeError:
+        return data.decode("cp1252", errors="replace")
+
+
+def extract_text(src: str, kind: str, max_chars: int) -> str:
+    """Normalised text of `src`, at most `max_chars` long. Runs in a worker
+    process."""
+    if kind == "pdf":
+        import pypdfium2 as pdfium
+
+        parts: List[str] = []
+        length = 0
+        pdf = pdfium.PdfDocument(src)
+        try:
+            for index in range(len(pdf)):
+                page = pdf[index]
+                textpage = page.get_textpage()
+                parts.append(textpage.get_text_range())
+                textpage.close()
+                page.close()
+                length += len(parts[-1])
+                if length >= max_chars * 2:  # normalising only shrinks it
+                    break
+        finally:
+            pdf.close()
+        raw = "\n".join(parts)
+    else:
+        with open(src, "rb") as f:
+            raw = _decode(f.read(max_chars * 4))
+    return normalise_text(raw, max_chars)
+
+
+def _pdf_supported() -> bool:
+    global _warned_no_pdf
+    if find_spec("pypdfium2") is not None:
+        return True
+    if not _warned_no_pdf:
+        logger.warning("pypdfium2 is not installed; PDF text is not indexed")
+        _warned_no_pdf = True
+    return False
+
+
+async def _extract(db, upload_dir: Path, sha256: str, name: str, mime_type: Optional[str]) -> Optional[Tuple[str, str]]:
+    """(status, text) for blob `sha256`, or None to try again later."""
+    kind = text_kind(name, mime_type)
+    blob = await db.file_blobs.find_one({"sha256": sha256}, {"_id": 0, "storage": 1, "size": 1})
+    if not blob:
+        return None
+    max_source = env_int("TEXT_MAX_SOURCE_MB", DEFAULT_TEXT_MAX_SOURCE_MB) * 1024 * 1024
+    if kind is None or (blob.get("size") or 0) > max_source:
+        return "unsupported", ""
+    if kind == "pdf" and not _pdf_supported():
+        return None
+
+    backend = storage_backend(db, upload_dir, blob.get("storage") or "local")
+    key = blob_key(sha256)
+    src = backend.local_path(key)
+    fetched = None
+    try:
+        if src is None:
+            fetched = src = partial_path(upload_dir, str(uuid.uuid4()))
+            src.parent.mkdir(parents=True, exist_ok=True)
+            await backend.fetch_to(key, src)
+        text = await _pool.run(extract_text, str(src), kind,
+                               env_int("TEXT_INDEX_MAX_CHARS", DEFAULT_TEXT_MAX_CHARS))
+    except Exception as e:
+        logger.warning("Could not extract text from blob %s: %s", sha256, e)
+        return "failed", ""
+    finally:
+        if fetched is not None:
+            fetched.unlink(missing_ok=True)
+    return ("indexed" if text else "empty"), text
+
+
+async def index_blob(db, upload_dir: Path, sha256: str) -> int:
+    """Add index rows for the attachments of blob `sha256` that have none,
+    extracting its text only if no other attachment of it is indexed yet.
+    Returns the number of rows added."""
+    files = await db.file_attachments.find(
+        {"blob_id": sha256},
+        {"_id": 0, "id": 1, "meeting_id": 1, "patient_id": 1, "original_name": 1, "mime_type": 1},
+    ).to_list(None)
+    done = set(await db.attachment_texts.distinct("file_id", {"blob_id": sha256}))
+    todo = [f for f in files if f['id'] not in done]
+    if not todo:
+        return 0
+
+    known = await db.attachment_texts.find_one({"blob_id": sha256}, {"_id": 0, "status": 1, "text": 1})
+    if known:
+        status, text = known['status'], known.get('text', "")
+    else:
+        extracted = await _extract(db, upload_dir, sha256, todo[0].get('original_name'), todo[0].get('mime_type'))
+        if extracted is None:
+            return 0
+        status, text = extracted
+
+    now = datetime.now(timezone.utc).isoformat()
+    for f in todo:
+        await db.attachment_texts.update_one(
+            {"file_id": f['id']},
+            {"$set": {
+                "blob_id": sha256,
+                "meeting_id": f.get('meeting_id'),
+                "patient_id": f.get('patient_id'),
+                "file_name": f.get('original_name') or "",
+                "text": text,
+                "status": status,
+                "chars": len(text),
+                "indexed_at": now,
+            }},
+            upsert=True,
+        )
+    return len(todo)
+
+
+async def remove_from_text_index(db, file_id: str) -> None:
+    await db.attachment_texts.delete_one({"file_id": file_id})
+
+
+def _snippet(text: str, terms: List[str]) -> str:
+    lowered = text.lower()
+    hits = [i for i in (lowered.find(t) for t in terms) if i >= 0]
+    if not hits:
+        return text[:2 * _SNIPPET_CHARS]
+    start = max(0, min(hits) - _SNIPPET_CHARS)
+    end = min(len(text), min(hits) + _SNIPPET_CHARS)
+    return ("…" if start else "") + text[start:end] + ("…" if end < len(text) else "")
+
+
+async def search_attachments(db, query: str, meeting_ids: Optional[List[str]] = None,
+                             meeting_id: Optional[str] = None, patient_id: Optional[str] = None,
+                             limit: int = 20) -> List[dict]:
+    """Attachments whose name or text match `query`, best first. `meeting_ids`
+    (None = no restriction) limits the search to meetings the caller may
+    see; `meeting_id` / `patient_id` narrow it further."""
+    match: dict = {"$text": {"$search": query}}
+    if meeting_ids is not None:
+        match["meeting_id"] = {"$in": meeting_ids}
+    if meeting_id:
+        match["meeting_id"] = meeting_id
+    if patient_id:
+        match["patient_id"] = patient_id
+    rows = await db.attachment_texts.find(
+        match, {"_id": 0, "score": {"$meta": "textScore"}, "file_id": 1, "meeting_id": 1,
+                "patient_id": 1, "file_name": 1, "text": 1, "status": 1},
+    ).sort([("score", {"$meta": "textScore"})]).limit(min(limit, MAX_SEARCH_RESULTS)).to_list(None)
+
+    # Rows of attachments deleted while they were being indexed are skipped.
+    live = set(await db.file_attachments.distinct("id", {"id": {"$in": [r['file_id'] for r in rows]}}))
+    # Cut word endings so "biopsies" still finds "biopsy" in the snippet.
+    terms = [t if len(t) <= 4 else t[:max(4, len(t) - 3)] for t in re.findall(r"\w+", query.lower())]
+    return [{
+        "file_id": r['file_id'],
+        "meeting_id": r.get('meeting_id'),
+        "patient_id": r.get('patient_id'),
+        "file_name": r.get('file_name'),
+        "score": round(r.get('score', 0), 3),
+        "snippet": _snippet(r.get('text') or "", terms),
+    } for r in rows if r['file_id'] in live]
+
+
+# ---------------------------------------------------------------------------
+# Pipeline
+# ---------------------------------------------------------------------------
+
+def start_text_pipeline(db, upload_dir: Path) -> None:
+    global _queue
+    if _queue is None:
+        _queue = WorkQueue(
+            "text", lambda sha256: index_blob(db, upload_dir, sha256),
+            workers=_pool.workers, max_backlog=env_int("TEXT_EXTRACT_BACKLOG", DEFAULT_TEXT_BACKLOG),
+        )
+    _queue.start()
+
+
+async def stop_text_pipeline() -> None:
+    if _queue is not None:
+        await _queue.stop()
+    _pool.shutdown()
+
+
+def request_text_index(sha256: Optional[str]) -> bool:
+    """Queue blob `sha256` for indexing. False when the backlog is full
+    (the backfill picks it up later) or the pipeline is not running."""
+    if not sha256 or _queue is None:
+        return False
+    return _queue.submit(sha256)
+
+
+async def backfill_text_index(db) -> int:
+    """Queue the blobs of every attachment that has no index row yet,
+    waiting for room in the backlog as it drains. Returns the number of
+    blobs queued."""
+    indexed = set(await db.attachment_texts.distinct("file_id"))
+    queued = set()
+    cursor = db.file_attachments.find({"blob_id": {"$ne": None}}, {"_id": 0, "id": 1, "blob_id": 1})
+    async for row in cursor:
+        if row['id'] in indexed or row['blob_id'] in queued:
+            continue
+        while _queue is not None and _queue.running and not _queue.has_room():
+            await asyncio.sleep(1)
+        if not request_text_index(row['blob_id']):
+            break
+        queued.add(row['blob_id'])
+    if queued:
+        logger.info("Queued %d attachment blob(s) for text indexing", len(queued))
+    return len(queued)
+
+
+def text_index_stats() -> dict:
+    return _queue.stats() if _queue is not None else {}
@@ -0,0 +1,790 @@
+"""
+Attachment uploads: streamed to disk, hashed on the fly, size-limited.
+
+`write_stream` copies an async byte stream to a file in fixed
+`UPLOAD_CHUNK_BYTES` writes, updating a SHA-256 as it goes and giving up
+with `UploadTooLarge` as soon as the limit is crossed, so memory stays at
+one chunk whatever the file size. A plain upload's multipart body is fed
+to it straight from the socket by `StreamedForm`, so the limit holds while
+the file is still arriving. `store_attachment` records a finished file in
+`file_attachments`.
+
+Storage is content-addressed: each distinct file is kept once under
+`UPLOAD_DIR/blobs/<sha[:2]>/<sha>` and described by a `file_blobs` row
+(`sha256`, `size`, `ref_count`). Attachment rows point at it through
+`blob_id` (and `file_path`). Uploading a file that is already stored only
+bumps `ref_count`; `release_blob` deletes it when the last attachment
+goes. Several API replicas and the migration script share the store, so
+the deletion is claimed in Mongo first: the row is marked `state:
+"deleting"` by a conditional update, and `acquire_blob` will not take a
+reference on such a row (it waits until the row is gone and then stores
+its own copy). Attachments stored before the blob store existed are moved into it
+by `migrate_legacy_attachments`.
+
+Very large files can also be sent in pieces through a resumable upload
+session (`upload_sessions` collection):
+
+    init    create_upload_session  -> id, chunk size
+    append  append_chunk           -> bytes at `offset` are appended to a
+                                      `.part` file; a dropped connection keeps
+                                      whatever arrived, and the client resumes
+                                      from the `received` offset
+    commit  commit_upload          -> size / optional checksum verified, file
+                                      stored like a normal upload
+
+The running SHA-256 of each session is kept in memory. If it is missing
+(e.g. after a restart) commit re-hashes the `.part` file in a thread.
+Sessions expire after `UPLOAD_SESSION_TTL_HOURS`; `purge_expired_uploads`
+deletes them with their partial files.
+
+`MAX_UPLOAD_MB` (default 500) caps both kinds of upload.
+
+With `FILE_DOWNLOAD_MODE=accel` downloads are handed to nginx: the app
+checks access and answers with an `X-Accel-Redirect` to
+`ACCEL_REDIRECT_PREFIX` + the path under UPLOAD_DIR (see
+`accel_redirect_location`); nginx streams the file with sendfile.
+"""
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import logging
+import os
+import shutil
+import uuid
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import AsyncIterator, Dict, NamedTuple, Optional, Tuple
+from urllib.parse import quote
+
+import aiofiles
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+from python_multipart.multipart import MultipartParser, parse_options_header
+
+from services.blob_storage import (
+    BLOB_DIR_NAME, BlobStorage, blob_key, presigned_urls_enabled, preview_key, staging_key, storage_backend,
+)
+from utils.env import env_int
+
+logger = logging.getLogger(__name__)
+
+UPLOAD_CHUNK_BYTES = 1024 * 1024
+DEFAULT_MAX_UPLOAD_MB = 500
+UPLOAD_SESSION_TTL_HOURS = 24
+# A legacy-migration claim older than this belongs to a process that died.
+LEGACY_CLAIM_TTL = timedelta(hours=1)
+PARTIAL_DIR_NAME = ".partial"
+DEFAULT_ACCEL_REDIRECT_PREFIX = "/_protected_uploads"
+
+# Non-file fields of a multipart upload: a handful of ids and labels.
+MAX_FORM_FIELDS = 16
+MAX_FORM_FIELD_BYTES = 16 * 1024
+# Upper bound on what a multipart body adds around the file itself
+# (boundaries, part headers, the other fields).
+MULTIPART_OVERHEAD_BYTES = MAX_FORM_FIELDS * (MAX_FORM_FIELD_BYTES + 1024)
+
+ATTACHMENT_META_FIELDS = ("patient_id", "meeting_patient_id", "file_type", "department_document_type")
+
+# session id -> (bytes hashed, running sha256), for the sessions appended
+# to by this process.
+_hashers: Dict[str, Tuple[int, "hashlib._Hash"]] = {}
+_session_locks: Dict[str, asyncio.Lock] = {}
+# Serialises acquire/release of the same blob within this process (striped
+# by hash prefix). Only an optimisation: across processes the `state` field
+# of `file_blobs` (see `_drop_reference`) is what keeps a shared object from
+# being deleted under a new reference.
+_blob_locks = [asyncio.Lock() for _ in range(64)]
+
+BLOB_LIVE = "live"
+BLOB_DELETING = "deleting"
+# A deletion claimed longer ago than this is taken to be abandoned.
+BLOB_DELETE_TIMEOUT = timedelta(minutes=5)
+
+
+class UploadTooLarge(Exception):
+    def __init__(self, limit: int):
+        self.limit = limit
+        super().__init__(f"File exceeds the {limit} byte upload limit")
+
+
+class UploadOffsetMismatch(Exception):
+    def __init__(self, received: int):
+        self.received = received
+        super().__init__(f"Upload resumes at offset {received}")
+
+
+def max_upload_bytes() -> int:
+    return env_int("MAX_UPLOAD_MB", DEFAULT_MAX_UPLOAD_MB) * 1024 * 1024
+
+
+def accel_redirect_location(upload_dir: Path, file_path: str) -> Optional[str]:
+    """Internal nginx location for `file_path` when FILE_DOWNLOAD_MODE=accel
+    (the proxy then sends the bytes), else None. Files outside UPLOAD_DIR
+    are always served by the app."""
+    if os.environ.get("FILE_DOWNLOAD_MODE", "direct").lower() != "accel":
+        return None
+    try:
+        relative = Path(file_path).resolve().relative_to(upload_dir.resolve())
+    except ValueError:
+        return None
+    prefix = os.environ.get("ACCEL_REDIRECT_PREFIX", DEFAULT_ACCEL_REDIRECT_PREFIX).rstrip("/")
+    return f"{prefix}/{quote(relative.as_posix())}"
+
+
+class StreamedForm:
+    """A multipart/form-data request body, parsed as it arrives.
+
+    `file_chunks(request.stream())` yields the bytes of the one file part
+    (form field `file_field`) as they come off the socket. The other fields
+    are kept in `fields`, each at most MAX_FORM_FIELD_BYTES. Nothing is
+    spooled to a temp file, so the caller can enforce its size limit while
+    the upload is still in flight. Raises ValueError for a malformed body.
+    """
+
+    def __init__(self, content_type: Optional[str], file_field: str = "file"):
+        ctype, options = parse_options_header(content_type or "")
+        boundary = options.get(b"boundary")
+        if ctype != b"multipart/form-data" or not boundary:
+            raise ValueError("Expected a multipart/form-data body")
+        self.file_field = file_field
+        self.fields: Dict[str, str] = {}
+        self.filename: Optional[str] = None
+        self.content_type: Optional[str] = None
+        self._headers: Dict[str, bytes] = {}
+        self._header = [b"", b""]
+        self._part: Optional[str] = None  # field name; None while in the file part
+        self._value = bytearray()
+        self._in_file = False
+        self._out = bytearray()
+        self._parser = MultipartParser(boundary, {
+            "on_part_begin": self._part_begin,
+            "on_header_field": lambda data, start, end: self._header.__setitem__(0, self._header[0] + data[start:end]),
+            "on_header_value": lambda data, start, end: self._header.__setitem__(1, self._header[1] + data[start:end]),
+            "on_header_end": self._header_end,
+            "on_headers_finished": self._headers_finished,
+            "on_part_data": self._part_data,
+            "on_part_end": self._part_end,
+        })
+
+    def _part_begin(self) -> None:
+        self._headers, self._header = {}, [b"", b""]
+        self._part, self._in_file = None, False
+        self._value.clear()
+
+    def _header_end(self) -> None:
+        name, value = self._header
+        self._headers[name.decode("latin-1").lower()] = value
+        self._header = [b"", b""]
+
+    def _headers_finished(self) -> None:
+        _, options = parse_options_header(self._headers.get("content-disposition", b""))
+        name = options.get(b"name", b"").decode("utf-8", "replace")
+        if name == self.file_field and b"filename" in options:
+            if self.filename is not None:
+                raise ValueError("Only one file can be uploaded per request")
+            self.filename = options[b"filename"].decode("utf-8", "replace")
+            content_type = self._headers.get("content-type")
+            self.content_type = content_type.decode("latin-1") if content_type else None
+            self._in_file = True
+        else:
+            if len(self.fields) >= MAX_FORM_FIELDS:
+                raise ValueError("Too many form fields")
+            self._part = name
+
+    def _part_data(self, data: bytes, start: int, end: int) -> None:
+        if self._in_file:
+            self._out += data[start:end]
+            return
+        self._value += data[start:end]
+        if len(self._value) > MAX_FORM_FIELD_BYTES:
+            raise ValueError(f"Form field {self._part!r} is too large")
+
+    def _part_end(self) -> None:
+        if not self._in_file and self._part:
+            self.fields[self._part] = self._value.decode("utf-8", "replace")
+
+    async def file_chunks(self, stream: AsyncIterator[bytes]) -> AsyncIterator[bytes]:
+        """Feed the body through the parser, yielding the file's bytes.
+        Fields after the file part are read before the generator ends."""
+        async for chunk in stream:
+            self._parser.write(chunk)
+            if self._out:
+                data = bytes(self._out)
+                self._out.clear()
+                yield data
+        self._parser.finalize()
+        if self.filename is None:
+            raise ValueError(f"The form has no {self.file_field!r} file")
+
+
+async def write_stream(chunks: AsyncIterator[bytes], path: Path, limit: int,
+                       hasher=None, append: bool = False) -> int:
+    """Write `chunks` to `path` in UPLOAD_CHUNK_BYTES pieces, feeding
+    `hasher` with exactly what is written. Raises UploadTooLarge before
+    more than `limit` bytes would be written; bytes already received stay
+    on disk (the caller decides whether to keep them). Returns bytes written."""
+    written = 0
+    buffer = bytearray()
+    async with aiofiles.open(path, 'ab' if append else 'wb') as out:
+        async def flush():
+            nonlocal written
+            if buffer:
+                if hasher is not None:
+                    hasher.update(buffer)
+                await out.write(bytes(buffer))
+                written += len(buffer)
+                buffer.clear()
+
+        try:
+            async for chunk in chunks:
+                if written + len(buffer) + len(chunk) > limit:
+                    raise UploadTooLarge(limit)
+                buffer += chunk
+                if len(buffer) >= UPLOAD_CHUNK_BYTES:
+                    await flush()
+        finally:
+            await flush()
+    return written
+
+
+def _sha256_of(path: Path) -> str:
+    hasher = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(UPLOAD_CHUNK_BYTES), b''):
+            hasher.update(chunk)
+    return hasher.hexdigest()
+
+
+# ---------------------------------------------------------------------------
+# Blob store
+# ---------------------------------------------------------------------------
+
+def blob_path(upload_dir: Path, sha256: str) -> Path:
+    """Location of a blob held by the local backend."""
+    return upload_dir / BLOB_DIR_NAME / blob_key(sha256)
+
+
+def _blob_lock(sha256: str) -> asyncio.Lock:
+    return _blob_locks[int(sha256[:2], 16) % len(_blob_locks)]
+
+
+def _holder(db, upload_dir: Path, blob: dict) -> BlobStorage:
+    # Rows written before backends existed have no `storage`: they are local.
+    return storage_backend(db, upload_dir, blob.get("storage") or "local")
+
+
+async def ensure_blob_indexes(db) -> None:
+    await db.file_blobs.create_index("sha256", unique=True)
+    await db.file_blobs.create_index("storage")
+    await db.file_attachments.create_index("blob_id")
+
+
+async def _take_reference(db, sha256: str, size: int, storage: str) -> dict:
+    """`$inc` the blob's ref_count (creating its row if needed) unless it is
+    being deleted; then wait for the deleter to finish and retry."""
+    while True:
+        try:
+            return await db.file_blobs.find_one_and_update(
+                {"sha256": sha256, "state": {"$ne": BLOB_DELETING}},
+                {"$inc": {"ref_count": 1},
+                 "$setOnInsert": {"size": size, "storage": storage, "state": BLOB_LIVE,
+                                  "created_at": datetime.now(timezone.utc).isoformat()}},
+                projection={"_id": 0}, upsert=True, return_document=ReturnDocument.AFTER,
+            )
+        except DuplicateKeyError:
+            pass  # the row exists and is being deleted
+        # A deletion this old was left by a process that died part-way:
+        # drop its row. Its object counts as gone, so the caller stores its
+        # own copy.
+        cutoff = (datetime.now(timezone.utc) - BLOB_DELETE_TIMEOUT).isoformat()
+        await db.file_blobs.delete_one({"sha256": sha256, "state": BLOB_DELETING, "deleting_since": {"$lt": cutoff}})
+        await asyncio.sleep(0.05)
+
+
+async def acquire_blob(db, upload_dir: Path, src_path: Optional[Path], sha256: str, size: int,
+                       staged: Optional[Tuple[BlobStorage, str]] = None) -> dict:
+    """Take a reference on the blob for `sha256` and return its `file_blobs`
+    row. New content is written to the active backend, from `src_path`
+    (consumed) or, for a presigned upload, from the `staged` (backend, key)
+    object; known content stays where it is and the source is discarded.
+
+    A blob whose row is marked deleting cannot gain references, so its
+    object is never re-used after `release_blob` decided to delete it."""
+    backend = storage_backend(db, upload_dir)
+    key = blob_key(sha256)
+    async with _blob_lock(sha256):
+        blob = await _take_reference(db, sha256, size, backend.name)
+        holder = _holder(db, upload_dir, blob)
+        try:
+            if await holder.exists(key):
+                if src_path is not None:
+                    Path(src_path).unlink(missing_ok=True)
+                else:
+                    await staged[0].delete(staged[1])
+            elif src_path is not None:
+                await holder.put_file(key, src_path)
+            elif staged[0] is holder:
+                await holder.promote(staged[1], key)
+            else:
+                tmp = partial_path(upload_dir, str(uuid.uuid4()))
+                tmp.parent.mkdir(parents=True, exist_ok=True)
+                await staged[0].fetch_to(staged[1], tmp)
+                await holder.put_file(key, tmp)
+                await staged[0].delete(staged[1])
+        except BaseException:
+            await _drop_reference(db, upload_dir, sha256)
+            raise
+    return blob
+
+
+async def release_blob(db, upload_dir: Path, sha256: str) -> bool:
+    """Drop one reference; delete the blob when none are left. Returns
+    True if it was deleted."""
+    async with _blob_lock(sha256):
+        return await _drop_reference(db, upload_dir, sha256)
+
+
+async def _drop_reference(db, upload_dir: Path, sha256: str) -> bool:
+    blob = await db.file_blobs.find_one_and_update(
+        {"sha256": sha256, "state": {"$ne": BLOB_DELETING}}, {"$inc": {"ref_count": -1}},
+        projection={"_id": 0}, return_document=ReturnDocument.AFTER,
+    )
+    if blob is None or blob["ref_count"] > 0:
+        return False
+    # Claim the deletion in Mongo before touching the object: from here on
+    # no process (this one or another replica) can take a reference.
+    blob = await db.file_blobs.find_one_and_update(
+        {"sha256": sha256, "ref_count": {"$lte": 0}, "state": {"$ne": BLOB_DELETING}},
+        {"$set": {"state": BLOB_DELETING, "deleting_since": datetime.now(timezone.utc).isoformat()}},
+        projection={"_id": 0},
+    )
+    if blob is None:  # re-acquired, or someone else is deleting it
+        return False
+    holder = _holder(db, upload_dir, blob)
+    await holder.delete(blob_key(sha256))
+    if blob.get("preview"):
+        await holder.delete(preview_key(sha256))
+    await db.file_blobs.delete_one({"sha256": sha256, "state": BLOB_DELETING})
+    return True
+
+
+def _file_path(db, upload_dir: Path, blob: dict) -> Optional[str]:
+    path = _holder(db, upload_dir, blob).local_path(blob_key(blob["sha256"]))
+    return str(path) if path else None
+
+
+async def store_attachment(db, src_path: Optional[Path], upload_dir: Path, meeting_id: str, original_name: str,
+                           mime_type: Optional[str], size: int, sha256: str, meta: dict, user_id: str,
+                           staged: Optional[Tuple[BlobStorage, str]] = None) -> dict:
+    """Put a complete upload in the blob store and insert its
+    `file_attachments` row. Returns the row."""
+    blob = await acquire_blob(db, upload_dir, src_path, sha256, size, staged)
+    record = {
+        "id": str(uuid.uuid4()),
+        "meeting_id": meeting_id,
+        "patient_id": meta.get("patient_id"),
+        "meeting_patient_id": meta.get("meeting_patient_id"),
+        "file_name": sha256,
+        "original_name": original_name,
+        "file_path": _file_path(db, upload_dir, blob),
+        "blob_id": sha256,
+        "file_type": meta.get("file_type") or "other",
+        "mime_type": mime_type,
+        "file_size": size,
+        "sha256": sha256,
+        "department_document_type": meta.get("department_document_type"),
+        "uploaded_by": user_id,
+        "created_at": datetime.now(timezone.utc).isoformat()
+    }
+    await db.file_attachments.insert_one(dict(record))
+    return record
+
+
+class AttachmentSource(NamedTuple):
+    backend: Optional[BlobStorage]  # None for a pre-blob-store file
+    key: Optional[str]
+    path: Optional[Path]            # set when the bytes are on this host
+    size: Optional[int]
+
+
+async def attachment_source(db, upload_dir: Path, record: dict) -> Optional[AttachmentSource]:
+    """Where the bytes of an attachment row are, or None if they are gone."""
+    if not record.get("blob_id"):
+        path = Path(record.get("file_path") or "")
+        return AttachmentSource(None, None, path, path.stat().st_size) if path.is_file() else None
+    blob = await db.file_blobs.find_one({"sha256": record["blob_id"]}, {"_id": 0})
+    if not blob:
+        return None
+    backend = _holder(db, upload_dir, blob)
+    key = blob_key(blob["sha256"])
+    path = backend.local_path(key)
+    if path is not None and not path.is_file():
+        return None
+    return AttachmentSource(backend, key, path, blob["size"])
+
+
+async def delete_attachment_file(db, upload_dir: Path, record: dict) -> None:
+    """Release the storage behind an attachment row (the row itself is
+    deleted by the caller)."""
+    if record.get("blob_id"):
+        await release_blob(db, upload_dir, record["blob_id"])
+        return
+    try:
+        os.remove(record["file_path"])
+    except (FileNotFoundError, OSError):
+        pass
+
+
+async def _claim_legacy_row(db, row_id: str) -> Optional[str]:
+    """Mark a legacy row as being migrated by us; returns the claim token,
+    or None when another process (the startup task, the migration script)
+    holds a live claim or the row is gone or already migrated. Claims of a
+    process that died expire after LEGACY_CLAIM_TTL."""
+    token = str(uuid.uuid4())
+    now = datetime.now(timezone.utc)
+    claimed = await db.file_attachments.find_one_and_update(
+        {"id": row_id, "blob_id": None,
+         "$or": [{"migration_claim": {"$exists": False}},
+                 {"migration_claimed_at": {"$lt": (now - LEGACY_CLAIM_TTL).isoformat()}}]},
+        {"$set": {"migration_claim": token, "migration_claimed_at": now.isoformat()}},
+        projection={"_id": 0, "id": 1},
+    )
+    return token if claimed else None
+
+
+async def migrate_legacy_attachments(db, upload_dir: Path) -> int:
+    """Move attachments saved as per-meeting copies into the blob store,
+    one file at a time. Each row is claimed first, so concurrent runs never
+    take two blob references for it. Returns the number of rows migrated."""
+    migrated = 0
+    cursor = db.file_attachments.find({"blob_id": None}, {"_id": 0, "id": 1, "file_path": 1, "sha256": 1})
+    async for row in cursor:
+        path = Path(row.get("file_path") or "")
+        if not path.is_file():
+            continue
+        token = await _claim_legacy_row(db, row["id"])
+        if token is None:
+            continue
+        unclaim = {"$unset": {"migration_claim": "", "migration_claimed_at": ""}}
+        try:
+            sha256 = row.get("sha256") or await asyncio.to_thread(_sha256_of, path)
+            size = path.stat().st_size
+            # Link rather than move, so the row never points at a missing file
+            # if we are interrupted before it is updated.
+            staged = partial_path(upload_dir, str(uuid.uuid4()))
+            staged.parent.mkdir(parents=True, exist_ok=True)
+            try:
+                os.link(path, staged)
+            except OSError:
+                await asyncio.to_thread(shutil.copyfile, path, staged)
+            blob = await acquire_blob(db, upload_dir, staged, sha256, size)
+        except BaseException:
+            await db.file_attachments.update_one({"id": row["id"], "migration_claim": token}, unclaim)
+            raise
+        result = await db.file_attachments.update_one(
+            {"id": row["id"], "migration_claim": token},
+            {"$set": {"blob_id": sha256, "sha256": sha256, "file_name": sha256,
+                      "file_path": _file_path(db, upload_dir, blob)}, **unclaim},
+        )
+        if not result.matched_count:  # deleted (or our claim expired) meanwhile
+            await release_blob(db, upload_dir, sha256)
+            continue
+        path.unlink(missing_ok=True)
+        migrated += 1
+    if migrated:
+        logger.info("Moved %d attachment(s) into the blob store", migrated)
+    return migrated
+
+
+def _stored_in(name: str) -> dict:
+    return {"storage": {"$in": ["local", None]}} if name == "local" else {"storage": name}
+
+
+async def migrate_blobs(db, upload_dir: Path, target: str, source: Optional[str] = None,
+                        concurrency: int = 4, limit: Optional[int] = None) -> dict:
+    """Copy blobs into the `target` backend (from `source`, or from every
+    other backend), `concurrency` at a time, then switch their rows and
+    delete the old copies. Safe to interrupt and re-run: a blob only
+    changes backend once its copy is complete."""
+    target_backend = storage_backend(db, upload_dir, target)
+    query = _stored_in(source) if source else {"$nor": [_stored_in(target)]}
+    cursor = db.file_blobs.find(query, {"_id": 0, "sha256": 1, "storage": 1, "size": 1})
+    if limit:
+        cursor = cursor.limit(limit)
+    counts = {"moved": 0, "failed": 0, "bytes": 0}
+    queue: asyncio.Queue = asyncio.Queue(maxsize=concurrency * 2)
+
+    async def move(blob: dict) -> None:
+        sha256, key = blob["sha256"], blob_key(blob["sha256"])
+        source_backend = _holder(db, upload_dir, blob)
+        tmp = partial_path(upload_dir, str(uuid.uuid4()))
+        tmp.parent.mkdir(parents=True, exist_ok=True)
+        try:
+            await source_backend.fetch_to(key, tmp)
+            await target_backend.put_file(key, tmp)
+        finally:
+            tmp.unlink(missing_ok=True)
+        async with _blob_lock(sha256):
+            # The preview stays behind and is rendered again from the new copy.
+            switched = await db.file_blobs.update_one(
+                {"sha256": sha256, "storage": blob.get("storage"), "state": {"$ne": BLOB_DELETING}},
+                {"$set": {"storage": target}, "$unset": {"preview": ""}},
+            )
+            if not switched.matched_count:
+                # Released (or moved) while we copied: drop our copy unless it is now the live one.
+                current = await db.file_blobs.find_one({"sha256": sha256}, {"_id": 0, "storage": 1})
+                if not current or current.get("storage") != target:
+                    await target_backend.delete(key)
+                return
+            await source_backend.delete(key)
+            await source_backend.delete(preview_key(sha256))
+            path = target_backend.local_path(key)
+            await db.file_attachments.update_many(
+                {"blob_id": sha256},
+                {"$set": {"file_path": str(path)}} if path else {"$unset": {"file_path": ""}},
+            )
+        counts["moved"] += 1
+        counts["bytes"] += blob.get("size") or 0
+
+    async def worker() -> None:
+        while (blob := await queue.get()) is not None:
+            try:
+                await move(blob)
+            except Exception as e:
+                counts["failed"] += 1
+                logger.warning("Could not move blob %s to %s: %s", blob["sha256"], target, e)
+
+    workers = [asyncio.create_task(worker()) for _ in range(concurrency)]
+    try:
+        async for blob in cursor:
+            await queue.put(blob)
+        for _ in workers:
+            await queue.put(None)
+        await asyncio.gather(*workers)
+    finally:
+        for task in workers:
+            task.cancel()
+    logger.info("Moved %d blob(s) (%d bytes) to %s, %d failed", counts["moved"], counts["bytes"], target, counts["failed"])
+    return counts
+
+
+async def storage_stats(db) -> dict:
+    """Logical (per attachment) vs stored (per blob) bytes."""
+    rows = await db.file_attachments.aggregate([
+        {"$group": {
+            "_id": {"$cond": [{"$ifNull": ["$blob_id", False]}, "blob", "legacy"]},
+            "count": {"$sum": 1},
+            "bytes": {"$sum": {"$ifNull": ["$file_size", 0]}},
+        }},
+    ]).to_list(None)
+    by_kind = {r["_id"]: r for r in rows}
+    backends = await db.file_blobs.aggregate([
+        {"$group": {"_id": {"$ifNull": ["$storage", "local"]}, "count": {"$sum": 1}, "bytes": {"$sum": "$size"},
+                    "shared": {"$sum": {"$cond": [{"$gt": ["$ref_count", 1]}, 1, 0]}}}},
+    ]).to_list(None)
+    blobs = {key: sum(b[key] for b in backends) for key in ("count", "bytes", "shared")}
+
+    attachments = by_kind.get("blob", {}).get("count", 0)
+    logical_bytes = by_kind.get("blob", {}).get("bytes", 0)
+    return {
+        "attachments": attachments,
+        "logical_bytes": logical_bytes,
+        "blobs": blobs["count"],
+        "stored_bytes": blobs["bytes"],
+        "shared_blobs": blobs["shared"],
+        "saved_bytes": logical_bytes - blobs["bytes"],
+        "dedupe_ratio": round(logical_bytes / blobs["bytes"], 3) if blobs["bytes"] else None,
+        "file_dedupe_ratio": round(attachments / blobs["count"], 3) if blobs["count"] else None,
+        "legacy_attachments": by_kind.get("legacy", {}).get("count", 0),
+        "by_backend": {b["_id"]: {"blobs": b["count"], "bytes": b["bytes"]} for b in backends},
+    }
+
+
+# ---------------------------------------------------------------------------
+# Resumable upload sessions
+# ---------------------------------------------------------------------------
+
+def partial_path(upload_dir: Path, upload_id: str) -> Path:
+    return upload_dir / PARTIAL_DIR_NAME / f"{upload_id}.part"
+
+
+async def ensure_upload_indexes(db) -> None:
+    await db.upload_sessions.create_index("id", unique=True)
+    await db.upload_sessions.create_index("expires_at")
+
+
+async def session_view(db, upload_dir: Path, session: dict) -> dict:
+    view = {
+        "upload_id": session["id"],
+        "meeting_id": session["meeting_id"],
+        "file_name": session["original_name"],
+        "mode": session.get("mode", "proxy"),
+        "total_size": session["total_size"],
+        "received": session["received"],
+        "chunk_size": UPLOAD_CHUNK_BYTES,
+        "expires_at": session["expires_at"],
+    }
+    if view["mode"] == "direct":
+        # A fresh presigned PUT each time: the URLs are short-lived.
+        backend = storage_backend(db, upload_dir, session["storage"])
+        view["upload"] = await backend.presigned_upload(staging_key(session["id"]), session["sha256"])
+    return view
+
+
+async def create_upload_session(db, upload_dir: Path, meeting_id: str, user_id: str, original_name: str,
+                                mime_type: Optional[str], total_size: int, meta: dict,
+                                sha256: Optional[str] = None) -> dict:
+    """Start a resumable upload. With `sha256` and a backend that signs
+    URLs, the session is `direct`: the client PUTs the file to the
+    presigned URL in the session view instead of sending it through us."""
+    if total_size > max_upload_bytes():
+        raise UploadTooLarge(max_upload_bytes())
+    if sha256 is not None:
+        sha256 = sha256.lower()
+        if len(sha256) != 64 or set(sha256) - set("0123456789abcdef"):
+            raise ValueError("sha256 must be 64 hex characters")
+    backend = storage_backend(db, upload_dir)
+    direct = sha256 is not None and backend.supports_presigned_urls and presigned_urls_enabled()
+    now = datetime.now(timezone.utc)
+    session = {
+        "id": str(uuid.uuid4()),
+        "meeting_id": meeting_id,
+        "owner_id": user_id,
+        "original_name": original_name,
+        "mime_type": mime_type,
+        "total_size": total_size,
+        "received": 0,
+        "sha256": sha256,
+        "mode": "direct" if direct else "proxy",
+        "storage": backend.name,
+        "meta": {k: meta.get(k) for k in ATTACHMENT_META_FIELDS},
+        "created_at": now.isoformat(),
+        "expires_at": (now + timedelta(hours=UPLOAD_SESSION_TTL_HOURS)).isoformat(),
+    }
+    if not direct:
+        path = partial_path(upload_dir, session["id"])
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.touch()
+        _hashers[session["id"]] = (0, hashlib.sha256())
+    await db.upload_sessions.insert_one(dict(session))
+    return session
+
+
+async def append_chunk(db, upload_dir: Path, session: dict, offset: int, chunks: AsyncIterator[bytes]) -> int:
+    """Append the bytes of `chunks` at `offset` (which must equal the bytes
+    received so far). Returns the new `received`. If the stream breaks
+    off, the bytes that did arrive are kept and the error re-raised."""
+    upload_id = session["id"]
+    if session.get("mode") == "direct":
+        raise ValueError("This upload goes directly to storage; PUT the file to its presigned URL")
+    lock = _session_locks.setdefault(upload_id, asyncio.Lock())
+    async with lock:
+        current = await db.upload_sessions.find_one({"id": upload_id}, {"_id": 0, "received": 1})
+        received = current["received"] if current else session["received"]
+        if offset != received:
+            raise UploadOffsetMismatch(received)
+
+        path = partial_path(upload_dir, upload_id)
+        hashed, hasher = _hashers.get(upload_id, (None, None))
+        if hashed != received:
+            hasher = None  # commit will re-hash the file
+        try:
+            await write_stream(chunks, path, session["total_size"] - received, hasher, append=True)
+        except UploadTooLarge:
+            # Drop this request's bytes; the session stays at `received`.
+            os.truncate(path, received)
+            _hashers.pop(upload_id, None)
+            hasher = None
+            raise
+        finally:
+            size = path.stat().st_size
+            if size != received:
+                await db.upload_sessions.update_one({"id": upload_id}, {"$set": {"received": size}})
+            if hasher is not None:
+                _hashers[upload_id] = (size, hasher)
+        return size
+
+
+async def commit_upload(db, upload_dir: Path, session: dict, user_id: str,
+                        expected_sha256: Optional[str] = None) -> dict:
+    """Verify and store a fully received session. Raises ValueError when
+    the file is incomplete or the checksum does not match (either
+    `expected_sha256` or the one declared when the session started)."""
+    upload_id = session["id"]
+    # Serialised with appends and with a second commit of the same session;
+    # whoever waited re-reads the session, which may be gone by then.
+    async with _session_locks.setdefault(upload_id, asyncio.Lock()):
+        session = await db.upload_sessions.find_one({"id": upload_id}, {"_id": 0})
+        if session is None:
+            raise ValueError("Upload already committed or cancelled")
+        return await _commit_upload(db, upload_dir, session, user_id, expected_sha256 or session.get("sha256"))
+
+
+async def _commit_upload(db, upload_dir: Path, session: dict, user_id: str,
+                         expected_sha256: Optional[str]) -> dict:
+    if session.get("mode") == "direct":
+        return await _commit_direct_upload(db, upload_dir, session, user_id, expected_sha256)
+    upload_id = session["id"]
+    if session["received"] != session["total_size"]:
+        raise ValueError(f"Upload incomplete: {session['received']} of {session['total_size']} bytes received")
+    path = partial_path(upload_dir, upload_id)
+    hashed, hasher = _hashers.get(upload_id, (None, None))
+    sha256 = hasher.hexdigest() if hashed == session["total_size"] else await asyncio.to_thread(_sha256_of, path)
+    if expected_sha256 and expected_sha256.lower() != sha256:
+        raise ValueError("Checksum mismatch: the uploaded bytes differ from the file")
+
+    record = await store_attachment(
+        db, path, upload_dir, session["meeting_id"], session["original_name"], session["mime_type"],
+        session["total_size"], sha256, session.get("meta") or {}, user_id,
+    )
+    await discard_upload(db, upload_dir, upload_id)
+    return record
+
+
+async def _commit_direct_upload(db, upload_dir: Path, session: dict, user_id: str, expected_sha256: str) -> dict:
+    """Check the object the client PUT to the staging key, then move it
+    into the blob store without the bytes passing through the API
+    (unless the store kept no checksum, in which case we hash it here)."""
+    backend = storage_backend(db, upload_dir, session["storage"])
+    key = staging_key(session["id"])
+    size = await backend.size(key)
+    if size is None:
+        raise ValueError("Upload incomplete: nothing has been uploaded to storage yet")
+    if size != session["total_size"]:
+        raise ValueError(f"Upload incomplete: {size} of {session['total_size']} bytes received")
+    sha256 = await backend.checksum_sha256(key)
+    if sha256 is None:
+        hasher = hashlib.sha256()
+        async for chunk in backend.read_range(key, 0, size - 1):
+            hasher.update(chunk)
+        sha256 = hasher.hexdigest()
+    if expected_sha256.lower() != sha256:
+        raise ValueError("Checksum mismatch: the uploaded bytes differ from the file")
+
+    record = await store_attachment(
+        db, None, upload_dir, session["meeting_id"], session["original_name"], session["mime_type"],
+        size, sha256, session.get("meta") or {}, user_id, staged=(backend, key),
+    )
+    await discard_upload(db, upload_dir, session["id"])
+    return record
+
+
+async def discard_upload(db, upload_dir: Path, upload_id: str) -> None:
+    session = await db.upload_sessions.find_one({"id": upload_id}, {"_id": 0, "mode": 1, "storage": 1})
+    if session and session.get("mode") == "direct":
+        await storage_backend(db, upload_dir, session["storage"]).delete(staging_key(upload_id))
+    partial_path(upload_dir, upload_id).unlink(missing_ok=True)
+    await db.upload_sessions.delete_one({"id": upload_id})
+    _hashers.pop(upload_id, None)
+    _session_locks.pop(upload_id, None)
+
+
+async def purge_expired_uploads(db, upload_dir: Path) -> int:
+    now_iso = datetime.now(timezone.utc).isoformat()
+    expired = await db.upload_sessions.find({"expires_at": {"$lt": now_iso}}, {"_id": 0, "id": 1}).to_list(None)
+    for session in expired:
+        await discard_upload(db, upload_dir, session["id"])
+    if expired:
+        logger.info("Removed %d expired upload session(s)", len(expired))
+    return len(expired)
@@ -0,0 +1,376 @@
+"""
+Storage backends for attachment blobs.
+
+The blob store (services/attachments.py) keeps one object per SHA-256 under
+the key `<sha[:2]>/<sha>`. Where those bytes live is up to a backend:
+
+    local   files under UPLOAD_DIR/blobs/ (default)
+    gridfs  a MongoDB GridFS bucket, GRIDFS_BUCKET (default "attachments")
+    s3      any S3-compatible object store (AWS S3, MinIO): S3_BUCKET,
+            S3_ENDPOINT_URL, S3_REGION, S3_ACCESS_KEY_ID,
+            S3_SECRET_ACCESS_KEY, S3_PREFIX (default "attachments/")
+
+`STORAGE_BACKEND` picks where new blobs are written. Every `file_blobs` row
+records the backend that holds it, so blobs written before a switch are
+still served from where they are until scripts/migrate_attachment_storage.py
+moves them.
+
+The S3 backend can hand out presigned URLs, so downloads (and, through an
+upload session, uploads) go straight between the browser and the bucket.
+`S3_PUBLIC_ENDPOINT_URL` signs those URLs for the address browsers use when
+it differs from the API's (e.g. http://minio:9000 inside Compose). boto3 is
+only imported when the S3 backend is first used.
+"""
+from __future__ import annotations
+
+import abc
+import asyncio
+import base64
+import os
+import shutil
+from pathlib import Path
+from typing import AsyncIterator, Dict, Optional
+
+import aiofiles
+from gridfs.errors import NoFile
+from motor.motor_asyncio import AsyncIOMotorGridFSBucket
+
+from utils.env import env_int
+from utils.http_cache import content_disposition
+
+BLOB_DIR_NAME = "blobs"
+STORAGE_BACKENDS = ("local", "gridfs", "s3")
+DEFAULT_STORAGE_BACKEND = "local"
+STREAM_CHUNK_BYTES = 1024 * 1024
+PRESIGNED_URL_TTL_SECONDS = 300
+# Body of a download answered with a link instead of a redirect: XHR clients
+# cannot follow a 307 to the bucket with their Authorization header attached.
+PRESIGNED_LINK_MEDIA_TYPE = "application/vnd.presigned-url+json"
+
+
+def blob_key(sha256: str) -> str:
+    return f"{sha256[:2]}/{sha256}"
+
+
+def preview_key(sha256: str) -> str:
+    """The preview image rendered from a blob, kept next to it."""
+    return f"{blob_key(sha256)}.preview.jpg"
+
+
+def staging_key(upload_id: str) -> str:
+    """Where a presigned upload lands before it is verified."""
+    return f"incoming/{upload_id}"
+
+
+def presigned_urls_enabled() -> bool:
+    """STORAGE_PRESIGNED_URLS=false keeps every transfer going through the API."""
+    return os.environ.get("STORAGE_PRESIGNED_URLS", "true").lower() in ("1", "true", "yes")
+
+
+def presigned_url_ttl() -> int:
+    return env_int("PRESIGNED_URL_TTL_SECONDS", PRESIGNED_URL_TTL_SECONDS)
+
+
+class BlobStorage(abc.ABC):
+    """Interface of a blob backend. Keys are `blob_key`/`staging_key` strings."""
+
+    name = ""
+    supports_presigned_urls = False
+
+    def local_path(self, key: str) -> Optional[Path]:
+        """Filesystem path of the object, for backends that have one."""
+        return None
+
+    @abc.abstractmethod
+    async def exists(self, key: str) -> bool:
+        """Whether an object is stored under `key`."""
+
+    @abc.abstractmethod
+    async def size(self, key: str) -> Optional[int]:
+        """Size of the object in bytes, or None when it is missing."""
+
+    @abc.abstractmethod
+    async def put_file(self, key: str, src_path: Path) -> None:
+        """Store `src_path` under `key`. The source file is consumed."""
+
+    @abc.abstractmethod
+    async def fetch_to(self, key: str, dest_path: Path) -> None:
+        """Copy the object into a new local file (the object stays)."""
+
+    @abc.abstractmethod
+    def read_range(self, key: str, start: int, end: int) -> AsyncIterator[bytes]:
+        """Bytes `start`..`end` (inclusive) of the object."""
+
+    @abc.abstractmethod
+    async def delete(self, key: str) -> None:
+        """Remove the object; a missing one is not an error."""
+
+    async def presigned_download_url(self, key: str, filename: Optional[str],
+                                     content_type: Optional[str]) -> Optional[str]:
+        return None
+
+    async def presigned_upload(self, key: str, sha256: str) -> Optional[dict]:
+        return None
+
+    async def checksum_sha256(self, key: str) -> Optional[str]:
+        """Hex SHA-256 the backend verified on upload, if it keeps one."""
+        return None
+
+    @abc.abstractmethod
+    async def promote(self, src_key: str, key: str) -> None:
+        """Move an object to another key within this backend."""
+
+
+class LocalStorage(BlobStorage):
+    name = "local"
+
+    def __init__(self, upload_dir: Path):
+        self.root = upload_dir / BLOB_DIR_NAME
+
+    def local_path(self, key: str) -> Path:
+        return self.root / key
+
+    async def exists(self, key: str) -> bool:
+        return self.local_path(key).exists()
+
+    async def size(self, key: str) -> Optional[int]:
+        try:
+            return self.local_path(key).stat().st_size
+        except FileNotFoundError:
+            return None
+
+    async def put_file(self, key: str, src_path: Path) -> None:
+        dest = self.local_path(key)
+        dest.parent.mkdir(parents=True, exist_ok=True)
+        os.replace(src_path, dest)
+
+    async def fetch_to(self, key: str, dest_path: Path) -> None:
+        try:
+            os.link(self.local_path(key), dest_path)
+        except OSError:
+            await asyncio.to_thread(shutil.copyfile, self.local_path(key), dest_path)
+
+    async def read_range(self, key: str, start: int, end: int) -> AsyncIterator[bytes]:
+        remaining = end - start + 1
+        async with aiofiles.open(self.local_path(key), 'rb') as f:
+            await f.seek(start)
+            while remaining > 0:
+                chunk = await f.read(min(STREAM_CHUNK_BYTES, remaining))
+                if not chunk:
+                    return
+                remaining -= len(chunk)
+                yield chunk
+
+    async def delete(self, key: str) -> None:
+        self.local_path(key).unlink(missing_ok=True)
+
+    async def promote(self, src_key: str, key: str) -> None:
+        await self.put_file(key, self.local_path(src_key))
+
+
+class GridFSStorage(BlobStorage):
+    name = "gridfs"
+
+    def __init__(self, db, bucket_name: str):
+        self.bucket = AsyncIOMotorGridFSBucket(db, bucket_name=bucket_name)
+        self.files = db[f"{bucket_name}.files"]
+
+    async def exists(self, key: str) -> bool:
+        return await self.files.find_one({"_id": key}, {"_id": 1}) is not None
+
+    async def size(self, key: str) -> Optional[int]:
+        doc = await self.files.find_one({"_id": key}, {"length": 1})
+        return doc["length"] if doc else None
+
+    async def put_file(self, key: str, src_path: Path) -> None:
+        stream = self.bucket.open_upload_stream_with_id(key, key)
+        try:
+            async with aiofiles.open(src_path, 'rb') as src:
+                while chunk := await src.read(STREAM_CHUNK_BYTES):
+                    await stream.write(chunk)
+        except BaseException:
+            await stream.abort()
+            raise
+        await stream.close()
+        Path(src_path).unlink(missing_ok=True)
+
+    async def fetch_to(self, key: str, dest_path: Path) -> None:
+        grid_out = await self.bucket.open_download_stream(key)
+        async with aiofiles.open(dest_path, 'wb') as dest:
+            while chunk := await grid_out.read(STREAM_CHUNK_BYTES):
+                await dest.write(chunk)
+
+    async def read_range(self, key: str, start: int, end: int) -> AsyncIterator[bytes]:
+        grid_out = await self.bucket.open_download_stream(key)
+        grid_out.seek(start)
+        remaining = end - start + 1
+        while remaining > 0:
+            chunk = await grid_out.read(min(STREAM_CHUNK_BYTES, remaining))
+            if not chunk:
+                return
+            remaining -= len(chunk)
+            yield chunk
+
+    async def delete(self, key: str) -> None:
+        try:
+            await self.bucket.delete(key)
+        except NoFile:
+            pass
+
+    async def promote(self, src_key: str, key: str) -> None:
+        # GridFS has no rename of `_id`: copy the chunks under the new id.
+        if not await self.exists(key):
+            grid_out = await self.bucket.open_download_stream(src_key)
+            stream = self.bucket.open_upload_stream_with_id(key, key)
+            try:
+                while chunk := await grid_out.read(STREAM_CHUNK_BYTES):
+                    await stream.write(chunk)
+            except BaseException:
+                await stream.abort()
+                raise
+            await stream.close()
+        await self.delete(src_key)
+
+
+class S3Storage(BlobStorage):
+    name = "s3"
+    supports_presigned_urls = True
+
+    def __init__(self, bucket: str, prefix: str = "", endpoint_url: Optional[str] = None,
+                 public_endpoint_url: Optional[str] = None, region: Optional[str] = None,
+                 access_key_id: Optional[str] = None, secret_access_key: Optional[str] = None):
+        try:
+            import boto3
+            from botocore.config import Config
+        except ImportError as e:
+            raise RuntimeError("STORAGE_BACKEND=s3 requires boto3 (pip install boto3)") from e
+
+        def make_client(endpoint):
+            return boto3.client(
+                "s3", endpoint_url=endpoint, region_name=region,
+                aws_access_key_id=access_key_id, aws_secret_access_key=secret_access_key,
+                # Path-style addressing works for MinIO and any custom endpoint.
+                config=Config(signature_version="s3v4",
+                              s3={"addressing_style": "path" if endpoint else "auto"}),
+            )
+
+        self.bucket = bucket
+        self.prefix = prefix
+        self.client = make_client(endpoint_url)
+        self.signer = make_client(public_endpoint_url) if public_endpoint_url else self.client
+
+    def _key(self, key: str) -> str:
+        return f"{self.prefix}{key}"
+
+    async def _head(self, key: str, **kwargs) -> Optional[dict]:
+        from botocore.exceptions import ClientError
+        try:
+            return await asyncio.to_thread(self.client.head_object, Bucket=self.bucket, Key=self._key(key), **kwargs)
+        except ClientError as e:
+            if e.response.get("Error", {}).get("Code") in ("404", "NoSuchKey", "NotFound"):
+                return None
+            raise
+
+    async def exists(self, key: str) -> bool:
+        return await self._head(key) is not None
+
+    async def size(self, key: str) -> Optional[int]:
+        head = await self._head(key)
+        return head["ContentLength"] if head else None
+
+    async def put_file(self, key: str, src_path: Path) -> None:
+        # Managed transfer: multipart and parallel for large files.
+        await asyncio.to_thread(self.client.upload_file, str(src_path), self.bucket, self._key(key))
+        Path(src_path).unlink(missing_ok=True)
+
+    async def fetch_to(self, key: str, dest_path: Path) -> None:
+        await asyncio.to_thread(self.client.download_file, self.bucket, self._key(key), str(dest_path))
+
+    async def read_range(self, key: str, start: int, end: int) -> AsyncIterator[bytes]:
+        response = await asyncio.to_thread(
+            self.client.get_object, Bucket=self.bucket, Key=self._key(key), Range=f"bytes={start}-{end}",
+        )
+        body = response["Body"]
+        try:
+            while chunk := await asyncio.to_thread(body.read, STREAM_CHUNK_BYTES):
+                yield chunk
+        finally:
+            body.close()
+
+    async def delete(self, key: str) -> None:
+        await asyncio.to_thread(self.client.delete_object, Bucket=self.bucket, Key=self._key(key))
+
+    async def presigned_download_url(self, key: str, filename: Optional[str],
+                                     content_type: Optional[str]) -> Optional[str]:
+        params = {"Bucket": self.bucket, "Key": self._key(key)}
+        if filename:
+            params["ResponseContentDisposition"] = content_disposition(filename)
+        if content_type:
+            params["ResponseContentType"] = content_type
+        return await asyncio.to_thread(
+            self.signer.generate_presigned_url, "get_object", Params=params, ExpiresIn=presigned_url_ttl(),
+        )
+
+    async def presigned_upload(self, key: str, sha256: str) -> Optional[dict]:
+        checksum = base64.b64encode(bytes.fromhex(sha256)).decode()
+        url = await asyncio.to_thread(
+            self.signer.generate_presigned_url, "put_object",
+            Params={"Bucket": self.bucket, "Key": self._key(key), "ChecksumSHA256": checksum},
+            ExpiresIn=presigned_url_ttl(),
+        )
+        # The store rejects the PUT if the body does not hash to `sha256`.
+        return {"url": url, "method": "PUT", "headers": {"x-amz-checksum-sha256": checksum}}
+
+    async def checksum_sha256(self, key: str) -> Optional[str]:
+        head = await self._head(key, ChecksumMode="ENABLED")
+        checksum = (head or {}).get("ChecksumSHA256")
+        # Multipart objects report a checksum of part checksums ("...-N"), not of the content.
+        if not checksum or "-" in checksum:
+            return None
+        return base64.b64decode(checksum).hex()
+
+    async def promote(self, src_key: str, key: str) -> None:
+        # Server-side copy: the bytes never pass through the API.
+        await asyncio.to_thread(
+            self.client.copy_object, Bucket=self.bucket, Key=self._key(key),
+            CopySource={"Bucket": self.bucket, "Key": self._key(src_key)},
+        )
+        await self.delete(src_key)
+
+
+_backends: Dict[str, BlobStorage] = {}
+
+
+def active_backend_name() -> str:
+    name = os.environ.get("STORAGE_BACKEND", DEFAULT_STORAGE_BACKEND).lower()
+    if name not in STORAGE_BACKENDS:
+        raise ValueError(f"STORAGE_BACKEND must be one of {', '.join(STORAGE_BACKENDS)}")
+    return name
+
+
+def storage_backend(db, upload_dir: Path, name: Optional[str] = None) -> BlobStorage:
+    """The backend called `name` (default: STORAGE_BACKEND), created once."""
+    name = name or active_backend_name()
+    backend = _backends.get(name)
+    if backend is None:
+        if name == "local":
+            backend = LocalStorage(upload_dir)
+        elif name == "gridfs":
+            backend = GridFSStorage(db, os.environ.get("GRIDFS_BUCKET", "attachments"))
+        elif name == "s3":
+            bucket = os.environ.get("S3_BUCKET")
+            if not bucket:
+                raise RuntimeError("STORAGE_BACKEND=s3 requires S3_BUCKET")
+            backend = S3Storage(
+                bucket,
+                prefix=os.environ.get("S3_PREFIX", "attachments/"),
+                endpoint_url=os.environ.get("S3_ENDPOINT_URL") or None,
+                public_endpoint_url=os.environ.get("S3_PUBLIC_ENDPOINT_URL") or None,
+                region=os.environ.get("S3_REGION") or None,
+                access_key_id=os.environ.get("S3_ACCESS_KEY_ID") or None,
+                secret_access_key=os.environ.get("S3_SECRET_ACCESS_KEY") or None,
+            )
+        else:
+            raise ValueError(f"Unknown storage backend {name!r}")
+        _backends[name] = backend
+    return backend
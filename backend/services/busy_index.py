@@ -0,0 +1,285 @@
+"""
+Per-user free/busy index (`busy_intervals` collection) and conflict checks.
+
+One row per (user, concrete session) the user is expected to attend:
+
+    user_id, meeting_id, start_min, end_min
+
+`start_min`/`end_min` are UTC epoch minutes: plain integers keep both the
+index and the overlap arithmetic cheap (no datetime decoding per row).
+
+A user is busy for every meeting they organise or were invited to and have
+not declined. One-time meetings contribute a single interval; recurring
+series contribute one per materialised occurrence (see
+services/meeting_occurrences.py), so recurring sessions are covered as far
+ahead as the occurrence window reaches. Cancelled and completed meetings and
+occurrences are left out.
+
+Rows are derived data: `rebuild_meeting_busy` recomputes every row of one
+meeting and `refresh_members_busy` those of some of its members. Intervals are clipped
+to `MAX_INTERVAL_MINUTES` so a conflict lookup can bound its index range on
+both sides and never scans a user's whole history.
+
+`find_conflicts` answers "which of these users are already booked during any
+of these intervals" for all users in one query, then locates every candidate
+booking among the new meeting's sorted sessions with numpy.
+"""
+from __future__ import annotations
+
+import logging
+from datetime import date, datetime, timedelta, timezone
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+from zoneinfo import ZoneInfo
+
+import numpy as np
+
+from utils.recurrence import ONE_TIME_TYPES, is_recurring
+
+logger = logging.getLogger(__name__)
+
+MAX_INTERVAL_MINUTES = 24 * 60
+DEFAULT_DURATION_MINUTES = 60
+
+INACTIVE_MEETING_STATUSES = ("cancelled", "completed")
+FREE_RESPONSES = ("declined",)
+
+Interval = Tuple[datetime, datetime]
+
+_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+
+def epoch_minutes(value: datetime) -> int:
+    return int((value - _EPOCH).total_seconds() // 60)
+
+
+def from_epoch_minutes(value: int) -> datetime:
+    return _EPOCH + timedelta(minutes=int(value))
+
+
+async def ensure_busy_indexes(db) -> None:
+    await db.busy_intervals.create_index([("user_id", 1), ("start_min", 1), ("end_min", 1)])
+    await db.busy_intervals.create_index([("meeting_id", 1), ("user_id", 1)])
+
+
+def _tz(name: Optional[str]) -> ZoneInfo:
+    try:
+        return ZoneInfo(name or "UTC")
+    except Exception:
+        return ZoneInfo("UTC")
+
+
+def _minutes(hhmm: Optional[str]) -> Optional[int]:
+    try:
+        h, m = hhmm.split(":")[:2]
+        return int(h) * 60 + int(m)
+    except (AttributeError, ValueError):
+        return None
+
+
+def _duration(meeting: dict) -> int:
+    start, end = _minutes(meeting.get("start_time")), _minutes(meeting.get("end_time"))
+    if start is not None and end is not None and end > start:
+        minutes = end - start
+    else:
+        minutes = meeting.get("duration_minutes") or DEFAULT_DURATION_MINUTES
+    return max(1, min(int(minutes), MAX_INTERVAL_MINUTES))
+
+
+def session_intervals(meeting: dict, days: Iterable[str]) -> List[Interval]:
+    """UTC (start, end) of `meeting` on each local date in `days`."""
+    start_min = _minutes(meeting.get("start_time"))
+    if start_min is None:
+        return []
+    tz = _tz(meeting.get("organizer_timezone"))
+    length = timedelta(minutes=_duration(meeting))
+    out = []
+    for day in days:
+        try:
+            local = datetime.strptime(day, "%Y-%m-%d") + timedelta(minutes=start_min)
+        except (TypeError, ValueError):
+            continue
+        start = local.replace(tzinfo=tz).astimezone(timezone.utc)
+        out.append((start, start + length))
+    return out
+
+
+async def _meeting_days(db, meeting: dict) -> List[str]:
+    """Local dates the meeting is still expected to happen on."""
+    if not is_recurring(meeting):
+        return [meeting["meeting_date"]] if meeting.get("meeting_date") else []
+    since = (date.today() - timedelta(days=1)).isoformat()
+    occurrences = await db.meeting_occurrences.find(
+        {
+            "meeting_id": meeting["id"],
+            "occurrence_date": {"$gte": since},
+            "status": {"$nin": list(INACTIVE_MEETING_STATUSES)},
+        },
+        {"_id": 0, "occurrence_date": 1},
+    ).to_list(None)
+    return [o["occurrence_date"] for o in occurrences]
+
+
+async def _busy_members(db, meeting_id: str, user_ids: Optional[Sequence[str]] = None) -> List[str]:
+    query = {"meeting_id": meeting_id, "response_status": {"$nin": list(FREE_RESPONSES)}}
+    if user_ids is not None:
+        query["user_id"] = {"$in": list(user_ids)}
+    rows = await db.user_meetings.find(query, {"_id": 0, "user_id": 1}).to_list(None)
+    return [r["user_id"] for r in rows]
+
+
+def _rows(meeting_id: str, user_ids: Sequence[str], intervals: Sequence[Interval]) -> List[dict]:
+    spans = [(epoch_minutes(start), epoch_minutes(end)) for start, end in intervals]
+    return [
+        {"user_id": uid, "meeting_id": meeting_id, "start_min": start, "end_min": end}
+        for uid in user_ids
+        for start, end in spans
+    ]
+
+
+async def rebuild_meeting_busy(db, meeting_id: str) -> None:
+    """Recompute every busy row of `meeting_id` from its current state."""
+    await db.busy_intervals.delete_many({"meeting_id": meeting_id})
+    meeting = await db.meetings.find_one({"id": meeting_id}, {"_id": 0})
+    if not meeting or meeting.get("status") in INACTIVE_MEETING_STATUSES:
+        return
+    intervals = session_intervals(meeting, await _meeting_days(db, meeting))
+    rows = _rows(meeting_id, await _busy_members(db, meeting_id), intervals)
+    if rows:
+        await db.busy_intervals.insert_many(rows, ordered=False)
+
+
+async def refresh_member_busy(db, meeting_id: str, user_id: str) -> None:
+    """Recompute one member's rows after they joined, left or responded."""
+    await refresh_members_busy(db, meeting_id, [user_id])
+
+
+async def refresh_members_busy(db, meeting_id: str, user_ids: Sequence[str]) -> None:
+    """Recompute the rows of several members of one meeting in one pass."""
+    user_ids = list(user_ids)
+    if not user_ids:
+        return
+    await db.busy_intervals.delete_many({"meeting_id": meeting_id, "user_id": {"$in": user_ids}})
+    meeting = await db.meetings.find_one({"id": meeting_id}, {"_id": 0})
+    if not meeting or meeting.get("status") in INACTIVE_MEETING_STATUSES:
+        return
+    members = await _busy_members(db, meeting_id, user_ids)
+    if not members:
+        return
+    rows = _rows(meeting_id, members, session_intervals(meeting, await _meeting_days(db, meeting)))
+    if rows:
+        await db.busy_intervals.insert_many(rows, ordered=False)
+
+
+async def add_occurrence_busy(db, meeting: dict, days: Sequence[str]) -> None:
+    """Append rows for newly materialised occurrence dates of a series."""
+    if not days or meeting.get("status") in INACTIVE_MEETING_STATUSES:
+        return
+    rows = _rows(meeting["id"], await _busy_members(db, meeting["id"]), session_intervals(meeting, days))
+    if rows:
+        await db.busy_intervals.insert_many(rows, ordered=False)
+
+
+async def backfill_busy_intervals(db) -> int:
+    """Build the index for every meeting that can still conflict. Returns meetings indexed."""
+    since = (date.today() - timedelta(days=1)).isoformat()
+    cursor = db.meetings.find(
+        {
+            "status": {"$nin": list(INACTIVE_MEETING_STATUSES)},
+            "$or": [
+                {"meeting_date": {"$gte": since}},
+                {"recurrence_type": {"$nin": list(ONE_TIME_TYPES)}},
+            ],
+        },
+        {"_id": 0, "id": 1},
+    )
+    count = 0
+    async for meeting in cursor:
+        await rebuild_meeting_busy(db, meeting["id"])
+        count += 1
+    logger.info("busy_intervals backfill: indexed %d meeting(s)", count)
+    return count
+
+
+async def find_conflicts(
+    db,
+    user_ids: Iterable[str],
+    intervals: Sequence[Interval],
+    exclude_meeting_id: Optional[str] = None,
+) -> List[Dict]:
+    """Existing bookings of `user_ids` that overlap any of `intervals`.
+
+    `intervals` are the sessions of one meeting, so they never overlap each
+    other (which keeps their end times sorted too). One indexed query fetches
+    the candidate bookings of every user; each is then located among the
+    sorted sessions with two `searchsorted` calls over the whole batch.
+    Intervals are half-open, so back-to-back meetings do not conflict.
+    Each result names the user, the clashing meeting and both time ranges.
+    """
+    user_ids = list(dict.fromkeys(u for u in user_ids if u))
+    if not user_ids or not intervals:
+        return []
+    new = sorted((epoch_minutes(s), epoch_minutes(e)) for s, e in intervals)
+    new_start = np.fromiter((s for s, _ in new), dtype="int64", count=len(new))
+    new_end = np.fromiter((e for _, e in new), dtype="int64", count=len(new))
+    lo, hi = int(new_start[0]), int(new_end.max())
+
+    query = {
+        "user_id": {"$in": user_ids},
+        # Rows are at most MAX_INTERVAL_MINUTES long, so this bounds the scan.
+        "start_min": {"$gte": lo - MAX_INTERVAL_MINUTES, "$lt": hi},
+        "end_min": {"$gt": lo},
+    }
+    if exclude_meeting_id:
+        query["meeting_id"] = {"$ne": exclude_meeting_id}
+    rows = await db.busy_intervals.find(
+        query, {"_id": 0, "user_id": 1, "meeting_id": 1, "start_min": 1, "end_min": 1}
+    ).to_list(None)
+    if not rows:
+        return []
+
+    booked_start = np.fromiter((r["start_min"] for r in rows), dtype="int64", count=len(rows))
+    booked_end = np.fromiter((r["end_min"] for r in rows), dtype="int64", count=len(rows))
+    # Sessions [first, last) overlap a booking: the first one ending after it
+    # starts up to (excluding) the first one starting at/after it ends.
+    first = np.searchsorted(new_end, booked_start, side="right")
+    last = np.searchsorted(new_start, booked_end, side="left")
+
+    conflicts: List[Dict] = []
+    for i in np.flatnonzero(last > first):
+        row, j = rows[i], int(first[i])
+        conflicts.append({
+            "user_id": row["user_id"],
+            "meeting_id": row["meeting_id"],
+            "start": _iso(row["start_min"]),
+            "end": _iso(row["end_min"]),
+            "requested_start": _iso(new[j][0]),
+            "requested_end": _iso(new[j][1]),
+        })
+    return conflicts
+
+
+async def meeting_conflicts(db, meeting_id: str, user_ids: Optional[Iterable[str]] = None) -> List[Dict]:
+    """Conflicts of `meeting_id`'s sessions with its members' other bookings
+    (or only those of `user_ids`), each labelled with the other meeting's title."""
+    meeting = await db.meetings.find_one({"id": meeting_id}, {"_id": 0})
+    if not meeting or meeting.get("status") in INACTIVE_MEETING_STATUSES:
+        return []
+    if user_ids is None:
+        user_ids = await _busy_members(db, meeting_id)
+    intervals = session_intervals(meeting, await _meeting_days(db, meeting))
+    conflicts = await find_conflicts(db, user_ids, intervals, exclude_meeting_id=meeting_id)
+    if conflicts:
+        titles = {
+            m["id"]: m.get("title")
+            for m in await db.meetings.find(
+                {"id": {"$in": list({c["meeting_id"] for c in conflicts})}},
+                {"_id": 0, "id": 1, "title": 1},
+            ).to_list(None)
+        }
+        for c in conflicts:
+            c["title"] = titles.get(c["meeting_id"])
+    return conflicts
+
+
+def _iso(minutes: int) -> str:
+    return from_epoch_minutes(minutes).isoformat()
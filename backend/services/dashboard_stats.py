@@ -0,0 +1,119 @@
+"""
+Cached per-user dashboard counters.
+
+`get_user_dashboard_counts` answers the three per-user dashboard tiles
+(upcoming, pending invites, this week) with a single `$facet` aggregation
+over the user's `user_meetings` rows, then keeps the result in memory.
+
+A cache entry is keyed by the user's *local* date (their profile timezone),
+so it rolls over at the user's midnight rather than UTC's. Any write that
+changes a membership row invalidates the affected users through the
+`user_meetings` helpers; the active-patient count is shared by everyone and
+is invalidated on patient create/delete.
+
+The cache is per process — the backend runs as a single uvicorn worker — and
+entries also expire after `DASHBOARD_CACHE_TTL_SECONDS` as a safety net for
+writes made outside the API (scripts, manual fixes).
+"""
+from __future__ import annotations
+
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Iterable, Optional, Tuple
+from zoneinfo import ZoneInfo
+
+from utils.recurrence import ongoing_series_filter
+from utils.env import env_int
+
+ACTIVE_MEETING_STATUSES = ["scheduled", "in_progress"]
+
+_MAX_ENTRIES = 10_000
+
+
+def _ttl_seconds() -> int:
+    return env_int("DASHBOARD_CACHE_TTL_SECONDS", 300)
+
+
+# user_id -> (local_date, stored_at_monotonic, counts)
+_user_counts: "OrderedDict[str, Tuple[str, float, Dict[str, int]]]" = OrderedDict()
+# (stored_at_monotonic, count)
+_patient_count: Optional[Tuple[float, int]] = None
+
+
+def _user_today(tz_name: Optional[str], now: Optional[datetime] = None) -> datetime:
+    try:
+        tz = ZoneInfo(tz_name or "UTC")
+    except Exception:
+        tz = ZoneInfo("UTC")
+    return (now or datetime.now(timezone.utc)).astimezone(tz)
+
+
+def dashboard_pipeline(user_id: str, today: str, week_end: str) -> list:
+    return [
+        {"$match": {"user_id": user_id}},
+        {"$facet": {
+            "upcoming_meetings": [
+                {"$match": {
+                    "status": {"$in": ACTIVE_MEETING_STATUSES},
+                    "$or": [{"meeting_date": {"$gte": today}}, ongoing_series_filter(today)],
+                }},
+                {"$count": "n"},
+            ],
+            "pending_invites": [
+                {"$match": {"response_status": "pending"}},
+                {"$count": "n"},
+            ],
+            "meetings_this_week": [
+                {"$match": {"meeting_date": {"$gte": today, "$lte": week_end}}},
+                {"$count": "n"},
+            ],
+        }},
+    ]
+
+
+async def get_user_dashboard_counts(db, user: dict, now: Optional[datetime] = None) -> Dict[str, int]:
+    local_now = _user_today(user.get("timezone"), now)
+    today = local_now.strftime("%Y-%m-%d")
+
+    cached = _user_counts.get(user["id"])
+    if cached and cached[0] == today and time.monotonic() - cached[1] < _ttl_seconds():
+        return cached[2]
+
+    week_end = (local_now + timedelta(days=7)).strftime("%Y-%m-%d")
+    result = await db.user_meetings.aggregate(dashboard_pipeline(user["id"], today, week_end)).to_list(1)
+    facets = result[0] if result else {}
+    counts = {
+        name: (facets.get(name) or [{}])[0].get("n", 0)
+        for name in ("upcoming_meetings", "pending_invites", "meetings_this_week")
+    }
+
+    _user_counts[user["id"]] = (today, time.monotonic(), counts)
+    _user_counts.move_to_end(user["id"])
+    while len(_user_counts) > _MAX_ENTRIES:
+        _user_counts.popitem(last=False)
+    return counts
+
+
+async def get_active_patient_count(db) -> int:
+    global _patient_count
+    if _patient_count and time.monotonic() - _patient_count[0] < _ttl_seconds():
+        return _patient_count[1]
+    count = await db.patients.count_documents({"is_active": True})
+    _patient_count = (time.monotonic(), count)
+    return count
+
+
+def invalidate_users(user_ids: Iterable[str]) -> None:
+    for user_id in user_ids:
+        _user_counts.pop(user_id, None)
+
+
+def invalidate_patient_count() -> None:
+    global _patient_count
+    _patient_count = None
+
+
+def clear() -> None:
+    _user_counts.clear()
+    invalidate_patient_count()
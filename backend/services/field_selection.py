@@ -0,0 +1,103 @@
+"""
+Sparse fieldsets (`?fields=`) and relation expansion (`?expand=`) for read
+endpoints.
+
+Both parameters are comma-separated lists. `fields` is pushed down into the
+Mongo projection so unrequested columns never leave the database; `expand`
+decides which related collections are joined in. A relation that is not
+expanded costs zero queries.
+
+Omitting a parameter keeps the endpoint's historical behaviour (full document,
+every enrichment); passing it empty (`?expand=`) opts out of all expansions.
+"""
+from __future__ import annotations
+
+from typing import Dict, Iterable, List, Optional, Set
+
+from fastapi import HTTPException
+
+MEETING_EXPANSIONS = ("organizer", "participants", "patients", "agenda", "files", "decisions")
+MEETING_LIST_EXPANSIONS = ("organizer", "participants", "patients")
+PATIENT_EXPANSIONS = ("meetings", "files", "treatment_plans")
+
+# Never returned by any users endpoint, even when explicitly requested.
+USER_SECRET_FIELDS = ("password_hash",)
+
+
+def parse_csv_param(raw: Optional[str]) -> Optional[List[str]]:
+    """Split `a,b , c` into ['a', 'b', 'c']; None stays None (parameter absent)."""
+    if raw is None:
+        return None
+    seen: List[str] = []
+    for part in raw.split(","):
+        name = part.strip()
+        if name and name not in seen:
+            seen.append(name)
+    return seen
+
+
+def parse_expand(raw: Optional[str], allowed: Iterable[str]) -> Set[str]:
+    """Resolve `?expand=` against the endpoint's allowed relations.
+
+    Absent → every allowed relation (backward compatible). Unknown names → 400.
+    """
+    allowed = tuple(allowed)
+    names = parse_csv_param(raw)
+    if names is None:
+        return set(allowed)
+    unknown = [n for n in names if n not in allowed]
+    if unknown:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unknown expand value(s): {', '.join(unknown)}. Allowed: {', '.join(allowed)}",
+        )
+    return set(names)
+
+
+def build_projection(
+    fields: Optional[List[str]],
+    required: Iterable[str] = ("id",),
+    excluded: Iterable[str] = (),
+) -> Dict[str, int]:
+    """Build a Mongo projection for `fields`.
+
+    `required` keys are always fetched because the endpoint needs them to run
+    its expansions; `excluded` keys (and their sub-fields) are never fetched.
+    A path under another selected path (`title.x` next to `title`) is
+    dropped, since Mongo rejects overlapping projections.
+    """
+    excluded = set(excluded)
+    if fields is None:
+        projection = {"_id": 0}
+        projection.update({k: 0 for k in excluded})
+        return projection
+
+    names = []
+    for name in list(fields) + list(required):
+        parts = name.split(".")
+        if name.startswith("$") or "" in parts or parts[0] == "_id" or parts[0] in excluded:
+            continue
+        names.append(name)
+    projection = {"_id": 0}
+    for name in sorted(set(names), key=lambda n: n.count(".")):
+        parts = name.split(".")
+        if any(".".join(parts[:i]) in projection for i in range(1, len(parts))):
+            continue
+        projection[name] = 1
+    if len(projection) == 1:
+        # Every requested field was filtered out; still return the id rather
+        # than letting Mongo fall back to "all fields".
+        projection["id"] = 1
+    return projection
+
+
+def strip_unrequested(doc: dict, fields: Optional[List[str]], added: Iterable[str]) -> dict:
+    """Drop keys that were fetched only for internal use (e.g. `organizer_id`
+    to resolve the organizer) when the client did not ask for them. The `id`
+    is always kept so sparse responses stay addressable."""
+    if fields is None:
+        return doc
+    for key in added:
+        if key != "id" and key not in fields:
+            doc.pop(key, None)
+    return doc
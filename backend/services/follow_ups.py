@@ -0,0 +1,216 @@
+"""
+Decision follow-up worklist and overdue alerts (`decision_logs`).
+
+`follow_up_page` lists open decisions of one responsible doctor, optionally
+narrowed to a due-date range and to some priorities, ordered by
+(follow_up_date, id) and keyset-paginated on that pair: the cursor is the
+last row's key, so page N costs the same as page 1. The compound indexes
+from `ensure_follow_up_indexes` serve both the filter and the sort.
+
+`send_overdue_alerts` runs on every scheduler tick. One indexed range query
+finds open decisions whose follow-up date has passed and that have not been
+alerted yet; each responsible doctor then gets a single digest email and
+all alerted rows are flagged with one `update_many`. Rows of a doctor
+whose digest could not be sent stay unflagged and are retried on the next
+tick. Moving a decision's follow-up date clears the flag (see
+`follow_up_date_reset`). Decisions that were already overdue before alerts
+existed are flagged at startup by `backfill_overdue_alert_flags` and never
+alerted.
+
+Dates are `YYYY-MM-DD` strings, compared lexically like everywhere else.
+Every helper takes `db` explicitly so the scheduler can share them.
+"""
+from __future__ import annotations
+
+import asyncio
+import base64
+import logging
+from collections import defaultdict
+from datetime import date
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from utils.email import send_email
+
+logger = logging.getLogger(__name__)
+
+CLOSED_STATUSES = ("completed", "cancelled")
+PRIORITIES = ("low", "medium", "high", "urgent")
+MAX_PAGE_SIZE = 200
+
+# Rows without the flag (written before it existed) match `None`.
+_NOT_ALERTED = {"$in": [False, None]}
+
+_LIST_FIELDS = {
+    "_id": 0, "id": 1, "meeting_id": 1, "title": 1, "decision_type": 1, "action_plan": 1,
+    "responsible_doctor_id": 1, "follow_up_date": 1, "priority": 1, "status": 1, "created_at": 1,
+}
+
+
+async def ensure_follow_up_indexes(db) -> None:
+    await db.decision_logs.create_index([("responsible_doctor_id", 1), ("follow_up_date", 1), ("id", 1)])
+    await db.decision_logs.create_index(
+        [("responsible_doctor_id", 1), ("priority", 1), ("follow_up_date", 1), ("id", 1)]
+    )
+    await db.decision_logs.create_index([("overdue_alert_sent", 1), ("follow_up_date", 1)])
+
+
+def encode_cursor(follow_up_date: str, decision_id: str) -> str:
+    return base64.urlsafe_b64encode(f"{follow_up_date}|{decision_id}".encode()).decode()
+
+
+def decode_cursor(cursor: str) -> Tuple[str, str]:
+    """Inverse of `encode_cursor`; raises ValueError on anything else."""
+    try:
+        follow_up_date, decision_id = base64.urlsafe_b64decode(cursor.encode()).decode().split("|", 1)
+    except Exception:
+        raise ValueError("invalid cursor")
+    return follow_up_date, decision_id
+
+
+def follow_up_query(
+    doctor_id: str,
+    due_from: Optional[str] = None,
+    due_to: Optional[str] = None,
+    priorities: Optional[Sequence[str]] = None,
+    include_closed: bool = False,
+    after: Optional[Tuple[str, str]] = None,
+) -> dict:
+    # `$gt: ""` drops decisions without a follow-up date (the UI sends "").
+    due = {"$gte": due_from} if due_from else {"$gt": ""}
+    if due_to:
+        due["$lte"] = due_to
+    query: dict = {"responsible_doctor_id": doctor_id, "follow_up_date": due}
+    if priorities:
+        query["priority"] = {"$in": list(priorities)}
+    if not include_closed:
+        query["status"] = {"$nin": list(CLOSED_STATUSES)}
+    if after:
+        last_date, last_id = after
+        query["$or"] = [
+            {"follow_up_date": {"$gt": last_date}},
+            {"follow_up_date": last_date, "id": {"$gt": last_id}},
+        ]
+    return query
+
+
+async def follow_up_page(db, doctor_id: str, limit: int = 50, cursor: Optional[str] = None, **filters) -> Dict:
+    """One page of the worklist plus the cursor of the next page (None at the end)."""
+    after = decode_cursor(cursor) if cursor else None
+    rows = await db.decision_logs.find(
+        follow_up_query(doctor_id, after=after, **filters), _LIST_FIELDS
+    ).sort([("follow_up_date", 1), ("id", 1)]).limit(limit + 1).to_list(limit + 1)
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1]["follow_up_date"], rows[-1]["id"])
+
+    if rows:
+        meetings = {
+            m["id"]: m
+            for m in await db.meetings.find(
+                {"id": {"$in": list({r["meeting_id"] for r in rows})}},
+                {"_id": 0, "id": 1, "title": 1, "meeting_date": 1},
+            ).to_list(None)
+        }
+        for row in rows:
+            meeting = meetings.get(row["meeting_id"]) or {}
+            row["meeting_title"] = meeting.get("title")
+            row["meeting_date"] = meeting.get("meeting_date")
+    return {"items": rows, "next_cursor": next_cursor}
+
+
+def follow_up_date_reset(update_data: dict) -> dict:
+    """Extra `$set` fields for a decision update: re-arm the overdue alert
+    when the follow-up date moves."""
+    return {"overdue_alert_sent": False} if "follow_up_date" in update_data else {}
+
+
+def overdue_query(today: str) -> dict:
+    return {
+        "overdue_alert_sent": _NOT_ALERTED,
+        "follow_up_date": {"$gt": "", "$lt": today},
+        "status": {"$nin": list(CLOSED_STATUSES)},
+        "responsible_doctor_id": {"$nin": [None, ""]},
+    }
+
+
+async def send_overdue_alerts(db, frontend_url: str, today: Optional[str] = None) -> int:
+    """Email each responsible doctor one digest of their newly overdue
+    follow-ups. Returns the number of decisions alerted."""
+    today = today or date.today().isoformat()
+    rows = await db.decision_logs.find(overdue_query(today), _LIST_FIELDS).to_list(None)
+    if not rows:
+        return 0
+
+    by_doctor: Dict[str, List[dict]] = defaultdict(list)
+    for row in rows:
+        by_doctor[row["responsible_doctor_id"]].append(row)
+    users = await db.users.find(
+        {"id": {"$in": list(by_doctor)}}, {"_id": 0, "id": 1, "name": 1, "email": 1}
+    ).to_list(None)
+    meetings = {
+        m["id"]: m.get("title")
+        for m in await db.meetings.find(
+            {"id": {"$in": list({r["meeting_id"] for r in rows})}}, {"_id": 0, "id": 1, "title": 1}
+        ).to_list(None)
+    }
+
+    # Doctors whose digest could not be sent keep their rows unflagged, so
+    # the next tick tries again.
+    failed = set()
+    for user in users:
+        if not user.get("email"):
+            continue
+        items = sorted(by_doctor[user["id"]], key=lambda r: (r["follow_up_date"], r["id"]))
+        lines = "".join(
+            f"<li><strong>{r.get('title', 'Decision')}</strong> — due {r['follow_up_date']} "
+            f"({r.get('priority') or 'medium'} priority), "
+            f"<a href=\"{frontend_url}/meetings/{r['meeting_id']}\">{meetings.get(r['meeting_id']) or 'Meeting'}</a></li>"
+            for r in items
+        )
+        html = f"""
+        <h2>Overdue Follow-ups</h2>
+        <p>Hello {user.get('name', '')},</p>
+        <p>The following follow-up(s) assigned to you are past their due date:</p>
+        <ul>{lines}</ul>
+        <p>Best regards,<br>Hospital Meeting Scheduler</p>
+        """
+        try:
+            await asyncio.to_thread(
+                send_email,
+                to_email=user["email"],
+                subject=f"{len(items)} overdue follow-up{'s' if len(items) != 1 else ''}",
+                html_content=html,
+            )
+        except Exception as e:
+            failed.add(user["id"])
+            logger.error("Failed to send overdue follow-up digest to %s: %s", user["email"], e)
+
+    # Flag the rest, including rows whose doctor has no email, so the same
+    # rows are not re-read every tick.
+    alerted = [r["id"] for r in rows if r["responsible_doctor_id"] not in failed]
+    if alerted:
+        await db.decision_logs.update_many(
+            {"id": {"$in": alerted}},
+            {"$set": {"overdue_alert_sent": True}},
+        )
+    logger.info("Overdue follow-up alerts: %d decision(s), %d doctor(s), %d digest(s) failed",
+                len(alerted), len(by_doctor), len(failed))
+    return len(alerted)
+
+
+async def backfill_overdue_alert_flags(db, today: Optional[str] = None) -> int:
+    """Mark decisions that were already overdue before alerts existed as
+    alerted, so the first tick does not email every historical follow-up.
+    Only rows without the flag are touched; new decisions are created with
+    it. Returns rows updated."""
+    today = today or date.today().isoformat()
+    result = await db.decision_logs.update_many(
+        {**overdue_query(today), "overdue_alert_sent": {"$exists": False}},
+        {"$set": {"overdue_alert_sent": True}},
+    )
+    if result.modified_count:
+        logger.info("decision_logs backfill: %d overdue follow-up(s) marked as already alerted",
+                    result.modified_count)
+    return result.modified_count
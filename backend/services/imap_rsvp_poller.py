@@ -35,6 +35,8 @@ from datetime import datetime, timezone
 from typing import Optional, Tuple
 
 from utils.ics_rsvp_parser import parse_ics_reply, extract_ics_from_email
+from utils.env import env_int
+from services.user_meetings import set_member_response
 
 logger = logging.getLogger(__name__)
 
@@ -47,19 +49,12 @@ def _env_bool(name: str, default: bool = False) -> bool:
     return os.environ.get(name, "true" if default else "false").lower() == "true"
 
 
-def _env_int(name: str, default: int) -> int:
-    try:
-        return int(os.environ.get(name, str(default)))
-    except ValueError:
-        return default
-
-
 def rsvp_poll_enabled() -> bool:
     return _env_bool("RSVP_POLL_ENABLED", default=False)
 
 
 def rsvp_poll_seconds() -> int:
-    return _env_int("RSVP_POLL_SECONDS", 300)
+    return env_int("RSVP_POLL_SECONDS", 300)
 
 
 def _imap_config() -> Optional[dict]:
@@ -70,7 +65,7 @@ def _imap_config() -> Optional[dict]:
         return None
     return {
         "host": os.environ.get("IMAP_HOST", "imap.gmail.com"),
-        "port": _env_int("IMAP_PORT", 993),
+        "port": env_int("IMAP_PORT", 993),
         "user": user,
         # Gmail app passwords may be displayed with spaces — strip them
         # so the IMAP login succeeds.
@@ -216,6 +211,9 @@ async def _apply_rsvp(db, reply: dict) -> str:
         )
         return "no_match"
 
+    await set_member_response(db, meeting_id, user["id"], new_status)
+    await db.meetings.update_one({"id": meeting_id}, {"$inc": {"version": 1}})
+
     logger.info(
         "RSVP poller: applied %s for %s on meeting %s",
         new_status, attendee_email, meeting_id,
@@ -0,0 +1,99 @@
+"""
+Calendar view: concrete meeting occurrences for one user over a date range.
+
+Candidate series come from a single `user_meetings` query (one-time meetings
+inside the window plus recurring series that started earlier and have not
+ended), then each series is expanded by `utils.recurrence`. Recurring
+occurrences that fall on one of the organizer's holidays are dropped — the
+same rules `validate_meeting_date_for_user` applies when the series is
+created. One-time meetings are shown as booked.
+"""
+from __future__ import annotations
+
+from datetime import date
+from typing import Dict, List
+
+import numpy as np
+
+from utils.holiday_checker import holiday_dates_for_user
+from utils.recurrence import expand, is_recurring, ongoing_series_filter
+
+# Longest window a single calendar request may span.
+MAX_CALENDAR_DAYS = 366
+
+_MEETING_FIELDS = (
+    "id", "title", "organizer_id", "meeting_date", "start_time", "end_time",
+    "status", "meeting_type", "location", "recurrence_type", "recurrence_end_date",
+    "recurrence_day_of_week", "recurrence_day_of_month", "recurrence_week_of_month",
+)
+_HOLIDAY_PREF_FIELDS = (
+    "id", "country", "holiday_enforcement_enabled", "enabled_default_holidays", "custom_holidays",
+)
+
+
+def candidate_query(user_id: str, start: str, end: str) -> dict:
+    """user_meetings filter for every series that can have an occurrence in [start, end]."""
+    return {
+        "user_id": user_id,
+        "status": {"$ne": "cancelled"},
+        "meeting_date": {"$lte": end},
+        "$or": [
+            {"meeting_date": {"$gte": start}},
+            ongoing_series_filter(start),
+        ],
+    }
+
+
+async def calendar_occurrences(db, user_id: str, start: date, end: date) -> List[Dict]:
+    start_s, end_s = start.isoformat(), end.isoformat()
+    memberships = await db.user_meetings.find(
+        candidate_query(user_id, start_s, end_s),
+        {"_id": 0, "meeting_id": 1, "role": 1, "response_status": 1},
+    ).to_list(None)
+    if not memberships:
+        return []
+    by_meeting = {m["meeting_id"]: m for m in memberships}
+
+    meetings = await db.meetings.find(
+        {"id": {"$in": list(by_meeting)}},
+        {"_id": 0, **{f: 1 for f in _MEETING_FIELDS}},
+    ).to_list(None)
+
+    organizer_ids = {m.get("organizer_id") for m in meetings if is_recurring(m) and m.get("organizer_id")}
+    organizers = await db.users.find(
+        {"id": {"$in": list(organizer_ids)}},
+        {"_id": 0, **{f: 1 for f in _HOLIDAY_PREF_FIELDS}},
+    ).to_list(None) if organizer_ids else []
+    holidays = {
+        u["id"]: np.array(sorted(holiday_dates_for_user(start, end, u)), dtype="datetime64[D]")
+        for u in organizers
+    }
+
+    occurrences: List[Dict] = []
+    for meeting in meetings:
+        recurring = is_recurring(meeting)
+        skip = holidays.get(meeting.get("organizer_id")) if recurring else None
+        dates = expand(meeting, start, end, skip=skip)
+        if not dates.size:
+            continue
+
+        membership = by_meeting[meeting["id"]]
+        base = {
+            "meeting_id": meeting["id"],
+            "title": meeting.get("title"),
+            "start_time": meeting.get("start_time"),
+            "end_time": meeting.get("end_time"),
+            "status": meeting.get("status"),
+            "meeting_type": meeting.get("meeting_type"),
+            "location": meeting.get("location"),
+            "organizer_id": meeting.get("organizer_id"),
+            "recurrence_type": meeting.get("recurrence_type"),
+            "is_recurring": recurring,
+            "role": membership.get("role"),
+            "response_status": membership.get("response_status"),
+        }
+        for day in dates.astype(str):
+            occurrences.append({**base, "date": day})
+
+    occurrences.sort(key=lambda o: (o["date"], o.get("start_time") or ""))
+    return occurrences
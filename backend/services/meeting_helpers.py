@@ -9,6 +9,7 @@ changes, only structural ones.
 """
 from __future__ import annotations
 
+import asyncio
 import logging
 import uuid
 from datetime import datetime, timezone
@@ -16,8 +17,9 @@ from typing import Any, Dict, List, Optional
 from zoneinfo import ZoneInfo
 
 from fastapi import HTTPException
+from pymongo import ReturnDocument, UpdateOne
 
-from core import db, serialize_doc, FRONTEND_URL
+from core import db, serialize_doc, transactions_supported, FRONTEND_URL
 from utils.email import send_meeting_invite, send_datetime_change_email
 from utils.holiday_checker import validate_meeting_date_for_user
 from services.teams_service import get_teams_service
@@ -102,9 +104,104 @@ def build_meeting_doc(meeting, current_user: dict, meeting_id: str) -> Dict[str,
         "created_at": datetime.now(timezone.utc).isoformat(),
         "teams_meeting_id": None,
         "teams_join_url": None,
+        # Next free agenda order_index; see allocate_agenda_positions.
+        "agenda_order_seq": len(getattr(meeting, 'agenda_items', None) or []),
+        # Bumped by every mutation of the meeting or its child rows; drives
+        # the ETag on the detail/summary endpoints.
+        "version": 1,
     }
 
 
+async def bump_meeting_version(meeting_id: Optional[str]) -> None:
+    """Invalidate cached representations of `meeting_id` after a child-row write."""
+    if not meeting_id:
+        return
+    await db.meetings.update_one({"id": meeting_id}, {"$inc": {"version": 1}})
+
+
+# User fields shown in meeting detail and summary PDFs (participants,
+# organizer, decision makers).
+MEETING_USER_FIELDS = ('name', 'role', 'specialty')
+
+
+async def bump_meeting_versions(meeting_ids: List[str]) -> None:
+    """`bump_meeting_version` for several meetings in one write."""
+    meeting_ids = [m for m in dict.fromkeys(meeting_ids) if m]
+    if meeting_ids:
+        await db.meetings.update_many({"id": {"$in": meeting_ids}}, {"$inc": {"version": 1}})
+
+
+async def bump_patient_meeting_versions(patient_id: str) -> None:
+    """Invalidate every meeting that shows `patient_id` after the patient
+    record changed (name, age and diagnosis appear in the summary)."""
+    meeting_ids = await db.meeting_patients.distinct("meeting_id", {"patient_id": patient_id})
+    meeting_ids += await db.agenda_items.distinct("meeting_id", {"patient_id": patient_id})
+    await bump_meeting_versions(meeting_ids)
+
+
+async def bump_user_meeting_versions(user_id: str) -> None:
+    """Invalidate every meeting that shows `user_id` after one of
+    MEETING_USER_FIELDS changed."""
+    meeting_ids = await db.user_meetings.distinct("meeting_id", {"user_id": user_id})
+    meeting_ids += await db.decision_logs.distinct("meeting_id", {"created_by": user_id})
+    await bump_meeting_versions(meeting_ids)
+
+
+async def allocate_agenda_positions(meeting_id: str, count: int = 1) -> Optional[int]:
+    """Reserve `count` consecutive agenda order_index values; returns the first.
+
+    The counter lives on the meeting (`agenda_order_seq`) and is advanced
+    with a single `$inc`, so concurrent adds never get the same position.
+    Meetings created before the counter existed are seeded once from their
+    highest order_index. Also bumps the meeting version. None when the
+    meeting does not exist.
+    """
+    seeded = await db.meetings.find_one({"id": meeting_id}, {"_id": 0, "agenda_order_seq": 1})
+    if seeded is None:
+        return None
+    if 'agenda_order_seq' not in seeded:
+        top = await db.agenda_items.find(
+            {"meeting_id": meeting_id}, {"_id": 0, "order_index": 1}
+        ).sort("order_index", -1).limit(1).to_list(1)
+        # Only the first concurrent seeder wins; the others just $inc below.
+        await db.meetings.update_one(
+            {"id": meeting_id, "agenda_order_seq": {"$exists": False}},
+            {"$set": {"agenda_order_seq": (top[0].get('order_index', -1) + 1) if top else 0}},
+        )
+    updated = await db.meetings.find_one_and_update(
+        {"id": meeting_id},
+        {"$inc": {"agenda_order_seq": count, "version": 1}},
+        projection={"_id": 0, "agenda_order_seq": 1},
+        return_document=ReturnDocument.AFTER,
+    )
+    return updated['agenda_order_seq'] - count if updated else None
+
+
+async def apply_agenda_order(meeting_id: str, item_ids: List[str], current: Dict[str, Any]) -> int:
+    """Write order_index = position in `item_ids` with one `bulk_write`.
+
+    `current` maps item id -> its present order_index; items already in
+    place are skipped. Returns the number of items moved.
+    """
+    now_iso = datetime.now(timezone.utc).isoformat()
+    ops = [
+        UpdateOne(
+            {"id": item_id, "meeting_id": meeting_id},
+            {"$set": {"order_index": idx, "updated_at": now_iso}},
+        )
+        for idx, item_id in enumerate(item_ids)
+        if current.get(item_id) != idx
+    ]
+    if ops:
+        await db.agenda_items.bulk_write(ops, ordered=False)
+        # Positions 0..n-1 are now taken; keep new items after them.
+        await db.meetings.update_one(
+            {"id": meeting_id},
+            {"$max": {"agenda_order_seq": len(item_ids)}, "$inc": {"version": 1}},
+        )
+    return len(ops)
+
+
 def _safe_zoneinfo(name: Optional[str]) -> ZoneInfo:
     try:
         return ZoneInfo(name or 'UTC')
@@ -112,8 +209,12 @@ def _safe_zoneinfo(name: Optional[str]) -> ZoneInfo:
         return ZoneInfo('UTC')
 
 
-async def attach_teams_meeting(meeting_id: str, meeting, current_user: dict) -> None:
-    """Create a Teams onlineMeeting and persist its id/joinUrl. Silently no-ops on failure."""
+async def create_teams_meeting(meeting_id: str, meeting, current_user: dict) -> Dict[str, Any]:
+    """Create a Teams onlineMeeting and return its id/joinUrl as meeting fields.
+
+    Called before the meeting is inserted so the link is written with it.
+    Returns {} on failure — Teams problems never block scheduling.
+    """
     try:
         teams_service = get_teams_service()
         tz = _safe_zoneinfo(current_user.get('timezone'))
@@ -129,93 +230,62 @@ async def attach_teams_meeting(meeting_id: str, meeting, current_user: dict) ->
             start_datetime=start_dt,
             end_datetime=end_dt,
         )
-        await db.meetings.update_one(
-            {"id": meeting_id},
-            {"$set": {
-                "teams_meeting_id": teams_meeting['id'],
-                "teams_join_url": teams_meeting['joinWebUrl'],
-            }},
-        )
         logger.info(f"Teams meeting created for meeting {meeting_id}")
+        return {
+            "teams_meeting_id": teams_meeting['id'],
+            "teams_join_url": teams_meeting['joinWebUrl'],
+        }
     except Exception as e:
         logger.error(f"Failed to create Teams meeting for {meeting_id}: {e}")
+        return {}
 
 
-async def insert_organizer_participant(meeting_id: str, organizer_id: str) -> None:
-    await db.meeting_participants.insert_one({
+def build_participant_rows(meeting_id: str, organizer_id: str, participant_ids: Optional[List[str]]) -> List[dict]:
+    """The organizer (always "accepted") followed by each distinct invitee."""
+    now_iso = datetime.now(timezone.utc).isoformat()
+    rows = [{
         "id": str(uuid.uuid4()),
         "meeting_id": meeting_id,
         "user_id": organizer_id,
         "role": "organizer",
         "response_status": "accepted",
-        "created_at": datetime.now(timezone.utc).isoformat(),
-    })
-
-
-async def _send_invite_to(meeting_id: str, meeting, fresh_meeting: dict, participant_user: dict, current_user: dict) -> None:
-    meeting_data = {
-        "id": meeting_id,
-        "title": meeting.title,
-        "description": meeting.description,
-        "meeting_date": meeting.meeting_date,
-        "start_time": meeting.start_time,
-        "end_time": meeting.end_time,
-        # legacy fields kept for backward compat
-        "date": meeting.meeting_date,
-        "time": meeting.start_time,
-        "location": meeting.location or "To be announced",
-        "organizer_timezone": (fresh_meeting or {}).get("organizer_timezone"),
-        "teams_join_url": (fresh_meeting or {}).get("teams_join_url"),
-        "video_link": meeting.video_link,
-        "recurrence_type": meeting.recurrence_type,
-    }
-    send_meeting_invite(
-        meeting=meeting_data,
-        participant=participant_user,
-        organizer=current_user,
-        frontend_url=FRONTEND_URL,
-    )
-
-
-async def insert_participants_and_invite(meeting_id: str, meeting, current_user: dict) -> None:
-    """Persist every non-organizer participant and email them an invite."""
-    fresh_meeting = await db.meetings.find_one({"id": meeting_id}, {"_id": 0}) or {}
-    for participant_id in meeting.participant_ids or []:
-        if participant_id == current_user['id']:
+        "created_at": now_iso,
+    }]
+    for participant_id in dict.fromkeys(participant_ids or []):
+        if participant_id == organizer_id:
             continue
-        await db.meeting_participants.insert_one({
+        rows.append({
             "id": str(uuid.uuid4()),
             "meeting_id": meeting_id,
             "user_id": participant_id,
             "role": "attendee",
             "response_status": "pending",
-            "created_at": datetime.now(timezone.utc).isoformat(),
+            "created_at": now_iso,
         })
-        try:
-            participant_user = await db.users.find_one({"id": participant_id}, {"_id": 0})
-            if participant_user and participant_user.get('email'):
-                await _send_invite_to(meeting_id, meeting, fresh_meeting, participant_user, current_user)
-                logger.info(f"Sent meeting invite to {participant_user.get('email')}")
-        except Exception as e:
-            logger.error(f"Failed to send meeting invite: {e}")
+    return rows
 
 
-async def insert_meeting_patients(meeting_id: str, patient_ids: List[str], current_user: dict) -> None:
-    for patient_id in patient_ids or []:
-        await db.meeting_patients.insert_one({
+def build_meeting_patient_rows(meeting_id: str, patient_ids: Optional[List[str]], current_user: dict) -> List[dict]:
+    now_iso = datetime.now(timezone.utc).isoformat()
+    return [
+        {
             "id": str(uuid.uuid4()),
             "meeting_id": meeting_id,
             "patient_id": patient_id,
             "status": "new_case",
             "added_by": current_user['id'],
-            "created_at": datetime.now(timezone.utc).isoformat(),
-        })
+            # Creator is the organizer; keys the approval worklist index.
+            "organizer_id": current_user['id'],
+            "created_at": now_iso,
+        }
+        for patient_id in patient_ids or []
+    ]
 
 
-async def insert_agenda_items(meeting_id: str, agenda_items: Optional[List[dict]]) -> None:
+def build_agenda_rows(meeting_id: str, agenda_items: Optional[List[dict]]) -> List[dict]:
     now_iso = datetime.now(timezone.utc).isoformat()
-    for idx, item in enumerate(agenda_items or []):
-        await db.agenda_items.insert_one({
+    return [
+        {
             "id": str(uuid.uuid4()),
             "meeting_id": meeting_id,
             "patient_id": item.get('patient_id'),
@@ -229,7 +299,85 @@ async def insert_agenda_items(meeting_id: str, agenda_items: Optional[List[dict]
             "order_index": idx,
             "created_at": now_iso,
             "updated_at": now_iso,
-        })
+        }
+        for idx, item in enumerate(agenda_items or [])
+    ]
+
+
+async def insert_meeting_with_rows(meeting_doc: dict, meeting, current_user: dict) -> List[str]:
+    """Insert the meeting and all of its participant, patient and agenda rows.
+
+    One `insert_many` per collection, so the number of round-trips no longer
+    grows with the payload. On a replica set the writes share a transaction
+    and a failure leaves no half-created meeting behind. Returns the invitee
+    user ids (organizer excluded) for `send_meeting_invites`.
+    """
+    meeting_id = meeting_doc['id']
+    writes = [
+        (db.meetings, [meeting_doc]),
+        (db.meeting_participants, build_participant_rows(meeting_id, current_user['id'], meeting.participant_ids)),
+        (db.meeting_patients, build_meeting_patient_rows(meeting_id, meeting.patient_ids, current_user)),
+        (db.agenda_items, build_agenda_rows(meeting_id, meeting.agenda_items)),
+    ]
+
+    async def _write(session=None):
+        for collection, rows in writes:
+            if rows:
+                await collection.insert_many(rows, session=session)
+
+    if await transactions_supported(db):
+        async with await db.client.start_session() as session:
+            await session.with_transaction(_write)
+    else:
+        await _write()
+    return [row['user_id'] for row in writes[1][1] if row['role'] != 'organizer']
+
+
+def _invite_payload(meeting_doc: dict) -> Dict[str, Any]:
+    return {
+        "id": meeting_doc['id'],
+        "title": meeting_doc.get('title'),
+        "description": meeting_doc.get('description'),
+        "meeting_date": meeting_doc.get('meeting_date'),
+        "start_time": meeting_doc.get('start_time'),
+        "end_time": meeting_doc.get('end_time'),
+        # legacy fields kept for backward compat
+        "date": meeting_doc.get('meeting_date'),
+        "time": meeting_doc.get('start_time'),
+        "location": meeting_doc.get('location') or "To be announced",
+        "organizer_timezone": meeting_doc.get("organizer_timezone"),
+        "teams_join_url": meeting_doc.get("teams_join_url"),
+        "video_link": meeting_doc.get('video_link'),
+        "recurrence_type": meeting_doc.get('recurrence_type'),
+    }
+
+
+async def send_meeting_invites(meeting_doc: dict, invitee_ids: List[str], current_user: dict) -> None:
+    """Email every invitee; one user lookup for all of them.
+
+    Meant to run as a background task after the create response is sent.
+    SMTP is blocking, so each send runs in a worker thread.
+    """
+    if not invitee_ids:
+        return
+    meeting_data = _invite_payload(meeting_doc)
+    users = await db.users.find(
+        {"id": {"$in": list(invitee_ids)}}, {"_id": 0, "password_hash": 0}
+    ).to_list(None)
+    for participant_user in users:
+        if not participant_user.get('email'):
+            continue
+        try:
+            await asyncio.to_thread(
+                send_meeting_invite,
+                meeting=meeting_data,
+                participant=participant_user,
+                organizer=current_user,
+                frontend_url=FRONTEND_URL,
+            )
+            logger.info(f"Sent meeting invite to {participant_user.get('email')}")
+        except Exception as e:
+            logger.error(f"Failed to send meeting invite: {e}")
 
 
 # ---------------------------------------------------------------------------
@@ -441,3 +589,47 @@ async def attach_decisions(meeting: dict) -> None:
         {"meeting_id": meeting['id']}, {"_id": 0}
     ).sort("created_at", -1).to_list(100)
     meeting['decisions'] = [serialize_doc(d) for d in decisions]
+
+
+# ---------------------------------------------------------------------------
+# list_meetings helpers
+# ---------------------------------------------------------------------------
+
+async def enrich_meeting_list(meetings: List[dict], expand: set) -> None:
+    """Batch-enrich list rows: one query per expanded relation, not per meeting."""
+    if not meetings:
+        return
+    meeting_ids = [m['id'] for m in meetings]
+
+    if 'organizer' in expand:
+        organizer_ids = list({m['organizer_id'] for m in meetings if m.get('organizer_id')})
+        organizers = await db.users.find(
+            {"id": {"$in": organizer_ids}}, {"_id": 0, "id": 1, "name": 1, "specialty": 1}
+        ).to_list(len(organizer_ids) or 1)
+        by_id = {u['id']: u for u in organizers}
+        for m in meetings:
+            organizer = by_id.get(m.get('organizer_id'))
+            m['organizer_name'] = organizer['name'] if organizer else None
+            m['organizer_specialty'] = organizer.get('specialty') if organizer else None
+
+    if 'participants' in expand:
+        rows = await db.meeting_participants.find(
+            {"meeting_id": {"$in": meeting_ids}},
+            {"_id": 0, "meeting_id": 1, "user_id": 1, "response_status": 1, "responded_at": 1},
+        ).to_list(None)
+        grouped: Dict[str, List[dict]] = {mid: [] for mid in meeting_ids}
+        for row in rows:
+            grouped.setdefault(row.pop('meeting_id'), []).append(row)
+        for m in meetings:
+            m['participant_count'] = len(grouped.get(m['id'], []))
+            # Dashboard only needs response_status per participant; capped as before.
+            m['participants'] = grouped.get(m['id'], [])[:100]
+
+    if 'patients' in expand:
+        counts = await db.meeting_patients.aggregate([
+            {"$match": {"meeting_id": {"$in": meeting_ids}}},
+            {"$group": {"_id": "$meeting_id", "n": {"$sum": 1}}},
+        ]).to_list(None)
+        by_meeting = {row['_id']: row['n'] for row in counts}
+        for m in meetings:
+            m['patient_count'] = by_meeting.get(m['id'], 0)
@@ -0,0 +1,214 @@
+"""
+Materialised occurrences of recurring meetings (`meeting_occurrences`).
+
+A recurring meeting is one `meetings` document; the sessions it produces are
+rows in `meeting_occurrences`, one per (meeting_id, occurrence_date), each
+with its own status, 1-hour reminder state and Teams join link. The
+scheduler sends reminders and auto-completes per occurrence, so a weekly
+board keeps getting reminders and stays "upcoming" after its first session.
+
+Only a rolling window is materialised (`OCCURRENCE_WINDOW_DAYS`, default 90).
+Each series records how far it has been expanded in
+`occurrences_materialized_through`; `extend_occurrence_windows` only expands
+the missing tail. Occurrences on the organizer's holidays are skipped, as in
+the calendar view. New occurrences are added to the members' free/busy
+index as they are materialised.
+
+One-time meetings have no rows here — they keep using the fields on the
+meeting document itself.
+
+Every helper takes `db` explicitly so the scheduler can share them.
+"""
+from __future__ import annotations
+
+import logging
+from datetime import date, datetime, timedelta, timezone
+from typing import Iterable, Optional
+
+from pymongo import UpdateOne
+
+from services.busy_index import add_occurrence_busy, rebuild_meeting_busy
+from utils.env import env_int
+from utils.holiday_checker import holiday_dates_for_user
+from utils.recurrence import ONE_TIME_TYPES, expand, is_recurring
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_WINDOW_DAYS = 90
+
+# Changes to these meeting fields invalidate the not-yet-held occurrences.
+SCHEDULE_FIELDS = (
+    "meeting_date", "start_time", "end_time", "recurrence_type", "recurrence_end_date",
+    "recurrence_day_of_week", "recurrence_day_of_month", "recurrence_week_of_month",
+)
+
+_HOLIDAY_PREF_FIELDS = {
+    "_id": 0, "id": 1, "country": 1, "holiday_enforcement_enabled": 1,
+    "enabled_default_holidays": 1, "custom_holidays": 1,
+}
+
+
+def window_days() -> int:
+    return env_int("OCCURRENCE_WINDOW_DAYS", DEFAULT_WINDOW_DAYS)
+
+
+def occurrence_id(meeting_id: str, occurrence_date: str) -> str:
+    return f"{meeting_id}:{occurrence_date}"
+
+
+async def ensure_occurrence_indexes(db) -> None:
+    await db.meeting_occurrences.create_index("id", unique=True)
+    await db.meeting_occurrences.create_index([("meeting_id", 1), ("occurrence_date", 1)], unique=True)
+    await db.meeting_occurrences.create_index([("status", 1), ("occurrence_date", 1)])
+    await db.meeting_occurrences.create_index([("occurrence_date", 1), ("reminder_1h_sent", 1)])
+    await db.meetings.create_index([("recurrence_type", 1), ("occurrences_materialized_through", 1)])
+
+
+def _occurrence_doc(meeting: dict, day: str) -> dict:
+    return {
+        "id": occurrence_id(meeting["id"], day),
+        "meeting_id": meeting["id"],
+        "organizer_id": meeting.get("organizer_id"),
+        "occurrence_date": day,
+        "start_time": meeting.get("start_time"),
+        "end_time": meeting.get("end_time"),
+        "status": "scheduled",
+        "reminder_1h_sent": False,
+        "teams_join_url": meeting.get("teams_join_url"),
+        "created_at": datetime.now(timezone.utc).isoformat(),
+    }
+
+
+async def materialize_series(
+    db,
+    meeting: dict,
+    through: Optional[date] = None,
+    organizer: Optional[dict] = None,
+    index_busy: bool = True,
+) -> int:
+    """Expand `meeting` from where it last stopped (or from today, for a
+    series not expanded before) up to `through` (inclusive).
+
+    Existing rows are never overwritten, so reminder/complete state survives.
+    Returns the number of occurrence dates in the newly covered span.
+    """
+    if not is_recurring(meeting):
+        return 0
+    through = through or (date.today() + timedelta(days=window_days()))
+    done = meeting.get("occurrences_materialized_through")
+    # A series seen for the first time starts today: sessions already past
+    # are history, not work for the scheduler.
+    start = datetime.strptime(done, "%Y-%m-%d").date() + timedelta(days=1) if done else date.today()
+    start = max(start, datetime.strptime(meeting["meeting_date"], "%Y-%m-%d").date())
+
+    count = 0
+    if start <= through:
+        if organizer is None and meeting.get("organizer_id"):
+            organizer = await db.users.find_one({"id": meeting["organizer_id"]}, _HOLIDAY_PREF_FIELDS)
+        skip = holiday_dates_for_user(start, through, organizer) if organizer else None
+        days = expand(meeting, start, through, skip=skip).astype(str)
+        if days.size:
+            await db.meeting_occurrences.bulk_write([
+                UpdateOne(
+                    {"meeting_id": meeting["id"], "occurrence_date": day},
+                    {"$setOnInsert": _occurrence_doc(meeting, day)},
+                    upsert=True,
+                )
+                for day in days
+            ], ordered=False)
+            if index_busy:
+                await add_occurrence_busy(db, meeting, list(days))
+        count = int(days.size)
+
+    await db.meetings.update_one(
+        {"id": meeting["id"]},
+        {"$set": {"occurrences_materialized_through": through.isoformat()}},
+    )
+    return count
+
+
+async def rematerialize_series(db, meeting_id: str) -> int:
+    """Rebuild the upcoming occurrences after the series' schedule changed.
+
+    Past occurrences and ones already reminded or completed are kept; the
+    rest of the window is dropped and expanded again from today.
+    """
+    today = date.today()
+    await db.meeting_occurrences.delete_many({
+        "meeting_id": meeting_id,
+        "occurrence_date": {"$gte": today.isoformat()},
+        "status": "scheduled",
+        "reminder_1h_sent": {"$ne": True},
+    })
+    meeting = await db.meetings.find_one({"id": meeting_id}, {"_id": 0})
+    if not meeting:
+        return 0
+    count = 0
+    if not is_recurring(meeting) or meeting.get("status") == "cancelled":
+        await db.meetings.update_one({"id": meeting_id}, {"$unset": {"occurrences_materialized_through": ""}})
+    else:
+        meeting["occurrences_materialized_through"] = (today - timedelta(days=1)).isoformat()
+        count = await materialize_series(db, meeting, index_busy=False)
+    await rebuild_meeting_busy(db, meeting_id)
+    return count
+
+
+async def cancel_upcoming_occurrences(db, meeting_id: str) -> None:
+    await db.meeting_occurrences.update_many(
+        {"meeting_id": meeting_id, "occurrence_date": {"$gte": date.today().isoformat()}, "status": "scheduled"},
+        {"$set": {"status": "cancelled"}},
+    )
+    await rebuild_meeting_busy(db, meeting_id)
+
+
+async def set_upcoming_teams_link(db, meeting_id: str, join_url: Optional[str]) -> None:
+    """Give every not-yet-held occurrence the series' (new) Teams link."""
+    await db.meeting_occurrences.update_many(
+        {"meeting_id": meeting_id, "occurrence_date": {"$gte": date.today().isoformat()}},
+        {"$set": {"teams_join_url": join_url}},
+    )
+
+
+async def extend_occurrence_windows(db, today: Optional[date] = None) -> int:
+    """Top up every active series whose window ends before today + window.
+
+    Only the missing tail of each series is expanded. Returns the number of
+    series touched.
+    """
+    today = today or date.today()
+    horizon = today + timedelta(days=window_days())
+    cursor = db.meetings.find(
+        {
+            "status": {"$in": ["scheduled", "in_progress"]},
+            "recurrence_type": {"$nin": list(ONE_TIME_TYPES)},
+            "$or": [
+                {"occurrences_materialized_through": {"$lt": horizon.isoformat()}},
+                {"occurrences_materialized_through": {"$exists": False}},
+            ],
+        },
+        {"_id": 0},
+    )
+    meetings = await cursor.to_list(None)
+    if not meetings:
+        return 0
+
+    organizer_ids = list({m["organizer_id"] for m in meetings if m.get("organizer_id")})
+    organizers = {
+        u["id"]: u
+        for u in await db.users.find({"id": {"$in": organizer_ids}}, _HOLIDAY_PREF_FIELDS).to_list(None)
+    }
+    for meeting in meetings:
+        await materialize_series(db, meeting, horizon, organizers.get(meeting.get("organizer_id")))
+    logger.info("Extended occurrence window of %d series through %s", len(meetings), horizon.isoformat())
+    return len(meetings)
+
+
+async def series_has_open_occurrences(db, meeting_id: str) -> bool:
+    return await db.meeting_occurrences.find_one(
+        {"meeting_id": meeting_id, "status": {"$in": ["scheduled", "in_progress"]}},
+        {"_id": 0, "id": 1},
+    ) is not None
+
+
+def schedule_changed(update_data: dict, fields: Iterable[str] = SCHEDULE_FIELDS) -> bool:
+    return any(f in update_data for f in fields)
@@ -0,0 +1,248 @@
+"""
+Meeting summary PDF: batched data gathering, process-pool rendering and a
+content-versioned cache.
+
+`gather_summary_data` loads everything the report shows with one query per
+collection: participants, meeting patients, agenda items, decisions, plus a
+single `$in` lookup each for users and patients. `render_summary_pdf` runs
+reportlab in a process pool (`PDF_RENDER_WORKERS`, default 2; bulk exports
+use their own, `PDF_EXPORT_WORKERS`), so one large report cannot stall the
+event loop or hog the GIL.
+
+Rendered bytes are cached in memory under (meeting id, meeting `version`).
+Every content change bumps the version, so a cached PDF is never stale, and
+repeated downloads after a meeting cost nothing. The cache is bounded by
+`PDF_CACHE_MB` (default 64) and evicts least-recently-used entries.
+Concurrent requests for the same uncached version share one render.
+
+Every helper takes `db` explicitly, like the other services.
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import Dict, Optional, Tuple
+
+from utils.pdf_generator import generate_meeting_summary_pdf
+from utils.env import env_int
+from utils.work_queue import ProcessPool
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_RENDER_WORKERS = 2
+DEFAULT_CACHE_MB = 64
+
+_PARTICIPANT_USER_FIELDS = {"_id": 0, "id": 1, "name": 1, "role": 1, "specialty": 1}
+
+
+# ---------------------------------------------------------------------------
+# Data gathering
+# ---------------------------------------------------------------------------
+
+def _age(date_of_birth: str) -> Optional[int]:
+    try:
+        dob = datetime.fromisoformat(date_of_birth.replace('Z', '+00:00'))
+    except (AttributeError, ValueError):
+        return None
+    today = datetime.now(timezone.utc)
+    return today.year - dob.year - ((today.month, today.day) < (dob.month, dob.day))
+
+
+def _recorded_on(created_at) -> Optional[str]:
+    if isinstance(created_at, str):
+        try:
+            created_at = datetime.fromisoformat(created_at.replace('Z', '+00:00'))
+        except ValueError:
+            return created_at
+    if isinstance(created_at, datetime):
+        return created_at.strftime('%B %d, %Y at %I:%M %p')
+    return None
+
+
+async def gather_summary_data(db, meeting_id: str) -> Optional[Dict]:
+    """Everything `generate_meeting_summary_pdf` needs, or None when the
+    meeting does not exist. Returns keyword arguments for the generator."""
+    meeting = await db.meetings.find_one({"id": meeting_id}, {"_id": 0})
+    if not meeting:
+        return None
+
+    participant_rows, meeting_patients, agenda_items, decisions = await asyncio.gather(
+        db.meeting_participants.find({"meeting_id": meeting_id}, {"_id": 0}).to_list(None),
+        db.meeting_patients.find({"meeting_id": meeting_id}, {"_id": 0}).to_list(None),
+        db.agenda_items.find({"meeting_id": meeting_id}, {"_id": 0}).sort("order_index", 1).to_list(None),
+        db.decision_logs.find({"meeting_id": meeting_id}, {"_id": 0}).sort("created_at", 1).to_list(None),
+    )
+
+    user_ids = {meeting.get('organizer_id')} | {p['user_id'] for p in participant_rows}
+    user_ids |= {d['created_by'] for d in decisions if d.get('created_by')}
+    patient_ids = [mp['patient_id'] for mp in meeting_patients]
+    patient_ids += [a['patient_id'] for a in agenda_items if a.get('patient_id')]
+    users_list, patients_list = await asyncio.gather(
+        db.users.find({"id": {"$in": [u for u in user_ids if u]}}, _PARTICIPANT_USER_FIELDS).to_list(None),
+        db.patients.find({"id": {"$in": list(dict.fromkeys(patient_ids))}}, {"_id": 0}).to_list(None),
+    )
+    users = {u['id']: u for u in users_list}
+    patients_by_id = {p['id']: p for p in patients_list}
+
+    organizer = users.get(meeting.get('organizer_id'))
+    meeting['organizer_name'] = organizer.get('name', 'Unknown') if organizer else 'Unknown'
+
+    participants = []
+    for p in participant_rows:
+        user = users.get(p['user_id'])
+        if user:
+            participants.append({
+                "name": user.get('name', 'Unknown'),
+                "role": user.get('role', 'Unknown'),
+                "specialty": user.get('specialty', 'N/A'),
+                "response_status": p.get('response_status', 'pending')
+            })
+
+    patients = []
+    for mp in meeting_patients:
+        patient = patients_by_id.get(mp['patient_id'])
+        if patient:
+            patient = dict(patient)
+            if patient.get('date_of_birth'):
+                patient['age'] = _age(patient['date_of_birth'])
+            patients.append(patient)
+
+    for item in agenda_items:
+        patient = patients_by_id.get(item.get('patient_id'))
+        if patient:
+            item['patient_name'] = f"{patient.get('first_name', '')} {patient.get('last_name', '')}"
+            item['patient_mrn'] = patient.get('patient_id_number', '')
+
+    for decision in decisions:
+        maker = users.get(decision.get('created_by'))
+        if maker:
+            decision['decision_maker'] = maker.get('name', 'Unknown')
+        if decision.get('created_at'):
+            decision['created_at'] = _recorded_on(decision['created_at'])
+
+    return {
+        "meeting_data": meeting,
+        "participants": participants,
+        "patients": patients,
+        "agenda_items": agenda_items,
+        "decisions": decisions,
+    }
+
+
+# ---------------------------------------------------------------------------
+# Rendering
+# ---------------------------------------------------------------------------
+
+# Interactive downloads and bulk exports (services/summary_exports.py) get
+# separate pools so a long export never queues ahead of a user's download.
+_pools: Dict[str, ProcessPool] = {
+    "interactive": ProcessPool("PDF render (interactive)", env_int("PDF_RENDER_WORKERS", DEFAULT_RENDER_WORKERS)),
+    "export": ProcessPool("PDF render (export)", env_int("PDF_EXPORT_WORKERS", DEFAULT_RENDER_WORKERS)),
+}
+
+
+def pool_size(name: str) -> int:
+    return _pools[name].workers
+
+
+def shutdown_render_pool(name: Optional[str] = None) -> None:
+    """Stop one render pool, or all of them."""
+    for pool in [_pools[name]] if name else _pools.values():
+        pool.shutdown()
+
+
+async def render_summary_pdf(data: Dict, pool: str = "interactive") -> bytes:
+    """Run `generate_meeting_summary_pdf(**data)` in the named render pool."""
+    return await _pools[pool].run(_render, data)
+
+
+async def render_summary_pdf_file(data: Dict, path: str, pool: str = "export") -> None:
+    """Like `render_summary_pdf`, but the worker writes the PDF straight to
+    `path`, so the bytes never travel back through the parent process."""
+    await _pools[pool].run(_render_to_file, data, path)
+
+
+def _render(data: Dict) -> bytes:
+    return generate_meeting_summary_pdf(**data)
+
+
+def _render_to_file(data: Dict, path: str) -> None:
+    with open(path, "wb") as sink:
+        generate_meeting_summary_pdf(**data, output=sink)
+
+
+# ---------------------------------------------------------------------------
+# Cache
+# ---------------------------------------------------------------------------
+
+class SummaryPdfCache:
+    """LRU of rendered PDFs keyed by (meeting_id, version), bounded in bytes.
+    Only the newest version of a meeting is kept."""
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[Tuple[str, int], bytes]" = OrderedDict()
+        self._size = 0
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, meeting_id: str, version: int) -> Optional[bytes]:
+        pdf = self._entries.get((meeting_id, version))
+        if pdf is None:
+            self.misses += 1
+            return None
+        self._entries.move_to_end((meeting_id, version))
+        self.hits += 1
+        return pdf
+
+    def put(self, meeting_id: str, version: int, pdf: bytes) -> None:
+        if len(pdf) > self.max_bytes:
+            return
+        for key in [k for k in self._entries if k[0] == meeting_id]:
+            self._size -= len(self._entries.pop(key))
+        self._entries[(meeting_id, version)] = pdf
+        self._size += len(pdf)
+        while self._size > self.max_bytes:
+            _, evicted = self._entries.popitem(last=False)
+            self._size -= len(evicted)
+
+    def stats(self) -> dict:
+        return {"entries": len(self._entries), "bytes": self._size, "max_bytes": self.max_bytes,
+                "hits": self.hits, "misses": self.misses}
+
+
+summary_cache = SummaryPdfCache(env_int("PDF_CACHE_MB", DEFAULT_CACHE_MB) * 1024 * 1024)
+_in_flight: Dict[Tuple[str, int], "asyncio.Future[Optional[bytes]]"] = {}
+
+
+async def build_summary_pdf(db, meeting_id: str, version: int) -> Optional[bytes]:
+    """Gather, render and cache the summary of `meeting_id` at `version`.
+    Callers racing on the same version await the first one's render.
+    Returns None when the meeting does not exist."""
+    key = (meeting_id, version)
+    pending = _in_flight.get(key)
+    if pending is not None:
+        return await asyncio.shield(pending)
+
+    future = asyncio.get_running_loop().create_future()
+    _in_flight[key] = future
+    try:
+        data = await gather_summary_data(db, meeting_id)
+        pdf = await render_summary_pdf(data) if data else None
+        if pdf is not None:
+            # Key by the version actually rendered, in case it moved on.
+            summary_cache.put(meeting_id, data["meeting_data"].get("version", 0), pdf)
+        future.set_result(pdf)
+        return pdf
+    except asyncio.CancelledError:
+        future.cancel()
+        raise
+    except Exception as e:
+        future.set_exception(e)
+        # Nobody may be waiting; mark the exception as retrieved.
+        future.exception()
+        raise
+    finally:
+        del _in_flight[key]
@@ -0,0 +1,187 @@
+"""
+Common free-slot finder for `POST /api/scheduling/suggest`.
+
+The horizon — the organizer's local days `start_date`..`end_date` — is laid
+out as one minute grid. Every participant contributes "blocked" spans to a
+single difference array:
+
+* the whole horizon, except their working hours on each of *their* local
+  working days (converted from their profile `timezone`); days that are
+  holidays for them (`holiday_dates_for_user`, the same rules as
+  `validate_meeting_date_for_user`) get no working hours;
+* every busy interval they have in `busy_intervals`.
+
+One cumulative sum gives, per minute, how many participants are unavailable;
+a second one over "anyone unavailable" lets every candidate start be checked
+for a fully free `[start, start + duration)` window in O(1). The cost is
+O(horizon minutes + participants x days + busy rows) — 200 participants over
+90 days takes about 10 ms (see benchmarks/bench_slot_finder.py).
+
+Spans may overlap freely: a minute is free only while its count is zero.
+"""
+from __future__ import annotations
+
+from datetime import date, datetime, timedelta, timezone
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+from zoneinfo import ZoneInfo
+
+import numpy as np
+
+from services.busy_index import MAX_INTERVAL_MINUTES, epoch_minutes, from_epoch_minutes
+from utils.holiday_checker import holiday_dates_for_user
+
+MAX_SUGGEST_DAYS = 90
+MAX_SUGGEST_PARTICIPANTS = 200
+MAX_SUGGESTIONS = 50
+
+# User fields needed to place working hours and holidays.
+PARTICIPANT_FIELDS = {
+    "_id": 0, "id": 1, "name": 1, "timezone": 1, "country": 1,
+    "holiday_enforcement_enabled": 1, "enabled_default_holidays": 1, "custom_holidays": 1,
+}
+
+
+def _tz(name: Optional[str]) -> ZoneInfo:
+    try:
+        return ZoneInfo(name or "UTC")
+    except Exception:
+        return ZoneInfo("UTC")
+
+
+def parse_hhmm(value: str) -> int:
+    """Minutes after midnight for "HH:MM"; raises ValueError otherwise."""
+    h, m = (int(part) for part in value.split(":"))
+    if not (0 <= h and 0 <= m < 60 and h * 60 + m <= 24 * 60):
+        raise ValueError(value)
+    return h * 60 + m
+
+
+def _local_to_epoch(day: date, minutes: int, tz: ZoneInfo) -> int:
+    local = datetime(day.year, day.month, day.day) + timedelta(minutes=minutes)
+    return epoch_minutes(local.replace(tzinfo=tz).astimezone(timezone.utc))
+
+
+def _working_windows(
+    tz: ZoneInfo, days: Sequence[date], work_start: int, work_end: int
+) -> Dict[date, Tuple[int, int]]:
+    return {d: (_local_to_epoch(d, work_start, tz), _local_to_epoch(d, work_end, tz)) for d in days}
+
+
+def find_common_slots(
+    participants: Sequence[dict],
+    busy_rows: Iterable[dict],
+    start_date: date,
+    end_date: date,
+    duration_minutes: int,
+    work_start: int,
+    work_end: int,
+    organizer_timezone: Optional[str] = None,
+    include_weekends: bool = False,
+    step_minutes: int = 15,
+    limit: int = 5,
+    not_before: Optional[datetime] = None,
+) -> List[Dict]:
+    """Earliest non-overlapping slots of `duration_minutes` when every
+    participant is inside their working hours and not booked.
+
+    `busy_rows` are `busy_intervals` rows (`start_min`/`end_min`) of any of
+    the participants. Candidate starts fall on `step_minutes` boundaries of
+    the organizer's local clock and never before `not_before`.
+    """
+    org_tz = _tz(organizer_timezone)
+    lo = _local_to_epoch(start_date, 0, org_tz)
+    hi = _local_to_epoch(end_date + timedelta(days=1), 0, org_tz)
+    n = hi - lo
+    if n <= 0 or duration_minutes <= 0 or not participants:
+        return []
+
+    # Minutes where the number of unavailable participants goes up / down.
+    up: List[int] = []
+    down: List[int] = []
+    # Working days are the participant's own local dates, so look one day
+    # either side of the organizer's range to cover every timezone offset.
+    days = [start_date + timedelta(days=i) for i in range(-1, (end_date - start_date).days + 2)]
+    if not include_weekends:
+        days = [d for d in days if d.weekday() < 5]
+    windows_by_tz: Dict[str, Dict[date, Tuple[int, int]]] = {}
+    for user in participants:
+        tz_name = user.get("timezone") or "UTC"
+        windows = windows_by_tz.get(tz_name)
+        if windows is None:
+            windows = windows_by_tz[tz_name] = _working_windows(_tz(tz_name), days, work_start, work_end)
+        holidays = holiday_dates_for_user(days[0], days[-1], user) if days else set()
+        for d, (ws, we) in windows.items():
+            if d not in holidays:
+                down.append(ws)
+                up.append(we)
+
+    rows = list(busy_rows)
+    up.extend(r["start_min"] for r in rows)
+    down.extend(r["end_min"] for r in rows)
+
+    up_idx = np.clip(np.fromiter(up, dtype="int64", count=len(up)) - lo, 0, n)
+    down_idx = np.clip(np.fromiter(down, dtype="int64", count=len(down)) - lo, 0, n)
+    diff = np.bincount(up_idx, minlength=n + 1) - np.bincount(down_idx, minlength=n + 1)
+    # Everyone starts out blocked; their working windows lower that again.
+    diff[0] += len(participants)
+    blocked = np.cumsum(diff[:n]) > 0
+    prefix = np.concatenate(([0], np.cumsum(blocked, dtype="int64")))
+
+    first = 0
+    if not_before is not None:
+        first = max(0, epoch_minutes(not_before) - lo)
+        first = -(-first // step_minutes) * step_minutes
+    candidates = np.arange(first, n - duration_minutes + 1, step_minutes)
+    if not candidates.size:
+        return []
+    free = candidates[prefix[candidates + duration_minutes] == prefix[candidates]]
+
+    slots: List[Dict] = []
+    next_allowed = -1
+    for offset in free:
+        if offset < next_allowed:
+            continue
+        start = from_epoch_minutes(lo + int(offset))
+        end = start + timedelta(minutes=duration_minutes)
+        local_start, local_end = start.astimezone(org_tz), end.astimezone(org_tz)
+        slots.append({
+            "start": start.isoformat(),
+            "end": end.isoformat(),
+            "meeting_date": local_start.strftime("%Y-%m-%d"),
+            "start_time": local_start.strftime("%H:%M"),
+            "end_time": local_end.strftime("%H:%M"),
+        })
+        if len(slots) >= limit:
+            break
+        next_allowed = int(offset) + duration_minutes
+    return slots
+
+
+async def suggest_slots(
+    db,
+    participants: Sequence[dict],
+    start_date: date,
+    end_date: date,
+    duration_minutes: int,
+    work_start: int,
+    work_end: int,
+    organizer_timezone: Optional[str] = None,
+    **options,
+) -> List[Dict]:
+    """Fetch the participants' bookings in one query and run `find_common_slots`."""
+    org_tz = _tz(organizer_timezone)
+    lo = _local_to_epoch(start_date, 0, org_tz)
+    hi = _local_to_epoch(end_date + timedelta(days=1), 0, org_tz)
+    rows = await db.busy_intervals.find(
+        {
+            "user_id": {"$in": [p["id"] for p in participants]},
+            # Rows are at most MAX_INTERVAL_MINUTES long, so this bounds the scan.
+            "start_min": {"$gte": lo - MAX_INTERVAL_MINUTES, "$lt": hi},
+            "end_min": {"$gt": lo},
+        },
+        {"_id": 0, "start_min": 1, "end_min": 1},
+    ).to_list(None)
+    return find_common_slots(
+        participants, rows, start_date, end_date, duration_minutes, work_start, work_end,
+        organizer_timezone=organizer_timezone, **options,
+    )
@@ -0,0 +1,293 @@
+"""
+Bulk summary-PDF exports (`summary_exports` collection).
+
+An export job covers every meeting in a date range, optionally only those
+with a patient of one department, and produces a single ZIP of summary
+PDFs. Admins export every meeting; everyone else only the meetings they
+belong to (via the `user_meetings` index).
+
+`create_export` records the job and starts `run_export` as a background
+task. The runner renders PDFs in the dedicated export process pool (see
+services/meeting_summary.py), up to one per worker at a time. Workers write
+each PDF to a scratch file, which is appended to the ZIP on disk as soon as
+it finishes, so the parent process never holds the PDFs in memory whatever
+the size of the export. Progress (done / failed / total)
+is written back to the job row about once a second for the polling
+endpoint. The archive is written to a `.part` file and renamed once
+complete; downloads stream it straight from disk.
+
+A user has at most one job queued or running at a time. A unique partial
+index on `requested_by` enforces it, so concurrent requests cannot both
+start one; `create_export` raises ValueError for the loser.
+
+Jobs still queued or running when the process stops are marked failed at
+the next startup (`fail_interrupted_exports`). Archives expire after
+`EXPORT_TTL_HOURS` and are removed by `purge_expired_exports`.
+
+Every helper takes `db` explicitly, like the other services.
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+import re
+import shutil
+import time
+import uuid
+import zipfile
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import List, Optional, Set, Union
+
+from pymongo.errors import DuplicateKeyError
+
+from services.meeting_summary import gather_summary_data, pool_size, render_summary_pdf_file, summary_cache
+
+logger = logging.getLogger(__name__)
+
+MAX_EXPORT_DAYS = 366
+MAX_EXPORT_MEETINGS = 2000
+EXPORT_TTL_HOURS = 24
+ACTIVE_STATUSES = ("queued", "running")
+MAX_RECORDED_FAILURES = 50
+_PROGRESS_INTERVAL_SECONDS = 1.0
+
+_PUBLIC_FIELDS = {"_id": 0, "meeting_ids": 0, "file_path": 0}
+_MEETING_FIELDS = {"_id": 0, "id": 1, "title": 1, "meeting_date": 1, "start_time": 1, "version": 1}
+
+# Running export tasks, kept referenced so they are not garbage-collected.
+_tasks: Set[asyncio.Task] = set()
+
+
+async def ensure_export_indexes(db) -> None:
+    await db.summary_exports.create_index("id", unique=True)
+    await db.summary_exports.create_index([("requested_by", 1), ("status", 1)])
+    # $in in a partial filter needs MongoDB 6.0 (the Compose image).
+    await db.summary_exports.create_index(
+        "requested_by", name="one_active_export_per_user", unique=True,
+        partialFilterExpression={"status": {"$in": list(ACTIVE_STATUSES)}},
+    )
+
+
+async def export_meeting_ids(db, user: dict, date_from: str, date_to: str,
+                             department: Optional[str] = None) -> List[str]:
+    """Ids of the non-cancelled meetings in [date_from, date_to] the user may
+    export, optionally narrowed to those with a patient of `department`."""
+    in_range = {"meeting_date": {"$gte": date_from, "$lte": date_to}, "status": {"$ne": "cancelled"}}
+    if user.get('role') == 'admin':
+        ids = await db.meetings.distinct("id", in_range)
+    else:
+        ids = await db.user_meetings.distinct("meeting_id", {"user_id": user['id'], **in_range})
+    if department and ids:
+        patient_ids = await db.patients.distinct("id", {"department_name": department})
+        in_department = set(await db.meeting_patients.distinct(
+            "meeting_id", {"meeting_id": {"$in": ids}, "patient_id": {"$in": patient_ids}}
+        ))
+        ids = [i for i in ids if i in in_department]
+    return ids
+
+
+def export_view(job: dict) -> dict:
+    """The job as the API shows it (no server paths, no id list)."""
+    view = {k: v for k, v in job.items() if k not in ("_id", "meeting_ids", "file_path")}
+    if job.get('status') == 'completed':
+        view['download_url'] = f"/api/exports/summaries/{job['id']}/download"
+    return view
+
+
+async def active_export(db, user_id: str) -> Optional[dict]:
+    return await db.summary_exports.find_one(
+        {"requested_by": user_id, "status": {"$in": list(ACTIVE_STATUSES)}}, _PUBLIC_FIELDS
+    )
+
+
+async def create_export(db, user: dict, meeting_ids: List[str], date_from: str, date_to: str,
+                        department: Optional[str], export_dir: Path) -> dict:
+    """Record a queued job for `meeting_ids` and start rendering it.
+    ValueError when the user already has one queued or running."""
+    job = {
+        "id": str(uuid.uuid4()),
+        "requested_by": user['id'],
+        "date_from": date_from,
+        "date_to": date_to,
+        "department": department,
+        "status": "queued",
+        "total": len(meeting_ids),
+        "done": 0,
+        "failed": 0,
+        "failures": [],
+        "size_bytes": None,
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "started_at": None,
+        "finished_at": None,
+        "expires_at": None,
+        "error": None,
+        "meeting_ids": meeting_ids,
+    }
+    try:
+        await db.summary_exports.insert_one(dict(job))
+    except DuplicateKeyError:
+        raise ValueError("An export is already in progress")
+    task = asyncio.create_task(run_export(db, job['id'], export_dir))
+    _tasks.add(task)
+    task.add_done_callback(_tasks.discard)
+    return export_view(job)
+
+
+_UNSAFE = re.compile(r"[^A-Za-z0-9._-]+")
+
+
+def _entry_name(meeting: dict, used: Set[str]) -> str:
+    title = _UNSAFE.sub("_", meeting.get('title') or 'Meeting').strip("_")[:80] or "Meeting"
+    stem = f"{meeting.get('meeting_date', '')}_{(meeting.get('start_time') or '00:00')[:5].replace(':', '-')}_{title}"
+    name = f"{stem}.pdf"
+    if name in used:
+        name = f"{stem}_{meeting['id'][:8]}.pdf"
+    used.add(name)
+    return name
+
+
+async def _summary_pdf(db, meeting: dict, scratch_dir: Path) -> Union[bytes, Path, None]:
+    """The meeting's PDF: bytes from the interactive cache when present,
+    otherwise rendered by a worker into a scratch file whose path is
+    returned. Export-only PDFs are not added to the interactive cache."""
+    cached = summary_cache.get(meeting['id'], meeting.get('version', 0))
+    if cached is not None:
+        return cached
+    data = await gather_summary_data(db, meeting['id'])
+    if not data:
+        return None
+    path = scratch_dir / f"{meeting['id']}.pdf"
+    await render_summary_pdf_file(data, str(path), pool="export")
+    return path
+
+
+def _add_to_archive(archive: zipfile.ZipFile, name: str, pdf: Union[bytes, Path]) -> None:
+    if isinstance(pdf, Path):
+        archive.write(pdf, name)
+        pdf.unlink()
+    else:
+        archive.writestr(name, pdf)
+
+
+async def run_export(db, job_id: str, export_dir: Path) -> None:
+    final_path = export_dir / f"{job_id}.zip"
+    part_path = export_dir / f"{job_id}.zip.part"
+    scratch_dir = export_dir / f"{job_id}.tmp"
+    slots = asyncio.Semaphore(pool_size("export"))
+
+    async def render(meeting: dict):
+        async with slots:
+            try:
+                return meeting, await _summary_pdf(db, meeting, scratch_dir), None
+            except Exception as e:
+                return meeting, None, str(e)
+
+    done, failures = 0, []
+    archive: Optional[zipfile.ZipFile] = None
+    renders: List[asyncio.Future] = []
+    # Everything, setup included, runs under the handler below: a job must
+    # never be left queued or running, or `active_export` would keep
+    # refusing its owner a new one.
+    try:
+        job = await db.summary_exports.find_one({"id": job_id}, {"_id": 0})
+        meetings = await db.meetings.find(
+            {"id": {"$in": job['meeting_ids']}}, _MEETING_FIELDS
+        ).sort([("meeting_date", 1), ("start_time", 1)]).to_list(None)
+        await db.summary_exports.update_one(
+            {"id": job_id},
+            {"$set": {"status": "running", "total": len(meetings),
+                      "started_at": datetime.now(timezone.utc).isoformat()}},
+        )
+        export_dir.mkdir(parents=True, exist_ok=True)
+        scratch_dir.mkdir(exist_ok=True)
+
+        last_flush = time.monotonic()
+        archive = zipfile.ZipFile(part_path, "w", compression=zipfile.ZIP_DEFLATED)
+        renders = [asyncio.ensure_future(render(m)) for m in meetings]
+        used_names: Set[str] = set()
+        for next_done in asyncio.as_completed(renders):
+            meeting, pdf, error = await next_done
+            if pdf is None:
+                failures.append({"meeting_id": meeting['id'], "error": error or "Meeting not found"})
+            else:
+                # Compression and disk I/O stay off the event loop.
+                await asyncio.to_thread(_add_to_archive, archive, _entry_name(meeting, used_names), pdf)
+                done += 1
+            if time.monotonic() - last_flush >= _PROGRESS_INTERVAL_SECONDS:
+                last_flush = time.monotonic()
+                await db.summary_exports.update_one(
+                    {"id": job_id}, {"$set": {"done": done, "failed": len(failures)}}
+                )
+        await asyncio.to_thread(archive.close)
+        part_path.replace(final_path)
+        shutil.rmtree(scratch_dir, ignore_errors=True)
+    except BaseException as e:
+        for pending in renders:
+            pending.cancel()
+        if archive is not None:
+            archive.close()
+        part_path.unlink(missing_ok=True)
+        shutil.rmtree(scratch_dir, ignore_errors=True)
+        logger.error("Summary export %s failed: %s", job_id, e)
+        await db.summary_exports.update_one(
+            {"id": job_id},
+            {"$set": {"status": "failed", "done": done, "failed": len(failures),
+                      "error": str(e) or type(e).__name__,
+                      "finished_at": datetime.now(timezone.utc).isoformat()}},
+        )
+        if isinstance(e, asyncio.CancelledError):
+            raise
+        return
+
+    finished = datetime.now(timezone.utc)
+    await db.summary_exports.update_one(
+        {"id": job_id},
+        {"$set": {
+            "status": "completed",
+            "done": done,
+            "failed": len(failures),
+            "failures": failures[:MAX_RECORDED_FAILURES],
+            "file_path": str(final_path),
+            "size_bytes": final_path.stat().st_size,
+            "finished_at": finished.isoformat(),
+            "expires_at": (finished + timedelta(hours=EXPORT_TTL_HOURS)).isoformat(),
+        }},
+    )
+    logger.info("Summary export %s: %d PDF(s), %d failed", job_id, done, len(failures))
+
+
+async def fail_interrupted_exports(db) -> int:
+    """Mark jobs left queued/running by a previous process as failed."""
+    result = await db.summary_exports.update_many(
+        {"status": {"$in": list(ACTIVE_STATUSES)}},
+        {"$set": {"status": "failed", "error": "Interrupted by a server restart",
+                  "finished_at": datetime.now(timezone.utc).isoformat()}},
+    )
+    return result.modified_count
+
+
+async def purge_expired_exports(db) -> int:
+    """Delete archives past their `expires_at`. Returns jobs expired."""
+    now_iso = datetime.now(timezone.utc).isoformat()
+    expired = await db.summary_exports.find(
+        {"status": "completed", "expires_at": {"$lt": now_iso}}, {"_id": 0, "id": 1, "file_path": 1}
+    ).to_list(None)
+    for job in expired:
+        if job.get('file_path'):
+            Path(job['file_path']).unlink(missing_ok=True)
+    if expired:
+        await db.summary_exports.update_many(
+            {"id": {"$in": [j['id'] for j in expired]}},
+            {"$set": {"status": "expired"}, "$unset": {"file_path": ""}},
+        )
+    return len(expired)
+
+
+async def cancel_running_exports() -> None:
+    """Cancel the export jobs of this process and wait until each has
+    recorded its failure, so they finish before the Mongo client closes."""
+    tasks = list(_tasks)
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
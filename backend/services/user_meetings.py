@@ -0,0 +1,200 @@
+"""
+Per-user meeting membership index (`user_meetings` collection).
+
+One row per (user, meeting) the user can see — as organizer, participant, or
+both — carrying the meeting fields the list and dashboard views filter and
+sort on:
+
+    user_id, meeting_id, meeting_date, start_time, status, role,
+    response_status, recurrence_type, recurrence_end_date
+
+The recurrence fields let the calendar find series that started before the
+requested window but still run inside it.
+
+`response_status` is None when the user organises the meeting but has no
+`meeting_participants` row (legacy/seeded data); `my_invites` relies on that.
+
+The rows are denormalised copies, so every write to `meetings` (date, start
+time, status) or `meeting_participants` (add, remove, respond) must go
+through one of the helpers below. They also invalidate the cached dashboard
+counters of every user whose row changed and keep the free/busy index
+(services/busy_index.py) in step with membership. `backfill_user_meetings` rebuilds the index
+from scratch and runs at startup when the collection is empty or holds rows
+written by an older `ROW_VERSION`.
+
+Every helper takes `db` explicitly so the scheduler and IMAP poller (which
+receive their database handle as an argument) can share them.
+"""
+from __future__ import annotations
+
+import logging
+from typing import Dict, Iterable, List, Optional
+
+from pymongo import UpdateOne
+
+from services import dashboard_stats
+from services.busy_index import rebuild_meeting_busy, refresh_member_busy, refresh_members_busy
+
+logger = logging.getLogger(__name__)
+
+# Meeting fields mirrored onto every membership row.
+MIRRORED_FIELDS = ("meeting_date", "start_time", "status", "recurrence_type", "recurrence_end_date")
+
+# Projection that fetches everything a membership row needs from `meetings`.
+MEMBERSHIP_PROJECTION = {"_id": 0, "id": 1, "organizer_id": 1, **{f: 1 for f in MIRRORED_FIELDS}}
+
+# Bump when the row shape changes so startup rebuilds the collection.
+ROW_VERSION = 2
+
+
+def _membership_row(meeting: dict, user_id: str, role: Optional[str], response_status: Optional[str]) -> Dict:
+    if user_id == meeting.get("organizer_id"):
+        role = "organizer"
+    row = {
+        "user_id": user_id,
+        "meeting_id": meeting["id"],
+        "role": role or "attendee",
+        "response_status": response_status,
+        "row_version": ROW_VERSION,
+    }
+    row.update({f: meeting.get(f) for f in MIRRORED_FIELDS})
+    return row
+
+
+def _upsert(row: Dict) -> UpdateOne:
+    return UpdateOne(
+        {"user_id": row["user_id"], "meeting_id": row["meeting_id"]},
+        {"$set": row},
+        upsert=True,
+    )
+
+
+async def ensure_user_meeting_indexes(db) -> None:
+    await db.user_meetings.create_index([("user_id", 1), ("meeting_id", 1)], unique=True)
+    await db.user_meetings.create_index([("user_id", 1), ("meeting_date", -1), ("start_time", -1)])
+    await db.user_meetings.create_index([("user_id", 1), ("status", 1), ("meeting_date", 1)])
+    await db.user_meetings.create_index([("user_id", 1), ("response_status", 1)])
+    await db.user_meetings.create_index("meeting_id")
+
+
+async def index_meeting_members(db, meeting: dict) -> None:
+    """(Re)write every membership row for `meeting` from its participant rows."""
+    participants = await db.meeting_participants.find(
+        {"meeting_id": meeting["id"]},
+        {"_id": 0, "user_id": 1, "role": 1, "response_status": 1},
+    ).to_list(None)
+    rows = [
+        _membership_row(meeting, p["user_id"], p.get("role"), p.get("response_status"))
+        for p in participants
+    ]
+    if meeting.get("organizer_id") and not any(r["user_id"] == meeting["organizer_id"] for r in rows):
+        rows.append(_membership_row(meeting, meeting["organizer_id"], "organizer", None))
+    if rows:
+        await db.user_meetings.bulk_write([_upsert(r) for r in rows], ordered=False)
+        dashboard_stats.invalidate_users(r["user_id"] for r in rows)
+    await rebuild_meeting_busy(db, meeting["id"])
+
+
+async def add_member(db, meeting: dict, user_id: str, role: Optional[str], response_status: Optional[str]) -> None:
+    await db.user_meetings.bulk_write(
+        [_upsert(_membership_row(meeting, user_id, role, response_status))]
+    )
+    dashboard_stats.invalidate_users([user_id])
+    await refresh_member_busy(db, meeting["id"], user_id)
+
+
+async def add_members(db, meeting: dict, members: Iterable[Dict]) -> None:
+    """Bulk `add_member`: `members` are dicts with user_id, role, response_status."""
+    rows = [
+        _membership_row(meeting, m["user_id"], m.get("role"), m.get("response_status"))
+        for m in members
+    ]
+    if not rows:
+        return
+    await db.user_meetings.bulk_write([_upsert(r) for r in rows], ordered=False)
+    user_ids = [r["user_id"] for r in rows]
+    dashboard_stats.invalidate_users(user_ids)
+    await refresh_members_busy(db, meeting["id"], user_ids)
+
+
+async def remove_member(db, meeting: dict, user_id: str) -> None:
+    """Drop the row, unless the user still organises the meeting."""
+    if user_id == meeting.get("organizer_id"):
+        await db.user_meetings.update_one(
+            {"user_id": user_id, "meeting_id": meeting["id"]},
+            {"$set": {"response_status": None}},
+        )
+    else:
+        await db.user_meetings.delete_one({"user_id": user_id, "meeting_id": meeting["id"]})
+    dashboard_stats.invalidate_users([user_id])
+    await refresh_member_busy(db, meeting["id"], user_id)
+
+
+async def set_member_response(db, meeting_id: str, user_id: str, response_status: str) -> None:
+    await db.user_meetings.update_one(
+        {"user_id": user_id, "meeting_id": meeting_id},
+        {"$set": {"response_status": response_status}},
+    )
+    dashboard_stats.invalidate_users([user_id])
+    await refresh_member_busy(db, meeting_id, user_id)
+
+
+async def sync_meeting_fields(db, meeting_id: str, changes: dict) -> None:
+    """Propagate date / start time / status changes to every member's row."""
+    mirrored = {k: v for k, v in changes.items() if k in MIRRORED_FIELDS}
+    if not mirrored:
+        return
+    members = await db.user_meetings.find(
+        {"meeting_id": meeting_id}, {"_id": 0, "user_id": 1}
+    ).to_list(None)
+    await db.user_meetings.update_many({"meeting_id": meeting_id}, {"$set": mirrored})
+    dashboard_stats.invalidate_users(m["user_id"] for m in members)
+
+
+async def needs_backfill(db) -> bool:
+    """True when the collection is empty or has rows from an older ROW_VERSION."""
+    if await db.user_meetings.estimated_document_count() == 0:
+        return True
+    stale = await db.user_meetings.find_one({"row_version": {"$ne": ROW_VERSION}}, {"_id": 1})
+    return stale is not None
+
+
+async def backfill_user_meetings(db, batch_size: int = 500) -> int:
+    """Rebuild the index for every meeting. Returns the number of meetings indexed."""
+    count = 0
+    batch: List[dict] = []
+    cursor = db.meetings.find({}, MEMBERSHIP_PROJECTION)
+    async for meeting in cursor:
+        batch.append(meeting)
+        if len(batch) >= batch_size:
+            count += await _backfill_batch(db, batch)
+            batch = []
+    if batch:
+        count += await _backfill_batch(db, batch)
+    dashboard_stats.clear()
+    logger.info("user_meetings backfill: indexed %d meeting(s)", count)
+    return count
+
+
+async def _backfill_batch(db, meetings: Iterable[dict]) -> int:
+    meetings = list(meetings)
+    by_id = {m["id"]: m for m in meetings}
+    participants = await db.meeting_participants.find(
+        {"meeting_id": {"$in": list(by_id)}},
+        {"_id": 0, "meeting_id": 1, "user_id": 1, "role": 1, "response_status": 1},
+    ).to_list(None)
+
+    rows: Dict[tuple, dict] = {}
+    for p in participants:
+        meeting = by_id[p["meeting_id"]]
+        rows[(p["user_id"], meeting["id"])] = _membership_row(
+            meeting, p["user_id"], p.get("role"), p.get("response_status")
+        )
+    for meeting in meetings:
+        key = (meeting.get("organizer_id"), meeting["id"])
+        if meeting.get("organizer_id") and key not in rows:
+            rows[key] = _membership_row(meeting, meeting["organizer_id"], "organizer", None)
+
+    if rows:
+        await db.user_meetings.bulk_write([_upsert(r) for r in rows.values()], ordered=False)
+    return len(meetings)
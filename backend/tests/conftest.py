@@ -0,0 +1,373 @@
+"""
+Shared fixtures for the backend unit tests.
+
+`make_db` builds a `FakeDB`, an in-memory stand-in for the Motor database,
+so the service tests run without MongoDB:
+
+    db = make_db(meetings=[{"id": "m1", ...}], users=[...])
+
+Collections are created on first use and keep their documents in `docs`.
+Every call is recorded in the database-wide `db.calls` list as
+`(collection, method, *args)`, so a test can pin the number of round-trips
+as well as the result.
+
+Queries understand equality (also on dotted paths and array members),
+`$in`, `$nin`, `$ne`, `$lt`, `$lte`, `$gt`, `$gte`, `$exists`, `$or`,
+`$and` and `$nor`. `$text` is not evaluated: every row matches, and a
+textScore sort orders by the rows' own `score` field. Updates understand
+`$set`, `$unset`, `$inc`, `$max` and `$setOnInsert`, with upserts seeded
+from the query's equality conditions. Unique indexes made with
+`create_index` (partial ones too) raise DuplicateKeyError like the server,
+so a test can build them with the service's own `ensure_*_indexes`.
+Pipelines are not evaluated: a test that aggregates sets the collection's
+`aggregate_rows(pipeline)` to return the result rows. Anything else
+unsupported raises NotImplementedError rather than quietly matching.
+"""
+import copy
+import operator
+from types import SimpleNamespace
+
+import pytest
+from pymongo import DeleteOne, InsertOne, ReturnDocument, UpdateMany, UpdateOne
+from pymongo.errors import DuplicateKeyError
+
+_MISSING = object()
+_ORDER = {"$lt": operator.lt, "$lte": operator.le, "$gt": operator.gt, "$gte": operator.ge}
+
+
+def _get(doc, path):
+    value = doc
+    for part in path.split("."):
+        if not isinstance(value, dict) or part not in value:
+            return _MISSING
+        value = value[part]
+    return value
+
+
+def _set(doc, path, value):
+    *parents, last = path.split(".")
+    for part in parents:
+        doc = doc.setdefault(part, {})
+    doc[last] = value
+
+
+def _unset(doc, path):
+    *parents, last = path.split(".")
+    for part in parents:
+        doc = doc.get(part)
+        if not isinstance(doc, dict):
+            return
+    doc.pop(last, None)
+
+
+def _equals(value, arg):
+    if value is _MISSING:
+        return arg is None
+    if isinstance(value, list) and not isinstance(arg, list):
+        return arg in value
+    return value == arg
+
+
+def _compare(op, value, arg):
+    if op == "$exists":
+        return (value is not _MISSING) == bool(arg)
+    if op == "$eq":
+        return _equals(value, arg)
+    if op == "$ne":
+        return not _equals(value, arg)
+    if op == "$in":
+        return any(_equals(value, a) for a in arg)
+    if op == "$nin":
+        return not any(_equals(value, a) for a in arg)
+    if op in _ORDER:
+        return value is not _MISSING and value is not None and _ORDER[op](value, arg)
+    raise NotImplementedError(f"FakeDB does not support the {op} query operator")
+
+
+def matches(doc, query):
+    """Whether `doc` satisfies the Mongo filter `query`."""
+    for key, cond in (query or {}).items():
+        if key == "$or":
+            ok = any(matches(doc, q) for q in cond)
+        elif key == "$and":
+            ok = all(matches(doc, q) for q in cond)
+        elif key == "$nor":
+            ok = not any(matches(doc, q) for q in cond)
+        elif key == "$text":
+            ok = True
+        elif key.startswith("$"):
+            raise NotImplementedError(f"FakeDB does not support the {key} query operator")
+        elif isinstance(cond, dict) and cond and all(op.startswith("$") for op in cond):
+            ok = all(_compare(op, _get(doc, key), arg) for op, arg in cond.items())
+        else:
+            ok = _equals(_get(doc, key), cond)
+        if not ok:
+            return False
+    return True
+
+
+def _project(doc, projection):
+    doc = copy.deepcopy(doc)
+    if not projection:
+        return doc
+    if projection.get("_id", 1) in (0, False):
+        doc.pop("_id", None)
+    fields = {k: v for k, v in projection.items() if k != "_id"}
+    included = {k.split(".")[0] for k, v in fields.items() if v not in (0, False)}
+    if included:
+        return {k: v for k, v in doc.items() if k in included or k == "_id"}
+    for key in fields:
+        _unset(doc, key)
+    return doc
+
+
+def _sort_key(value):
+    # Missing and null sort first, as in MongoDB.
+    return (0, "") if value is _MISSING or value is None else (1, value)
+
+
+class FakeCursor:
+    def __init__(self, docs, projection=None):
+        self._docs = docs
+        self._projection = projection
+
+    def sort(self, key, direction=1):
+        keys = key if isinstance(key, list) else [(key, direction)]
+        for field, order in reversed(keys):
+            if isinstance(order, dict):  # {"$meta": "textScore"}: best first
+                field, order = "score", -1
+            self._docs = sorted(self._docs, key=lambda d: _sort_key(_get(d, field)), reverse=order < 0)
+        return self
+
+    def skip(self, n):
+        self._docs = self._docs[n:]
+        return self
+
+    def limit(self, n):
+        if n:
+            self._docs = self._docs[:n]
+        return self
+
+    async def to_list(self, length=None):
+        length = len(self._docs) if length is None else length
+        page, self._docs = self._docs[:length], self._docs[length:]
+        return [_project(d, self._projection) for d in page]
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        if not self._docs:
+            raise StopAsyncIteration
+        return _project(self._docs.pop(0), self._projection)
+
+
+class FakeCollection:
+    def __init__(self, db, name, docs=()):
+        self.db = db
+        self.name = name
+        self.docs = [copy.deepcopy(d) for d in docs]
+        self.unique_indexes = []  # (fields, partial filter)
+
+    def _record(self, method, *args):
+        self.db.calls.append((self.name, method, *copy.deepcopy(args)))
+
+    def _matching(self, query):
+        return [d for d in self.docs if matches(d, query)]
+
+    def _check_unique(self, doc, ignore=None):
+        for fields, partial in self.unique_indexes:
+            if partial and not matches(doc, partial):
+                continue
+            key = [_get(doc, f) for f in fields]
+            for other in self.docs:
+                if other is ignore or (partial and not matches(other, partial)):
+                    continue
+                if [_get(other, f) for f in fields] == key:
+                    raise DuplicateKeyError(f"E11000 duplicate key error collection: {self.name}")
+
+    def _update_doc(self, doc, update, inserting=False):
+        """Apply `update` to `doc` in place; True when it changed."""
+        new = copy.deepcopy(doc)
+        for op, fields in update.items():
+            for path, value in fields.items():
+                current = _get(new, path)
+                if op == "$set":
+                    _set(new, path, copy.deepcopy(value))
+                elif op == "$unset":
+                    _unset(new, path)
+                elif op == "$inc":
+                    _set(new, path, (0 if current is _MISSING else current) + value)
+                elif op == "$max":
+                    if current is _MISSING or value > current:
+                        _set(new, path, value)
+                elif op == "$setOnInsert":
+                    if inserting:
+                        _set(new, path, copy.deepcopy(value))
+                else:
+                    raise NotImplementedError(f"FakeDB does not support the {op} update operator")
+        self._check_unique(new, ignore=doc)
+        changed = new != doc
+        doc.clear()
+        doc.update(new)
+        return changed
+
+    def _upsert(self, query, update):
+        doc = {}
+        for key, cond in query.items():
+            if not key.startswith("$") and not (isinstance(cond, dict) and any(k.startswith("$") for k in cond)):
+                _set(doc, key, copy.deepcopy(cond))
+        self._update_doc(doc, update, inserting=True)
+        self.docs.append(doc)
+        return doc
+
+    # -- reads -------------------------------------------------------------
+
+    def find(self, query=None, projection=None, **_kwargs):
+        self._record("find", query or {})
+        return FakeCursor(self._matching(query), projection)
+
+    async def find_one(self, query=None, projection=None, **_kwargs):
+        self._record("find_one", query or {})
+        found = self._matching(query)
+        return _project(found[0], projection) if found else None
+
+    async def count_documents(self, query, **_kwargs):
+        self._record("count_documents", query)
+        return len(self._matching(query))
+
+    async def estimated_document_count(self):
+        self._record("estimated_document_count")
+        return len(self.docs)
+
+    async def distinct(self, field, query=None, **_kwargs):
+        self._record("distinct", field, query or {})
+        values = []
+        for doc in self._matching(query):
+            value = _get(doc, field)
+            for v in value if isinstance(value, list) else [value]:
+                if v is not _MISSING and v not in values:
+                    values.append(v)
+        return values
+
+    def aggregate(self, pipeline, **_kwargs):
+        self._record("aggregate", pipeline)
+        return FakeCursor(self.aggregate_rows(pipeline))
+
+    def aggregate_rows(self, pipeline):
+        raise NotImplementedError("FakeDB does not run pipelines; set aggregate_rows on the collection")
+
+    # -- writes ------------------------------------------------------------
+
+    async def insert_one(self, doc, **_kwargs):
+        self._record("insert_one", doc)
+        doc = copy.deepcopy(doc)
+        self._check_unique(doc)
+        self.docs.append(doc)
+        return SimpleNamespace(inserted_id=doc.get("_id"))
+
+    async def insert_many(self, docs, ordered=True, **_kwargs):
+        self._record("insert_many", docs)
+        for doc in docs:
+            doc = copy.deepcopy(doc)
+            self._check_unique(doc)
+            self.docs.append(doc)
+        return SimpleNamespace(inserted_ids=[d.get("_id") for d in docs])
+
+    async def _update(self, query, update, upsert, many):
+        found = self._matching(query)
+        if not many:
+            found = found[:1]
+        modified = sum(self._update_doc(doc, update) for doc in found)
+        upserted_id = None
+        if not found and upsert:
+            upserted_id = self._upsert(query, update).get("_id")
+        return SimpleNamespace(matched_count=len(found), modified_count=modified, upserted_id=upserted_id)
+
+    async def update_one(self, query, update, upsert=False, **_kwargs):
+        self._record("update_one", query, update)
+        return await self._update(query, update, upsert, many=False)
+
+    async def update_many(self, query, update, upsert=False, **_kwargs):
+        self._record("update_many", query, update)
+        return await self._update(query, update, upsert, many=True)
+
+    async def find_one_and_update(self, query, update, projection=None, upsert=False,
+                                  return_document=ReturnDocument.BEFORE, **_kwargs):
+        self._record("find_one_and_update", query, update)
+        found = self._matching(query)
+        if not found:
+            if not upsert:
+                return None
+            doc = self._upsert(query, update)
+            return _project(doc, projection) if return_document == ReturnDocument.AFTER else None
+        before = _project(found[0], projection)
+        self._update_doc(found[0], update)
+        return _project(found[0], projection) if return_document == ReturnDocument.AFTER else before
+
+    async def delete_one(self, query, **_kwargs):
+        self._record("delete_one", query)
+        found = self._matching(query)[:1]
+        self.docs = [d for d in self.docs if not any(d is f for f in found)]
+        return SimpleNamespace(deleted_count=len(found))
+
+    async def delete_many(self, query, **_kwargs):
+        self._record("delete_many", query)
+        found = self._matching(query)
+        self.docs = [d for d in self.docs if not any(d is f for f in found)]
+        return SimpleNamespace(deleted_count=len(found))
+
+    async def bulk_write(self, requests, ordered=True, **_kwargs):
+        self._record("bulk_write", requests)
+        matched = modified = 0
+        for op in requests:
+            if isinstance(op, (UpdateOne, UpdateMany)):
+                result = await self._update(op._filter, op._doc, op._upsert, many=isinstance(op, UpdateMany))
+                matched += result.matched_count
+                modified += result.modified_count
+            elif isinstance(op, InsertOne):
+                doc = copy.deepcopy(op._doc)
+                self._check_unique(doc)
+                self.docs.append(doc)
+            elif isinstance(op, DeleteOne):
+                found = self._matching(op._filter)[:1]
+                self.docs = [d for d in self.docs if not any(d is f for f in found)]
+            else:
+                raise NotImplementedError(f"FakeDB does not support {type(op).__name__} in bulk_write")
+        return SimpleNamespace(matched_count=matched, modified_count=modified)
+
+    async def create_index(self, keys, unique=False, partialFilterExpression=None, name=None, **_kwargs):
+        fields = [keys] if isinstance(keys, str) else [k for k, _ in keys]
+        if unique:
+            self.unique_indexes.append((fields, partialFilterExpression))
+        return name or "_".join(f"{f}_1" for f in fields)
+
+
+class FakeDB:
+    def __init__(self, **collections):
+        self.calls = []
+        self._collections = {}
+        for name, docs in collections.items():
+            self._collections[name] = FakeCollection(self, name, docs)
+
+    def __getitem__(self, name):
+        if name not in self._collections:
+            self._collections[name] = FakeCollection(self, name)
+        return self._collections[name]
+
+    def __getattr__(self, name):
+        if name.startswith("_"):
+            raise AttributeError(name)
+        return self[name]
+
+    def __setattr__(self, name, value):
+        if name.startswith("_") or name == "calls":
+            object.__setattr__(self, name, value)
+        else:
+            self._collections[name] = value
+
+
+@pytest.fixture
+def make_db():
+    """`make_db(collection=[docs], ...)` -> a fresh FakeDB."""
+    return FakeDB
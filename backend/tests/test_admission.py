@@ -0,0 +1,78 @@
+"""
+Unit tests for utils/admission.py (concurrency limiter and token bucket).
+"""
+import asyncio
+import os
+import sys
+
+import pytest
+from fastapi import HTTPException
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from utils.admission import ConcurrencyLimiter, TokenBucket  # noqa: E402
+
+
+def _run(coro):
+    return asyncio.new_event_loop().run_until_complete(coro)
+
+
+def test_limiter_queues_then_rejects_with_retry_after():
+    async def scenario():
+        limiter = ConcurrencyLimiter("pdf", max_concurrent=1, max_queue=1, queue_timeout=5)
+        gate = asyncio.Event()
+
+        async def hold():
+            async with limiter.slot():
+                await gate.wait()
+
+        holder = asyncio.create_task(hold())
+        queued = asyncio.create_task(hold())
+        await asyncio.sleep(0)
+        assert (limiter.active, limiter.waiting) == (1, 1)
+
+        with pytest.raises(HTTPException) as exc:
+            await limiter.acquire()
+        assert exc.value.status_code == 503
+        assert exc.value.headers == {"Retry-After": "5"}
+
+        gate.set()
+        await asyncio.gather(holder, queued)
+        return limiter.snapshot()
+
+    snap = _run(scenario())
+    assert snap["active"] == 0 and snap["queued"] == 0
+    assert (snap["admitted"], snap["rejected_queue_full"]) == (2, 1)
+
+
+def test_limiter_times_out_queued_request():
+    async def scenario():
+        limiter = ConcurrencyLimiter("teams", max_concurrent=1, max_queue=4, queue_timeout=0.01)
+        await limiter.acquire()
+        with pytest.raises(HTTPException) as exc:
+            await limiter.acquire()
+        limiter.release()
+        # The slot is usable again and nothing leaked.
+        async with limiter.slot():
+            pass
+        return exc.value.status_code, limiter.snapshot()
+
+    status, snap = _run(scenario())
+    assert status == 503
+    assert (snap["active"], snap["queued"], snap["rejected_timeout"]) == (0, 0, 1)
+
+
+def test_token_bucket_is_per_key_and_refills():
+    now = [0.0]
+    bucket = TokenBucket("login", rate=1.0, burst=2, clock=lambda: now[0])
+
+    assert bucket.take("a") is None and bucket.take("a") is None
+    assert bucket.take("a") == pytest.approx(1.0)
+    assert bucket.take("b") is None
+
+    now[0] = 1.5
+    assert bucket.take("a") is None
+    with pytest.raises(HTTPException) as exc:
+        bucket.check("a")
+    assert exc.value.status_code == 429
+    assert exc.value.headers == {"Retry-After": "1"}
@@ -0,0 +1,84 @@
+"""
+Unit tests for the approval worklist helpers (services/approvals.py).
+
+Runs against the shared in-memory FakeDB (tests/conftest.py), which also
+records every write.
+"""
+import asyncio
+import os
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import services.approvals as approvals  # noqa: E402
+
+
+def _db(make_db, rows):
+    return make_db(
+        meeting_patients=rows,
+        meetings=[{"id": "m1", "title": "Tumour Board"}, {"id": "m2", "title": "Cardio"}],
+        patients=[{"id": f"p{i}", "first_name": f"P{i}"} for i in range(5)],
+        users=[{"id": "bob", "name": "Bob", "email": "bob@x.test"}, {"id": "cy", "name": "Cy", "email": "cy@x.test"}],
+    )
+
+
+def _writes(db, collection):
+    return [c[2] for c in db.calls if c[:2] == (collection, "update_many")]
+
+
+def _row(row_id, meeting_id, patient_id, added_by, organizer_id="org", status="pending"):
+    return {"id": row_id, "meeting_id": meeting_id, "patient_id": patient_id, "added_by": added_by,
+            "organizer_id": organizer_id, "approval_status": status}
+
+
+def _run(coro):
+    return asyncio.new_event_loop().run_until_complete(coro)
+
+
+def test_worklist_limit_is_not_used_up_by_cancelled_meetings(make_db):
+    db = _db(make_db, [{**_row(f"c{i}", "m3", "p1", "bob"), "created_at": f"2026-01-0{i + 1}"} for i in range(3)]
+             + [{**_row("r1", "m1", "p2", "cy"), "created_at": "2026-02-01"}])
+    db.meetings.docs += [{"id": "m3", "title": "Old board", "organizer_id": "org", "status": "cancelled"}]
+
+    items = _run(approvals.pending_approvals(db, "org", limit=2))
+    assert [i["id"] for i in items] == ["r1"]
+    assert items[0]["meeting_title"] == "Tumour Board" and items[0]["patient_name"] == "P2"
+
+
+def test_approve_rows_uses_one_write_and_reports_each_id(make_db):
+    db = _db(make_db, [
+        _row("r1", "m1", "p1", "bob"),
+        _row("r2", "m2", "p2", "bob"),
+        _row("r3", "m1", "p3", "cy", status="approved"),
+        _row("r4", "m9", "p4", "cy", organizer_id="someone-else"),
+    ])
+    outcome = _run(approvals.approve_rows(db, {"id": "org", "name": "Org"}, ["r1", "r2", "r3", "r4", "r1"]))
+
+    assert outcome["results"] == [
+        {"id": "r1", "status": "approved"},
+        {"id": "r2", "status": "approved"},
+        {"id": "r3", "status": "already_approved"},
+        {"id": "r4", "status": "not_found"},
+    ]
+    assert [r["id"] for r in outcome["approved"]] == ["r1", "r2"]
+    assert len(_writes(db, "meeting_patients")) == 1
+    assert {d["id"]: d["approval_status"] for d in db.meeting_patients.docs}["r4"] == "pending"
+    # One version bump for both meetings.
+    assert [sorted(w["id"]["$in"]) for w in _writes(db, "meetings")] == [["m1", "m2"]]
+
+
+def test_notify_adders_sends_one_summary_per_adder(monkeypatch, make_db):
+    sent = []
+    monkeypatch.setattr(approvals, "send_email", lambda **kw: sent.append((kw["to_email"], kw["subject"])))
+    approved = [
+        _row("r1", "m1", "p1", "bob"),
+        _row("r2", "m2", "p2", "bob"),
+        _row("r3", "m1", "p3", "cy"),
+        _row("r4", "m1", "p4", "org"),  # organizer's own addition: no email
+    ]
+    _run(approvals.notify_adders(_db(make_db, []), approved, {"id": "org", "name": "Org"}, "https://app.test"))
+
+    assert sorted(sent) == [
+        ("bob@x.test", "2 patient additions approved"),
+        ("cy@x.test", "1 patient addition approved"),
+    ]
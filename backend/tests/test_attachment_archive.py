@@ -0,0 +1,63 @@
+"""
+Unit tests for the streamed meeting ZIP (services/attachment_archive.py).
+
+The entry listing runs against the shared in-memory FakeDB (tests/conftest.py).
+"""
+import asyncio
+import io
+import os
+import sys
+import zipfile
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import services.attachment_archive as aa  # noqa: E402
+
+
+def _run(coro):
+    return asyncio.new_event_loop().run_until_complete(coro)
+
+
+def _file(id_, name, created, patient=None, doc_type=None, **extra):
+    return {"id": id_, "meeting_id": "m1", "original_name": name, "created_at": created,
+            "patient_id": patient, "department_document_type": doc_type, **extra}
+
+
+def test_entries_are_grouped_per_patient_and_document_type(make_db):
+    db = make_db(
+        file_attachments=[_file("f1", "ct.jpg", "2026-01-01", "p1", "Radiology"),
+         _file("f2", "report.pdf", "2026-01-02", "p1", "Pathology"),
+         _file("f3", "ct.jpg", "2026-01-03", "p1", "Radiology"),
+         _file("f4", "agenda.docx", "2026-01-04"),
+         _file("f5", "../../etc/passwd", "2026-01-05", "p2", "a/b")],
+        patients=[{"id": "p1", "first_name": "Jane", "last_name": "Doe", "patient_id_number": "MRN1"}],
+    )
+    paths = [path for path, _ in _run(aa.archive_entries(db, "m1"))]
+    assert paths == ["Doe_Jane_MRN1/Pathology/report.pdf", "Doe_Jane_MRN1/Radiology/ct.jpg",
+                     "Doe_Jane_MRN1/Radiology/ct (2).jpg", "Meeting/agenda.docx", "p2/a_b/_.._etc_passwd"]
+
+
+def test_archive_is_streamed_in_pieces_and_stores_compressed_formats(tmp_path, monkeypatch):
+    monkeypatch.setattr(aa, "UPLOAD_CHUNK_BYTES", 64 * 1024)
+    scan, notes = os.urandom(300_000), b"blood pressure 120/80\n" * 20_000
+    (tmp_path / "scan").write_bytes(scan)
+    (tmp_path / "notes").write_bytes(notes)
+    entries = [
+        ("P/Radiology/scan.jpg", _file("f1", "scan.jpg", "2026-01-01T09:00:00", file_path=str(tmp_path / "scan"))),
+        ("P/Lab/notes.txt", _file("f2", "notes.txt", "2026-01-01T09:00:00", file_path=str(tmp_path / "notes"))),
+        ("P/Lab/lost.txt", _file("f3", "lost.txt", "2026-01-01T09:00:00", file_path=str(tmp_path / "gone"))),
+    ]
+
+    async def collect():
+        return [piece async for piece in aa.stream_archive(None, tmp_path, entries)]
+
+    pieces = _run(collect())
+    assert len(pieces) > 5 and max(map(len, pieces)) < 2 * 64 * 1024  # never the whole file at once
+    archive = zipfile.ZipFile(io.BytesIO(b"".join(pieces)))
+    assert archive.testzip() is None
+    info = {i.filename: i for i in archive.infolist()}
+    assert info["P/Radiology/scan.jpg"].compress_type == zipfile.ZIP_STORED
+    assert info["P/Lab/notes.txt"].compress_type == zipfile.ZIP_DEFLATED
+    assert info["P/Lab/notes.txt"].compress_size < len(notes) // 10
+    assert archive.read("P/Radiology/scan.jpg") == scan and archive.read("P/Lab/notes.txt") == notes
+    assert "P/Lab/lost.txt" in archive.read(aa.MISSING_FILES_ENTRY).decode()
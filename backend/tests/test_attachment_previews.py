@@ -0,0 +1,151 @@
+"""
+Unit tests for background attachment previews (services/attachment_previews.py)
+and the bounded work queue behind them (utils/work_queue.py).
+
+Blob and attachment rows live in the shared in-memory FakeDB (tests/conftest.py).
+"""
+import asyncio
+import hashlib
+import io
+import os
+import sys
+
+import pytest
+from PIL import Image
+from reportlab.pdfgen import canvas
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import services.attachment_previews as ap  # noqa: E402
+import services.blob_storage as bs  # noqa: E402
+from utils.work_queue import WorkQueue  # noqa: E402
+
+
+@pytest.fixture(autouse=True)
+def _inline_pool(monkeypatch):
+    monkeypatch.setattr(bs, "_backends", {})
+    monkeypatch.delenv("STORAGE_BACKEND", raising=False)
+
+    async def run(fn, *args):
+        return fn(*args)
+
+    monkeypatch.setattr(ap._pool, "run", run)
+
+
+def _db(make_db, blobs, files):
+    return make_db(file_blobs=blobs, file_attachments=files)
+
+
+def _blob_row(db, sha):
+    return next(d for d in db.file_blobs.docs if d["sha256"] == sha)
+
+
+def _run(coro):
+    return asyncio.new_event_loop().run_until_complete(coro)
+
+
+def _pdf() -> bytes:
+    buf = io.BytesIO()
+    pdf = canvas.Canvas(buf)
+    pdf.drawString(100, 700, "Histology report")
+    pdf.showPage()
+    pdf.save()
+    return buf.getvalue()
+
+
+def _png(width, height) -> bytes:
+    buf = io.BytesIO()
+    Image.new("RGB", (width, height), "red").save(buf, "PNG")
+    return buf.getvalue()
+
+
+def _store(tmp_path, data, name, mime):
+    sha = hashlib.sha256(data).hexdigest()
+    path = tmp_path / bs.BLOB_DIR_NAME / bs.blob_key(sha)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(data)
+    return ({"sha256": sha, "storage": "local", "size": len(data)},
+            {"blob_id": sha, "original_name": name, "mime_type": mime})
+
+
+def test_previews_are_rendered_next_to_the_blob(tmp_path, make_db):
+    pdf_blob, pdf_row = _store(tmp_path, _pdf(), "report.pdf", "application/pdf")
+    png_blob, png_row = _store(tmp_path, _png(2000, 500), "scan.png", "image/png")
+    txt_blob, txt_row = _store(tmp_path, b"notes", "notes.txt", "text/plain")
+    db = _db(make_db, [pdf_blob, png_blob, txt_blob], [pdf_row, png_row, txt_row])
+
+    assert _run(ap.generate_preview(db, tmp_path, pdf_blob["sha256"])) == "ready"
+    assert _run(ap.generate_preview(db, tmp_path, png_blob["sha256"])) == "ready"
+    assert _run(ap.generate_preview(db, tmp_path, txt_blob["sha256"])) == "unsupported"
+    assert _run(ap.generate_preview(db, tmp_path, png_blob["sha256"])) is None  # already done
+
+    preview = _blob_row(db, png_blob["sha256"])["preview"]
+    assert (preview["width"], preview["height"]) == (512, 128)
+    source = ap.preview_source(db, tmp_path, _blob_row(db, png_blob["sha256"]))
+    assert source.path == tmp_path / bs.BLOB_DIR_NAME / bs.preview_key(png_blob["sha256"])
+    assert Image.open(source.path).format == "JPEG" and source.path.stat().st_size == preview["size"]
+    page = _blob_row(db, pdf_blob["sha256"])["preview"]
+    assert max(page["width"], page["height"]) == 512 and page["height"] > page["width"]  # portrait A4
+
+
+def test_pdfs_without_a_renderer_are_settled_until_one_is_installed(tmp_path, monkeypatch, make_db):
+    pdf_blob, pdf_row = _store(tmp_path, _pdf(), "report.pdf", "application/pdf")
+    db = _db(make_db, [pdf_blob], [pdf_row])
+    monkeypatch.setattr(ap, "_pdf_renderer_installed", lambda: False)
+    assert _run(ap.generate_preview(db, tmp_path, pdf_blob["sha256"])) == "unsupported"
+    assert _blob_row(db, pdf_blob["sha256"])["preview"]["status"] == "unsupported"
+    _run(ap.backfill_previews(db))
+    assert "preview" in _blob_row(db, pdf_blob["sha256"])
+
+    monkeypatch.setattr(ap, "_pdf_renderer_installed", lambda: True)
+    _run(ap.backfill_previews(db))
+    assert _run(ap.generate_preview(db, tmp_path, pdf_blob["sha256"])) == "ready"
+
+
+def test_unreadable_files_are_marked_failed_and_released_blobs_leave_nothing(tmp_path, make_db):
+    bad_blob, bad_row = _store(tmp_path, b"%PDF-not really", "broken.pdf", "application/pdf")
+    gone_blob, gone_row = _store(tmp_path, _png(64, 64), "scan.png", "image/png")
+    db = _db(make_db, [bad_blob, gone_blob], [bad_row, gone_row])
+    assert _run(ap.generate_preview(db, tmp_path, bad_blob["sha256"])) == "failed"
+    assert _blob_row(db, bad_blob["sha256"])["preview"]["status"] == "failed"
+
+    # Released while rendering: the conditional update misses and the preview is removed.
+    original = db.file_blobs.update_one
+
+    async def released(query, update):
+        await db.file_blobs.delete_one({"sha256": query["sha256"]})
+        return await original(query, update)
+
+    db.file_blobs.update_one = released
+    assert _run(ap.generate_preview(db, tmp_path, gone_blob["sha256"])) is None
+    assert not (tmp_path / bs.BLOB_DIR_NAME / bs.preview_key(gone_blob["sha256"])).exists()
+    assert not list((tmp_path / ".partial").iterdir())
+
+
+def test_work_queue_backlog_is_bounded_and_deduplicated():
+    seen = []
+
+    async def scenario():
+        gate = asyncio.Event()
+
+        async def handler(key):
+            await gate.wait()
+            seen.append(key)
+
+        queue = WorkQueue("test", handler, workers=1, max_backlog=2)
+        assert not queue.submit("a")  # not started
+        queue.start()
+        assert queue.submit("a")
+        await asyncio.sleep(0)  # the worker takes "a"
+        assert queue.submit("b") and queue.submit("c") and queue.submit("b")
+        assert not queue.submit("d") and not queue.has_room()
+        assert queue.submit("a")  # in progress: runs once more afterwards, on the same worker
+        gate.set()
+        await queue.join()
+        stats = queue.stats()
+        await queue.stop()
+        return stats
+
+    stats = _run(scenario())
+    assert seen == ["a", "a", "b", "c"]
+    assert stats["processed"] == 4 and stats["dropped"] == 2 and stats["backlog"] == 0
@@ -0,0 +1,107 @@
+"""
+Unit tests for attachment text extraction and search (services/attachment_text.py).
+
+Indexing and search run against the shared in-memory FakeDB (tests/conftest.py).
+"""
+import asyncio
+import io
+import os
+import sys
+
+import pytest
+from reportlab.pdfgen import canvas
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import services.attachment_text as tx  # noqa: E402
+import services.blob_storage as bs  # noqa: E402
+
+
+@pytest.fixture(autouse=True)
+def _inline_pool(monkeypatch):
+    monkeypatch.setattr(bs, "_backends", {})
+    monkeypatch.delenv("STORAGE_BACKEND", raising=False)
+    calls = []
+
+    async def run(fn, *args):
+        calls.append(args)
+        return fn(*args)
+
+    monkeypatch.setattr(tx._pool, "run", run)
+    return calls
+
+
+def _db(make_db, files, blobs):
+    return make_db(file_attachments=files, file_blobs=blobs)
+
+
+def _queries(db):
+    return [c[2] for c in db.calls if c[:2] == ("attachment_texts", "find")]
+
+
+def _run(coro):
+    return asyncio.new_event_loop().run_until_complete(coro)
+
+
+def _blob(tmp_path, sha, data):
+    path = tmp_path / bs.BLOB_DIR_NAME / bs.blob_key(sha)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(data)
+    return {"sha256": sha, "storage": "local", "size": len(data)}
+
+
+def test_pdf_and_plain_text_are_extracted_and_normalised(tmp_path):
+    buf = io.BytesIO()
+    pdf = canvas.Canvas(buf)
+    pdf.drawString(72, 700, "Invasive ductal carcinoma, HER2 nega-")
+    pdf.drawString(72, 686, "tive.")
+    pdf.showPage()
+    pdf.drawString(72, 700, "Margins   clear.")
+    pdf.save()
+    (tmp_path / "report.pdf").write_bytes(buf.getvalue())
+    assert tx.extract_text(str(tmp_path / "report.pdf"), "pdf", 1000) == (
+        "Invasive ductal carcinoma, HER2 negative. Margins clear.")
+
+    (tmp_path / "note.txt").write_bytes("Caf\xe9 au lait\x00 spots,\r\nfollow-\r\n  up in 3\tmonths".encode("cp1252"))
+    assert tx.extract_text(str(tmp_path / "note.txt"), "plain", 1000) == "Café au lait spots, followup in 3 months"
+    (tmp_path / "wide.txt").write_bytes("ﬁbrosis".encode("utf-16"))
+    assert tx.extract_text(str(tmp_path / "wide.txt"), "plain", 4) == "fibr"
+    assert tx.text_kind("scan.dcm", "application/dicom") is None and tx.text_kind("a.CSV", None) == "plain"
+
+
+def test_indexing_is_incremental_and_reads_each_blob_once(tmp_path, _inline_pool, make_db):
+    note = _blob(tmp_path, "a" * 64, b"Consult: suspected sarcoidosis")
+    image = _blob(tmp_path, "b" * 64, b"\x89PNG")
+    files = [
+        {"id": "f1", "blob_id": note["sha256"], "meeting_id": "m1", "patient_id": "p1", "original_name": "consult.txt", "mime_type": "text/plain"},
+        {"id": "f2", "blob_id": note["sha256"], "meeting_id": "m2", "patient_id": "p1", "original_name": "consult.txt", "mime_type": "text/plain"},
+        {"id": "f3", "blob_id": image["sha256"], "meeting_id": "m1", "patient_id": None, "original_name": "x.png", "mime_type": "image/png"},
+    ]
+    db = _db(make_db, files, [note, image])
+    assert _run(tx.index_blob(db, tmp_path, note["sha256"])) == 2
+    assert _run(tx.index_blob(db, tmp_path, image["sha256"])) == 1
+    assert _run(tx.index_blob(db, tmp_path, note["sha256"])) == 0
+    assert len(_inline_pool) == 1  # one extraction for both attachments, none for the image
+
+    db.file_attachments.docs.append({**files[0], "id": "f4", "meeting_id": "m3"})
+    assert _run(tx.index_blob(db, tmp_path, note["sha256"])) == 1 and len(_inline_pool) == 1
+    rows = {r["file_id"]: r for r in db.attachment_texts.docs}
+    assert rows["f4"]["text"] == "Consult: suspected sarcoidosis" and rows["f4"]["meeting_id"] == "m3"
+    assert rows["f3"]["status"] == "unsupported" and rows["f3"]["file_name"] == "x.png"
+
+
+def test_search_is_scoped_and_skips_deleted_attachments(make_db):
+    db = _db(make_db, [{"id": "f1"}], [])
+    text = "History. " * 20 + "Biopsy confirmed adenocarcinoma. " + "Plan. " * 20
+    db.attachment_texts.docs = [
+        {"file_id": "f1", "meeting_id": "m1", "patient_id": "p1", "file_name": "path.pdf", "text": text, "score": 1.5},
+        {"file_id": "gone", "meeting_id": "m1", "patient_id": "p1", "file_name": "old.pdf", "text": text, "score": 1.0},
+    ]
+    items = _run(tx.search_attachments(db, "biopsies", meeting_ids=["m1", "m2"], patient_id="p1"))
+    assert _queries(db)[-1] == {"$text": {"$search": "biopsies"}, "meeting_id": {"$in": ["m1", "m2"]},
+                                "patient_id": "p1"}
+    assert [i["file_id"] for i in items] == ["f1"]
+    assert items[0]["snippet"].startswith("…") and "Biopsy confirmed" in items[0]["snippet"]
+
+    _run(tx.search_attachments(db, "biopsy", meeting_ids=None, meeting_id="m1", limit=500))
+    assert _queries(db)[-1] == {"$text": {"$search": "biopsy"}, "meeting_id": "m1"}
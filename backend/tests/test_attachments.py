@@ -0,0 +1,313 @@
+"""
+Unit tests for streamed and resumable uploads (services/attachments.py).
+
+Rows live in the shared in-memory FakeDB (tests/conftest.py).
+"""
+import asyncio
+import hashlib
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import services.attachments as at  # noqa: E402
+import services.blob_storage as bs  # noqa: E402
+
+
+@pytest.fixture(autouse=True)
+def _fresh_backends(monkeypatch):
+    # Backends are created once per process; each test has its own UPLOAD_DIR.
+    monkeypatch.setattr(bs, "_backends", {})
+    monkeypatch.delenv("STORAGE_BACKEND", raising=False)
+
+
+async def _chunks(*parts, fail=False):
+    for part in parts:
+        yield part
+    if fail:
+        raise ConnectionError("client went away")
+
+
+def _run(coro):
+    return asyncio.new_event_loop().run_until_complete(coro)
+
+
+def _db(make_db):
+    """FakeDB with the real unique indexes, so a racing blob upsert hits
+    the same DuplicateKeyError as on the server."""
+    db = make_db()
+    _run(at.ensure_blob_indexes(db))
+    _run(at.ensure_upload_indexes(db))
+    return db
+
+
+def _blob_row(db, digest):
+    return next(d for d in db.file_blobs.docs if d["sha256"] == digest)
+
+
+def test_write_stream_hashes_and_enforces_limit(tmp_path, monkeypatch):
+    monkeypatch.setattr(at, "UPLOAD_CHUNK_BYTES", 4)
+    hasher = hashlib.sha256()
+    size = _run(at.write_stream(_chunks(b"abc", b"defgh", b"i"), tmp_path / "f", 9, hasher))
+
+    assert size == 9 and (tmp_path / "f").read_bytes() == b"abcdefghi"
+    assert hasher.hexdigest() == hashlib.sha256(b"abcdefghi").hexdigest()
+    with pytest.raises(at.UploadTooLarge):
+        _run(at.write_stream(_chunks(b"abc", b"defgh", b"ij"), tmp_path / "g", 9))
+
+
+def test_streamed_form_hands_on_the_file_and_keeps_the_fields(tmp_path):
+    body = (b'--xx\r\nContent-Disposition: form-data; name="patient_id"\r\n\r\np1\r\n'
+            b'--xx\r\nContent-Disposition: form-data; name="file"; filename="r\xc3\xa9sum\xc3\xa9.pdf"\r\n'
+            b'Content-Type: application/pdf\r\n\r\n' + b"%PDF" * 1000 + b'\r\n'
+            b'--xx\r\nContent-Disposition: form-data; name="file_type"\r\n\r\nreport\r\n--xx--\r\n')
+    form = at.StreamedForm("multipart/form-data; boundary=xx")
+    size = _run(at.write_stream(form.file_chunks(_chunks(*[body[i:i + 500] for i in range(0, len(body), 500)])),
+                                tmp_path / "f", 4000))
+    assert size == 4000 and (tmp_path / "f").read_bytes() == b"%PDF" * 1000
+    assert (form.filename, form.content_type) == ("résumé.pdf", "application/pdf")
+    assert form.fields == {"patient_id": "p1", "file_type": "report"}
+
+    # The limit trips mid-body, before the rest has been read.
+    late = _chunks(body[:300], body[300:], fail=True)
+    with pytest.raises(at.UploadTooLarge):
+        _run(at.write_stream(at.StreamedForm("multipart/form-data; boundary=xx").file_chunks(late), tmp_path / "g", 100))
+    with pytest.raises(ValueError):
+        at.StreamedForm("application/json")
+
+
+def test_concurrent_commits_store_the_upload_once(tmp_path, make_db):
+    db = _db(make_db)
+    session = _run(at.create_upload_session(db, tmp_path, "m1", "u1", "a.bin", None, 3, {}))
+
+    async def scenario():
+        await at.append_chunk(db, tmp_path, session, 0, _chunks(b"abc"))
+        fresh = await db.upload_sessions.find_one({"id": session["id"]})
+        return await asyncio.gather(at.commit_upload(db, tmp_path, fresh, "u1"),
+                                    at.commit_upload(db, tmp_path, fresh, "u1"), return_exceptions=True)
+
+    first, second = _run(scenario())
+    assert first["file_size"] == 3
+    assert isinstance(second, ValueError) and "already committed" in str(second)
+    assert len(db.file_attachments.docs) == 1
+
+
+def test_resumable_upload_survives_disconnect_and_commits(tmp_path, make_db):
+    db = _db(make_db)
+    meta = {"patient_id": "p1", "file_type": "imaging"}
+    session = _run(at.create_upload_session(db, tmp_path, "m1", "u1", "scan.bin", None, 10, meta))
+
+    with pytest.raises(ConnectionError):
+        _run(at.append_chunk(db, tmp_path, session, 0, _chunks(b"0123", fail=True)))
+    session = _run(db.upload_sessions.find_one({"id": session["id"]}))
+    assert session["received"] == 4  # bytes before the drop are kept
+
+    with pytest.raises(at.UploadOffsetMismatch):
+        _run(at.append_chunk(db, tmp_path, session, 0, _chunks(b"0123")))
+    with pytest.raises(at.UploadTooLarge):
+        _run(at.append_chunk(db, tmp_path, session, 4, _chunks(b"4567890")))
+    assert at.partial_path(tmp_path, session["id"]).stat().st_size == 4
+
+    assert _run(at.append_chunk(db, tmp_path, session, 4, _chunks(b"456", b"789"))) == 10
+    session = _run(db.upload_sessions.find_one({"id": session["id"]}))
+    with pytest.raises(ValueError):
+        _run(at.commit_upload(db, tmp_path, session, "u1", expected_sha256="0" * 64))
+
+    digest = hashlib.sha256(b"0123456789").hexdigest()
+    # The rejected chunk dropped the running hash, so commit re-hashes the file.
+    assert session["id"] not in at._hashers
+    record = _run(at.commit_upload(db, tmp_path, session, "u1", expected_sha256=digest))
+    assert record["sha256"] == digest and record["file_size"] == 10 and record["patient_id"] == "p1"
+    assert open(record["file_path"], "rb").read() == b"0123456789"
+    assert db.upload_sessions.docs == [] and not at.partial_path(tmp_path, session["id"]).exists()
+
+
+def test_identical_uploads_share_one_blob_until_the_last_reference_goes(tmp_path, make_db):
+    db = _db(make_db)
+    digest = hashlib.sha256(b"report").hexdigest()
+    records = []
+    for meeting in ("m1", "m2"):
+        src = tmp_path / f"{meeting}.tmp"
+        src.write_bytes(b"report")
+        records.append(_run(at.store_attachment(db, src, tmp_path, meeting, "report.pdf", "application/pdf",
+                                                6, digest, {}, "u1")))
+        assert not src.exists()
+
+    blob = at.blob_path(tmp_path, digest)
+    assert {r["file_path"] for r in records} == {str(blob)} and {r["blob_id"] for r in records} == {digest}
+    assert _blob_row(db, digest)["ref_count"] == 2
+
+    _run(at.delete_attachment_file(db, tmp_path, records[0]))
+    assert blob.read_bytes() == b"report"
+    _run(at.delete_attachment_file(db, tmp_path, records[1]))
+    assert not blob.exists() and db.file_blobs.docs == []
+
+
+def test_a_blob_being_deleted_by_another_replica_is_not_reused(tmp_path, monkeypatch, make_db):
+    # No shared in-process lock, as between two API replicas.
+    monkeypatch.setattr(at, "_blob_lock", lambda _sha: asyncio.Lock())
+    db = _db(make_db)
+    digest = hashlib.sha256(b"scan").hexdigest()
+    (tmp_path / "a.tmp").write_bytes(b"scan")
+    _run(at.acquire_blob(db, tmp_path, tmp_path / "a.tmp", digest, 4))
+    local = bs.storage_backend(db, tmp_path)
+    real_delete = local.delete
+
+    async def slow_delete(key):
+        await asyncio.sleep(0.2)  # replica B uploads the same file meanwhile
+        await real_delete(key)
+
+    monkeypatch.setattr(local, "delete", slow_delete)
+
+    async def scenario():
+        (tmp_path / "b.tmp").write_bytes(b"scan")
+        release = asyncio.create_task(at.release_blob(db, tmp_path, digest))
+        await asyncio.sleep(0.05)
+        assert _blob_row(db, digest)["state"] == at.BLOB_DELETING
+        blob = await at.acquire_blob(db, tmp_path, tmp_path / "b.tmp", digest, 4)
+        return await release, blob
+
+    deleted, blob = _run(scenario())
+    assert deleted and blob["ref_count"] == 1 and blob["state"] == at.BLOB_LIVE
+    assert at.blob_path(tmp_path, digest).read_bytes() == b"scan"  # B stored its own copy
+
+
+def test_accel_location_only_for_files_under_upload_dir(tmp_path, monkeypatch):
+    blob = at.blob_path(tmp_path, "ab" + "0" * 62)
+    assert at.accel_redirect_location(tmp_path, str(blob)) is None  # direct mode by default
+
+    monkeypatch.setenv("FILE_DOWNLOAD_MODE", "accel")
+    assert at.accel_redirect_location(tmp_path, str(blob)) == f"/_protected_uploads/blobs/ab/ab{'0' * 62}"
+    assert at.accel_redirect_location(tmp_path, str(tmp_path / "m1" / "a b.pdf")) == "/_protected_uploads/m1/a%20b.pdf"
+    assert at.accel_redirect_location(tmp_path, "/etc/passwd") is None
+
+
+class _MemoryStorage(bs.BlobStorage):
+    name = "s3"
+    supports_presigned_urls = True
+
+    def __init__(self):
+        self.objects = {}
+
+    async def exists(self, key):
+        return key in self.objects
+
+    async def size(self, key):
+        return len(self.objects[key]) if key in self.objects else None
+
+    async def put_file(self, key, src_path):
+        self.objects[key] = src_path.read_bytes()
+        src_path.unlink()
+
+    async def fetch_to(self, key, dest_path):
+        dest_path.write_bytes(self.objects[key])
+
+    async def read_range(self, key, start, end):
+        yield self.objects[key][start:end + 1]
+
+    async def delete(self, key):
+        self.objects.pop(key, None)
+
+    async def presigned_upload(self, key, sha256):
+        return {"url": f"https://store.example.com/{key}", "method": "PUT", "headers": {}}
+
+    async def checksum_sha256(self, key):
+        return None  # no stored checksum: commit has to hash the object itself
+
+    async def promote(self, src_key, key):
+        self.objects[key] = self.objects.pop(src_key)
+
+
+def test_a_backend_must_implement_the_whole_interface():
+    class Partial(bs.BlobStorage):
+        async def exists(self, key):
+            return False
+
+    with pytest.raises(TypeError, match="abstract"):
+        Partial()
+    _MemoryStorage()
+
+
+def test_every_backend_can_be_created(tmp_path, monkeypatch):
+    from motor.motor_asyncio import AsyncIOMotorClient
+
+    monkeypatch.setenv("S3_BUCKET", "attachments")
+    db = AsyncIOMotorClient("mongodb://127.0.0.1:1", connect=False)["hospital"]
+    for name in bs.STORAGE_BACKENDS:
+        assert bs.storage_backend(db, tmp_path, name).name == name
+
+
+class _GridBucket:
+    """The slice of AsyncIOMotorGridFSBucket (and its files collection)
+    that GridFSStorage uses."""
+
+    def __init__(self, files):
+        self.files = files
+
+    async def find_one(self, query, _proj=None):
+        return {"_id": query["_id"]} if query["_id"] in self.files else None
+
+    async def open_download_stream(self, key):
+        if key not in self.files:
+            raise bs.NoFile(key)
+        data = self.files[key]
+
+        class Out:
+            async def read(self, n):
+                nonlocal data
+                chunk, data = data[:n], data[n:]
+                return chunk
+        return Out()
+
+    def open_upload_stream_with_id(self, key, _filename):
+        parts, files = [], self.files
+
+        class In:
+            async def write(self, chunk):
+                parts.append(chunk)
+
+            async def close(self):
+                files[key] = b"".join(parts)
+
+            async def abort(self):
+                parts.clear()
+        return In()
+
+    async def delete(self, key):
+        if self.files.pop(key, None) is None:
+            raise bs.NoFile(key)
+
+
+def test_gridfs_promote_moves_the_staged_object(tmp_path):
+    storage = bs.GridFSStorage.__new__(bs.GridFSStorage)
+    storage.bucket = storage.files = _GridBucket({"incoming/u1": b"0123456789", "incoming/u2": b"0123456789"})
+
+    _run(storage.promote("incoming/u1", "ab/abc"))
+    assert storage.bucket.files == {"ab/abc": b"0123456789", "incoming/u2": b"0123456789"}
+    _run(storage.promote("incoming/u2", "ab/abc"))  # already there: the copy just goes
+    assert storage.bucket.files == {"ab/abc": b"0123456789"}
+
+
+def test_direct_upload_is_verified_before_it_enters_the_blob_store(tmp_path, monkeypatch, make_db):
+    store = _MemoryStorage()
+    monkeypatch.setitem(bs._backends, "s3", store)
+    monkeypatch.setenv("STORAGE_BACKEND", "s3")
+    db = _db(make_db)
+    digest = hashlib.sha256(b"0123456789").hexdigest()
+    session = _run(at.create_upload_session(db, tmp_path, "m1", "u1", "scan.bin", None, 10, {}, sha256=digest))
+    view = _run(at.session_view(db, tmp_path, session))
+    assert view["mode"] == "direct" and view["upload"]["url"].endswith(bs.staging_key(session["id"]))
+
+    with pytest.raises(ValueError, match="nothing has been uploaded"):
+        _run(at.commit_upload(db, tmp_path, session, "u1"))
+    store.objects[bs.staging_key(session["id"])] = b"9876543210"
+    with pytest.raises(ValueError, match="Checksum mismatch"):
+        _run(at.commit_upload(db, tmp_path, session, "u1"))
+
+    store.objects[bs.staging_key(session["id"])] = b"0123456789"
+    record = _run(at.commit_upload(db, tmp_path, session, "u1"))
+    assert record["sha256"] == digest and record["file_path"] is None
+    assert store.objects == {bs.blob_key(digest): b"0123456789"}
+    assert _blob_row(db, digest)["storage"] == "s3" and db.upload_sessions.docs == []
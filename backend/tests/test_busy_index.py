@@ -0,0 +1,70 @@
+"""
+Unit tests for the free/busy conflict check (services/busy_index.py).
+
+Runs against the shared in-memory FakeDB (tests/conftest.py), which
+evaluates the range query, so rows outside the bounds never reach the
+overlap arithmetic.
+"""
+import asyncio
+import os
+import sys
+from datetime import datetime, timedelta, timezone
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from services.busy_index import epoch_minutes, find_conflicts, session_intervals  # noqa: E402
+
+
+def _utc(*args):
+    return datetime(*args, tzinfo=timezone.utc)
+
+
+def _row(user_id, meeting_id, start, minutes=60):
+    return {
+        "user_id": user_id,
+        "meeting_id": meeting_id,
+        "start_min": epoch_minutes(start),
+        "end_min": epoch_minutes(start + timedelta(minutes=minutes)),
+    }
+
+
+def _run(coro):
+    return asyncio.new_event_loop().run_until_complete(coro)
+
+
+def test_session_intervals_use_organizer_timezone():
+    meeting = {"start_time": "09:00", "end_time": "10:30", "organizer_timezone": "America/New_York"}
+    [(start, end)] = session_intervals(meeting, ["2026-07-01"])
+    assert start == _utc(2026, 7, 1, 13, 0)
+    assert end - start == timedelta(minutes=90)
+
+
+def _queries(db):
+    return [c[2] for c in db.calls if c[:2] == ("busy_intervals", "find")]
+
+
+def test_overlaps_reported_per_user_and_back_to_back_ignored(make_db):
+    weekly = [(_utc(2026, 6, d, 9), _utc(2026, 6, d, 10)) for d in (1, 8, 15)]
+    db = make_db(busy_intervals=[
+        _row("a", "other", _utc(2026, 6, 8, 9, 30)),       # overlaps 2nd session
+        _row("b", "other", _utc(2026, 6, 15, 10, 0)),      # starts as 3rd ends
+        _row("b", "late", _utc(2026, 6, 1, 8, 0), 90),     # overlaps 1st session
+        _row("c", "other", _utc(2026, 6, 2, 9, 0)),        # different day
+    ])
+
+    conflicts = _run(find_conflicts(db, ["a", "b", "c"], weekly, exclude_meeting_id="self"))
+
+    assert sorted((c["user_id"], c["meeting_id"], c["requested_start"]) for c in conflicts) == [
+        ("a", "other", "2026-06-08T09:00:00+00:00"),
+        ("b", "late", "2026-06-01T09:00:00+00:00"),
+    ]
+    query = _queries(db)[0]
+    assert query["meeting_id"] == {"$ne": "self"}
+    assert query["start_min"]["$gte"] == epoch_minutes(_utc(2026, 5, 31, 9))
+
+
+def test_no_users_or_intervals_skips_query(make_db):
+    db = make_db(busy_intervals=[])
+    assert _run(find_conflicts(db, [], [(_utc(2026, 1, 1, 9), _utc(2026, 1, 1, 10))])) == []
+    assert _run(find_conflicts(db, ["a"], [])) == []
+    assert _queries(db) == []
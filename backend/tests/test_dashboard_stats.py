@@ -0,0 +1,96 @@
+"""
+Unit tests for the cached dashboard counters (services/dashboard_stats.py).
+
+The shared in-memory FakeDB (tests/conftest.py) records how often the
+`$facet` pipeline and the patient count reach the database, so the tests
+can check cache hits, invalidation and the local-midnight rollover without
+MongoDB.
+"""
+import asyncio
+import os
+import sys
+from datetime import datetime, timezone
+
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from services import dashboard_stats  # noqa: E402
+
+
+def _db(make_db):
+    """FakeDB whose user_meetings pipeline returns fixed `$facet` counts."""
+    db = make_db(patients=[{"id": f"p{i}", "is_active": i < 7} for i in range(9)])
+    db.user_meetings.aggregate_rows = lambda _pipeline: [{
+        "upcoming_meetings": [{"n": 3}],
+        "pending_invites": [],
+        "meetings_this_week": [{"n": 1}],
+    }]
+    return db
+
+
+def _pipelines(db):
+    return [c[2] for c in db.calls if c[:2] == ("user_meetings", "aggregate")]
+
+
+def _patient_counts(db):
+    return sum(1 for c in db.calls if c[:2] == ("patients", "count_documents"))
+
+
+@pytest.fixture(autouse=True)
+def _fresh_cache():
+    dashboard_stats.clear()
+    yield
+    dashboard_stats.clear()
+
+
+def _run(coro):
+    return asyncio.new_event_loop().run_until_complete(coro)
+
+
+def test_counts_are_cached_until_invalidated(make_db):
+    db = _db(make_db)
+    user = {"id": "u1", "timezone": "UTC"}
+
+    first = _run(dashboard_stats.get_user_dashboard_counts(db, user))
+    assert first == {"upcoming_meetings": 3, "pending_invites": 0, "meetings_this_week": 1}
+    _run(dashboard_stats.get_user_dashboard_counts(db, user))
+    assert len(_pipelines(db)) == 1
+
+    dashboard_stats.invalidate_users(["someone-else"])
+    _run(dashboard_stats.get_user_dashboard_counts(db, user))
+    assert len(_pipelines(db)) == 1
+
+    dashboard_stats.invalidate_users(["u1"])
+    _run(dashboard_stats.get_user_dashboard_counts(db, user))
+    assert len(_pipelines(db)) == 2
+
+
+def test_rollover_follows_user_timezone(make_db):
+    db = _db(make_db)
+    user = {"id": "u1", "timezone": "America/New_York"}
+    # 03:00 UTC is still the previous evening in New York.
+    before = datetime(2030, 1, 8, 3, 0, tzinfo=timezone.utc)
+    after_utc_midnight = datetime(2030, 1, 8, 4, 0, tzinfo=timezone.utc)
+    after_local_midnight = datetime(2030, 1, 8, 5, 30, tzinfo=timezone.utc)
+
+    _run(dashboard_stats.get_user_dashboard_counts(db, user, now=before))
+    match = _pipelines(db)[0][1]["$facet"]["meetings_this_week"][0]["$match"]
+    assert match["meeting_date"] == {"$gte": "2030-01-07", "$lte": "2030-01-14"}
+
+    _run(dashboard_stats.get_user_dashboard_counts(db, user, now=after_utc_midnight))
+    assert len(_pipelines(db)) == 1
+
+    _run(dashboard_stats.get_user_dashboard_counts(db, user, now=after_local_midnight))
+    assert len(_pipelines(db)) == 2
+
+
+def test_patient_count_cached_and_invalidated(make_db):
+    db = _db(make_db)
+    assert _run(dashboard_stats.get_active_patient_count(db)) == 7
+    _run(dashboard_stats.get_active_patient_count(db))
+    assert _patient_counts(db) == 1
+
+    dashboard_stats.invalidate_patient_count()
+    _run(dashboard_stats.get_active_patient_count(db))
+    assert _patient_counts(db) == 2
@@ -0,0 +1,58 @@
+"""Unit tests for the `?fields=` / `?expand=` helpers used by the read endpoints."""
+import pytest
+from fastapi import HTTPException
+
+from services.field_selection import (
+    MEETING_EXPANSIONS,
+    USER_SECRET_FIELDS,
+    build_projection,
+    parse_csv_param,
+    parse_expand,
+    strip_unrequested,
+)
+
+
+def test_parse_csv_param_trims_and_dedupes():
+    assert parse_csv_param(" title, meeting_date ,title,,") == ["title", "meeting_date"]
+    assert parse_csv_param(None) is None
+    assert parse_csv_param("") == []
+
+
+def test_expand_defaults_to_everything_when_absent():
+    assert parse_expand(None, MEETING_EXPANSIONS) == set(MEETING_EXPANSIONS)
+
+
+def test_empty_expand_opts_out_of_all_relations():
+    assert parse_expand("", MEETING_EXPANSIONS) == set()
+
+
+def test_unknown_expand_is_rejected():
+    with pytest.raises(HTTPException) as exc:
+        parse_expand("participants,bogus", MEETING_EXPANSIONS)
+    assert exc.value.status_code == 400
+    assert "bogus" in exc.value.detail
+
+
+def test_projection_includes_required_and_drops_secrets():
+    proj = build_projection(["name", "password_hash"], required=["id"], excluded=USER_SECRET_FIELDS)
+    assert proj == {"_id": 0, "name": 1, "id": 1}
+
+
+def test_full_projection_still_excludes_secrets():
+    assert build_projection(None, excluded=USER_SECRET_FIELDS) == {"_id": 0, "password_hash": 0}
+
+
+def test_projection_never_degrades_to_all_fields():
+    assert build_projection(["password_hash"], required=[], excluded=USER_SECRET_FIELDS) == {"_id": 0, "id": 1}
+
+
+def test_projection_drops_overlapping_and_invalid_paths():
+    proj = build_projection(["title.x", "title", "agenda.item", "a..b", "password_hash.salt"],
+                            required=["id", "id.sub"], excluded=USER_SECRET_FIELDS)
+    assert proj == {"_id": 0, "title": 1, "id": 1, "agenda.item": 1}
+
+
+def test_strip_unrequested_keeps_id_and_requested_keys():
+    doc = {"id": "m1", "title": "T", "organizer_id": "u1"}
+    assert strip_unrequested(dict(doc), ["title"], ["id", "organizer_id"]) == {"id": "m1", "title": "T"}
+    assert strip_unrequested(dict(doc), None, ["organizer_id"]) == doc
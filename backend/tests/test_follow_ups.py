@@ -0,0 +1,108 @@
+"""
+Unit tests for the decision follow-up helpers (services/follow_ups.py).
+
+Runs against the shared in-memory FakeDB (tests/conftest.py), which
+records every call, so the tests pin the query shapes and the number of
+round-trips as well as the results.
+"""
+import asyncio
+import os
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import services.follow_ups as fu  # noqa: E402
+
+
+def _db(make_db, decisions):
+    return make_db(
+        decision_logs=decisions,
+        meetings=[{"id": "m1", "title": "Tumour Board"}],
+        users=[{"id": "bob", "name": "Bob", "email": "bob@x.test"}, {"id": "cy", "name": "Cy", "email": None}],
+    )
+
+
+def _flagged(call):
+    """The ids a recorded `update_many` flagged, and its update."""
+    collection, method, query, update = call
+    assert (collection, method) == ("decision_logs", "update_many")
+    return sorted(query["id"]["$in"]), update
+
+
+def _decision(decision_id, doctor, due, priority="high"):
+    return {"id": decision_id, "meeting_id": "m1", "title": f"D {decision_id}", "responsible_doctor_id": doctor,
+            "follow_up_date": due, "priority": priority, "status": "pending"}
+
+
+def _run(coro):
+    loop = asyncio.new_event_loop()
+    try:
+        return loop.run_until_complete(coro)
+    finally:
+        loop.close()
+
+
+def test_worklist_query_and_keyset_cursor(make_db):
+    query = fu.follow_up_query("bob", due_to="2026-06-30", priorities=["high", "urgent"])
+    assert query == {
+        "responsible_doctor_id": "bob",
+        "follow_up_date": {"$gt": "", "$lte": "2026-06-30"},
+        "priority": {"$in": ["high", "urgent"]},
+        "status": {"$nin": ["completed", "cancelled"]},
+    }
+
+    db = _db(make_db, [_decision(f"d{i}", "bob", f"2026-06-0{i + 1}") for i in range(3)])
+    page = _run(fu.follow_up_page(db, "bob", limit=2))
+    assert [r["id"] for r in page["items"]] == ["d0", "d1"]
+    assert page["items"][0]["meeting_title"] == "Tumour Board"
+    assert fu.decode_cursor(page["next_cursor"]) == ("2026-06-02", "d1")
+
+    db.calls.clear()
+    _run(fu.follow_up_page(db, "bob", limit=2, cursor=page["next_cursor"]))
+    assert db.calls[0][2]["$or"] == [
+        {"follow_up_date": {"$gt": "2026-06-02"}},
+        {"follow_up_date": "2026-06-02", "id": {"$gt": "d1"}},
+    ]
+    assert fu.follow_up_date_reset({"follow_up_date": "2026-07-01"}) == {"overdue_alert_sent": False}
+    assert fu.follow_up_date_reset({"status": "completed"}) == {}
+
+
+def test_overdue_alerts_one_query_one_digest_per_doctor(monkeypatch, make_db):
+    sent = []
+    monkeypatch.setattr(fu, "send_email", lambda **kw: sent.append((kw["to_email"], kw["subject"])))
+    db = _db(make_db, [
+        _decision("d1", "bob", "2026-05-01"),
+        _decision("d2", "bob", "2026-05-03"),
+        _decision("d3", "cy", "2026-05-02"),  # no email address: flagged, not sent
+    ])
+    assert _run(fu.send_overdue_alerts(db, "https://app.test", today="2026-05-10")) == 3
+
+    assert [c[0] for c in db.calls if c[1] == "find"] == ["decision_logs", "users", "meetings"]
+    assert db.calls[0][2]["follow_up_date"] == {"$gt": "", "$lt": "2026-05-10"}
+    assert sent == [("bob@x.test", "2 overdue follow-ups")]
+    assert _flagged(db.calls[-1]) == (["d1", "d2", "d3"], {"$set": {"overdue_alert_sent": True}})
+
+
+def test_failed_digest_leaves_rows_for_the_next_tick(monkeypatch, make_db):
+    def fail(**_kw):
+        raise OSError("SMTP down")
+
+    monkeypatch.setattr(fu, "send_email", fail)
+    db = _db(make_db, [_decision("d1", "bob", "2026-05-01"), _decision("d3", "cy", "2026-05-02")])
+    assert _run(fu.send_overdue_alerts(db, "https://app.test", today="2026-05-10")) == 1
+    assert _flagged(db.calls[-1]) == (["d3"], {"$set": {"overdue_alert_sent": True}})
+
+
+def test_backfill_flags_only_rows_that_predate_the_flag(make_db):
+    db = _db(make_db, [
+        _decision("old1", "bob", "2026-05-01"),
+        _decision("old2", "cy", "2026-05-09"),
+        {**_decision("alerted", "bob", "2026-05-02"), "overdue_alert_sent": False},
+        _decision("future", "bob", "2026-05-10"),
+        _decision("undated", "bob", ""),
+    ])
+    assert _run(fu.backfill_overdue_alert_flags(db, today="2026-05-10")) == 2
+    _, _, query, update = db.calls[-1]
+    assert query["overdue_alert_sent"] == {"$exists": False}
+    assert query["follow_up_date"] == {"$gt": "", "$lt": "2026-05-10"}
+    assert update == {"$set": {"overdue_alert_sent": True}}
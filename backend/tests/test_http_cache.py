@@ -0,0 +1,125 @@
+"""Unit tests for the ETag / If-None-Match and Range helpers in utils.http_cache."""
+from datetime import datetime, timezone
+
+import pytest
+from fastapi import FastAPI, Request
+from fastapi.testclient import TestClient
+
+from utils.http_cache import (
+    RangeNotSatisfiable, canonical_list, etag_matches, file_response, http_date, make_etag,
+    modified_since, not_modified, parse_range,
+)
+
+
+def test_etag_is_stable_and_quoted():
+    a = make_etag("meeting", "m1", 3)
+    assert a == make_etag("meeting", "m1", 3)
+    assert a.startswith('"') and a.endswith('"')
+    assert a != make_etag("meeting", "m1", 4)
+
+
+def test_weak_comparison_accepts_w_prefix_and_lists():
+    tag = make_etag("x")
+    assert etag_matches(tag, tag)
+    assert etag_matches(f"W/{tag}", tag)
+    assert etag_matches(f'"other", {tag}', tag)
+    assert etag_matches("*", tag)
+    assert not etag_matches('"other"', tag)
+    assert not etag_matches(None, tag)
+
+
+def test_canonical_list_is_order_independent():
+    assert canonical_list({"b", "a"}) == canonical_list(["a", "b"]) == "a,b"
+    assert canonical_list(None) == "*"
+
+
+def test_not_modified_has_no_body_and_echoes_etag():
+    resp = not_modified('"abc"')
+    assert resp.status_code == 304
+    assert resp.headers["etag"] == '"abc"'
+    assert resp.body == b""
+
+
+def test_parse_range_forms():
+    assert parse_range("bytes=0-99", 1000) == (0, 99)
+    assert parse_range("bytes=900-", 1000) == (900, 999)
+    assert parse_range("bytes=-100", 1000) == (900, 999)
+    assert parse_range("bytes=990-5000", 1000) == (990, 999)
+    # Ignored: absent, malformed, multi-range -> whole file.
+    assert parse_range(None, 1000) is None
+    assert parse_range("items=0-1", 1000) is None
+    assert parse_range("bytes=0-1,5-6", 1000) is None
+    with pytest.raises(RangeNotSatisfiable):
+        parse_range("bytes=1000-", 1000)
+
+
+def test_modified_since_uses_second_resolution():
+    stamp = datetime(2026, 5, 1, 12, 0, 0, 500000, tzinfo=timezone.utc)
+    assert not modified_since(http_date(stamp), stamp)
+    assert modified_since("Thu, 30 Apr 2026 12:00:00 GMT", stamp)
+    assert modified_since("not a date", stamp)
+
+
+def test_file_response_serves_ranges_and_revalidates(tmp_path):
+    path = tmp_path / "scan.bin"
+    path.write_bytes(bytes(range(256)) * 4)
+    stamp = datetime(2026, 5, 1, tzinfo=timezone.utc)
+    app = FastAPI()
+
+    @app.get("/f")
+    async def serve(request: Request):
+        return file_response(request, str(path), 1024, '"abc"', stamp, filename="scan.bin")
+
+    client = TestClient(app)
+    full = client.get("/f")
+    assert full.status_code == 200 and len(full.content) == 1024
+    assert full.headers["accept-ranges"] == "bytes" and "immutable" in full.headers["cache-control"]
+
+    part = client.get("/f", headers={"Range": "bytes=10-19"})
+    assert part.status_code == 206 and part.content == path.read_bytes()[10:20]
+    assert part.headers["content-range"] == "bytes 10-19/1024"
+
+    assert client.get("/f", headers={"Range": "bytes=10-19", "If-Range": '"old"'}).status_code == 200
+    assert client.get("/f", headers={"Range": "bytes=2000-"}).status_code == 416
+    assert client.get("/f", headers={"If-None-Match": '"abc"'}).status_code == 304
+    assert client.get("/f", headers={"If-Modified-Since": http_date(stamp)}).status_code == 304
+    # If-None-Match takes precedence over If-Modified-Since.
+    assert client.get("/f", headers={"If-None-Match": '"x"', "If-Modified-Since": http_date(stamp)}).status_code == 200
+
+
+def test_file_response_hands_the_body_to_nginx_in_accel_mode(tmp_path):
+    stamp = datetime(2026, 5, 1, tzinfo=timezone.utc)
+    app = FastAPI()
+
+    @app.get("/f")
+    async def serve(request: Request):
+        return file_response(request, "/unused", 1024, '"abc"', stamp, filename="CT scan.pdf",
+                             media_type="application/pdf", accel_location="/_protected_uploads/blobs/ab/abc")
+
+    client = TestClient(app)
+    resp = client.get("/f", headers={"Range": "bytes=0-9"})
+    assert resp.status_code == 200 and resp.content == b""  # nginx handles the range
+    assert resp.headers["x-accel-redirect"] == "/_protected_uploads/blobs/ab/abc"
+    assert resp.headers["content-type"] == "application/pdf"
+    assert resp.headers["content-disposition"] == "attachment; filename*=utf-8''CT%20scan.pdf"
+    assert client.get("/f", headers={"If-None-Match": '"abc"'}).status_code == 304
+
+
+def test_every_file_response_falls_back_to_the_same_content_type(tmp_path):
+    stamp = datetime(2026, 5, 1, tzinfo=timezone.utc)
+    blob = tmp_path / "abc"
+    blob.write_bytes(b"0123456789")
+    app = FastAPI()
+
+    async def chunks(start, end):
+        yield b"0123456789"[start:end + 1]
+
+    @app.get("/{mode}")
+    async def serve(request: Request, mode: str):
+        return file_response(request, str(blob), 10, '"abc"', stamp, filename="scan",
+                             accel_location="/_protected_uploads/abc" if mode == "accel" else None,
+                             stream=chunks if mode == "stream" else None)
+
+    client = TestClient(app)
+    for mode in ("accel", "stream", "file"):
+        assert client.get(f"/{mode}").headers["content-type"] == "application/octet-stream"
@@ -0,0 +1,89 @@
+"""
+Unit tests for the batched writes in services/meeting_helpers.py (meeting
+creation, invites, agenda reorder).
+
+The shared in-memory FakeDB (tests/conftest.py) records every call, so
+the tests pin the number of round-trips:
+one insert per collection, one user lookup for all invites and one
+bulk_write per reorder.
+"""
+import asyncio
+import os
+import sys
+import tempfile
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+# core reads these at import time; the Motor client itself connects lazily.
+os.environ.setdefault("MONGO_URL", "mongodb://localhost:27017")
+os.environ.setdefault("DB_NAME", "test_meeting_create_batching")
+os.environ.setdefault("UPLOAD_DIR", tempfile.gettempdir())
+
+import services.meeting_helpers as mh  # noqa: E402
+
+
+def _run(coro):
+    return asyncio.new_event_loop().run_until_complete(coro)
+
+
+def test_meeting_and_children_are_inserted_with_one_call_per_collection(monkeypatch, make_db):
+    db = make_db()
+    monkeypatch.setattr(mh, "db", db)
+
+    async def _no_transactions(_db):
+        return False
+    monkeypatch.setattr(mh, "transactions_supported", _no_transactions)
+
+    meeting = SimpleNamespace(
+        participant_ids=[f"u{i}" for i in range(30)] + ["u0", "org"],
+        patient_ids=[f"p{i}" for i in range(20)],
+        agenda_items=[{"patient_id": f"p{i}", "mrn": str(i)} for i in range(20)],
+    )
+    invitees = _run(mh.insert_meeting_with_rows({"id": "m1"}, meeting, {"id": "org"}))
+
+    assert [(name, method, len(rows)) for name, method, rows in db.calls] == [
+        ("meetings", "insert_many", 1),
+        ("meeting_participants", "insert_many", 31),
+        ("meeting_patients", "insert_many", 20),
+        ("agenda_items", "insert_many", 20),
+    ]
+    assert invitees == [f"u{i}" for i in range(30)]
+    organizer = db.meeting_participants.docs[0]
+    assert (organizer["user_id"], organizer["role"], organizer["response_status"]) == ("org", "organizer", "accepted")
+    assert [a["order_index"] for a in db.agenda_items.docs] == list(range(20))
+
+
+def test_invites_use_a_single_user_lookup(monkeypatch, make_db):
+    users = [{"id": f"u{i}", "email": f"u{i}@x.test" if i != 2 else None} for i in range(4)]
+    db = make_db(users=users)
+    monkeypatch.setattr(mh, "db", db)
+    sent = []
+    monkeypatch.setattr(mh, "send_meeting_invite", lambda **kw: sent.append(kw["participant"]["id"]))
+
+    meeting_doc = {"id": "m1", "title": "Board", "meeting_date": "2026-06-01", "start_time": "09:00",
+                   "teams_join_url": "https://teams.test/j"}
+    _run(mh.send_meeting_invites(meeting_doc, ["u0", "u1", "u2", "u3"], {"id": "org"}))
+
+    assert [c for c in db.calls if c[0] == "users"] == [("users", "find", {"id": {"$in": ["u0", "u1", "u2", "u3"]}})]
+    assert sorted(sent) == ["u0", "u1", "u3"]
+
+
+def test_agenda_reorder_is_one_bulk_write_of_moved_items(monkeypatch, make_db):
+    current = {"a": 0, "b": 1, "c": 2, "d": 3}
+    db = make_db(agenda_items=[{"id": i, "meeting_id": "m1", "order_index": n} for i, n in current.items()],
+                 meetings=[{"id": "m1", "agenda_order_seq": 3, "version": 1}])
+    monkeypatch.setattr(mh, "db", db)
+
+    moved = _run(mh.apply_agenda_order("m1", ["a", "c", "b", "d"], current))
+
+    assert moved == 2
+    [(_, _, ops), (_, _, _, meeting_update)] = db.calls
+    assert [(op._filter["id"], op._doc["$set"]["order_index"]) for op in ops] == [("c", 1), ("b", 2)]
+    assert meeting_update == {"$max": {"agenda_order_seq": 4}, "$inc": {"version": 1}}
+    assert [(c[0], c[1]) for c in db.calls] == [("agenda_items", "bulk_write"), ("meetings", "update_one")]
+    assert [d["id"] for d in sorted(db.agenda_items.docs, key=lambda d: d["order_index"])] == ["a", "c", "b", "d"]
+    assert (db.meetings.docs[0]["agenda_order_seq"], db.meetings.docs[0]["version"]) == (4, 2)
+
+    db.calls.clear()
+    assert _run(mh.apply_agenda_order("m1", ["a", "b"], {"a": 0, "b": 1})) == 0
+    assert db.calls == []
@@ -0,0 +1,95 @@
+"""
+Unit tests for services/meeting_summary.py: batched data gathering, the
+version-keyed PDF cache and single-flight rendering.
+
+Data gathering runs against the shared in-memory FakeDB (tests/conftest.py).
+"""
+import asyncio
+import os
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import services.meeting_summary as ms  # noqa: E402
+
+
+def _db(make_db):
+    return make_db(**{
+        "meetings": [{"id": "m1", "title": "Board", "organizer_id": "org", "version": 7}],
+        "users": [{"id": u, "name": u.upper(), "role": "doctor"} for u in ("org", "u1", "u2")],
+        "meeting_participants": [{"meeting_id": "m1", "user_id": u, "response_status": "accepted"}
+                                 for u in ("org", "u1", "u2")],
+        "patients": [{"id": f"p{i}", "first_name": f"F{i}", "last_name": "L", "patient_id_number": f"MRN{i}",
+                      "date_of_birth": "1970-01-01"} for i in range(3)],
+        "meeting_patients": [{"meeting_id": "m1", "patient_id": f"p{i}"} for i in range(3)],
+        "agenda_items": [{"meeting_id": "m1", "title": t, "order_index": i, "patient_id": f"p{i}"}
+                         for i, t in [(2, "third"), (0, "first"), (1, "second")]],
+        "decision_logs": [{"meeting_id": "m1", "title": "Operate", "created_by": "u2",
+                           "created_at": "2026-04-06T12:00:00+00:00"}],
+        "meeting_decisions": [{"meeting_id": "m1", "title": "legacy, never read"}],
+    })
+
+
+def _run(coro):
+    return asyncio.new_event_loop().run_until_complete(coro)
+
+
+def test_gather_is_one_query_per_collection(make_db):
+    db = _db(make_db)
+    data = _run(ms.gather_summary_data(db, "m1"))
+
+    assert sorted(name for name, *_ in db.calls) == sorted([
+        "meetings", "meeting_participants", "meeting_patients", "agenda_items", "decision_logs",
+        "users", "patients",
+    ])
+    assert data["meeting_data"]["organizer_name"] == "ORG"
+    assert [p["name"] for p in data["participants"]] == ["ORG", "U1", "U2"]
+    assert [a["title"] for a in data["agenda_items"]] == ["first", "second", "third"]
+    assert data["agenda_items"][0]["patient_mrn"] == "MRN0"
+    assert [d["title"] for d in data["decisions"]] == ["Operate"]
+    assert data["decisions"][0]["decision_maker"] == "U2"
+    assert data["decisions"][0]["created_at"] == "April 06, 2026 at 12:00 PM"
+    assert all(p["age"] >= 56 for p in data["patients"])
+    assert _run(ms.gather_summary_data(db, "missing")) is None
+
+
+def test_cache_keeps_newest_version_and_respects_byte_budget():
+    cache = ms.SummaryPdfCache(max_bytes=10)
+    cache.put("m1", 1, b"aaaa")
+    cache.put("m1", 2, b"bbbb")
+    assert cache.get("m1", 1) is None and cache.get("m1", 2) == b"bbbb"
+
+    cache.put("m2", 1, b"cccc")
+    cache.get("m1", 2)
+    cache.put("m3", 1, b"dddd")  # over budget: evicts m2, the least recently used
+    assert cache.get("m2", 1) is None
+    assert cache.stats()["bytes"] == 8
+
+
+def test_concurrent_builds_share_one_render(monkeypatch, make_db):
+    renders = []
+
+    async def fake_render(data):
+        renders.append(data["meeting_data"]["id"])
+        await asyncio.sleep(0.01)
+        return b"%PDF-fake"
+
+    monkeypatch.setattr(ms, "render_summary_pdf", fake_render)
+    monkeypatch.setattr(ms, "summary_cache", ms.SummaryPdfCache(1024))
+
+    async def scenario():
+        db = _db(make_db)
+        return await asyncio.gather(*[ms.build_summary_pdf(db, "m1", 7) for _ in range(5)])
+
+    assert _run(scenario()) == [b"%PDF-fake"] * 5
+    assert renders == ["m1"]
+    assert ms.summary_cache.get("m1", 7) == b"%PDF-fake"
+
+
+def test_render_runs_in_the_process_pool(make_db):
+    data = _run(ms.gather_summary_data(_db(make_db), "m1"))
+    try:
+        pdf = _run(ms.render_summary_pdf(data))
+    finally:
+        ms.shutdown_render_pool()
+    assert pdf.startswith(b"%PDF")
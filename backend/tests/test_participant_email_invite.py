@@ -463,5 +463,32 @@ class TestParticipantCanAddParticipant:
         print("Existing participant can add new participant: PASS")
 
 
+class TestBulkAddParticipants:
+    """POST /api/meetings/{id}/participants:bulk"""
+
+    def test_bulk_add_reports_per_user_outcomes(self, auth_headers, future_meeting, test_user):
+        meeting_id = future_meeting["id"]
+        url = f"{BASE_URL}/api/meetings/{meeting_id}/participants:bulk"
+        payload = {"participants": [
+            {"user_id": test_user["id"], "role": "doctor"},
+            {"user_id": test_user["id"]},
+            {"user_id": f"missing-{uuid.uuid4().hex[:8]}"},
+        ]}
+
+        response = requests.post(url, json=payload, headers=auth_headers)
+        assert response.status_code == 200, response.text
+        data = response.json()
+        assert data["added"] == 1
+        assert [r["status"] for r in data["results"]] == ["added", "duplicate", "user_not_found"]
+
+        again = requests.post(url, json={"participants": [{"user_id": test_user["id"]}]}, headers=auth_headers)
+        assert again.json()["results"][0]["status"] == "already_participant"
+
+        meeting = requests.get(f"{BASE_URL}/api/meetings/{meeting_id}", headers=auth_headers).json()
+        roles = {p["user_id"]: p.get("role") for p in meeting.get("participants", [])}
+        assert roles.get(test_user["id"]) == "doctor"
+        print("Bulk add participants: PASS")
+
+
 if __name__ == "__main__":
     pytest.main([__file__, "-v", "--tb=short"])
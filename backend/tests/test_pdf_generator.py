@@ -0,0 +1,45 @@
+"""
+Unit tests for utils/pdf_generator.py large-document mode.
+"""
+import io
+import os
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import utils.pdf_generator as pg  # noqa: E402
+from reportlab.platypus import LongTable  # noqa: E402
+
+
+def _meeting(items):
+    meeting = {"title": "Review", "meeting_date": "2026-12-01", "start_time": "09:00", "end_time": "10:00",
+               "meeting_type": "video", "status": "completed", "organizer_name": "Org"}
+    patients = [{"first_name": f"P{i}", "last_name": "X", "patient_id_number": str(i)} for i in range(items)]
+    agenda = [{"title": f"Case {i}", "patient_name": f"P{i} X", "treatment_plan": "Plan\nline two"}
+              for i in range(items)]
+    decisions = [{"title": f"D{i}", "description": "Go"} for i in range(items // 2)]
+    return meeting, [{"name": "Org", "role": "doctor"}], patients, agenda, decisions
+
+
+def test_large_tables_are_chunked_long_tables_with_repeating_header():
+    rows = [[str(i)] for i in range(pg.TABLE_CHUNK_ROWS * 2 + 1)]
+    tables = pg._list_tables(["#"], rows, [72], "#3b6658", large=True)
+
+    assert [len(t._cellvalues) for t in tables] == [pg.TABLE_CHUNK_ROWS + 1] * 2 + [2]
+    assert all(isinstance(t, LongTable) and t.repeatRows == 1 for t in tables)
+    assert len(pg._list_tables(["#"], rows, [72], "#3b6658", large=False)) == 1
+
+
+def test_large_mode_writes_to_sink_and_is_chosen_automatically(monkeypatch):
+    seen = []
+    original = pg._agenda_flowables
+    monkeypatch.setattr(pg, "_agenda_flowables", lambda *a: seen.append(a[3]) or original(*a))
+
+    sink = io.BytesIO()
+    assert pg.generate_meeting_summary_pdf(*_meeting(pg.LARGE_DOCUMENT_THRESHOLD), output=sink) is None
+    assert sink.getvalue().startswith(b"%PDF")
+    assert set(seen) == {True}
+
+    seen.clear()
+    assert pg.generate_meeting_summary_pdf(*_meeting(3)).startswith(b"%PDF")
+    assert set(seen) == {False}
@@ -0,0 +1,88 @@
+"""
+Unit tests for the recurrence expansion engine (utils/recurrence.py).
+"""
+import os
+import sys
+from datetime import date
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from utils.recurrence import expand, is_recurring  # noqa: E402
+from utils.holiday_checker import holiday_dates_for_user  # noqa: E402
+
+
+def _dates(meeting, start, end, **kw):
+    return [str(d) for d in expand(meeting, start, end, **kw)]
+
+
+def test_one_time_only_inside_window():
+    m = {"meeting_date": "2026-01-15"}
+    assert _dates(m, date(2026, 1, 1), date(2026, 1, 31)) == ["2026-01-15"]
+    assert _dates(m, date(2026, 2, 1), date(2026, 2, 28)) == []
+    assert not is_recurring(m)
+
+
+def test_daily_respects_end_date_and_skip():
+    m = {"meeting_date": "2026-01-05", "recurrence_type": "daily", "recurrence_end_date": "2026-01-09"}
+    assert _dates(m, date(2026, 1, 1), date(2026, 2, 1), skip={date(2026, 1, 7)}) == [
+        "2026-01-05", "2026-01-06", "2026-01-08", "2026-01-09",
+    ]
+
+
+def test_weekly_on_chosen_weekday():
+    # 2026-01-01 is a Thursday; the series runs on Mondays.
+    m = {"meeting_date": "2026-01-01", "recurrence_type": "weekly",
+         "recurrence_day_of_week": "monday", "recurrence_end_date": "2026-02-01"}
+    assert _dates(m, date(2026, 1, 10), date(2026, 3, 1)) == ["2026-01-12", "2026-01-19", "2026-01-26"]
+
+
+def test_bi_weekly_anchored_on_first_occurrence():
+    m = {"meeting_date": "2026-01-05", "recurrence_type": "bi_weekly"}
+    assert _dates(m, date(2026, 1, 10), date(2026, 2, 20)) == ["2026-01-19", "2026-02-02", "2026-02-16"]
+
+
+def test_monthly_skips_short_months():
+    m = {"meeting_date": "2026-01-31", "recurrence_type": "monthly", "recurrence_day_of_month": 31}
+    assert _dates(m, date(2026, 1, 1), date(2026, 6, 30)) == ["2026-01-31", "2026-03-31", "2026-05-31"]
+
+
+def test_monthly_on_nth_and_last_weekday():
+    second_tuesday = {"meeting_date": "2026-01-01", "recurrence_type": "monthly_on",
+                      "recurrence_week_of_month": "second", "recurrence_day_of_week": "tuesday"}
+    assert _dates(second_tuesday, date(2026, 1, 1), date(2026, 4, 30)) == [
+        "2026-01-13", "2026-02-10", "2026-03-10", "2026-04-14",
+    ]
+    last_friday = {**second_tuesday, "recurrence_week_of_month": "last", "recurrence_day_of_week": "friday"}
+    assert _dates(last_friday, date(2026, 1, 1), date(2026, 4, 30)) == [
+        "2026-01-30", "2026-02-27", "2026-03-27", "2026-04-24",
+    ]
+
+
+def test_quarterly_and_yearly():
+    quarterly = {"meeting_date": "2026-01-15", "recurrence_type": "quarterly"}
+    assert _dates(quarterly, date(2026, 3, 1), date(2026, 12, 31)) == ["2026-04-15", "2026-07-15", "2026-10-15"]
+    leap = {"meeting_date": "2024-02-29", "recurrence_type": "yearly"}
+    assert _dates(leap, date(2024, 1, 1), date(2029, 1, 1)) == ["2024-02-29", "2028-02-29"]
+
+
+def test_holiday_dates_follow_user_preferences():
+    user = {"country": "US", "custom_holidays": [{"date": "2020-03-02", "name": "Retreat", "recurring": True}]}
+    assert holiday_dates_for_user(date(2026, 3, 1), date(2026, 3, 31), user) == {date(2026, 3, 2)}
+    assert holiday_dates_for_user(
+        date(2026, 3, 1), date(2026, 3, 31), {**user, "holiday_enforcement_enabled": False}
+    ) == set()
+
+
+def test_new_series_is_materialised_from_today_not_its_first_date(make_db):
+    import asyncio
+    from datetime import timedelta
+
+    from services.meeting_occurrences import materialize_series
+
+    today = date.today()
+    meeting = {"id": "m1", "meeting_date": str(today - timedelta(days=730)), "recurrence_type": "daily"}
+    db = make_db(meetings=[meeting])
+    count = asyncio.new_event_loop().run_until_complete(
+        materialize_series(db, meeting, today + timedelta(days=6), index_busy=False))
+    days = sorted(d["occurrence_date"] for d in db.meeting_occurrences.docs)
+    assert count == 7 and days[0] == str(today) and days[-1] == str(today + timedelta(days=6))
@@ -1,10 +1,9 @@
 """
 Unit tests for the scheduler's auto-complete behaviour.
 
-Uses an in-memory fake DB (minimal async stub) so the scheduler can run its
-logic without requiring a real MongoDB. This keeps the test fast and hermetic.
+Uses the shared in-memory FakeDB (tests/conftest.py) so the scheduler can run
+its logic without requiring a real MongoDB. This keeps the test fast and hermetic.
 """
-import asyncio
 import os
 import sys
 from datetime import datetime, timedelta, timezone
@@ -17,62 +16,8 @@ sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")
 from scheduler import _auto_complete_ended_meetings  # noqa: E402
 
 
-class _Cursor:
-    def __init__(self, docs):
-        self._docs = docs
-
-    async def to_list(self, _n):
-        return list(self._docs)
-
-
-class _Col:
-    """Minimal async collection stub supporting find() and update_one()."""
-
-    def __init__(self, docs=None):
-        self.docs = docs or []
-        self.updates = []  # (filter, update)
-
-    def find(self, filt, _proj=None):
-        def match(doc):
-            for k, v in filt.items():
-                if isinstance(v, dict) and "$in" in v:
-                    if doc.get(k) not in v["$in"]:
-                        return False
-                else:
-                    if doc.get(k) != v:
-                        return False
-            return True
-
-        return _Cursor([d for d in self.docs if match(d)])
-
-    async def find_one(self, filt, _proj=None):
-        for d in self.docs:
-            if all(d.get(k) == v for k, v in filt.items()):
-                return d
-        return None
-
-    async def update_one(self, filt, update):
-        self.updates.append((filt, update))
-        # Apply to the in-memory doc so subsequent find_one reflects it.
-        for d in self.docs:
-            ok = True
-            for k, v in filt.items():
-                if isinstance(v, dict) and "$in" in v:
-                    if d.get(k) not in v["$in"]:
-                        ok = False
-                        break
-                elif d.get(k) != v:
-                    ok = False
-                    break
-            if ok:
-                d.update(update.get("$set", {}))
-                break
-
-
-class _DB:
-    def __init__(self, meetings, users):
-        self.meetings = _Col(meetings)
-        self.users = _Col(users)
+def _db(make_db, meetings, users, occurrences=()):
+    return make_db(meetings=meetings, users=users, meeting_occurrences=occurrences)
 
 
 def _iso(dt):
@@ -80,7 +25,7 @@ def _iso(dt):
 
 
 @pytest.mark.asyncio
-async def test_auto_completes_past_meeting():
+async def test_auto_completes_past_meeting(make_db):
     """Meeting past end_time + grace should flip to completed."""
     os.environ["AUTO_COMPLETE_ENABLED"] = "true"
     os.environ["AUTO_COMPLETE_GRACE_MINUTES"] = "10"
@@ -89,7 +34,8 @@ async def test_auto_completes_past_meeting():
     ended = datetime.now(timezone.utc) - timedelta(minutes=30)
     d, t = _iso(ended)
 
-    db = _DB(
+    db = _db(
+        make_db,
         meetings=[{
             "id": "m1",
             "status": "scheduled",
@@ -107,14 +53,15 @@ async def test_auto_completes_past_meeting():
 
 
 @pytest.mark.asyncio
-async def test_does_not_complete_future_meeting():
+async def test_does_not_complete_future_meeting(make_db):
     """Meeting in the future must be left alone."""
     os.environ["AUTO_COMPLETE_ENABLED"] = "true"
 
     future = datetime.now(timezone.utc) + timedelta(hours=2)
     d, t = _iso(future)
 
-    db = _DB(
+    db = _db(
+        make_db,
         meetings=[{
             "id": "m2",
             "status": "scheduled",
@@ -132,14 +79,15 @@ async def test_does_not_complete_future_meeting():
 
 
 @pytest.mark.asyncio
-async def test_respects_disable_flag():
+async def test_respects_disable_flag(make_db):
     """When AUTO_COMPLETE_ENABLED=false, nothing happens."""
     os.environ["AUTO_COMPLETE_ENABLED"] = "false"
 
     ended = datetime.now(timezone.utc) - timedelta(hours=1)
     d, t = _iso(ended)
 
-    db = _DB(
+    db = _db(
+        make_db,
         meetings=[{
             "id": "m3",
             "status": "scheduled",
@@ -159,14 +107,15 @@ async def test_respects_disable_flag():
 
 
 @pytest.mark.asyncio
-async def test_skips_already_completed():
+async def test_skips_already_completed(make_db):
     """A meeting already completed should not be touched."""
     os.environ["AUTO_COMPLETE_ENABLED"] = "true"
 
     ended = datetime.now(timezone.utc) - timedelta(hours=2)
     d, t = _iso(ended)
 
-    db = _DB(
+    db = _db(
+        make_db,
         meetings=[{
             "id": "m4",
             "status": "completed",
@@ -184,13 +133,71 @@ async def test_skips_already_completed():
     assert "auto_completed" not in db.meetings.docs[0]
 
 
+@pytest.mark.asyncio
+async def test_recurring_series_completes_per_occurrence(make_db):
+    """An ended session is completed; the series itself stays scheduled."""
+    os.environ["AUTO_COMPLETE_ENABLED"] = "true"
+    os.environ["AUTO_COMPLETE_GRACE_MINUTES"] = "10"
+
+    ended = datetime.now(timezone.utc) - timedelta(minutes=30)
+    d, t = _iso(ended)
+    next_week = (ended + timedelta(days=7)).strftime("%Y-%m-%d")
+
+    db = _db(
+        make_db,
+        meetings=[{
+            "id": "r1",
+            "status": "scheduled",
+            "organizer_id": "u1",
+            "meeting_date": d,
+            "start_time": t,
+            "end_time": t,
+            "recurrence_type": "weekly",
+            "recurrence_end_date": next_week,
+            "occurrences_materialized_through": next_week,
+        }],
+        users=[{"id": "u1", "timezone": "UTC"}],
+        occurrences=[
+            {"id": f"r1:{d}", "meeting_id": "r1", "organizer_id": "u1", "occurrence_date": d,
+             "start_time": t, "end_time": t, "status": "scheduled"},
+            {"id": f"r1:{next_week}", "meeting_id": "r1", "organizer_id": "u1",
+             "occurrence_date": next_week, "start_time": t, "end_time": t, "status": "scheduled"},
+        ],
+    )
+
+    await _auto_complete_ended_meetings(db)
+    assert db.meetings.docs[0]["status"] == "scheduled"
+    assert [o["status"] for o in db.meeting_occurrences.docs] == ["completed", "scheduled"]
+
+    # A week later the last session ends and the series is completed too.
+    db.meeting_occurrences.docs[1]["occurrence_date"] = d
+    await _auto_complete_ended_meetings(db)
+    assert db.meetings.docs[0]["status"] == "completed"
+
+
+@pytest.mark.asyncio
+async def test_pages_through_every_meeting_with_one_timezone_query_per_page(monkeypatch, make_db):
+    """No cap on how many meetings one pass completes; organizer timezones
+    are loaded per page, not per meeting."""
+    import scheduler
+
+    os.environ["AUTO_COMPLETE_ENABLED"] = "true"
+    os.environ["AUTO_COMPLETE_GRACE_MINUTES"] = "10"
+    monkeypatch.setattr(scheduler, "AUTO_COMPLETE_PAGE_SIZE", 2)
+
+    d, t = _iso(datetime.now(timezone.utc) - timedelta(hours=2))
+    db = _db(
+        make_db,
+        meetings=[{"id": f"m{i}", "status": "scheduled", "organizer_id": f"u{i % 2}", "meeting_date": d,
+                   "start_time": t, "end_time": t, "recurrence_type": "none"} for i in range(5)],
+        users=[{"id": "u0", "timezone": "UTC"}, {"id": "u1", "timezone": "Not/AZone"}],
+    )
+
+    await _auto_complete_ended_meetings(db)
+    assert [m["status"] for m in db.meetings.docs] == ["completed"] * 5
+    assert sum(1 for c in db.calls if c[:2] == ("users", "find")) == 3
+
+
 if __name__ == "__main__":
-    # Manual runner for quick sanity.
-    async def _run():
-        await test_auto_completes_past_meeting()
-        await test_does_not_complete_future_meeting()
-        await test_respects_disable_flag()
-        await test_skips_already_completed()
-        print("All scheduler auto-complete tests PASSED")
-
-    asyncio.run(_run())
+    # Manual runner for quick sanity; pytest supplies the FakeDB fixture.
+    sys.exit(pytest.main(["-q", __file__]))
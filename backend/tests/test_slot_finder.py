@@ -0,0 +1,62 @@
+"""
+Unit tests for the common free-slot finder (services/slot_finder.py).
+"""
+import os
+import sys
+from datetime import date, datetime, timedelta, timezone
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from services.busy_index import epoch_minutes  # noqa: E402
+from services.slot_finder import find_common_slots, parse_hhmm  # noqa: E402
+
+NINE, FIVE = 9 * 60, 17 * 60
+
+
+def _busy(start, minutes):
+    return {"start_min": epoch_minutes(start), "end_min": epoch_minutes(start + timedelta(minutes=minutes))}
+
+
+def test_working_hours_are_converted_per_participant_timezone():
+    london = {"id": "a", "timezone": "Europe/London"}
+    new_york = {"id": "b", "timezone": "America/New_York"}
+    # Mon 2 Nov 2026: London 09-17 is 09-17 UTC, New York 09-17 is 14-22 UTC.
+    slots = find_common_slots([london, new_york], [], date(2026, 11, 2), date(2026, 11, 2),
+                              60, NINE, FIVE, organizer_timezone="Europe/London", limit=10)
+    assert [s["start_time"] for s in slots] == ["14:00", "15:00", "16:00"]
+    assert slots[0]["start"] == "2026-11-02T14:00:00+00:00"
+
+
+def test_busy_rows_holidays_and_weekends_are_skipped():
+    a = {"id": "a", "timezone": "UTC", "custom_holidays": [{"date": "2026-11-02", "name": "Leave"}]}
+    b = {"id": "b", "timezone": "UTC"}
+    busy = [_busy(datetime(2026, 11, 3, 9, tzinfo=timezone.utc), 100)]
+    # Sat 31 Oct .. Tue 3 Nov: weekend off, Monday is a's holiday, Tuesday starts busy.
+    slots = find_common_slots([a, b], busy, date(2026, 10, 31), date(2026, 11, 3),
+                              90, NINE, FIVE, limit=2)
+    assert [(s["meeting_date"], s["start_time"], s["end_time"]) for s in slots] == [
+        ("2026-11-03", "10:45", "12:15"),
+        ("2026-11-03", "12:15", "13:45"),
+    ]
+
+
+def test_not_before_and_full_calendar():
+    user = {"id": "a", "timezone": "UTC"}
+    now = datetime(2026, 11, 2, 15, 7, tzinfo=timezone.utc)
+    slots = find_common_slots([user], [], date(2026, 11, 2), date(2026, 11, 2),
+                              30, NINE, FIVE, not_before=now)
+    assert [s["start_time"] for s in slots] == ["15:15", "15:45", "16:15"]
+
+    booked = [_busy(datetime(2026, 11, 2, 0, tzinfo=timezone.utc), 24 * 60)]
+    assert find_common_slots([user], booked, date(2026, 11, 2), date(2026, 11, 2), 30, NINE, FIVE) == []
+
+
+def test_parse_hhmm():
+    assert parse_hhmm("08:30") == 510
+    assert parse_hhmm("24:00") == 1440
+    for bad in ("8", "25:00", "09:60", "x:y"):
+        try:
+            parse_hhmm(bad)
+        except ValueError:
+            continue
+        raise AssertionError(bad)
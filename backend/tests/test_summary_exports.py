@@ -0,0 +1,121 @@
+"""
+Unit tests for the bulk summary-PDF export runner (services/summary_exports.py).
+
+Rendering is replaced by a stub; the shared in-memory FakeDB
+(tests/conftest.py) keeps the job row so the tests can check the persisted
+progress and the ZIP written to disk.
+"""
+import asyncio
+import os
+import sys
+import tempfile
+import zipfile
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+# core reads these at import time; the Motor client itself connects lazily.
+os.environ.setdefault("MONGO_URL", "mongodb://localhost:27017")
+os.environ.setdefault("DB_NAME", "test_summary_exports")
+os.environ.setdefault("UPLOAD_DIR", tempfile.gettempdir())
+
+import services.summary_exports as se  # noqa: E402
+
+
+def _db(make_db, meetings):
+    return make_db(meetings=meetings,
+                   summary_exports=[{"id": "job1", "meeting_ids": [m["id"] for m in meetings], "status": "queued"}])
+
+
+def _job(db, job_id="job1"):
+    return next(j for j in db.summary_exports.docs if j["id"] == job_id)
+
+
+def test_export_zips_every_rendered_pdf_and_records_failures(monkeypatch, tmp_path, make_db):
+    meetings = [
+        {"id": "m1-aaaaaaaa", "title": "Tumour Board", "meeting_date": "2026-04-01", "start_time": "09:00"},
+        {"id": "m2-bbbbbbbb", "title": "Tumour Board", "meeting_date": "2026-04-01", "start_time": "09:00"},
+        {"id": "m3-cccccccc", "title": "Cardio / Review", "meeting_date": "2026-04-02", "start_time": "14:30"},
+        {"id": "m4-dddddddd", "title": "Broken", "meeting_date": "2026-04-03", "start_time": "08:00"},
+    ]
+
+    async def fake_pdf(_db, meeting, scratch_dir):
+        if meeting["title"] == "Broken":
+            raise RuntimeError("render failed")
+        await asyncio.sleep(0)
+        if meeting["id"].startswith("m3"):
+            # Rendered by a worker into a scratch file.
+            path = scratch_dir / f"{meeting['id']}.pdf"
+            path.write_bytes(f"%PDF {meeting['id']}".encode())
+            return path
+        return f"%PDF {meeting['id']}".encode()
+
+    monkeypatch.setattr(se, "_summary_pdf", fake_pdf)
+    db = _db(make_db, meetings)
+    asyncio.new_event_loop().run_until_complete(se.run_export(db, "job1", Path(tmp_path)))
+
+    job = _job(db)
+    assert (job["status"], job["total"], job["done"], job["failed"]) == ("completed", 4, 3, 1)
+    assert job["failures"] == [{"meeting_id": "m4-dddddddd", "error": "render failed"}]
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["job1.zip"]  # .part and scratch files gone
+    with zipfile.ZipFile(job["file_path"]) as archive:
+        names = sorted(archive.namelist())
+        assert archive.read("2026-04-02_14-30_Cardio_Review.pdf") == b"%PDF m3-cccccccc"
+    # Same title and slot: the second one gets an id suffix.
+    assert names[0] == "2026-04-01_09-00_Tumour_Board.pdf"
+    assert names[1].startswith("2026-04-01_09-00_Tumour_Board_m")
+    assert job["size_bytes"] == os.path.getsize(job["file_path"])
+    assert se.export_view(job)["download_url"] == "/api/exports/summaries/job1/download"
+    assert "file_path" not in se.export_view(job)
+
+
+def test_setup_errors_fail_the_job_instead_of_leaving_it_queued(tmp_path, make_db):
+    class _BrokenMeetings:
+        def find(self, _query, _proj=None):
+            raise ConnectionError("mongo unreachable")
+
+    db = _db(make_db, [])
+    db.meetings = _BrokenMeetings()
+    asyncio.new_event_loop().run_until_complete(se.run_export(db, "job1", Path(tmp_path)))
+
+    job = _job(db)
+    assert job["status"] == "failed" and job["error"] == "mongo unreachable"
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_cancelled_exports_record_their_failure_before_shutdown_returns(monkeypatch, tmp_path, make_db):
+    async def never(_db, _meeting, _scratch_dir):
+        await asyncio.sleep(3600)
+
+    monkeypatch.setattr(se, "_summary_pdf", never)
+    db = _db(make_db, [{"id": "m1", "title": "T", "meeting_date": "2026-04-01", "start_time": "09:00"}])
+
+    async def scenario():
+        task = asyncio.create_task(se.run_export(db, "job1", Path(tmp_path)))
+        se._tasks.add(task)
+        task.add_done_callback(se._tasks.discard)
+        await asyncio.sleep(0.05)
+        await se.cancel_running_exports()
+        return task
+
+    task = asyncio.new_event_loop().run_until_complete(scenario())
+    assert task.done() and _job(db)["status"] == "failed"
+
+
+def test_a_user_cannot_start_a_second_export_while_one_is_active(tmp_path, make_db):
+    db = _db(make_db, [])
+    _job(db)["requested_by"] = "u1"
+
+    async def scenario():
+        await se.ensure_export_indexes(db)
+        with pytest.raises(ValueError, match="already in progress"):
+            await se.create_export(db, {"id": "u1"}, ["m1"], "2026-04-01", "2026-04-30", None, Path(tmp_path))
+        assert not se._tasks
+        _job(db)["status"] = "completed"
+        view = await se.create_export(db, {"id": "u1"}, [], "2026-04-01", "2026-04-30", None, Path(tmp_path))
+        await asyncio.gather(*se._tasks)
+        return view
+
+    view = asyncio.new_event_loop().run_until_complete(scenario())
+    assert view["status"] == "queued" and _job(db, view["id"])["requested_by"] == "u1"
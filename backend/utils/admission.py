@@ -0,0 +1,192 @@
+"""
+Admission control for expensive endpoints.
+
+`ConcurrencyLimiter` caps how many requests of one endpoint class (PDF
+rendering, Teams link generation, bulk writes) run at once. Up to
+`max_queue` more wait for a slot for at most `queue_timeout` seconds. Any
+beyond that, and any that time out waiting, are turned away straight away
+with 503 + Retry-After, so a stampede on one feature cannot tie up the
+worker for the others:
+
+    async with PDF_ADMISSION.slot():
+        ...expensive part...
+
+`TokenBucket` is a per-key rate limiter (429 + Retry-After), used on login
+with the account email as the key.
+
+Limits are per process, which matches the single-uvicorn deployment.
+`ADMISSION_<CLASS>_CONCURRENCY` / `ADMISSION_<CLASS>_QUEUE` override the
+defaults of each class; `admission_metrics()` reports queue depths and
+rejection counts of every limiter.
+"""
+import asyncio
+import math
+import time
+from contextlib import asynccontextmanager
+from typing import Callable, Dict, Optional, Tuple
+
+from fastapi import HTTPException
+
+from utils.env import env_float, env_int
+
+DEFAULT_QUEUE_TIMEOUT_SECONDS = 10.0
+
+_LIMITERS: Dict[str, "ConcurrencyLimiter"] = {}
+_BUCKETS: Dict[str, "TokenBucket"] = {}
+
+
+def _retry_header(seconds: float) -> dict:
+    return {"Retry-After": str(max(1, math.ceil(seconds)))}
+
+
+class ConcurrencyLimiter:
+    """At most `max_concurrent` holders and `max_queue` waiters at a time."""
+
+    def __init__(self, name: str, max_concurrent: int, max_queue: int,
+                 queue_timeout: float = DEFAULT_QUEUE_TIMEOUT_SECONDS,
+                 retry_after: Optional[float] = None):
+        self.name = name
+        self.max_concurrent = max(1, max_concurrent)
+        self.max_queue = max(0, max_queue)
+        self.queue_timeout = queue_timeout
+        self.retry_after = retry_after if retry_after is not None else queue_timeout
+        self._sem = asyncio.Semaphore(self.max_concurrent)
+        self.active = 0
+        self.waiting = 0
+        self.admitted = 0
+        self.rejected = 0
+        self.timed_out = 0
+
+    def _reject(self, reason: str) -> HTTPException:
+        return HTTPException(
+            status_code=503,
+            detail=f"Too many {self.name} requests in progress ({reason}); please retry shortly",
+            headers=_retry_header(self.retry_after),
+        )
+
+    async def acquire(self) -> None:
+        if self._sem.locked():
+            if self.waiting >= self.max_queue:
+                self.rejected += 1
+                raise self._reject("queue full")
+            self.waiting += 1
+            try:
+                await asyncio.wait_for(self._sem.acquire(), self.queue_timeout)
+            except asyncio.TimeoutError:
+                self.timed_out += 1
+                raise self._reject("timed out waiting")
+            finally:
+                self.waiting -= 1
+        else:
+            await self._sem.acquire()
+        self.active += 1
+        self.admitted += 1
+
+    def release(self) -> None:
+        self.active -= 1
+        self._sem.release()
+
+    @asynccontextmanager
+    async def slot(self):
+        await self.acquire()
+        try:
+            yield
+        finally:
+            self.release()
+
+    def snapshot(self) -> dict:
+        return {
+            "max_concurrent": self.max_concurrent,
+            "max_queue": self.max_queue,
+            "active": self.active,
+            "queued": self.waiting,
+            "admitted": self.admitted,
+            "rejected_queue_full": self.rejected,
+            "rejected_timeout": self.timed_out,
+        }
+
+
+class TokenBucket:
+    """Per-key token buckets: `burst` tokens, refilled at `rate` per second."""
+
+    def __init__(self, name: str, rate: float, burst: int, max_keys: int = 10_000,
+                 clock: Callable[[], float] = time.monotonic):
+        self.name = name
+        self.rate = rate
+        self.burst = max(1, burst)
+        self.max_keys = max_keys
+        self._clock = clock
+        self._buckets: Dict[str, Tuple[float, float]] = {}
+        self.rejected = 0
+
+    def take(self, key: str) -> Optional[float]:
+        """Spend one token of `key`. Returns None when allowed, else the
+        seconds until a token is available."""
+        now = self._clock()
+        tokens, last = self._buckets.get(key, (float(self.burst), now))
+        tokens = min(float(self.burst), tokens + (now - last) * self.rate)
+        if tokens < 1:
+            self._buckets[key] = (tokens, now)
+            self.rejected += 1
+            return (1 - tokens) / self.rate
+        self._buckets[key] = (tokens - 1, now)
+        if len(self._buckets) > self.max_keys:
+            self._prune(now)
+        return None
+
+    def check(self, key: str) -> None:
+        """`take`, raising 429 + Retry-After when `key` is out of tokens."""
+        wait = self.take(key)
+        if wait is not None:
+            raise HTTPException(
+                status_code=429,
+                detail="Too many attempts; please wait before trying again",
+                headers=_retry_header(wait),
+            )
+
+    def _prune(self, now: float) -> None:
+        # Buckets that have refilled completely carry no state worth keeping.
+        full_after = self.burst / self.rate
+        for key, (_, last) in list(self._buckets.items()):
+            if now - last >= full_after:
+                del self._buckets[key]
+
+    def snapshot(self) -> dict:
+        return {
+            "rate_per_second": self.rate,
+            "burst": self.burst,
+            "tracked_keys": len(self._buckets),
+            "rejected": self.rejected,
+        }
+
+
+def endpoint_limiter(name: str, max_concurrent: int, max_queue: int) -> ConcurrencyLimiter:
+    """Registered limiter for endpoint class `name`, with env overrides."""
+    prefix = f"ADMISSION_{name.upper()}"
+    limiter = ConcurrencyLimiter(
+        name,
+        env_int(f"{prefix}_CONCURRENCY", max_concurrent),
+        env_int(f"{prefix}_QUEUE", max_queue),
+        env_float("ADMISSION_QUEUE_TIMEOUT_SECONDS", DEFAULT_QUEUE_TIMEOUT_SECONDS),
+    )
+    _LIMITERS[name] = limiter
+    return limiter
+
+
+def rate_limiter(name: str, per_minute: int, burst: int) -> TokenBucket:
+    """Registered token bucket `name`, with env overrides."""
+    prefix = f"RATE_LIMIT_{name.upper()}"
+    bucket = TokenBucket(
+        name,
+        env_int(f"{prefix}_PER_MINUTE", per_minute) / 60.0,
+        env_int(f"{prefix}_BURST", burst),
+    )
+    _BUCKETS[name] = bucket
+    return bucket
+
+
+def admission_metrics() -> dict:
+    return {
+        "endpoints": {name: limiter.snapshot() for name, limiter in _LIMITERS.items()},
+        "rate_limits": {name: bucket.snapshot() for name, bucket in _BUCKETS.items()},
+    }
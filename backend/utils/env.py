@@ -0,0 +1,22 @@
+"""
+Numeric settings read from the environment.
+
+An unset or unparsable variable falls back to the default instead of
+failing at import, so a typo in `.env` never takes the server down. The
+value is read on every call; callers that want it fixed read it once.
+"""
+import os
+
+
+def env_int(name: str, default: int) -> int:
+    try:
+        return int(os.environ.get(name, str(default)))
+    except ValueError:
+        return default
+
+
+def env_float(name: str, default: float) -> float:
+    try:
+        return float(os.environ.get(name, str(default)))
+    except ValueError:
+        return default
@@ -359,6 +359,54 @@ def validate_meeting_date_for_user(meeting_date: date, user: Dict) -> Dict:
     }
 
 
+def holiday_dates_for_user(start_date: date, end_date: date, user: Optional[Dict]) -> set:
+    """
+    Every date in [start_date, end_date] that validate_meeting_date_for_user
+    would reject for `user` — same rules, computed for a whole range at once.
+    """
+    checker = get_holiday_checker()
+    blocked = set()
+
+    def _add(date_str: Optional[str]):
+        try:
+            d = datetime.strptime(date_str, '%Y-%m-%d').date()
+        except (TypeError, ValueError):
+            return
+        if start_date <= d <= end_date:
+            blocked.add(d)
+
+    if not user:
+        if not checker.is_enforcement_enabled():
+            return blocked
+        for year in range(start_date.year, end_date.year + 1):
+            for h in checker.get_country_info().get('holidays', {}).get(str(year), []):
+                _add(h.get('date'))
+                _add(h.get('observed'))
+        return blocked
+
+    if user.get('holiday_enforcement_enabled') is False:
+        return blocked
+
+    for ch in user.get('custom_holidays') or []:
+        ch_date = ch.get('date')
+        if not ch_date:
+            continue
+        _add(ch_date)
+        if ch.get('recurring') and len(ch_date) >= 10:
+            for year in range(start_date.year, end_date.year + 1):
+                _add(f"{year}{ch_date[4:10]}")
+
+    enabled_names = set(user.get('enabled_default_holidays') or [])
+    if enabled_names:
+        country = checker.get_country_info(country_to_key(user.get('country', 'US')))
+        for year in range(start_date.year, end_date.year + 1):
+            for h in country.get('holidays', {}).get(str(year), []):
+                if h.get('name') in enabled_names:
+                    _add(h.get('date'))
+                    _add(h.get('observed'))
+    return blocked
+
+
 def _holiday_invalid(meeting_date: date, name: str, country: str, info: Dict = None) -> Dict:
     return {
         'valid': False,
@@ -0,0 +1,216 @@
+"""
+HTTP conditional-request helpers (ETag / If-None-Match, Range).
+
+Endpoints compute a cheap validator (e.g. a meeting's `version` counter) and
+ask `etag_matches` whether the client's cached copy is still current before
+doing any expensive work. On a match they return `not_modified(etag)`.
+
+Immutable files (attachments) go through `file_response`, which adds
+If-Modified-Since, If-Range and single byte-range (206) handling on top, or
+hands the transfer to nginx with X-Accel-Redirect.
+"""
+import hashlib
+import re
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from mimetypes import guess_type
+from typing import AsyncIterator, Callable, Iterable, Optional, Tuple
+from urllib.parse import quote
+
+import anyio
+from fastapi import Request, Response
+from fastapi.responses import FileResponse, StreamingResponse
+
+# Clients may keep a copy but must revalidate it on every use.
+REVALIDATE_CACHE_CONTROL = "private, no-cache"
+# Content that never changes under its URL (e.g. an attachment id).
+IMMUTABLE_CACHE_CONTROL = "private, max-age=31536000, immutable"
+
+_RANGE_RE = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+
+def make_etag(*parts, weak: bool = False) -> str:
+    """Build a quoted entity tag from `parts` (hashed so it stays short)."""
+    raw = "|".join("" if p is None else str(p) for p in parts)
+    digest = hashlib.sha1(raw.encode("utf-8")).hexdigest()[:20]
+    return f'W/"{digest}"' if weak else f'"{digest}"'
+
+
+def _opaque(tag: str) -> str:
+    tag = tag.strip()
+    return tag[2:] if tag.startswith("W/") else tag
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Weak comparison of an `If-None-Match` header against `etag` (RFC 9110 §13.1.2)."""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    wanted = _opaque(etag)
+    return any(_opaque(candidate) == wanted for candidate in if_none_match.split(","))
+
+
+def not_modified(etag: str, cache_control: str = REVALIDATE_CACHE_CONTROL, extra: Optional[dict] = None) -> Response:
+    headers = {"ETag": etag, "Cache-Control": cache_control}
+    if extra:
+        headers.update(extra)
+    return Response(status_code=304, headers=headers)
+
+
+def canonical_list(values: Optional[Iterable[str]]) -> str:
+    """Stable string form of a list/set query option for use inside an ETag."""
+    if values is None:
+        return "*"
+    return ",".join(sorted(values))
+
+
+def http_date(value: datetime) -> str:
+    return format_datetime(value.astimezone(timezone.utc).replace(microsecond=0), usegmt=True)
+
+
+def modified_since(if_modified_since: Optional[str], last_modified: datetime) -> bool:
+    """False only when `If-Modified-Since` is a valid date not older than
+    `last_modified` (compared at one-second resolution)."""
+    if not if_modified_since:
+        return True
+    try:
+        since = parsedate_to_datetime(if_modified_since)
+    except (TypeError, ValueError):
+        return True
+    if since.tzinfo is None:
+        since = since.replace(tzinfo=timezone.utc)
+    return last_modified.replace(microsecond=0) > since
+
+
+class RangeNotSatisfiable(Exception):
+    pass
+
+
+def parse_range(header: Optional[str], size: int) -> Optional[Tuple[int, int]]:
+    """The (start, end) byte positions, inclusive, of a single-range `Range`
+    header. None means "send the whole file": no header, a malformed one,
+    or several ranges (which we are allowed to ignore). Raises
+    RangeNotSatisfiable when the range lies outside the file."""
+    if not header:
+        return None
+    match = _RANGE_RE.match(header.strip())
+    if not match or match.group(1) == match.group(2) == "":
+        return None
+    first, last = match.groups()
+    if first == "":
+        length = int(last)  # suffix range: the last N bytes
+        if length == 0:
+            raise RangeNotSatisfiable()
+        return max(size - length, 0), size - 1
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start >= size or end < start:
+        raise RangeNotSatisfiable()
+    return start, end
+
+
+class _PartialFileResponse(FileResponse):
+    """206 response carrying bytes `start`..`end` of a file."""
+
+    def __init__(self, path, start: int, end: int, size: int, **kwargs):
+        super().__init__(path, status_code=206, **kwargs)
+        self.start, self.end = start, end
+        self.headers["content-range"] = f"bytes {start}-{end}/{size}"
+        self.headers["content-length"] = str(end - start + 1)
+
+    async def __call__(self, scope, receive, send) -> None:
+        await send({"type": "http.response.start", "status": self.status_code, "headers": self.raw_headers})
+        remaining = self.end - self.start + 1
+        async with await anyio.open_file(self.path, mode="rb") as file:
+            await file.seek(self.start)
+            while remaining > 0:
+                chunk = await file.read(min(self.chunk_size, remaining))
+                if not chunk:
+                    break
+                remaining -= len(chunk)
+                await send({"type": "http.response.body", "body": chunk, "more_body": remaining > 0})
+        if remaining > 0:  # file shrank underneath us
+            await send({"type": "http.response.body", "body": b"", "more_body": False})
+
+
+def content_disposition(filename: str, disposition: str = "attachment") -> str:
+    """Same encoding as Starlette's FileResponse."""
+    quoted = quote(filename)
+    if quoted != filename:
+        return f"{disposition}; filename*=utf-8''{quoted}"
+    return f'{disposition}; filename="{filename}"'
+
+
+def _aware(value: datetime) -> datetime:
+    return value if value.tzinfo else value.replace(tzinfo=timezone.utc)
+
+
+def conditional_response(request: Request, etag: str, last_modified: datetime,
+                         cache_control: str = IMMUTABLE_CACHE_CONTROL) -> Optional[Response]:
+    """304 if the client's copy is current (If-None-Match, or without it
+    If-Modified-Since), else None."""
+    last_modified = _aware(last_modified)
+    validators = {"ETag": etag, "Last-Modified": http_date(last_modified)}
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        if etag_matches(if_none_match, etag):
+            return not_modified(etag, cache_control, validators)
+    elif not modified_since(request.headers.get("if-modified-since"), last_modified):
+        return not_modified(etag, cache_control, validators)
+    return None
+
+
+def file_response(request: Request, path: Optional[str], size: int, etag: str, last_modified: datetime,
+                  filename: Optional[str] = None, media_type: Optional[str] = None,
+                  cache_control: str = IMMUTABLE_CACHE_CONTROL, accel_location: Optional[str] = None,
+                  stream: Optional[Callable[[int, int], AsyncIterator[bytes]]] = None) -> Response:
+    """Serve an immutable file with conditional-GET and byte-range support.
+
+    304 when If-None-Match matches (or, without it, If-Modified-Since is not
+    older than the file); 206 for a satisfiable single range unless an
+    If-Range validator is stale; 416 for an unsatisfiable range; 200 otherwise.
+    `etag` must be strong for ranges to be honoured across requests.
+
+    With `accel_location` the body is left to the reverse proxy: the
+    response is an empty `X-Accel-Redirect` to that internal location, and
+    nginx sends the file (and handles Range) itself; the internal location
+    re-sends this response's ETag and Last-Modified in place of its own. For
+    content that is not a local file, pass `stream(start, end)` yielding
+    those bytes (inclusive) instead of `path`. Without a `media_type`, one
+    is guessed from the name, else application/octet-stream.
+    """
+    cached = conditional_response(request, etag, last_modified, cache_control)
+    if cached is not None:
+        return cached
+    media_type = media_type or guess_type(filename or path or "")[0] or "application/octet-stream"
+
+    headers = {"ETag": etag, "Last-Modified": http_date(_aware(last_modified)),
+               "Cache-Control": cache_control, "Accept-Ranges": "bytes"}
+    if accel_location:
+        headers["X-Accel-Redirect"] = accel_location
+        if filename is not None:
+            headers["Content-Disposition"] = content_disposition(filename)
+        return Response(headers=headers, media_type=media_type)
+
+    if_range = request.headers.get("if-range")
+    byte_range = None
+    if if_range is None or (not if_range.strip().startswith("W/") and if_range.strip() == etag):
+        try:
+            byte_range = parse_range(request.headers.get("range"), size)
+        except RangeNotSatisfiable:
+            return Response(status_code=416, headers={**headers, "Content-Range": f"bytes */{size}"})
+    if stream is not None:
+        start, end = byte_range or (0, size - 1)
+        headers["Content-Length"] = str(end - start + 1)
+        if byte_range:
+            headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+        if filename is not None:
+            headers["Content-Disposition"] = content_disposition(filename)
+        return StreamingResponse(
+            stream(start, end) if size else iter(()), status_code=206 if byte_range else 200, headers=headers,
+            media_type=media_type,
+        )
+    if byte_range is None:
+        return FileResponse(path, filename=filename, media_type=media_type, headers=headers)
+    return _PartialFileResponse(path, *byte_range, size, filename=filename, media_type=media_type, headers=headers)
@@ -2,73 +2,254 @@ from reportlab.lib import colors
 from reportlab.lib.pagesizes import letter
 from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
 from reportlab.lib.units import inch
-from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer, PageBreak
+from reportlab.platypus import SimpleDocTemplate, Table, LongTable, TableStyle, Paragraph, Spacer, PageBreak
 from reportlab.lib.enums import TA_CENTER
 from datetime import datetime
+from functools import lru_cache
+from types import SimpleNamespace
 import io
 
-def generate_meeting_summary_pdf(meeting_data, participants, patients, agenda_items, decisions):
+# Meetings with more agenda items + decisions than this are laid out in
+# large-document mode (see generate_meeting_summary_pdf).
+LARGE_DOCUMENT_THRESHOLD = 60
+
+# Rows per table in large-document mode. Splitting one huge table across
+# pages costs time quadratic in its rows; several medium ones do not.
+TABLE_CHUNK_ROWS = 200
+
+
+@lru_cache(maxsize=1)
+def _styles():
+    """Paragraph styles, built once per process instead of once per report."""
+    styles = getSampleStyleSheet()
+    normal = styles['Normal']
+    return SimpleNamespace(
+        title=ParagraphStyle(
+            'CustomTitle',
+            parent=styles['Heading1'],
+            fontSize=24,
+            textColor=colors.HexColor('#0b0b30'),
+            spaceAfter=30,
+            alignment=TA_CENTER,
+            fontName='Helvetica-Bold'
+        ),
+        heading=ParagraphStyle(
+            'CustomHeading',
+            parent=styles['Heading2'],
+            fontSize=16,
+            textColor=colors.HexColor('#3b6658'),
+            spaceAfter=12,
+            spaceBefore=20,
+            fontName='Helvetica-Bold'
+        ),
+        subheading=ParagraphStyle(
+            'CustomSubHeading',
+            parent=styles['Heading3'],
+            fontSize=14,
+            textColor=colors.HexColor('#694e20'),
+            spaceAfter=10,
+            spaceBefore=15,
+            fontName='Helvetica-Bold'
+        ),
+        normal=normal,
+        # Large-document mode: one paragraph per item, spacing in the style
+        # rather than separate Spacer flowables.
+        item_body=ParagraphStyle('ItemBody', parent=normal, spaceAfter=0.15*inch),
+        footer=ParagraphStyle('Footer', parent=normal, fontSize=8, textColor=colors.grey, alignment=TA_CENTER),
+    )
+
+
+_INFO_TABLE_STYLE = TableStyle([
+    ('BACKGROUND', (0, 0), (0, -1), colors.HexColor('#e8e8f5')),
+    ('TEXTCOLOR', (0, 0), (-1, -1), colors.black),
+    ('ALIGN', (0, 0), (0, -1), 'RIGHT'),
+    ('ALIGN', (1, 0), (1, -1), 'LEFT'),
+    ('FONTNAME', (0, 0), (0, -1), 'Helvetica-Bold'),
+    ('FONTNAME', (1, 0), (1, -1), 'Helvetica'),
+    ('FONTSIZE', (0, 0), (-1, -1), 10),
+    ('BOTTOMPADDING', (0, 0), (-1, -1), 8),
+    ('TOPPADDING', (0, 0), (-1, -1), 8),
+    ('GRID', (0, 0), (-1, -1), 0.5, colors.grey),
+])
+
+
+@lru_cache(maxsize=None)
+def _list_table_style(header_color):
+    return TableStyle([
+        ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor(header_color)),
+        ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+        ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
+        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+        ('FONTSIZE', (0, 0), (-1, 0), 11),
+        ('FONTNAME', (0, 1), (-1, -1), 'Helvetica'),
+        ('FONTSIZE', (0, 1), (-1, -1), 9),
+        ('BOTTOMPADDING', (0, 0), (-1, -1), 6),
+        ('TOPPADDING', (0, 0), (-1, -1), 6),
+        ('GRID', (0, 0), (-1, -1), 0.5, colors.grey),
+        ('ROWBACKGROUNDS', (0, 1), (-1, -1), [colors.white, colors.HexColor('#f5f5f5')]),
+    ])
+
+
+def _list_tables(header, rows, col_widths, header_color, large):
+    """A header + rows table; in large mode split into LongTables of
+    TABLE_CHUNK_ROWS rows that repeat the header on every page."""
+    style = _list_table_style(header_color)
+    if not large:
+        table = Table([header] + rows, colWidths=col_widths)
+        table.setStyle(style)
+        return [table]
+    tables = []
+    for start in range(0, len(rows), TABLE_CHUNK_ROWS):
+        table = LongTable([header] + rows[start:start + TABLE_CHUNK_ROWS], colWidths=col_widths, repeatRows=1)
+        table.setStyle(style)
+        tables.append(table)
+    return tables
+
+
+def _agenda_flowables(idx, item, styles, large):
+    heading = f"<b>{idx}. {item.get('title')}</b>" if item.get('title') else f"<b>Agenda Item {idx}</b>"
+    patient_info = []
+    if item.get('patient_name'):
+        patient_info.append(item.get('patient_name'))
+    if item.get('patient_mrn'):
+        patient_info.append(f"MRN: {item.get('patient_mrn')}")
+
+    if large:
+        lines = []
+        if item.get('description'):
+            lines.append(f"<i>Description:</i> {item.get('description', '')}")
+        if patient_info:
+            lines.append(f"<i>Patient:</i> {' - '.join(patient_info)}")
+        if item.get('presenter'):
+            lines.append(f"<i>Presenter:</i> {item.get('presenter', '')}")
+        if item.get('duration'):
+            lines.append(f"<i>Duration:</i> {item.get('duration', '')} minutes")
+        if item.get('treatment_plan'):
+            lines.append("<b><u>Treatment Plan:</u></b>")
+            lines.append(item.get('treatment_plan', '').replace('\n', '<br/>'))
+        flowables = [Paragraph(heading, styles.subheading)]
+        if lines:
+            flowables.append(Paragraph('<br/>'.join(lines), styles.item_body))
+        return flowables
+
+    normal_style = styles.normal
+    elements = [Paragraph(heading, styles.subheading)]
+
+    if item.get('description'):
+        elements.append(Paragraph(f"<i>Description:</i> {item.get('description', '')}", normal_style))
+        elements.append(Spacer(1, 0.1*inch))
+
+    # Show patient name and MRN together
+    if patient_info:
+        elements.append(Paragraph(f"<i>Patient:</i> {' - '.join(patient_info)}", normal_style))
+        elements.append(Spacer(1, 0.1*inch))
+
+    if item.get('presenter'):
+        elements.append(Paragraph(f"<i>Presenter:</i> {item.get('presenter', '')}", normal_style))
+        elements.append(Spacer(1, 0.1*inch))
+
+    if item.get('duration'):
+        elements.append(Paragraph(f"<i>Duration:</i> {item.get('duration', '')} minutes", normal_style))
+        elements.append(Spacer(1, 0.1*inch))
+
+    # Treatment Plan with patient info
+    if item.get('treatment_plan'):
+        elements.append(Paragraph("<b><u>Treatment Plan:</u></b>", normal_style))
+        elements.append(Spacer(1, 0.05*inch))
+
+        # Add patient info in treatment plan section if available
+        if item.get('patient_name') or item.get('patient_mrn'):
+            patient_header = []
+            if item.get('patient_name'):
+                patient_header.append(f"<b>Patient:</b> {item.get('patient_name')}")
+            if item.get('patient_mrn'):
+                patient_header.append(f"<b>MRN:</b> {item.get('patient_mrn')}")
+            elements.append(Paragraph(' | '.join(patient_header), normal_style))
+            elements.append(Spacer(1, 0.05*inch))
+
+        treatment_text = item.get('treatment_plan', '').replace('\n', '<br/>')
+        elements.append(Paragraph(treatment_text, normal_style))
+
+    elements.append(Spacer(1, 0.15*inch))
+    return elements
+
+
+def _decision_flowables(idx, decision, styles, large):
+    heading = Paragraph(f"<b>Decision #{idx}</b>", styles.subheading)
+    title = f"<i>Title:</i> {decision.get('title', 'Untitled Decision')}"
+
+    if large:
+        lines = [title]
+        if decision.get('description'):
+            lines.append(f"<i>Description:</i><br/>{decision.get('description', '').replace(chr(10), '<br/>')}")
+        if decision.get('decision_maker'):
+            lines.append(f"<i>Decision Maker:</i> {decision.get('decision_maker', '')}")
+        if decision.get('created_at'):
+            lines.append(f"<i>Recorded On:</i> {decision.get('created_at', '')}")
+        return [heading, Paragraph('<br/>'.join(lines), styles.item_body)]
+
+    normal_style = styles.normal
+    elements = [heading, Paragraph(title, normal_style), Spacer(1, 0.05*inch)]
+
+    if decision.get('description'):
+        decision_text = decision.get('description', '').replace('\n', '<br/>')
+        elements.append(Paragraph(f"<i>Description:</i><br/>{decision_text}", normal_style))
+        elements.append(Spacer(1, 0.05*inch))
+
+    if decision.get('decision_maker'):
+        elements.append(Paragraph(f"<i>Decision Maker:</i> {decision.get('decision_maker', '')}", normal_style))
+
+    if decision.get('created_at'):
+        elements.append(Paragraph(f"<i>Recorded On:</i> {decision.get('created_at', '')}", normal_style))
+
+    elements.append(Spacer(1, 0.2*inch))
+    return elements
+
+
+def generate_meeting_summary_pdf(meeting_data, participants, patients, agenda_items, decisions,
+                                 output=None, large=None):
     """
     Generate a comprehensive PDF summary for a meeting
-    
+
     Args:
         meeting_data: Dictionary containing meeting information
         participants: List of participant dictionaries
         patients: List of patient dictionaries
         agenda_items: List of agenda item dictionaries (with treatment plans)
         decisions: List of decision dictionaries
-    
+        output: Optional writable binary file-like object to write the PDF to
+        large: Force large-document mode on or off; by default it is used when
+            agenda items + decisions exceed LARGE_DOCUMENT_THRESHOLD. It splits
+            tables into LongTable chunks with repeating headers, lays out each
+            agenda item and decision as a single paragraph and compresses page
+            streams, which keeps memory and render time in check for reports
+            with hundreds of cases.
+
     Returns:
-        BytesIO object containing the PDF
+        The PDF bytes, or None when written to `output`
     """
-    buffer = io.BytesIO()
-    doc = SimpleDocTemplate(buffer, pagesize=letter, topMargin=0.5*inch, bottomMargin=0.5*inch)
-    
+    if large is None:
+        large = len(agenda_items) + len(decisions) > LARGE_DOCUMENT_THRESHOLD
+    buffer = output if output is not None else io.BytesIO()
+    doc = SimpleDocTemplate(
+        buffer, pagesize=letter, topMargin=0.5*inch, bottomMargin=0.5*inch,
+        pageCompression=1 if large else None,
+    )
+
     # Container for the 'Flowable' objects
     elements = []
-    
-    # Define styles
-    styles = getSampleStyleSheet()
-    title_style = ParagraphStyle(
-        'CustomTitle',
-        parent=styles['Heading1'],
-        fontSize=24,
-        textColor=colors.HexColor('#0b0b30'),
-        spaceAfter=30,
-        alignment=TA_CENTER,
-        fontName='Helvetica-Bold'
-    )
-    
-    heading_style = ParagraphStyle(
-        'CustomHeading',
-        parent=styles['Heading2'],
-        fontSize=16,
-        textColor=colors.HexColor('#3b6658'),
-        spaceAfter=12,
-        spaceBefore=20,
-        fontName='Helvetica-Bold'
-    )
-    
-    subheading_style = ParagraphStyle(
-        'CustomSubHeading',
-        parent=styles['Heading3'],
-        fontSize=14,
-        textColor=colors.HexColor('#694e20'),
-        spaceAfter=10,
-        spaceBefore=15,
-        fontName='Helvetica-Bold'
-    )
-    
-    normal_style = styles['Normal']
-    
+
+    styles = _styles()
+    heading_style = styles.heading
+
     # Title
-    title = Paragraph("<b>Meeting Summary Report</b>", title_style)
+    title = Paragraph("<b>Meeting Summary Report</b>", styles.title)
     elements.append(title)
     elements.append(Spacer(1, 0.2*inch))
-    
+
     # Meeting Information Section
     elements.append(Paragraph("<b>Meeting Information</b>", heading_style))
-    
+
     meeting_info = [
         ['Meeting Title:', meeting_data.get('title', 'N/A')],
         ['Date:', meeting_data.get('meeting_date', 'N/A')],
@@ -78,172 +259,79 @@ def generate_meeting_summary_pdf(meeting_data, participants, patients, agenda_it
         ['Status:', meeting_data.get('status', 'N/A').replace('_', ' ').title()],
         ['Organizer:', meeting_data.get('organizer_name', 'N/A')],
     ]
-    
+
     if meeting_data.get('description'):
         meeting_info.append(['Description:', meeting_data.get('description', '')])
-    
+
     meeting_table = Table(meeting_info, colWidths=[2*inch, 5*inch])
-    meeting_table.setStyle(TableStyle([
-        ('BACKGROUND', (0, 0), (0, -1), colors.HexColor('#e8e8f5')),
-        ('TEXTCOLOR', (0, 0), (-1, -1), colors.black),
-        ('ALIGN', (0, 0), (0, -1), 'RIGHT'),
-        ('ALIGN', (1, 0), (1, -1), 'LEFT'),
-        ('FONTNAME', (0, 0), (0, -1), 'Helvetica-Bold'),
-        ('FONTNAME', (1, 0), (1, -1), 'Helvetica'),
-        ('FONTSIZE', (0, 0), (-1, -1), 10),
-        ('BOTTOMPADDING', (0, 0), (-1, -1), 8),
-        ('TOPPADDING', (0, 0), (-1, -1), 8),
-        ('GRID', (0, 0), (-1, -1), 0.5, colors.grey),
-    ]))
+    meeting_table.setStyle(_INFO_TABLE_STYLE)
     elements.append(meeting_table)
     elements.append(Spacer(1, 0.3*inch))
-    
+
     # Participants Section
     if participants:
         elements.append(Paragraph("<b>Participants</b>", heading_style))
-        
-        participant_data = [['Name', 'Role', 'Specialty', 'Response']]
+
+        participant_rows = []
         for p in participants:
-            participant_data.append([
+            participant_rows.append([
                 p.get('name', 'N/A'),
                 p.get('role', 'N/A').title(),
                 p.get('specialty', 'N/A'),
                 p.get('response_status', 'pending').replace('_', ' ').title()
             ])
-        
-        participant_table = Table(participant_data, colWidths=[2*inch, 1.5*inch, 2*inch, 1.5*inch])
-        participant_table.setStyle(TableStyle([
-            ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#3b6658')),
-            ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-            ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-            ('FONTSIZE', (0, 0), (-1, 0), 11),
-            ('FONTNAME', (0, 1), (-1, -1), 'Helvetica'),
-            ('FONTSIZE', (0, 1), (-1, -1), 9),
-            ('BOTTOMPADDING', (0, 0), (-1, -1), 6),
-            ('TOPPADDING', (0, 0), (-1, -1), 6),
-            ('GRID', (0, 0), (-1, -1), 0.5, colors.grey),
-            ('ROWBACKGROUNDS', (0, 1), (-1, -1), [colors.white, colors.HexColor('#f5f5f5')]),
-        ]))
-        elements.append(participant_table)
+
+        elements.extend(_list_tables(
+            ['Name', 'Role', 'Specialty', 'Response'], participant_rows,
+            [2*inch, 1.5*inch, 2*inch, 1.5*inch], '#3b6658', large,
+        ))
         elements.append(Spacer(1, 0.3*inch))
-    
+
     # Patients Section
     if patients:
         elements.append(Paragraph("<b>Patients Discussed</b>", heading_style))
-        
-        patient_data = [['Patient Name', 'ID', 'Age', 'Department', 'Primary Diagnosis']]
+
+        patient_rows = []
         for patient in patients:
-            patient_data.append([
+            patient_rows.append([
                 f"{patient.get('first_name', '')} {patient.get('last_name', '')}",
                 patient.get('patient_id_number', 'N/A'),
                 f"{patient.get('age', 'N/A')} yrs" if patient.get('age') else 'N/A',
                 patient.get('department_name', 'N/A'),
                 patient.get('primary_diagnosis', 'N/A')[:30] + '...' if patient.get('primary_diagnosis') and len(patient.get('primary_diagnosis', '')) > 30 else patient.get('primary_diagnosis', 'N/A')
             ])
-        
-        patient_table = Table(patient_data, colWidths=[1.8*inch, 1*inch, 0.8*inch, 1.5*inch, 1.9*inch])
-        patient_table.setStyle(TableStyle([
-            ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#694e20')),
-            ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-            ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-            ('FONTSIZE', (0, 0), (-1, 0), 11),
-            ('FONTNAME', (0, 1), (-1, -1), 'Helvetica'),
-            ('FONTSIZE', (0, 1), (-1, -1), 9),
-            ('BOTTOMPADDING', (0, 0), (-1, -1), 6),
-            ('TOPPADDING', (0, 0), (-1, -1), 6),
-            ('GRID', (0, 0), (-1, -1), 0.5, colors.grey),
-            ('ROWBACKGROUNDS', (0, 1), (-1, -1), [colors.white, colors.HexColor('#f5f5f5')]),
-        ]))
-        elements.append(patient_table)
+
+        elements.extend(_list_tables(
+            ['Patient Name', 'ID', 'Age', 'Department', 'Primary Diagnosis'], patient_rows,
+            [1.8*inch, 1*inch, 0.8*inch, 1.5*inch, 1.9*inch], '#694e20', large,
+        ))
         elements.append(Spacer(1, 0.3*inch))
-    
+
     # Agenda Items & Treatment Plans Section
     if agenda_items:
         elements.append(Paragraph("<b>Agenda Items & Treatment Plans</b>", heading_style))
-        
+
         for idx, item in enumerate(agenda_items, 1):
-            # Only show title if it exists
-            if item.get('title'):
-                elements.append(Paragraph(f"<b>{idx}. {item.get('title')}</b>", subheading_style))
-            else:
-                elements.append(Paragraph(f"<b>Agenda Item {idx}</b>", subheading_style))
-            
-            if item.get('description'):
-                elements.append(Paragraph(f"<i>Description:</i> {item.get('description', '')}", normal_style))
-                elements.append(Spacer(1, 0.1*inch))
-            
-            # Show patient name and MRN together
-            if item.get('patient_name') or item.get('patient_mrn'):
-                patient_info = []
-                if item.get('patient_name'):
-                    patient_info.append(item.get('patient_name'))
-                if item.get('patient_mrn'):
-                    patient_info.append(f"MRN: {item.get('patient_mrn')}")
-                elements.append(Paragraph(f"<i>Patient:</i> {' - '.join(patient_info)}", normal_style))
-                elements.append(Spacer(1, 0.1*inch))
-            
-            if item.get('presenter'):
-                elements.append(Paragraph(f"<i>Presenter:</i> {item.get('presenter', '')}", normal_style))
-                elements.append(Spacer(1, 0.1*inch))
-            
-            if item.get('duration'):
-                elements.append(Paragraph(f"<i>Duration:</i> {item.get('duration', '')} minutes", normal_style))
-                elements.append(Spacer(1, 0.1*inch))
-            
-            # Treatment Plan with patient info
-            if item.get('treatment_plan'):
-                elements.append(Paragraph("<b><u>Treatment Plan:</u></b>", normal_style))
-                elements.append(Spacer(1, 0.05*inch))
-                
-                # Add patient info in treatment plan section if available
-                if item.get('patient_name') or item.get('patient_mrn'):
-                    patient_header = []
-                    if item.get('patient_name'):
-                        patient_header.append(f"<b>Patient:</b> {item.get('patient_name')}")
-                    if item.get('patient_mrn'):
-                        patient_header.append(f"<b>MRN:</b> {item.get('patient_mrn')}")
-                    elements.append(Paragraph(' | '.join(patient_header), normal_style))
-                    elements.append(Spacer(1, 0.05*inch))
-                
-                treatment_text = item.get('treatment_plan', '').replace('\n', '<br/>')
-                elements.append(Paragraph(treatment_text, normal_style))
-            
-            elements.append(Spacer(1, 0.15*inch))
-    
+            elements.extend(_agenda_flowables(idx, item, styles, large))
+
     # Decisions Section
     if decisions:
         elements.append(PageBreak())
         elements.append(Paragraph("<b>Meeting Decisions</b>", heading_style))
-        
+
         for idx, decision in enumerate(decisions, 1):
-            elements.append(Paragraph(f"<b>Decision #{idx}</b>", subheading_style))
-            elements.append(Paragraph(f"<i>Title:</i> {decision.get('title', 'Untitled Decision')}", normal_style))
-            elements.append(Spacer(1, 0.05*inch))
-            
-            if decision.get('description'):
-                decision_text = decision.get('description', '').replace('\n', '<br/>')
-                elements.append(Paragraph(f"<i>Description:</i><br/>{decision_text}", normal_style))
-                elements.append(Spacer(1, 0.05*inch))
-            
-            if decision.get('decision_maker'):
-                elements.append(Paragraph(f"<i>Decision Maker:</i> {decision.get('decision_maker', '')}", normal_style))
-            
-            if decision.get('created_at'):
-                elements.append(Paragraph(f"<i>Recorded On:</i> {decision.get('created_at', '')}", normal_style))
-            
-            elements.append(Spacer(1, 0.2*inch))
-    
+            elements.extend(_decision_flowables(idx, decision, styles, large))
+
     # Footer
     elements.append(Spacer(1, 0.5*inch))
     footer_text = f"<i>Report generated on {datetime.now().strftime('%B %d, %Y at %I:%M %p')}</i>"
-    footer = Paragraph(footer_text, ParagraphStyle('Footer', parent=normal_style, fontSize=8, textColor=colors.grey, alignment=TA_CENTER))
-    elements.append(footer)
-    
+    elements.append(Paragraph(footer_text, styles.footer))
+
     # Build PDF
     doc.build(elements)
-    
+
+    if output is not None:
+        return None
     # Get the value of the BytesIO buffer and return it
     pdf = buffer.getvalue()
     buffer.close()
@@ -0,0 +1,147 @@
+"""
+Background work off the request path: a bounded queue and a process pool.
+
+`WorkQueue` holds a backlog of keys (e.g. blob hashes) that a few asyncio
+workers feed to an async handler, one key at a time each. The backlog is
+bounded. `submit` never waits, and it returns False when the queue is full
+or not running, so a burst of uploads cannot pile up unbounded work in
+memory. Callers keep the real state in MongoDB and re-submit whatever is
+still unprocessed later (see the startup backfills). A key already waiting
+is not queued twice. A key submitted while it is being worked on runs once
+more afterwards, since it may have arrived with new work. A key is never
+handled by two workers at once.
+
+`ProcessPool` runs CPU-heavy functions in spawned worker processes, so
+they hold neither the event loop nor the GIL. A pool whose worker died
+(e.g. OOM-killed) is replaced and the call retried once. The PDF render
+pools (services/meeting_summary.py), previews and text extraction use it.
+
+Both are per process, which matches the single-uvicorn deployment.
+"""
+import asyncio
+import logging
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Awaitable, Callable, List, Optional, Set
+
+logger = logging.getLogger(__name__)
+
+
+class WorkQueue:
+    """At most `max_backlog` keys waiting, `workers` handled at a time."""
+
+    def __init__(self, name: str, handler: Callable[[str], Awaitable[None]], workers: int, max_backlog: int):
+        self.name = name
+        self.handler = handler
+        self.workers = max(1, workers)
+        self.max_backlog = max(1, max_backlog)
+        self._queue: Optional[asyncio.Queue] = None
+        self._tasks: List[asyncio.Task] = []
+        self._waiting: Set[str] = set()
+        self._active: Set[str] = set()
+        self._again: Set[str] = set()
+        self.processed = 0
+        self.failed = 0
+        self.dropped = 0
+
+    @property
+    def running(self) -> bool:
+        return bool(self._tasks)
+
+    def start(self) -> None:
+        if self.running:
+            return
+        self._queue = asyncio.Queue(maxsize=self.max_backlog)
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    async def stop(self) -> None:
+        tasks, self._tasks = self._tasks, []
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._waiting.clear()
+        self._active.clear()
+        self._again.clear()
+        self._queue = None
+
+    def submit(self, key: str) -> bool:
+        """Queue `key` unless it is already waiting. False when the backlog
+        is full (or the queue is stopped); the key is then not queued."""
+        if key in self._waiting or key in self._again:
+            return True
+        if key in self._active and self._queue is not None:
+            self._again.add(key)
+            return True
+        if self._queue is None or self._queue.full():
+            self.dropped += 1
+            return False
+        self._waiting.add(key)
+        self._queue.put_nowait(key)
+        return True
+
+    def has_room(self) -> bool:
+        return self._queue is not None and not self._queue.full()
+
+    async def join(self) -> None:
+        """Wait until every queued key has been handled."""
+        if self._queue is not None:
+            await self._queue.join()
+
+    async def _worker(self) -> None:
+        while True:
+            key = await self._queue.get()
+            self._waiting.discard(key)
+            self._active.add(key)
+            try:
+                while True:
+                    try:
+                        await self.handler(key)
+                        self.processed += 1
+                    except Exception as e:
+                        self.failed += 1
+                        logger.warning("%s: %s failed: %s", self.name, key, e)
+                    if key not in self._again:
+                        break
+                    self._again.discard(key)
+            finally:
+                self._active.discard(key)
+                self._queue.task_done()
+
+    def stats(self) -> dict:
+        return {"backlog": self._queue.qsize() if self._queue else 0, "max_backlog": self.max_backlog,
+                "in_progress": len(self._active),
+                "workers": self.workers, "processed": self.processed, "failed": self.failed,
+                "dropped": self.dropped}
+
+
+class ProcessPool:
+    """Spawned worker processes, created on first use."""
+
+    def __init__(self, name: str, workers: int):
+        self.name = name
+        self.workers = max(1, workers)
+        self._executor: Optional[ProcessPoolExecutor] = None
+
+    def _pool(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            # spawn: the server process runs threads (Motor, SMTP sends),
+            # which fork does not copy safely.
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers, mp_context=multiprocessing.get_context("spawn"),
+            )
+        return self._executor
+
+    async def run(self, fn: Callable, *args):
+        loop = asyncio.get_running_loop()
+        try:
+            return await loop.run_in_executor(self._pool(), fn, *args)
+        except BrokenProcessPool:
+            logger.warning("%s process pool broke; restarting it", self.name)
+            self.shutdown()
+            return await loop.run_in_executor(self._pool(), fn, *args)
+
+    def shutdown(self) -> None:
+        executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
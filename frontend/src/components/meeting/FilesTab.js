@@ -1,9 +1,9 @@
-import React from 'react';
+import React, { useEffect, useState } from 'react';
 import { Card, CardContent } from '@/components/ui/card';
 import { Button } from '@/components/ui/button';
 import { Badge } from '@/components/ui/badge';
 import { Upload, FileText, Download, Trash2 } from 'lucide-react';
-import { downloadFile } from '@/lib/api';
+import { downloadFile, fetchFilePreview } from '@/lib/api';
 import { colorAt } from '@/lib/meetingColors';
 import { toast } from '@/components/ui/sonner';
 
@@ -18,6 +18,55 @@ const DEFAULT_FILE_ICONS = {
 const defaultGetFileIcon = (type) =>
     DEFAULT_FILE_ICONS[type] || DEFAULT_FILE_ICONS.other;
 
+const PREVIEW_POLL_MS = 2000;
+const PREVIEW_MAX_POLLS = 10;
+
+// First-page / downscaled preview of a PDF or image, rendered by the
+// backend after upload. Polls while it is pending; renders nothing for
+// files without one.
+function FilePreview({ file }) {
+    const [url, setUrl] = useState(null);
+
+    useEffect(() => {
+        let cancelled = false;
+        let objectUrl = null;
+        let timer = null;
+        const load = async (attempt) => {
+            try {
+                const result = await fetchFilePreview(file.id);
+                if (cancelled) {
+                    if (result.url) window.URL.revokeObjectURL(result.url);
+                    return;
+                }
+                if (result.status === 'ready') {
+                    objectUrl = result.url;
+                    setUrl(result.url);
+                } else if (result.status === 'pending' && attempt < PREVIEW_MAX_POLLS) {
+                    timer = setTimeout(() => load(attempt + 1), PREVIEW_POLL_MS);
+                }
+            } catch (e) {
+                // No preview is fine; the file card still works.
+            }
+        };
+        load(1);
+        return () => {
+            cancelled = true;
+            clearTimeout(timer);
+            if (objectUrl) window.URL.revokeObjectURL(objectUrl);
+        };
+    }, [file.id]);
+
+    if (!url) return null;
+    return (
+        <img
+            src={url}
+            alt={`Preview of ${file.original_name}`}
+            className="w-full h-40 object-contain rounded-md bg-white mb-3"
+            data-testid={`file-preview-${file.id}`}
+        />
+    );
+}
+
 export default function FilesTab({
     meeting,
     onUploadClick,
@@ -62,6 +111,7 @@ export default function FilesTab({
                                 data-testid={`file-${idx}`}
                             >
                                 <CardContent className="pt-6">
+                                    <FilePreview file={file} />
                                     <div className="flex items-start justify-between mb-3">
                                         <div className="flex items-start gap-3 flex-1">
                                             <span className="text-2xl">
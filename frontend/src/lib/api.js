@@ -103,8 +103,53 @@ export const deleteFile = (fileId) => api.delete(`/files/${fileId}`);
 // Blob-based download in the browser).
 export const getFileUrl = (fileId) => `${API_URL}/api/files/${fileId}`;
 
+// Attachments held in S3 are served from presigned URLs. An XHR cannot
+// follow the API's 307 to the bucket (it would carry the Authorization
+// header and need a bucket CORS rule), so ask for the link as JSON and let
+// the browser load it directly. Other backends answer with the bytes.
+const PRESIGNED_LINK_TYPE = 'application/vnd.presigned-url+json';
+
+const presignedLink = async (response) => {
+    if (!(response.headers['content-type'] || '').startsWith(PRESIGNED_LINK_TYPE)) {
+        return null;
+    }
+    const { url } = JSON.parse(await response.data.text());
+    return url;
+};
+
+// Thumbnails are rendered in the background after upload: 202 means "not
+// ready yet, ask again", 404 means the file has no preview. Resolves to
+// { status: 'ready', url } (an object URL the caller must revoke, or a
+// presigned URL, for which revoking does nothing), { status: 'pending' }
+// or { status: 'none' }.
+export const fetchFilePreview = async (fileId) => {
+    const response = await api.get(`/files/${fileId}/preview`, {
+        params: { redirect: false },
+        responseType: 'blob',
+        validateStatus: (status) => [200, 202, 404].includes(status),
+    });
+    if (response.status === 200) {
+        const link = await presignedLink(response);
+        return { status: 'ready', url: link || window.URL.createObjectURL(response.data) };
+    }
+    return { status: response.status === 202 ? 'pending' : 'none' };
+};
+
 export const downloadFile = async (fileId, fallbackName = 'download') => {
-    const response = await api.get(`/files/${fileId}`, { responseType: 'blob' });
+    const response = await api.get(`/files/${fileId}`, {
+        params: { redirect: false },
+        responseType: 'blob',
+    });
+    const link = await presignedLink(response);
+    if (link) {
+        // The link's own Content-Disposition makes this a download.
+        const a = document.createElement('a');
+        a.href = link;
+        document.body.appendChild(a);
+        a.click();
+        a.remove();
+        return;
+    }
     // Derive a filename from the Content-Disposition header if the server sent one.
     const disp = response.headers['content-disposition'] || '';
     const match = disp.match(/filename\*?=(?:UTF-8'')?["']?([^;"']+)["']?/i);
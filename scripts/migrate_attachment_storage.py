@@ -0,0 +1,67 @@
+"""
+Move stored attachments between storage backends.
+
+Copies every blob that is not yet in the target backend (or only those in
+--from) into it, several at a time, then switches the blob over and deletes
+the old copy. Attachments still saved as per-meeting files are first folded
+into the local blob store so they move too. The backend keeps serving files
+throughout: a blob only changes backend once its copy is complete, so the
+script is safe to interrupt and re-run.
+
+USAGE
+-----
+    # Local disk -> S3 (S3_* settings from /app/backend/.env)
+    python /app/scripts/migrate_attachment_storage.py --to s3
+
+    # Only GridFS blobs, 8 in parallel, first 1000 as a trial run
+    python /app/scripts/migrate_attachment_storage.py --to s3 --from gridfs --concurrency 8 --limit 1000
+
+Set STORAGE_BACKEND to the target as well (and restart the backend) so new
+uploads land there.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import logging
+import os
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "backend")))
+
+from core import UPLOAD_DIR, db  # noqa: E402
+from services.attachments import ensure_blob_indexes, migrate_blobs, migrate_legacy_attachments  # noqa: E402
+from services.blob_storage import STORAGE_BACKENDS  # noqa: E402
+
+
+async def run(args: argparse.Namespace) -> int:
+    await ensure_blob_indexes(db)
+    folded = await migrate_legacy_attachments(db, UPLOAD_DIR)
+    if folded:
+        print(f"Legacy files folded into the blob store: {folded}")
+    counts = await migrate_blobs(db, UPLOAD_DIR, args.to, source=args.source,
+                                 concurrency=args.concurrency, limit=args.limit)
+    print(f"Moved  : {counts['moved']} blob(s), {counts['bytes'] / 1024 / 1024:.1f} MiB -> {args.to}")
+    print(f"Failed : {counts['failed']}")
+    return 1 if counts["failed"] else 0
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--to", required=True, choices=STORAGE_BACKENDS, help="backend to move blobs into")
+    parser.add_argument("--from", dest="source", choices=STORAGE_BACKENDS,
+                        help="only move blobs stored here (default: every other backend)")
+    parser.add_argument("--concurrency", type=int, default=4, help="blobs copied in parallel (default 4)")
+    parser.add_argument("--limit", type=int, help="stop after this many blobs")
+    args = parser.parse_args()
+    if args.source == args.to:
+        parser.error("--from and --to must differ")
+    if args.concurrency < 1:
+        parser.error("--concurrency must be at least 1")
+
+    logging.basicConfig(level=logging.INFO, format="%(levelname)s %(message)s")
+    sys.exit(asyncio.run(run(args)))
+
+
+if __name__ == "__main__":
+    main()